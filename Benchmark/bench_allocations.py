@@ -0,0 +1,62 @@
+# ------------------------------------------------------------
+# bench_allocations.py
+#
+# Variable and TypeConverter objects created by every engine while running a program,
+# and peak memory traced during the run
+# ------------------------------------------------------------
+import contextlib
+import io
+import os
+import sys
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+import TypeConverter
+import Variable
+from TAInterpreter import TAInterpreter
+from bench_engines import RecordingRobot
+
+created = {"Variable": 0, "TypeConverter": 0}
+
+
+def counting(cls, name):
+    init = cls.__init__
+
+    def __init__(self, *args, **kwargs):
+        created[name] += 1
+        init(self, *args, **kwargs)
+
+    cls.__init__ = __init__
+
+
+counting(Variable.Variable, "Variable")
+counting(TypeConverter.TypeConverter, "TypeConverter")
+
+
+def run(engine, program):
+    interpreter = TAInterpreter(engine=engine)
+    interpreter.parser
+    # engines import their modules on first run, that should not count as memory of the run
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        TAInterpreter(engine=engine).start(program, RecordingRobot())
+    for name in created:
+        created[name] = 0
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        interpreter.start(program, RecordingRobot())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return dict(created), peak
+
+
+if __name__ == '__main__':
+    filepath = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "Testing", "test_interpreter_counters")
+    with open(filepath, "r") as f:
+        program = f.read()
+
+    for engine in TAInterpreter.engines:
+        counts, peak = run(engine, program)
+        print(f"{engine:>8}: Variable {counts['Variable']:8d}  TypeConverter {counts['TypeConverter']:8d}  "
+              f"peak {peak / 1024:8.1f} KiB")
@@ -0,0 +1,66 @@
+# ------------------------------------------------------------
+# bench_ast_memory.py
+#
+# memory kept by syntax tree and time to build it: NodeOfST objects against
+# array columns of TAFlatTree, on generated program with many sentences
+# ------------------------------------------------------------
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+from Parser.TAParser import TAParser
+from Parser.TAFlatTree import FlatSTBuilder
+
+BLOCK = """int a{i} = inc {i} 1
+boolean f{i} = lt inc a{i} 0 100
+if gt dec a{i} 1 0 (
+    a{i} := inc a{i} dec 7 3
+) else (
+    f{i} := or not gt inc f{i} 0 0 true
+)
+while lt inc a{i} 0 10
+do (
+    a{i} := inc a{i} 1
+)
+step
+"""
+
+
+def generate(blocks):
+    body = "".join(BLOCK.format(i=i) for i in range(blocks))
+    return f"proc main [x] (\n{body})\n"
+
+
+def measure(parser, program):
+    # time is taken without tracemalloc, which slows every allocation down
+    begin = time.perf_counter()
+    parser.parse(program)
+    elapsed = time.perf_counter() - begin
+    gc.collect()
+    tracemalloc.start()
+    result = parser.parse(program)
+    gc.collect()
+    kept, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, kept, peak
+
+
+if __name__ == '__main__':
+    blocks = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    program = generate(blocks)
+    print(f"{blocks * 8} sentences, {len(program) / 1024:.0f} KiB of source")
+
+    for name, parser in (("NodeOfST", TAParser()), ("flat", TAParser(node_builder=FlatSTBuilder()))):
+        result, elapsed, kept, peak = measure(parser, program)
+        print(f"{name:>8}: parse {elapsed * 1000:8.1f} ms  tree kept {kept / 1024:8.1f} KiB  "
+              f"peak {peak / 1024:8.1f} KiB")
+        if name == "flat":
+            tree = parser.node_builder.tree
+            print(f"{'':>8}  {len(tree)} nodes in columns of {tree.nbytes() / 1024:.1f} KiB, "
+                  f"{len(tree.strings)} distinct strings")
+        del result
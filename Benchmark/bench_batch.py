@@ -0,0 +1,64 @@
+# ------------------------------------------------------------
+# bench_batch.py
+#
+# one program in many mazes: serial loop parsing the program for every maze against
+# TABatchRunner with growing number of worker processes, in mazes per second
+# ------------------------------------------------------------
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+from Robot.TAMaze import Maze
+from Robot.TAMazeFile import dump
+from Robot.TARobot import SimulatedRobot
+from TABatch import TABatchRunner
+from TAInterpreter import TAInterpreter
+
+
+def write_mazes(directory, count, side):
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"maze_{i}.tamaze")
+        with open(path, "wb") as f:
+            dump(Maze.random(side, side, density=3, seed=i), f)
+        paths.append(path)
+    return paths
+
+
+def serial(program, paths):
+    for path in paths:
+        with contextlib.redirect_stdout(io.StringIO()):
+            TAInterpreter().start(program, SimulatedRobot(Maze.load(path)))
+
+
+def batch(program, paths, workers, chunk_size):
+    for _ in TABatchRunner(program, workers=workers, chunk_size=chunk_size).run(paths):
+        pass
+
+
+def throughput(run, count):
+    begin = time.perf_counter()
+    run()
+    return count / (time.perf_counter() - begin)
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    with open(os.path.join(ROOT, "Testing", "test_interpreter_maze_loops"), "r") as f:
+        program = f.read()
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_mazes(directory, count, side=64)
+        print(f"{count} mazes, {os.cpu_count()} cores")
+        print(f"{'serial tree':>22}: {throughput(lambda: serial(program, paths), count):8.1f} mazes/s")
+        print(f"{'batch in process':>22}: {throughput(lambda: batch(program, paths, 0, 16), count):8.1f} mazes/s")
+        workers = 1
+        while workers <= (os.cpu_count() or 1):
+            rate = throughput(lambda: batch(program, paths, workers, 16), count)
+            print(f"{f'batch {workers} workers':>22}: {rate:8.1f} mazes/s")
+            workers *= 2
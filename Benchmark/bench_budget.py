@@ -0,0 +1,61 @@
+# ------------------------------------------------------------
+# bench_budget.py
+#
+# cost of execution budgets: engines with the default budget against fuel, deadline
+# and action cap all set, and how fast a program which never ends is stopped
+# ------------------------------------------------------------
+import contextlib
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter"), os.path.join(ROOT, "Benchmark")]
+
+from bench_engines import RecordingRobot
+from TABudget import ExecutionBudget
+from TAInterpreter import TAInterpreter
+
+FOREVER = """proc main [x] (
+int i = 0
+while true
+do (
+    i := inc i 1
+)
+)
+"""
+
+
+def run(engine, program, budget, repeat):
+    best = None
+    for _ in range(repeat):
+        interpreter = TAInterpreter(engine=engine, budget=budget)
+        interpreter.parser
+        robot = RecordingRobot()
+        output = io.StringIO()
+        begin = time.perf_counter()
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            interpreter.start(program, robot)
+        elapsed = time.perf_counter() - begin
+        best = elapsed if best is None else min(best, elapsed)
+    return best, robot.commands, output.getvalue()
+
+
+if __name__ == '__main__':
+    filepath = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "Testing", "test_interpreter_maze_loops")
+    with open(filepath, "r") as f:
+        program = f.read()
+
+    limited = ExecutionBudget(fuel=10 ** 9, seconds=3600, actions=10 ** 9)
+    for engine in TAInterpreter.engines:
+        plain, commands, output = run(engine, program, None, repeat=5)
+        measured, limited_commands, limited_output = run(engine, program, limited, repeat=5)
+        same = commands == limited_commands and output == limited_output
+        print(f"{engine:>8}: default {plain * 1000:8.2f} ms  all limits {measured * 1000:8.2f} ms  "
+              f"x{measured / plain:5.2f}  same: {same}")
+    print()
+    for engine in TAInterpreter.engines:
+        for budget in (ExecutionBudget(fuel=10 ** 5), ExecutionBudget(seconds=0.1)):
+            elapsed, _, output = run(engine, FOREVER, budget, repeat=1)
+            print(f"{engine:>8}: stopped after {elapsed * 1000:7.1f} ms  {output.strip()}")
@@ -0,0 +1,83 @@
+# ------------------------------------------------------------
+# bench_bytecode.py
+#
+# running a program from source (lex + parse + compile) against loading
+# its compiled bytecode file, both executed by the virtual machine. Loading saves
+# only the time before the first instruction, which is small against a run of the maze
+# program and its noise: it is measured on its own, up to the machine ready to run
+# ------------------------------------------------------------
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+import TABytecode
+from TAInterpreter import TAInterpreter
+from TAVirtualMachine import TAVirtualMachine
+from bench_engines import RecordingRobot
+
+
+def best_of(repeat, action):
+    best = None
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            action()
+        elapsed = time.perf_counter() - begin
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == '__main__':
+    filepath = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "Testing", "test_interpreter_maze_loops")
+    with open(filepath, "r") as f:
+        program = f.read()
+
+    interpreter = TAInterpreter()
+    syntax_tree, func_table, has_syntax_errors = interpreter.parser.parse(program)
+    compiled = TABytecode.TABytecodeCompiler().compile(func_table)
+    with tempfile.NamedTemporaryFile(suffix=".tabc", delete=False) as f:
+        TABytecode.dump(compiled, f)
+        compiled_path = f.name
+
+    def from_source():
+        parsed = interpreter.parser.parse(program)
+        TAInterpreter().start_compiled(TABytecode.TABytecodeCompiler().compile(parsed[1]), RecordingRobot())
+
+    def from_file():
+        with open(compiled_path, "rb") as f:
+            TAInterpreter().start_compiled(TABytecode.load(f), RecordingRobot())
+
+    def parse_and_compile():
+        TABytecode.TABytecodeCompiler().compile(interpreter.parser.parse(program)[1])
+
+    def load_only():
+        with open(compiled_path, "rb") as f:
+            TABytecode.load(f)
+
+    def ready(compiled_program):
+        # interpreter and virtual machine before the first instruction
+        ready_interpreter = TAInterpreter()
+        ready_interpreter.prepare_compiled(compiled_program, RecordingRobot())
+        TAVirtualMachine(ready_interpreter, compiled_program)
+
+    def ready_from_source():
+        ready(TABytecode.TABytecodeCompiler().compile(interpreter.parser.parse(program)[1]))
+
+    def ready_from_file():
+        with open(compiled_path, "rb") as f:
+            ready(TABytecode.load(f))
+
+    print(f"bytecode file: {os.path.getsize(compiled_path)} bytes, source: {len(program.encode())} bytes")
+    print(f"parse + compile: {best_of(20, parse_and_compile) * 1000:8.3f} ms")
+    print(f"load:            {best_of(20, load_only) * 1000:8.3f} ms")
+    print(f"ready from source: {best_of(50, ready_from_source) * 1000:6.3f} ms")
+    print(f"ready from file:   {best_of(50, ready_from_file) * 1000:6.3f} ms")
+    print(f"run from source: {best_of(20, from_source) * 1000:8.3f} ms")
+    print(f"run from file:   {best_of(20, from_file) * 1000:8.3f} ms")
+    os.remove(compiled_path)
@@ -0,0 +1,56 @@
+# ------------------------------------------------------------
+# bench_distance_field.py
+#
+# breadth-first search of distance field on random mazes and on serpentine corridor
+# (one cell wide frontier all the way, the worst case for level by level search),
+# and what cache tiers save when the same maze is analysed again
+# ------------------------------------------------------------
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+import numpy as np
+
+from Robot.TADistanceField import DistanceField, DistanceFieldCache
+from Robot.TAMaze import Maze
+
+
+def serpentine(side):
+    # walls on every other row with a gap at alternating ends, side is even so the last row is wall
+    grid = np.zeros((side, side), dtype=bool)
+    grid[1::2, :] = True
+    grid[1::4, -1] = False
+    grid[3::4, 0] = False
+    return Maze.from_grid(grid, start=(0, 0), exits=[(side - 1, side - 2)])
+
+
+def timed(run):
+    begin = time.perf_counter()
+    result = run()
+    return result, time.perf_counter() - begin
+
+
+if __name__ == '__main__':
+    cases = [(f"random {side}x{side}", Maze.random(side, side, density=3, seed=1)) for side in (1000, 3162)]
+    cases.append(("serpentine 1000x1000", serpentine(1000)))
+    for name, maze in cases:
+        field, elapsed = timed(lambda: DistanceField(maze))
+        print(f"{name:>22}: search {elapsed * 1000:8.1f} ms  {field.nbytes() / 2 ** 20:6.1f} MiB  "
+              f"optimum {field.optimum()}")
+
+    maze = cases[1][1]
+    with tempfile.TemporaryDirectory() as directory:
+        cache = DistanceFieldCache(directory=directory)
+        cache.field(maze)
+        _, memory = timed(lambda: cache.field(maze))
+        _, disk = timed(lambda: DistanceFieldCache(directory=directory).field(maze))
+    print(f"{'cached':>22}: memory hit {memory * 1000:8.1f} ms  disk hit {disk * 1000:8.1f} ms  (hashing the maze)")
+
+    field = DistanceField(maze)
+    queries = [(x, y) for x in range(0, maze.width, 7) for y in range(0, maze.height, 97)]
+    _, elapsed = timed(lambda: [field.distance(x, y) for x, y in queries])
+    print(f"{'distance query':>22}: {elapsed / len(queries) * 1e9:8.0f} ns")
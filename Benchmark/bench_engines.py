@@ -0,0 +1,91 @@
+# ------------------------------------------------------------
+# bench_engines.py
+#
+# compares execution engines of TAInterpreter on loop-heavy maze programs:
+# both engines must produce the same robot commands and declaration table
+# ------------------------------------------------------------
+import contextlib
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+from TAInterpreter import TAInterpreter
+
+DIRECTIONS = ((0, -1), (1, 0), (0, 1), (-1, 0))
+
+
+class RecordingRobot:
+    """Robot in rectangular room with pillars on every third cell, remembers every command it got"""
+
+    def __init__(self, width=40, height=30):
+        self.width = width
+        self.height = height
+        self.walls = {(x, y) for x in range(2, width - 1, 3) for y in range(2, height - 1, 3)}
+        self.x, self.y, self.heading = 1, 1, 1
+        self.commands = []
+
+    def free(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height and (x, y) not in self.walls
+
+    def step(self):
+        dx, dy = DIRECTIONS[self.heading]
+        moved = self.free(self.x + dx, self.y + dy)
+        if moved:
+            self.x, self.y = self.x + dx, self.y + dy
+        self.commands.append(("step", moved))
+        return moved
+
+    def right(self):
+        self.heading = (self.heading + 1) % 4
+        self.commands.append(("right",))
+
+    def left(self):
+        self.heading = (self.heading - 1) % 4
+        self.commands.append(("left",))
+
+    def back(self):
+        self.heading = (self.heading + 2) % 4
+        self.commands.append(("back",))
+
+    def look(self):
+        dx, dy = DIRECTIONS[self.heading]
+        distance = 0
+        while self.free(self.x + dx * (distance + 1), self.y + dy * (distance + 1)):
+            distance += 1
+        self.commands.append(("look", distance))
+        return distance
+
+    def exit(self):
+        return (self.x, self.y) == (self.width - 2, self.height - 2)
+
+
+def run(engine, program, repeat):
+    best = None
+    for _ in range(repeat):
+        interpreter = TAInterpreter(engine=engine)
+        interpreter.parser
+        robot = RecordingRobot()
+        output = io.StringIO()
+        begin = time.perf_counter()
+        with contextlib.redirect_stdout(output):
+            interpreter.start(program, robot)
+        elapsed = time.perf_counter() - begin
+        best = elapsed if best is None else min(best, elapsed)
+    return best, robot.commands, output.getvalue()
+
+
+if __name__ == '__main__':
+    filepath = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "Testing", "test_interpreter_maze_loops")
+    with open(filepath, "r") as f:
+        program = f.read()
+
+    results = {engine: run(engine, program, repeat=5) for engine in TAInterpreter.engines}
+    tree_time, tree_commands, tree_table = results["tree"]
+    for engine, (elapsed, commands, table) in results.items():
+        same = commands == tree_commands and table == tree_table
+        print(f"{engine:>8}: {elapsed * 1000:8.2f} ms  x{tree_time / elapsed:5.2f}  "
+              f"commands: {len(commands)}  same as tree: {same}")
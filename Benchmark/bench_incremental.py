@@ -0,0 +1,58 @@
+# ------------------------------------------------------------
+# bench_incremental.py
+#
+# latency from edit of one line to updated syntax tree: TAIncrementalParser
+# splicing reparsed sentences against parsing whole program, for growing programs
+# ------------------------------------------------------------
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter"), os.path.join(ROOT, "Benchmark")]
+
+from Parser.TAIncremental import TAIncrementalParser
+from bench_ast_memory import BLOCK, generate
+
+BLOCK_LINES = BLOCK.count("\n")
+
+# (name, line inside the middle block, lines replaced, text); each edit is undone after it
+EDITS = [
+    ("replace step", 12, 1, "right\n"),
+    ("insert sentence", 12, 0, "left\n"),
+    ("edit if body", 4, 1, "    a{i} := inc a{i} 2\n"),
+]
+
+
+def best_of(repeat, run):
+    best = None
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - begin
+        best = elapsed if best is None or elapsed < best else best
+    return best
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    incremental = TAIncrementalParser()
+    for blocks in (10, 100, 1000):
+        document = incremental.parse(generate(blocks))
+        full = best_of(3, lambda: incremental.parse_all(document))
+        print(f"{blocks * 8:>6} sentences: full parse {full * 1000:8.2f} ms")
+        middle = blocks // 2
+        for name, line, count, text in EDITS:
+            # program starts with proc line
+            first = 2 + middle * BLOCK_LINES + line - 1
+            text = text.format(i=middle)
+            old = "".join(document.lines[first - 1:first - 1 + count])
+            new_count = text.count("\n")
+
+            def edit_and_undo():
+                incremental.edit(document, first, count, text)
+                incremental.edit(document, first, new_count, old)
+
+            # one edit is half of the round trip
+            elapsed = best_of(repeat, edit_and_undo) / 2
+            print(f"{name:>22}: {elapsed * 1000:8.3f} ms  {document.last_parse[0]}")
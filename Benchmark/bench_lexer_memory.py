@@ -0,0 +1,72 @@
+# ------------------------------------------------------------
+# bench_lexer_memory.py
+#
+# peak memory and time of lexing and parsing generated program from file:
+# whole source string with LexToken objects against chunked streaming and token arrays
+# ------------------------------------------------------------
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+from Parser.TAParser import TAParser
+from Parser.TAFlatTree import FlatSTBuilder
+from bench_ast_memory import generate
+
+
+def measure(action):
+    # time is taken without tracemalloc, which slows every allocation down
+    gc.collect()
+    begin = time.perf_counter()
+    action()
+    elapsed = time.perf_counter() - begin
+    gc.collect()
+    tracemalloc.start()
+    result = action()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+if __name__ == '__main__':
+    blocks = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    with tempfile.NamedTemporaryFile("w", suffix=".ta", delete=False) as f:
+        f.write(generate(blocks))
+        path = f.name
+    parser = TAParser(node_builder=FlatSTBuilder(), frozen=True)
+    lexer = parser.lexer
+    print(f"source {os.path.getsize(path) / 1024:.0f} KiB")
+
+    def read():
+        with open(path) as source:
+            return source.read()
+
+    def token_list():
+        lexer.lexer.lineno = 1
+        return list(lexer.tokenize(read()))
+
+    def token_array():
+        with open(path) as source:
+            return lexer.token_array(source)
+
+    def parse_string():
+        return parser.parse(read())
+
+    def parse_stream():
+        with open(path) as source:
+            return parser.parse(source)
+
+    tokens = token_array()
+
+    cases = (("LexToken list", token_list), ("TokenArray", token_array), ("parse string", parse_string),
+             ("parse stream", parse_stream), ("parse TokenArray", lambda: parser.parse(tokens)))
+    for name, action in cases:
+        result, elapsed, peak = measure(action)
+        print(f"{name:>16}: {elapsed * 1000:8.1f} ms  peak {peak / 1024:9.1f} KiB")
+    print(f"{len(tokens)} tokens in arrays of {tokens.nbytes() / 1024:.1f} KiB, {len(tokens.strings)} distinct strings")
+    os.unlink(path)
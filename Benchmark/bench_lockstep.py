@@ -0,0 +1,68 @@
+# ------------------------------------------------------------
+# bench_lockstep.py
+#
+# one program for many robots in one process: robots run one by one on the unboxed engine
+# against TALockstepRunner advancing all of them at once, in robots per second;
+# lockstep results must be the ones robots get on their own; python work of every sentence is paid
+# once for all robots, so lockstep gains only with many of them and stays flat above CHUNK_ROBOTS
+# ------------------------------------------------------------
+import contextlib
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+import numpy as np
+
+from Robot.TAMaze import Maze
+from Robot.TARobot import SimulatedRobot
+from Robot.TARobotArray import RobotArray
+from TAInterpreter import TAInterpreter
+from TALockstep import TALockstepRunner
+
+
+def random_starts(maze, count, seed):
+    rng = np.random.default_rng(seed)
+    cells = rng.choice(np.flatnonzero(~maze.to_grid().reshape(-1)), size=count)
+    return [(int(cell) % maze.width, int(cell) // maze.width) for cell in cells], rng.integers(0, 4, count).tolist()
+
+
+def one_by_one(program, maze, starts, headings):
+    robots = []
+    for start, heading in zip(starts, headings):
+        robot = SimulatedRobot(maze, start, heading)
+        with contextlib.redirect_stdout(io.StringIO()):
+            TAInterpreter(engine="unboxed").start(program, robot)
+        robots.append((robot.steps, robot.actions, robot.position()))
+    return robots
+
+
+def lockstep(program, maze, starts, headings):
+    results = TALockstepRunner(program).run(RobotArray(maze, starts, headings))
+    return [(result.steps, result.actions, result.position) for result in results]
+
+
+def timed(run):
+    begin = time.perf_counter()
+    result = run()
+    return result, time.perf_counter() - begin
+
+
+if __name__ == '__main__':
+    with open(os.path.join(ROOT, "Testing", "test_interpreter_maze_loops"), "r") as f:
+        program = f.read()
+    maze = Maze.random(256, 256, density=2, seed=1)
+    maze.build_look_tables()
+    sample = 100
+    starts, headings = random_starts(maze, sample, seed=0)
+    alone, elapsed = timed(lambda: one_by_one(program, maze, starts, headings))
+    print(f"{'unboxed one by one':>24}: {sample / elapsed:10.1f} robots/s")
+    together, _ = timed(lambda: lockstep(program, maze, starts, headings))
+    print(f"{'':>24}  lockstep results of {sample} robots are the same: {alone == together}")
+    for count in (100, 1000, 10000, 100000):
+        starts, headings = random_starts(maze, count, seed=count)
+        _, elapsed = timed(lambda: lockstep(program, maze, starts, headings))
+        print(f"{f'lockstep {count} robots':>24}: {count / elapsed:10.1f} robots/s")
@@ -0,0 +1,60 @@
+# ------------------------------------------------------------
+# bench_look.py
+#
+# look of simulated robot: time to build look tables, to update them when a cell changes
+# and per-call latency with tables against scanning the maze, on sparse and dense mazes
+# ------------------------------------------------------------
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+from Robot.TAMaze import Maze
+from Robot.TARobot import SimulatedRobot
+
+CALLS = 100000
+
+
+def free_cells(maze, count, seed=1):
+    rng = random.Random(seed)
+    cells = []
+    while len(cells) < count:
+        x, y = rng.randrange(maze.width), rng.randrange(maze.height)
+        if not maze.blocked(x, y):
+            cells.append((x, y, rng.randrange(4)))
+    return cells
+
+
+def look_latency(maze, cells, look_tables):
+    # robot is moved between calls, so reads are spread over the whole maze
+    robot = SimulatedRobot(maze, look_tables=look_tables)
+    begin = time.perf_counter()
+    for robot.x, robot.y, robot.heading in cells:
+        robot.look()
+    return (time.perf_counter() - begin) / len(cells)
+
+
+if __name__ == '__main__':
+    for side in (300, 1000, 3162):
+        for density in (2, 4):
+            maze = Maze.random(side, side, density=density, seed=1)
+            cells = free_cells(maze, CALLS)
+            scanned = look_latency(maze, cells, look_tables=False)
+
+            begin = time.perf_counter()
+            tables = maze.build_look_tables()
+            build = time.perf_counter() - begin
+            read = look_latency(maze, cells, look_tables=True)
+
+            changed = cells[:1000]
+            begin = time.perf_counter()
+            for x, y, _ in changed:
+                maze.set_blocked(x, y, True)
+            update = (time.perf_counter() - begin) / len(changed)
+
+            print(f"{side}x{side} 1/{2 ** density} blocked: build {build * 1000:8.1f} ms "
+                  f"{tables.nbytes() / 2 ** 20:6.1f} MiB  update {update * 1e6:7.1f} us  "
+                  f"look scanning {scanned * 1e9:7.0f} ns  tables {read * 1e9:5.0f} ns")
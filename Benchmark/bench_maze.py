@@ -0,0 +1,65 @@
+# ------------------------------------------------------------
+# bench_maze.py
+#
+# memory of bit-packed Maze against set of blocked (x, y) tuples robots usually keep,
+# and time of robot commands on a maze of more than 10^7 cells
+# ------------------------------------------------------------
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+import numpy as np
+
+from Robot.TAMaze import Maze
+from Robot.TARobot import SimulatedRobot
+
+
+def traced(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    kept, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, kept, peak
+
+
+def tuple_walls(maze):
+    # the same obstacles as set of tuples, built row by row
+    walls = set()
+    for y in range(maze.height):
+        row = np.unpackbits(maze.bits[y], count=maze.width, bitorder="little")
+        walls.update((int(x), y) for x in np.flatnonzero(row))
+    return walls
+
+
+def per_call(robot, command, count):
+    method = getattr(robot, command)
+    begin = time.perf_counter()
+    for _ in range(count):
+        method()
+    return (time.perf_counter() - begin) / count
+
+
+if __name__ == '__main__':
+    side = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    # numpy.random is imported on first use, it must not be counted as maze memory
+    Maze.random(8, 8, seed=1)
+    maze, kept, peak = traced(lambda: Maze.random(side, side, seed=1))
+    print(f"{side}x{side} maze, {side * side / 1e6:.1f} M cells: kept {kept / 2 ** 20:7.2f} MiB  "
+          f"peak {peak / 2 ** 20:7.2f} MiB  ({kept * 8 / (side * side):.2f} bits per cell)")
+
+    # tuples are measured on a smaller maze, a set of all obstacles of the big one does not fit in memory budget
+    small = Maze.random(1000, 1000, seed=1)
+    walls, kept, _ = traced(lambda: tuple_walls(small))
+    print(f"set of tuples, 1000x1000: kept {kept / 2 ** 20:7.2f} MiB  ({kept * 8 / 1e6:.0f} bits per cell), "
+          f"{len(walls)} obstacles")
+    del walls
+
+    robot = SimulatedRobot(maze)
+    for command in ("step", "right", "look"):
+        print(f"{command:>6}: {per_call(robot, command, 200000) * 1e9:8.0f} ns")
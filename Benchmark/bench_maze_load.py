@@ -0,0 +1,105 @@
+# ------------------------------------------------------------
+# bench_maze_load.py
+#
+# time to get a maze robot can run in: parsing text maze against mapping binary maze file,
+# for mazes of 10^6, 10^8 and 10^9 cells. Files are written to a temporary directory
+# and are in page cache when opened, resident memory shows what mapping really read
+# ------------------------------------------------------------
+import math
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+import numpy as np
+
+from Robot.TAMaze import Maze
+from Robot.TAMazeFile import convert, create, open_maze
+from Robot.TARobot import SimulatedRobot
+
+SIZES = (10 ** 6, 10 ** 8, 10 ** 9)
+# text mazes larger than this take too long to write and parse to be worth measuring
+TEXT_LIMIT = 10 ** 7
+ROWS = 1024
+
+
+def resident():
+    # resident set size in bytes, None where /proc is missing
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return None
+
+
+def write_binary(path, side, seed=1):
+    # random obstacles written chunk by chunk, the whole grid is never in memory
+    rng = np.random.default_rng(seed)
+    maze = create(path, side, side, start=(0, 0), heading=1, exits=[(side - 1, side - 1)])
+    for y in range(0, side, ROWS):
+        rows = maze.bits[y:y + ROWS]
+        rows[:] = rng.integers(0, 256, size=rows.shape, dtype=np.uint8) & \
+            rng.integers(0, 256, size=rows.shape, dtype=np.uint8)
+    maze.set_blocked(0, 0, False)
+    maze.clear_padding()
+    maze.bits.flush()
+    return maze
+
+
+def write_text(path, maze):
+    with open(path, "w") as f:
+        for y in range(0, maze.height, ROWS):
+            grid = np.unpackbits(maze.bits[y:y + ROWS], axis=1, count=maze.width, bitorder="little")
+            rows = np.where(grid, ord("#"), ord(".")).astype(np.uint8)
+            if y == 0:
+                rows[0, 0] = ord(">")
+            f.write("\n".join(row.tobytes().decode() for row in rows) + "\n")
+
+
+def timed(run):
+    begin = time.perf_counter()
+    result = run()
+    return result, time.perf_counter() - begin
+
+
+def run_commands(maze, count=1000):
+    robot = SimulatedRobot(maze)
+    for _ in range(count):
+        if not robot.step():
+            robot.right()
+        robot.look()
+
+
+if __name__ == '__main__':
+    sizes = [int(float(size)) for size in sys.argv[1:]] or SIZES
+    directory = tempfile.mkdtemp(prefix="maze_load_")
+    for cells in sizes:
+        side = math.isqrt(cells)
+        binary = os.path.join(directory, f"maze_{side}.tamaze")
+        write_binary(binary, side)
+        print(f"{side}x{side} ({side * side:.1e} cells), file {os.path.getsize(binary) / 2 ** 20:.1f} MiB")
+
+        before = resident()
+        maze, elapsed = timed(lambda: open_maze(binary))
+        _, first = timed(lambda: run_commands(maze))
+        after = resident()
+        read = f"  resident {(after - before) / 2 ** 10:+.0f} KiB" if before is not None else ""
+        print(f"  binary open {elapsed * 1000:10.3f} ms   1000 steps and looks {first * 1000:8.2f} ms{read}")
+        del maze
+
+        if side * side <= TEXT_LIMIT:
+            text = os.path.join(directory, f"maze_{side}.txt")
+            write_text(text, open_maze(binary))
+            with open(text, "r") as f:
+                source = f.read()
+            _, parsed = timed(lambda: Maze.from_text(source))
+            converted = os.path.join(directory, f"converted_{side}.tamaze")
+            _, conversion = timed(lambda: convert(text, converted))
+            print(f"  text parse  {parsed * 1000:10.3f} ms   one-time conversion to binary {conversion * 1000:8.2f} ms")
+            os.remove(text)
+            os.remove(converted)
+        os.remove(binary)
+    os.rmdir(directory)
@@ -0,0 +1,104 @@
+# ------------------------------------------------------------
+# bench_memo.py
+#
+# caches of pure procedures: doubly recursive fib and a helper called with arguments going
+# round in a cycle, without cache and with caches of several sizes, hit rates they get, and
+# which procedures of maze programs are pure
+# ------------------------------------------------------------
+import contextlib
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+from Parser.TAParser import TAParser
+from TAInterpreter import TAInterpreter
+from TAMemo import TAMemoizer, pure_procedures
+
+FIB = """proc fib [n r] (
+if lt inc n 0 2 (
+    r := n
+) else (
+    int a = dec n 1
+    int ra = 0
+    fib [a ra]
+    int b = dec n 2
+    int rb = 0
+    fib [b rb]
+    r := inc ra rb
+)
+)
+
+proc main [x] (
+int n = {n}
+int r = 0
+fib [n r]
+)
+"""
+
+# arguments repeat in a cycle of {distinct}: caches smaller than the cycle evict every result before its reuse
+CYCLE = """proc work [k r] (
+int i = 0
+r := 0
+while lt inc i 0 inc k 0
+do (
+    r := inc r i
+    i := inc i 1
+)
+)
+
+proc main [x] (
+int round = 0
+int r = 0
+while lt inc round 0 {rounds}
+do (
+    int j = 0
+    while lt inc j 0 {distinct}
+    do (
+        int k = j
+        int s = 0
+        work [k s]
+        r := inc r s
+        j := inc j 1
+    )
+    round := inc round 1
+)
+)
+"""
+
+
+def run(engine, program, memo):
+    interpreter = TAInterpreter(engine=engine, memo=memo)
+    interpreter.parser
+    begin = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        interpreter.start(program)
+    return time.perf_counter() - begin, interpreter.declaration_table[0]["r"].value
+
+
+def compare(title, program, procedure, sizes):
+    for engine in ("tree", "bytecode", "unboxed", "stack"):
+        plain, expected = run(engine, program, None)
+        print(f"{engine:>8} {title}: no cache {plain * 1000:10.2f} ms")
+        for size in sizes:
+            memo = TAMemoizer(size=size)
+            elapsed, value = run(engine, program, memo)
+            stat = memo.stats()[procedure]
+            print(f"{'':>8} {f'cache of {size}':>14} {elapsed * 1000:10.2f} ms  x{plain / elapsed:8.1f}  "
+                  f"hit rate {stat['hit_rate']:6.1%}  evicted {stat['evictions']:>6}  same: {value == expected}")
+
+
+if __name__ == '__main__':
+    compare("fib 18", FIB.format(n=18), "fib", (4, 16, 1024))
+    print()
+    compare("cycle of 64", CYCLE.format(rounds=10, distinct=64), "work", (16, 64, 1024))
+
+    print()
+    for name in ("test_interpreter_maze_loops", "test_interpreter_semantics", "test_interpreter_parser"):
+        with open(os.path.join(ROOT, "Testing", name), "r") as f:
+            _, func_table, _ = TAParser.shared().parse(f.read())
+        pure = pure_procedures(func_table)
+        print(f"{name:>28}: pure {sorted(pure)}, not pure {sorted(set(func_table) - pure)}")
@@ -0,0 +1,48 @@
+# ------------------------------------------------------------
+# bench_optimizer.py
+#
+# number of syntax tree nodes the tree walker executes and time it takes
+# with and without TAOptimizer between parsing and execution
+# ------------------------------------------------------------
+import contextlib
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+from TAInterpreter import TAInterpreter
+from bench_engines import RecordingRobot
+
+
+class CountingInterpreter(TAInterpreter):
+    def __init__(self, optimize):
+        super().__init__(optimize=optimize)
+        self.executed_nodes = 0
+
+    def handleNode(self, node):
+        self.executed_nodes += 1
+        return super().handleNode(node)
+
+
+def run(program, optimize):
+    interpreter = CountingInterpreter(optimize)
+    output = io.StringIO()
+    begin = time.perf_counter()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        interpreter.start(program, RecordingRobot())
+    return interpreter.executed_nodes, time.perf_counter() - begin, output.getvalue()
+
+
+if __name__ == '__main__':
+    filepath = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "Testing", "test_interpreter_constants")
+    with open(filepath, "r") as f:
+        program = f.read()
+
+    plain_nodes, plain_time, plain_output = run(program, optimize=False)
+    optimized_nodes, optimized_time, optimized_output = run(program, optimize=True)
+    print(f"    plain: {plain_nodes:8d} nodes  {plain_time * 1000:8.2f} ms")
+    print(f"optimized: {optimized_nodes:8d} nodes  {optimized_time * 1000:8.2f} ms  "
+          f"({100 * (1 - optimized_nodes / plain_nodes):.1f}% fewer nodes), same output: {plain_output == optimized_output}")
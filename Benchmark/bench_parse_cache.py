@@ -0,0 +1,40 @@
+# ------------------------------------------------------------
+# bench_parse_cache.py
+#
+# parsing the same program again: no cache, hit of in-memory tier
+# and hit of disk tier in a fresh cache, as another process would have
+# ------------------------------------------------------------
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+from Parser.TAParser import TAParser
+from Parser.TAFlatTree import FlatSTBuilder
+from Parser.TAParseCache import TAParseCache
+from bench_ast_memory import generate
+
+
+def timed(action):
+    begin = time.perf_counter()
+    action()
+    return time.perf_counter() - begin
+
+
+if __name__ == '__main__':
+    blocks = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    program = generate(blocks)
+    directory = tempfile.mkdtemp()
+
+    for name, flat_ast, parser in (("NodeOfST", False, TAParser()),
+                                   ("flat", True, TAParser(node_builder=FlatSTBuilder()))):
+        cache = TAParseCache(directory=directory)
+        parse = timed(lambda: parser.parse(program))
+        miss = timed(lambda: cache.parse(program, parser, flat_ast))
+        memory = timed(lambda: cache.parse(program, parser, flat_ast))
+        disk = timed(lambda: TAParseCache(directory=directory).parse(program, parser, flat_ast))
+        print(f"{name:>8}: parse {parse * 1000:8.1f} ms  miss {miss * 1000:8.1f} ms  "
+              f"memory hit {memory * 1000:6.2f} ms  disk hit {disk * 1000:8.1f} ms  {cache.stats()}")
@@ -0,0 +1,52 @@
+# ------------------------------------------------------------
+# bench_profiler.py
+#
+# cost of TAProfiler: interpreter without profiler against the same run measured,
+# both must produce the same robot commands and declaration table
+# ------------------------------------------------------------
+import contextlib
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter"), os.path.join(ROOT, "Benchmark")]
+
+from bench_engines import RecordingRobot
+from TAInterpreter import TAInterpreter
+from TAProfiler import TAProfiler
+
+
+def run(engine, program, repeat, profiled):
+    best = None
+    for _ in range(repeat):
+        profiler = TAProfiler(lines=engine in TAProfiler.line_engines,
+                              procedures=engine in TAProfiler.procedure_engines) if profiled else None
+        interpreter = TAInterpreter(engine=engine, profiler=profiler)
+        interpreter.parser
+        robot = RecordingRobot()
+        output = io.StringIO()
+        begin = time.perf_counter()
+        with contextlib.redirect_stdout(output):
+            interpreter.start(program, robot)
+        elapsed = time.perf_counter() - begin
+        best = elapsed if best is None else min(best, elapsed)
+    return best, robot.commands, output.getvalue(), profiler
+
+
+if __name__ == '__main__':
+    filepath = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "Testing", "test_interpreter_maze_loops")
+    with open(filepath, "r") as f:
+        program = f.read()
+
+    profilers = dict()
+    for engine in ("tree", "closure", "bytecode", "unboxed"):
+        plain, commands, table, _ = run(engine, program, repeat=5, profiled=False)
+        measured, profiled_commands, profiled_table, profilers[engine] = run(engine, program, repeat=5,
+                                                                             profiled=True)
+        same = commands == profiled_commands and table == profiled_table
+        print(f"{engine:>8}: {plain * 1000:8.2f} ms off  {measured * 1000:8.2f} ms on  x{measured / plain:5.2f}  "
+              f"same: {same}")
+    print()
+    print(profilers["tree"].summary(program, limit=5))
@@ -0,0 +1,73 @@
+# ------------------------------------------------------------
+# bench_shared_maze.py
+#
+# memory of worker processes running robots on one large maze: every worker loading
+# its own maze, look tables and distance field, against workers attaching SharedMaze.
+# Private memory of workers is read from /proc, so the benchmark needs Linux
+# ------------------------------------------------------------
+import multiprocessing
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+from Robot.TADistanceField import DistanceField
+from Robot.TAMaze import Maze
+from Robot.TAMazeFile import dump
+from Robot.TARobot import SimulatedRobot
+from Robot.TASharedMaze import SharedMaze
+
+
+def private_memory():
+    # bytes of pages only this process has
+    with open("/proc/self/smaps_rollup") as f:
+        fields = dict(line.split(":", 1) for line in f if line.startswith("Private"))
+    return sum(int(value.split()[0]) for value in fields.values()) * 1024
+
+
+def work(source, results):
+    before = private_memory()
+    if isinstance(source, str):
+        maze = Maze.load(source)
+        field = DistanceField(maze)
+    else:
+        shared = SharedMaze.attach(source)
+        maze, field = shared.maze, shared.field
+    robot = SimulatedRobot(maze, look_tables=True)
+    # every page of grid, tables and field is read, as long runs over the maze do
+    checksum = int(maze.bits.sum()) + int(field.distances.sum())
+    checksum += sum(int(table.sum()) for table in maze.look_tables.tables)
+    for _ in range(10000):
+        if not robot.step():
+            robot.right()
+        robot.look()
+    results.put((private_memory() - before, checksum))
+
+
+def measure(source, workers):
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=work, args=(source, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return sum(memory for memory, _ in reports), {checksum for _, checksum in reports}
+
+
+if __name__ == '__main__':
+    side = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    maze = Maze.random(side, side, density=3, seed=1)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "maze.tamaze")
+        with open(path, "wb") as f:
+            dump(maze, f)
+        with SharedMaze.publish(maze, look_tables=True, distance_field=True) as shared:
+            print(f"{side}x{side} maze, shared segment {shared.nbytes() / 2 ** 20:.1f} MiB")
+            for workers in (1, 2, 4):
+                copied, copied_sums = measure(path, workers)
+                attached, attached_sums = measure(shared.handle, workers)
+                print(f"{workers} workers: private memory own copies {copied / 2 ** 20:8.1f} MiB  "
+                      f"shared {attached / 2 ** 20:6.1f} MiB  same results: {copied_sums == attached_sums}")
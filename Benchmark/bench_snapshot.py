@@ -0,0 +1,108 @@
+# ------------------------------------------------------------
+# bench_snapshot.py
+#
+# branching a paused run into maze variants: getting back to the decision point by running
+# the program again, by deepcopy of the execution, by snapshot and restore, and by fork
+# ------------------------------------------------------------
+import copy
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+from Robot.TAMaze import Maze
+from Robot.TARobot import SimulatedRobot
+from TABudget import ExecutionBudget
+from TASnapshot import TAExecution, compile_program
+
+# right-hand wall follower which turns through a recursive procedure, so the run pauses inside calls
+FOLLOWER = """proc turn [n] (
+left
+n := dec n 1
+if gt inc n 0 0 (
+    turn [n]
+)
+)
+
+proc main [x] (
+boolean moved = false
+int count = 0
+while lt 0 1
+do (
+    int n = 3
+    turn [n]
+    while lt inc look 0 1
+    do (
+        left
+    )
+    moved := step
+    count := inc count 1
+)
+)
+"""
+
+
+def variants(maze, count, cells=64, seed=0):
+    # copies of maze with some cells far from the robot blocked, bits are new, look tables too
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    mazes = []
+    for _ in range(count):
+        variant = Maze(maze.width, maze.height, maze.bits.copy(), start=maze.start, heading=maze.heading,
+                       exits=maze.exits)
+        for x, y in zip(rng.integers(maze.width // 2, maze.width - 1, cells),
+                        rng.integers(maze.height // 2, maze.height - 1, cells)):
+            if (x, y) not in variant.exits:
+                variant.set_blocked(int(x), int(y))
+        mazes.append(variant)
+    return mazes
+
+
+def timed(call, *args, **kwargs):
+    begin = time.perf_counter()
+    result = call(*args, **kwargs)
+    return time.perf_counter() - begin, result
+
+
+if __name__ == '__main__':
+    decision, rest, branches = 200000, 2000, 8
+    maze = Maze.random(1000, 1000, seed=3)
+    mazes = variants(maze, branches)
+    for variant in mazes:
+        variant.build_look_tables()
+    program = compile_program(FOLLOWER)
+    budget = ExecutionBudget(fuel=None, actions=decision + rest, recursion_depth=None)
+
+    def to_decision():
+        execution = TAExecution(program, SimulatedRobot(maze), budget=budget)
+        execution.run(until=lambda run: run.robot.actions >= decision)
+        return execution
+
+    again, execution = timed(to_decision)
+    print(f"run to the decision point: {again * 1000:9.2f} ms, {execution.robot.actions} actions, "
+          f"{execution.machine.depth + 1} frames open")
+
+    taken, snapshot = timed(execution.snapshot)
+    print(f"snapshot: {taken * 1e6:9.1f} us, {snapshot.size()} bytes")
+    copied, _ = timed(copy.deepcopy, execution)
+    print(f"deepcopy of execution: {copied * 1000:9.2f} ms  x{copied / taken:8.0f} of snapshot")
+    restored, _ = timed(execution.restore, snapshot)
+    print(f"restore: {restored * 1e6:9.1f} us")
+    made, branch = timed(execution.branch, mazes[0], snapshot)
+    print(f"branch into maze variant: {made * 1e6:9.1f} us")
+
+    # rest of the run in every variant, with the way back to the decision point each one needs
+    rerun, results = timed(lambda: [to_decision().branch(variant).finish(index)
+                                    for index, variant in enumerate(mazes)])
+    inprocess, restored_results = timed(execution.branches, mazes)
+    forked, forked_results = timed(execution.branches, mazes, fork=True)
+    same = all(a.as_dict() | {"elapsed": 0} == b.as_dict() | {"elapsed": 0} == c.as_dict() | {"elapsed": 0}
+               for a, b, c in zip(results, restored_results, forked_results))
+    rest_time = sum(result.elapsed for result in restored_results)
+    print(f"\n{branches} variants, {rest} actions after the decision point, finishing them {rest_time * 1000:.2f} ms:")
+    print(f"  run again each time  {rerun * 1000:9.2f} ms")
+    print(f"  snapshot branches    {inprocess * 1000:9.2f} ms  x{rerun / inprocess:6.1f}")
+    print(f"  forked branches      {forked * 1000:9.2f} ms  x{rerun / forked:6.1f}")
+    print(f"same results: {same}, exits found {sum(result.exit_found for result in forked_results)}")
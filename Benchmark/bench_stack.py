@@ -0,0 +1,160 @@
+# ------------------------------------------------------------
+# bench_stack.py
+#
+# deep recursion: depth engines reach with recursive calls, memory one call takes on the
+# stack engine with and without tail calls, and recursive depth-first search of large mazes
+# ------------------------------------------------------------
+import contextlib
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+import numpy as np
+
+from Robot.TAMaze import Maze
+from Robot.TARobot import SimulatedRobot
+from TABudget import ExecutionBudget
+from TAInterpreter import TAInterpreter
+from TAStackMachine import Frame
+
+# work after the call keeps every frame alive until the deepest one returns
+DESCEND = """proc descend [n] (
+if gt inc n 0 0 (
+    int m = dec n 1
+    descend [m]
+    n := inc m 1
+)
+)
+
+proc main [x] (
+int n = {depth}
+descend [n]
+)
+"""
+
+# the call is the last thing countdown does, the callee takes over its frame
+COUNTDOWN = """proc countdown [n] (
+if gt inc n 0 0 (
+    n := dec n 1
+    countdown [n]
+)
+)
+
+proc main [x] (
+int n = {depth}
+countdown [n]
+)
+"""
+
+# every call explores one cell: left, front and right of the way robot came in, never back,
+# so a maze without cycles is searched completely; cells counts calls
+EXPLORE = """proc explore [cells] (
+int turn = 0
+cells := inc cells 1
+left
+while lt inc turn 0 3
+do (
+    if gt inc look 0 0 (
+        boolean moved = step
+        explore [cells]
+        back
+        moved := step
+        back
+    )
+    right
+    turn := inc turn 1
+)
+left
+left
+)
+
+proc main [x] (
+int cells = 0
+explore [cells]
+back
+explore [cells]
+)
+"""
+
+UNLIMITED = ExecutionBudget(fuel=None, recursion_depth=None)
+
+
+def perfect_maze(rooms, seed):
+    # maze without cycles made by randomized depth-first search over rooms x rooms cells
+    rng = np.random.default_rng(seed)
+    grid = np.ones((2 * rooms + 1, 2 * rooms + 1), dtype=bool)
+    seen = np.zeros((rooms, rooms), dtype=bool)
+    seen[0, 0] = True
+    grid[1, 1] = False
+    path = [(0, 0)]
+    while path:
+        x, y = path[-1]
+        around = [(x + dx, y + dy) for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1))
+                  if 0 <= x + dx < rooms and 0 <= y + dy < rooms and not seen[y + dy, x + dx]]
+        if not around:
+            path.pop()
+            continue
+        nx, ny = around[rng.integers(len(around))]
+        seen[ny, nx] = True
+        grid[2 * ny + 1, 2 * nx + 1] = False
+        grid[y + ny + 1, x + nx + 1] = False
+        path.append((nx, ny))
+    return Maze.from_grid(grid, start=(1, 1), heading=1)
+
+
+def run(engine, program, robot=None):
+    interpreter = TAInterpreter(engine=engine, budget=UNLIMITED)
+    interpreter.parser
+    output = io.StringIO()
+    begin = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            interpreter.start(program, robot)
+    except RecursionError:
+        return None, None
+    return time.perf_counter() - begin, interpreter.declaration_table[0]
+
+
+def peak_memory(program):
+    tracemalloc.start()
+    run("stack", program)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+if __name__ == '__main__':
+    print("recursion depth reached")
+    for depth in (100, 1000, 10 ** 4, 10 ** 5, 3 * 10 ** 5):
+        row = []
+        for engine in ("tree", "bytecode", "stack"):
+            elapsed, _ = run(engine, DESCEND.format(depth=depth))
+            row.append(f"{engine} {'RecursionError' if elapsed is None else f'{elapsed * 1000:.1f} ms':>16}")
+        print(f"{depth:>10}: " + "  ".join(row))
+
+    print()
+    print(f"Frame object: {sys.getsizeof(Frame())} bytes")
+    low, high = 10 ** 4, 10 ** 5
+    for name, program in (("call", DESCEND), ("tail call", COUNTDOWN)):
+        grown = peak_memory(program.format(depth=high)) - peak_memory(program.format(depth=low))
+        print(f"{name:>10}: {grown / (high - low):8.1f} bytes per level of recursion")
+
+    print()
+    for rooms in (50, 150):
+        maze = perfect_maze(rooms, seed=1)
+        free = maze.width * maze.height - maze.count_blocked()
+        for engine in ("bytecode", "stack"):
+            robot = SimulatedRobot(maze)
+            elapsed, variables = run(engine, EXPLORE, robot)
+            if elapsed is None:
+                print(f"{f'{engine} {maze.width}x{maze.height}':>20}: RecursionError after {robot.steps} steps")
+                continue
+            # the first cell is explored by both calls of main
+            complete = variables["cells"].value == free + 1
+            print(f"{f'{engine} {maze.width}x{maze.height}':>20}: {elapsed * 1000:10.1f} ms  {free} cells  "
+                  f"{robot.steps} steps  searched completely: {complete}")
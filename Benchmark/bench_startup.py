@@ -0,0 +1,52 @@
+# ------------------------------------------------------------
+# bench_startup.py
+#
+# cost of starting interpreter in fresh process: imports, construction,
+# building parser from reflected grammar against frozen tables, first run.
+# Tables are python modules: with PYTHONDONTWRITEBYTECODE set they are compiled in every process
+# ------------------------------------------------------------
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SETUP = f"""
+import sys, time
+sys.path[:0] = [{ROOT!r}, {os.path.join(ROOT, "Interpreter")!r}, {os.path.join(ROOT, "Benchmark")!r}]
+begin = time.perf_counter()
+"""
+
+CASES = {
+    "import TAInterpreter": "from TAInterpreter import TAInterpreter",
+    "TAInterpreter()": "from TAInterpreter import TAInterpreter\nTAInterpreter()",
+    "TAParser() reflected": "from Parser.TAParser import TAParser\nTAParser()",
+    "TAParser() frozen": "from Parser.TAParser import TAParser\nTAParser.shared()",
+    "first run": "from TAInterpreter import TAInterpreter\nfrom bench_engines import RecordingRobot\n"
+                 "TAInterpreter().start(PROGRAM, RecordingRobot())",
+}
+
+REPORT = """
+elapsed = time.perf_counter() - begin
+print(json.dumps({"elapsed": elapsed, "ply": "ply.yacc" in sys.modules or "ply.lex" in sys.modules}))
+"""
+
+PROGRAM = "proc main [x] (\nint a = 1\nstep\nright\n)\n"
+
+
+def measure(code, repeat):
+    script = SETUP + code.replace("PROGRAM", repr(PROGRAM)) + "\nimport json" + REPORT
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.splitlines()[-1])
+        best = result if best is None or result["elapsed"] < best["elapsed"] else best
+    return best
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for name, code in CASES.items():
+        result = measure(code, repeat)
+        print(f"{name:>22}: {result['elapsed'] * 1000:8.2f} ms  ply imported: {result['ply']}")
@@ -0,0 +1,300 @@
+# ------------------------------------------------------------
+# bench_suite.py
+#
+# performance baseline: generated workloads timed stage by stage (lexer, parser,
+# execution engines, robot backend), stored as json with machine metadata;
+# compare flags stages which got slower between two stored runs
+# ------------------------------------------------------------
+import argparse
+import contextlib
+import datetime
+import fnmatch
+import gc
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+import numpy as np
+
+from Lexer.TALexer import TALexer
+from Parser.TAParser import TAParser
+from Robot.TAMaze import Maze
+from Robot.TARobot import SimulatedRobot
+from TABatch import ParsedProgram
+from TAInterpreter import TAInterpreter
+
+ENGINES = ("tree", "bytecode", "unboxed")
+SEED = 1
+
+
+###################################
+# workloads
+
+class Workload:
+    # source is run in maze (or without robot when None); params say how it was generated
+    def __init__(self, name, params, source=None, maze=None, actions=None):
+        self.name = name
+        self.params = params
+        self.source = source
+        self.maze = maze
+        # robot backend workload: commands given to SimulatedRobot without interpreter
+        self.actions = actions
+
+
+FLAT_BLOCK = """int a{i} = inc {i} 1
+boolean f{i} = lt inc a{i} 0 100
+a{i} := inc a{i} dec 7 3
+f{i} := or not gt inc a{i} 0 0 true
+"""
+
+WALL_FOLLOWER = """proc turn_to_free [moved] (
+right
+if lt inc look 0 1 (
+    left
+    if lt inc look 0 1 (
+        left
+        if lt inc look 0 1 (
+            left
+        )
+    )
+)
+)
+
+proc main [x] (
+int steps = 0
+boolean moved = false
+while lt inc steps 0 {steps}
+do (
+    turn_to_free [moved]
+    moved := step
+    steps := inc steps 1
+)
+)
+"""
+
+
+def flat_program(sentences):
+    blocks = max(1, sentences // 4)
+    return f"proc main [x] (\n{''.join(FLAT_BLOCK.format(i=i) for i in range(blocks))})\n"
+
+
+def nested_program(depth):
+    # every level is while with one iteration around if, the innermost level counts in c
+    opening = []
+    for i in range(depth):
+        opening.append(f"int w{i} = 0\nwhile lt inc w{i} 0 1\ndo (\nw{i} := inc w{i} 1\nif gt inc w{i} 0 0 (\n")
+    inner = "c := inc c 1\n"
+    closing = ")\n)\n" * depth
+    return f"proc main [x] (\nint c = 0\n{''.join(opening)}{inner}{closing})\n"
+
+
+def recursive_program(depth, calls):
+    return f"""proc countdown [n] (
+if gt inc n 0 0 (
+    n := dec n 1
+    countdown [n]
+)
+)
+
+proc main [x] (
+int i = 0
+while lt inc i 0 {calls}
+do (
+    int n = {depth}
+    countdown [n]
+    i := inc i 1
+)
+)
+"""
+
+
+def robot_actions(count, seed):
+    # 0 step, 1 right, 2 left, 3 look; steps are the most common command of real programs
+    return np.random.default_rng(seed).choice(4, size=count, p=(0.5, 0.15, 0.15, 0.2)).tolist()
+
+
+def workloads(scale):
+    size = max(1, int(1000 * scale))
+    side = max(16, int(1000 * scale ** 0.5))
+    return [
+        Workload("flat", {"sentences": 4 * size}, source=flat_program(4 * size)),
+        Workload("nested", {"depth": 40}, source=nested_program(40)),
+        Workload("recursive", {"depth": 30, "calls": max(1, size // 20)},
+                 source=recursive_program(30, max(1, size // 20))),
+        Workload("maze", {"width": side, "height": side, "steps": 5 * size},
+                 source=WALL_FOLLOWER.format(steps=5 * size), maze=Maze.random(side, side, density=2, seed=SEED)),
+        Workload("robot", {"width": side, "height": side, "actions": 100 * size},
+                 maze=Maze.random(side, side, density=2, seed=SEED), actions=robot_actions(100 * size, SEED)),
+    ]
+
+
+###################################
+# stages: name and function which is timed, each returns one run
+
+def lex_stage(workload):
+    lexer = TALexer.shared()
+
+    def run():
+        lexer.lexer.lineno = 1
+        return len(list(lexer.tokenize(workload.source)))
+
+    return run
+
+
+def parse_stage(workload):
+    parser = TAParser.shared()
+    return lambda: parser.parse(workload.source)
+
+
+def execute_stage(workload, engine):
+    # program is parsed once, runs are timed from the start of execution
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        _, func_table, has_syntax_errors = TAParser.shared().parse(workload.source)
+    if has_syntax_errors:
+        raise ValueError(f"Workload {workload.name} has syntax errors")
+    program = ParsedProgram(func_table)
+
+    def run():
+        robot = SimulatedRobot(workload.maze) if workload.maze is not None else None
+        TAInterpreter(engine=engine).start(program, robot)
+
+    return run
+
+
+def robot_stage(workload):
+    def run():
+        robot = SimulatedRobot(workload.maze)
+        commands = (robot.step, robot.right, robot.left, robot.look)
+        for action in workload.actions:
+            commands[action]()
+        return robot.actions
+
+    return run
+
+
+def stages(workload, engines):
+    if workload.actions is not None:
+        return [("robot", robot_stage(workload))]
+    return ([("lex", lex_stage(workload)), ("parse", parse_stage(workload))] +
+            [(f"execute {engine}", execute_stage(workload, engine)) for engine in engines])
+
+
+def timed(run, repeat):
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            begin = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - begin)
+    return times
+
+
+###################################
+# stored runs
+
+def metadata(options):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                                timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "time": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": f"{platform.python_implementation()} {platform.python_version()}",
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "scale": options.scale,
+        "repeat": options.repeat,
+        "engines": list(options.engines),
+    }
+
+
+def run_suite(options):
+    results = dict()
+    for workload in workloads(options.scale):
+        for stage, run in stages(workload, options.engines):
+            key = f"{workload.name}/{stage}"
+            if options.only and not any(fnmatch.fnmatch(key, pattern) for pattern in options.only):
+                continue
+            try:
+                times = timed(run, options.repeat)
+            except RecursionError as e:
+                # tree engine walks sentence lists recursively, too long or too deep programs do not fit the stack
+                results[key] = {"params": workload.params, "error": f"{type(e).__name__}: {e}"}
+                print(f"{key:>28}: {type(e).__name__}")
+                continue
+            results[key] = {"params": workload.params, "best": min(times), "median": statistics.median(times),
+                            "runs": times}
+            print(f"{key:>28}: best {min(times) * 1000:10.2f} ms  median {statistics.median(times) * 1000:10.2f} ms")
+    return {"metadata": metadata(options), "results": results}
+
+
+def compare(old, new, threshold):
+    # stages whose best time grew by more than threshold are regressions; returns their keys
+    for field in ("machine", "processor", "python", "scale"):
+        if old["metadata"].get(field) != new["metadata"].get(field):
+            print(f"[WARNING]: runs differ in {field}: {old['metadata'].get(field)} / {new['metadata'].get(field)}")
+    regressions = []
+    for key in sorted(set(old["results"]) | set(new["results"])):
+        before = old["results"].get(key, {}).get("best")
+        after = new["results"].get(key, {}).get("best")
+        if before is None or after is None:
+            print(f"{key:>28}: {'-' if before is None else f'{before * 1000:.2f} ms':>12} -> "
+                  f"{'-' if after is None else f'{after * 1000:.2f} ms':>12}")
+            continue
+        ratio = after / before
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        elif ratio < 1 / (1 + threshold):
+            flag = "  faster"
+        print(f"{key:>28}: {before * 1000:9.2f} ms -> {after * 1000:9.2f} ms  x{ratio:5.2f}{flag}")
+    return regressions
+
+
+if __name__ == '__main__':
+    # python bench_suite.py run [--output F] [--scale S] [--repeat N] [--engines E ...] [--only PATTERN ...]
+    # python bench_suite.py compare <old.json> <new.json> [--threshold T]: exit status 1 on regressions
+    arguments = argparse.ArgumentParser(description="Benchmark suite of lexer, parser, engines and robot")
+    commands = arguments.add_subparsers(dest="command", required=True)
+    run_command = commands.add_parser("run")
+    run_command.add_argument("--output", default=None)
+    run_command.add_argument("--scale", type=float, default=1.0)
+    run_command.add_argument("--repeat", type=int, default=5)
+    run_command.add_argument("--engines", nargs="+", default=list(ENGINES), choices=TAInterpreter.engines)
+    run_command.add_argument("--only", nargs="+", default=None, help="shell patterns of workload/stage keys")
+    compare_command = commands.add_parser("compare")
+    compare_command.add_argument("old")
+    compare_command.add_argument("new")
+    compare_command.add_argument("--threshold", type=float, default=0.1)
+    options = arguments.parse_args()
+
+    if options.command == "run":
+        report = run_suite(options)
+        if options.output:
+            with open(options.output, "w") as f:
+                json.dump(report, f, indent=2)
+                f.write("\n")
+    else:
+        with open(options.old) as f:
+            old_report = json.load(f)
+        with open(options.new) as f:
+            new_report = json.load(f)
+        found = compare(old_report, new_report, options.threshold)
+        print(f"{len(found)} regressions over {options.threshold:.0%}" if found else "no regressions")
+        sys.exit(1 if found else 0)
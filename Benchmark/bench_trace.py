@@ -0,0 +1,86 @@
+# ------------------------------------------------------------
+# bench_trace.py
+#
+# robot traces of long runs: cost of recording, bytes per action, decoding rate,
+# seeking to a record with and without seek index, and replay into a robot
+# ------------------------------------------------------------
+import contextlib
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+from Robot.TAMaze import Maze
+from Robot.TARobot import SimulatedRobot
+from TABudget import ExecutionBudget
+from TAInterpreter import TAInterpreter
+from TATrace import TATracer, TraceReader, replay
+
+# right-hand wall follower which runs until the budget of robot actions is spent
+FOLLOWER = """proc main [x] (
+boolean moved = false
+while lt 0 1
+do (
+    right
+    while lt inc look 0 1
+    do (
+        left
+    )
+    moved := step
+)
+)
+"""
+
+MAZE = os.path.join(ROOT, "Testing", "maze_small")
+
+
+def run(engine, actions, tracer=None):
+    robot = SimulatedRobot(Maze.load(MAZE))
+    interpreter = TAInterpreter(engine=engine, tracer=tracer,
+                                budget=ExecutionBudget(fuel=None, actions=actions))
+    interpreter.parser
+    begin = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        interpreter.start(FOLLOWER, robot)
+    return time.perf_counter() - begin, robot
+
+
+def timed(call, *args):
+    begin = time.perf_counter()
+    result = call(*args)
+    return time.perf_counter() - begin, result
+
+
+if __name__ == '__main__':
+    actions = 10 ** 6
+    for engine in ("bytecode", "stack", "closure"):
+        plain, _ = run(engine, actions)
+        buffer = io.BytesIO()
+        traced, robot = run(engine, actions, TATracer(buffer))
+        print(f"{engine:>8}: {actions} actions {plain:7.2f} s, traced {traced:7.2f} s  x{traced / plain:5.2f}")
+
+    data = buffer.getvalue()
+    reader = TraceReader(data)
+    print(f"\ntrace: {len(reader)} records, {len(data)} bytes, {len(data) / len(reader):.2f} bytes per record, "
+          f"{len(reader.index)} index entries")
+
+    elapsed, count = timed(lambda: sum(1 for _ in reader.events()))
+    print(f"decode all: {elapsed:7.3f} s, {count / elapsed / 1e6:5.2f} M records/s")
+
+    target = len(reader) - 1
+    unindexed = TraceReader(data[:reader.end], index_interval=len(reader) + 1)
+    indexed_time, state = timed(reader.state, target)
+    linear_time, linear_state = timed(unindexed.state, target)
+    print(f"seek to record {target}: indexed {indexed_time * 1000:8.3f} ms, from start {linear_time * 1000:8.3f} ms, "
+          f"same state: {state.position() == linear_state.position()}")
+
+    replayed = SimulatedRobot(Maze.load(MAZE))
+    elapsed, count = timed(replay, reader, replayed)
+    print(f"replay into robot: {elapsed:7.3f} s, {count} actions checked, "
+          f"ends where the run did: {replayed.position() == robot.position()}")
+    half = SimulatedRobot(Maze.load(MAZE))
+    elapsed, count = timed(replay, reader, half, len(reader) // 2)
+    print(f"replay second half: {elapsed:7.3f} s, {count} actions, same end: {half.position() == robot.position()}")
@@ -0,0 +1,79 @@
+# ------------------------------------------------------------
+# bench_typecheck.py
+#
+# type checking before execution: time of the check, conversions still decided at runtime,
+# and run time of tree and closure engines with and without the conversions it chooses;
+# no conversion is left at runtime after the check, but the tree engine spends nine tenths of its
+# time dispatching nodes in handleNode, so it is not faster checked, the closure engine is
+# ------------------------------------------------------------
+import contextlib
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+from Parser.TAParser import TAParser
+from TAInterpreter import TAInterpreter
+from TAProfiler import TAProfiler
+from TATypeChecker import TATypeChecker
+
+# counters, constants and booleans stored into ints: every sentence converts something
+COUNTERS = """proc add [total amount] (
+total := inc total amount
+)
+
+proc main [x] (
+int i = 0
+int total = 0
+cint amount = 3
+boolean odd = false
+while lt inc i 0 {iterations}
+do (
+    int bonus = odd
+    total := inc total bonus
+    add [total amount]
+    odd := gt inc bonus 0 0
+    i := inc i 1
+)
+)
+"""
+
+
+def run(engine, program, typecheck, profiler=None):
+    interpreter = TAInterpreter(engine=engine, typecheck=typecheck, profiler=profiler)
+    interpreter.parser
+    begin = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        interpreter.start(program)
+    return time.perf_counter() - begin, interpreter.declaration_table[0]["total"].value
+
+
+def best(engine, program, typecheck, repeat=5):
+    return min(run(engine, program, typecheck) for _ in range(repeat))
+
+
+if __name__ == '__main__':
+    program = COUNTERS.format(iterations=900)
+    _, func_table, _ = TAParser.shared().parse(program)
+    begin = time.perf_counter()
+    typed = TATypeChecker().check(func_table)
+    print(f"check: {(time.perf_counter() - begin) * 1000:.3f} ms, {len(typed.annotations)} annotated nodes, "
+          f"parameters {typed.param_types}")
+
+    for engine in TAInterpreter.typed_engines:
+        profiler = TAProfiler()
+        run(engine, program, False, profiler)
+        dynamic = profiler.conversions.hits
+        profiler = TAProfiler()
+        run(engine, program, True, profiler)
+        print(f"{engine:>8}: conversions decided at runtime {dynamic:>8} without check, "
+              f"{profiler.conversions.hits:>8} with check")
+
+    for engine in TAInterpreter.typed_engines:
+        plain, expected = best(engine, program, False)
+        checked, value = best(engine, program, True)
+        print(f"{engine:>8}: {plain * 1000:10.2f} ms  checked {checked * 1000:10.2f} ms  x{plain / checked:5.2f}  "
+              f"same: {value == expected}")
@@ -19,6 +19,7 @@ class ErrorType(enum.Enum):
     UndeclaredFunctionError = 10
     ConstantAssignmentError = 11
     RuntimeError = 12
+    BudgetExhaustedError = 13
 
 
 class ErrorHandler:
@@ -32,7 +33,8 @@ class ErrorHandler:
 
     def raise_error(self, node=None, code=-1, type=""):
         if node is not None:
-            if isinstance(node.children, dict):
+            # descriptions read name of the first child, procedures and robot actions get placeholder
+            if isinstance(node.children, dict) or not node.children:
                 self.node = NodeOfST(node_type=node.type,
                                      value=node.value,
                                      children=[NodeOfST(node_type="placeholder", value="placeholder", children=[],
@@ -54,7 +56,8 @@ class ErrorHandler:
             9: f"[ERROR]: Function with name '{self.node.value}', which you trying to call at line {self.node.lineno}, has name conflicts in its declaration\n",
             10: f"[ERROR]: Function with '{self.node.value}' you trying to call at line {self.node.lineno} is not declared, check that it is spelled correctly\n",
             11: f"[ERROR]: Trying to assign new value to constant at line {self.node.lineno}\n",
-            12: f"[ERROR]: Runtime Error {self.node.lineno}\n"
+            12: f"[ERROR]: Runtime Error {self.node.lineno}\n",
+            13: f"[ERROR]: Execution budget exhausted: out of {type} at line {self.node.lineno}\n",
 
         }
         match code:
@@ -80,6 +83,8 @@ class ErrorHandler:
                 yellAboutError(errors_description[10])
             case ErrorType.ConstantAssignmentError.value:
                 yellAboutError(errors_description[11])
+            case ErrorType.BudgetExhaustedError.value:
+                yellAboutError(errors_description[13])
             case _:
                 print("[DEBUG]: Got incorrect code for raising error")
 
@@ -105,11 +110,22 @@ class TypeException(Exception):
     pass
 
 
-class MissingParameterException(Exception):
+class CallException(Exception):
+    # failed check of a procedure call; node is the proc_call node the error is reported for, which
+    # may be inside of the sentence: engines set it where the call is, locate returns the exception
+    node = None
+
+    def locate(self, node):
+        if self.node is None:
+            self.node = node
+        return self
+
+
+class MissingParameterException(CallException):
     pass
 
 
-class RecursionException(Exception):
+class RecursionException(CallException):
     pass
 
 
@@ -125,7 +141,7 @@ class RedeclarationReturnSpecificationException(Exception):
     pass
 
 
-class UndeclaredFunctionException(Exception):
+class UndeclaredFunctionException(CallException):
     pass
 
 
@@ -135,3 +151,39 @@ class ConstantAssignmentException(Exception):
 
 class MyRuntimeError(Exception):
     pass
+
+
+class BudgetExhaustedException(Exception):
+    # ends the whole program; node is the innermost sentence which was running, engines set it on the way out
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+        self.node = None
+
+    def locate(self, node):
+        if self.node is None:
+            self.node = node
+
+
+class PausedException(Exception):
+    # run stops right after a robot action, result is what the action gave
+    def __init__(self, result):
+        super().__init__("paused")
+        self.result = result
+
+
+class ReportedException(Exception):
+    # error of the sentence was found and reported before execution, sentence is just aborted
+    pass
+
+
+# exceptions raised while executing a sentence and the error reported for them
+SENTENCE_ERRORS = {
+    RedeclarationException: ErrorType.RedeclarationError.value,
+    UndeclaredException: ErrorType.UndeclaredError.value,
+    TypeException: ErrorType.TypeError.value,
+    MissingParameterException: ErrorType.MissingParameterError.value,
+    RecursionException: ErrorType.RecursionError.value,
+    UndeclaredFunctionException: ErrorType.UndeclaredFunctionError.value,
+    ConstantAssignmentException: ErrorType.ConstantAssignmentError.value,
+}
@@ -0,0 +1,250 @@
+# ------------------------------------------------------------
+# TABatch.py
+#
+# runs one robot program in many mazes on a pool of processes: the program is parsed
+# and compiled once, every worker gets it once and results come back as chunks finish
+# ------------------------------------------------------------
+import argparse
+import contextlib
+import io
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from Parser.TAOptimizer import TAOptimizer
+from Parser.TAParseCache import TreePickler
+from Parser.TAParser import TAParser
+from Robot.TADistanceField import DistanceFieldCache
+from Robot.TAMaze import Maze
+from Robot.TARobot import SimulatedRobot
+from Robot.TASharedMaze import SharedMaze, SharedMazeHandle
+from TABudget import DEFAULT_FUEL, ExecutionBudget
+from TABytecode import TABytecodeCompiler, dump, load
+from TAInterpreter import TAInterpreter
+from TATrace import TATracer
+
+# engines which run bytecode, workers get the program compiled instead of its syntax tree
+COMPILED_ENGINES = ("bytecode", "stack")
+
+
+class MazeResult:
+    """
+    Run of the program in one maze. maze is the path it was loaded from or its index in the batch,
+    errors are the lines ErrorHandler wrote, variables are final values of main when the program
+    ended normally. optimum and score are set when batch scores runs against distance field;
+    skipped runs were not started because exit can not be reached. trace is the path of the
+    robot trace of the run when batch records them.
+    """
+
+    def __init__(self, index, maze):
+        self.index = index
+        self.maze = maze
+        self.exit_found = False
+        self.steps = 0
+        self.actions = 0
+        self.position = None
+        self.errors = []
+        self.variables = None
+        self.elapsed = 0.0
+        self.optimum = None
+        self.score = None
+        self.skipped = False
+        self.trace = None
+
+    def as_dict(self):
+        return dict(self.__dict__)
+
+    def __repr__(self):
+        return f"MazeResult({self.as_dict()})"
+
+
+class ParsedProgram:
+    # taken by TAInterpreter.start in place of source: procedures of the program parsed before
+    def __init__(self, func_table):
+        self.func_table = func_table
+
+    def result(self):
+        # interpreter may replace procedures in its table, the shared one stays as parsed
+        return None, dict(self.func_table), False
+
+
+###################################
+# workers
+
+class BatchWorker:
+    def __init__(self, engine, payload, score, skip_unsolvable, field_directory, budget, trace_directory):
+        self.engine = engine
+        self.budget = budget
+        self.trace_directory = trace_directory
+        if engine in COMPILED_ENGINES:
+            self.program = load(io.BytesIO(payload))
+        else:
+            self.program = ParsedProgram(pickle.loads(payload))
+        self.fields = DistanceFieldCache(directory=field_directory) if score or skip_unsolvable else None
+        self.skip_unsolvable = skip_unsolvable
+        # shared mazes attached by this process, by name of their segment
+        self.shared = dict()
+
+    def attach(self, handle):
+        shared = self.shared.get(handle.name)
+        if shared is None:
+            shared = self.shared[handle.name] = SharedMaze.attach(handle)
+        return shared
+
+    def run(self, index, maze):
+        result = MazeResult(index, maze if isinstance(maze, str) else index)
+        field = None
+        if isinstance(maze, str):
+            maze = Maze.load(maze)
+        elif isinstance(maze, SharedMazeHandle):
+            shared = self.attach(maze)
+            maze, field = shared.maze, shared.field
+        if self.fields is not None:
+            if field is None:
+                field = self.fields.field(maze)
+            result.optimum = field.optimum()
+            if result.optimum is None and self.skip_unsolvable:
+                result.skipped = True
+                result.score = 0.0
+                return result
+
+        robot = SimulatedRobot(maze)
+        tracer = None
+        if self.trace_directory is not None:
+            result.trace = os.path.join(self.trace_directory, f"{index}.trace")
+            tracer = TATracer(result.trace)
+        interpreter = TAInterpreter(engine=self.engine, budget=self.budget, tracer=tracer)
+        errors = io.StringIO()
+        begin = time.perf_counter()
+        # declaration table interpreter prints at the end is not part of the result
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(errors):
+            try:
+                if self.engine in COMPILED_ENGINES:
+                    interpreter.start_compiled(self.program, robot)
+                else:
+                    interpreter.start(self.program, robot)
+                if interpreter.exhausted is None:
+                    result.variables = {name: var.value for name, var in interpreter.declaration_table[0].items()}
+            except Exception as e:
+                # one broken run must not stop the batch
+                sys.stderr.write(f"[ERROR]: {type(e).__name__}: {e}\n")
+        result.elapsed = time.perf_counter() - begin
+        result.exit_found = interpreter.exit_found
+        result.steps = robot.steps
+        result.actions = robot.actions
+        result.position = robot.position()
+        result.errors = [line for line in errors.getvalue().splitlines() if line]
+        if field is not None:
+            result.score = field.score(robot.steps, (robot.x, robot.y))
+        return result
+
+
+# worker of this process, made once by pool initializer
+worker = None
+
+
+def init_worker(*args):
+    global worker
+    worker = BatchWorker(*args)
+
+
+def run_chunk(tasks):
+    return [worker.run(index, maze) for index, maze in tasks]
+
+
+###################################
+# runner
+
+class TABatchRunner:
+    """
+    TABatchRunner(program).run(mazes) yields MazeResult of every maze as chunks of chunk_size mazes
+    finish on workers processes (os.cpu_count() by default, 0 runs in this process). Mazes are paths
+    of maze files, which workers open themselves, handles of SharedMaze, which workers attach once
+    and read without copies, or Maze objects, which are pickled to them. budget is ExecutionBudget
+    of every run, so untrusted programs can not keep workers busy. trace_directory gets robot trace
+    of every run, named by index of its maze, to replay failed runs with TATrace.
+    Programs with syntax errors are not run, ValueError has the messages of the parser.
+    """
+
+    def __init__(self, program, engine="bytecode", optimize=False, workers=None, chunk_size=16,
+                 score=False, skip_unsolvable=False, field_directory=None, budget=None, trace_directory=None):
+        if engine not in TAInterpreter.engines:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {TAInterpreter.engines}")
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            syntax_tree, func_table, has_syntax_errors = TAParser.shared().parse(program)
+        if has_syntax_errors:
+            raise ValueError(f"Program has syntax errors:\n{output.getvalue()}")
+        if optimize:
+            func_table = TAOptimizer().optimize(func_table)
+
+        buffer = io.BytesIO()
+        if engine in COMPILED_ENGINES:
+            dump(TABytecodeCompiler().compile(func_table), buffer)
+        else:
+            TreePickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(func_table)
+        self.engine = engine
+        self.payload = buffer.getvalue()
+        self.workers = os.cpu_count() if workers is None else workers
+        self.chunk_size = max(1, chunk_size)
+        if trace_directory is not None:
+            os.makedirs(trace_directory, exist_ok=True)
+        self.worker_args = (engine, self.payload, score, skip_unsolvable, field_directory, budget, trace_directory)
+
+    def run(self, mazes):
+        tasks = list(enumerate(mazes))
+        chunks = [tasks[i:i + self.chunk_size] for i in range(0, len(tasks), self.chunk_size)]
+        if self.workers == 0:
+            local = BatchWorker(*self.worker_args)
+            for chunk in chunks:
+                for index, maze in chunk:
+                    yield local.run(index, maze)
+            return
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                 initargs=self.worker_args) as pool:
+            futures = [pool.submit(run_chunk, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                yield from future.result()
+
+    def run_all(self, mazes):
+        return sorted(self.run(mazes), key=lambda result: result.index)
+
+
+if __name__ == '__main__':
+    # python TABatch.py <program> <maze> ... [--engine E] [--workers N] [--chunk-size N] [--score]
+    #                   [--fuel N, 0 for no limit] [--seconds S] [--actions N] [--loop-iterations N, 0 for no limit]
+    #                   [--trace-dir D]
+    arguments = argparse.ArgumentParser(description="Run robot program in many mazes")
+    arguments.add_argument("program")
+    arguments.add_argument("mazes", nargs="+")
+    arguments.add_argument("--engine", default="bytecode", choices=TAInterpreter.engines)
+    arguments.add_argument("--workers", type=int, default=None)
+    arguments.add_argument("--chunk-size", type=int, default=16)
+    arguments.add_argument("--score", action="store_true")
+    arguments.add_argument("--fuel", type=int, default=DEFAULT_FUEL)
+    arguments.add_argument("--seconds", type=float, default=None)
+    arguments.add_argument("--actions", type=int, default=None)
+    arguments.add_argument("--loop-iterations", type=int, default=None)
+    arguments.add_argument("--trace-dir", default=None)
+    options = arguments.parse_args()
+    with open(options.program, "r") as f:
+        source = f.read()
+
+    runner = TABatchRunner(source, engine=options.engine, workers=options.workers, chunk_size=options.chunk_size,
+                           score=options.score, skip_unsolvable=options.score,
+                           budget=ExecutionBudget(options.fuel or None, options.seconds, options.actions,
+                                                  options.loop_iterations or None),
+                           trace_directory=options.trace_dir)
+    found = 0
+    for result in runner.run(options.mazes):
+        found += result.exit_found
+        score = f"  score {result.score:.3f}" if result.score is not None else ""
+        print(f"{result.maze}: exit {'found' if result.exit_found else 'not found'}, {result.steps} steps{score}"
+              f"{'  skipped, exit can not be reached' if result.skipped else ''}")
+        for error in result.errors:
+            print(f"    {error}")
+        if result.trace is not None and (result.errors or not result.exit_found):
+            print(f"    trace: {result.trace}")
+    print(f"exit found in {found} of {len(options.mazes)} mazes")
@@ -0,0 +1,100 @@
+# ------------------------------------------------------------
+# TABudget.py
+#
+# limits of one program run: fuel spent by executed sentences and robot actions,
+# wall-clock deadline, robot action cap and iterations of one while loop
+# ------------------------------------------------------------
+import sys
+import time
+
+from ErrorHandler import BudgetExhaustedException
+
+# units of fuel between two looks at the clock when fuel itself is not limited
+CHECK_INTERVAL = 1024
+# calls of one procedure which may be active at once
+MAX_RECURSION_DEPTH = 100
+# fuel of the default budget: a million sentences, seconds for compiled engines and under a minute
+# for the tree walker, so a program which never ends is stopped without anything being set
+DEFAULT_FUEL = 10 ** 6
+
+
+class ExecutionBudget:
+    """
+    Every executed sentence and every robot action costs one unit of fuel. fuel is DEFAULT_FUEL
+    unless given, so untrusted programs which never end are stopped by the default budget too;
+    fuel, seconds and actions are None when not limited, ExecutionBudget(fuel=None) lets a program
+    run as long as it does. loop_iterations is an opt-in cap which stops one while loop after that
+    many iterations. Exhausted budget ends the program, the error is reported for the sentence which ran out.
+    recursion_depth is how many calls of one procedure may be active at once, more is recursion
+    error of the call; None is no limit. Engines other than "stack" recurse in python for every
+    call, deep limits are only reached by the stack engine.
+    """
+
+    def __init__(self, fuel=DEFAULT_FUEL, seconds=None, actions=None, loop_iterations=None,
+                 recursion_depth=MAX_RECURSION_DEPTH):
+        self.fuel = fuel
+        self.seconds = seconds
+        self.actions = actions
+        self.loop_iterations = loop_iterations
+        self.recursion_depth = recursion_depth
+
+    def meter(self):
+        return BudgetMeter(self)
+
+    def __repr__(self):
+        return (f"ExecutionBudget(fuel={self.fuel}, seconds={self.seconds}, actions={self.actions}, "
+                f"loop_iterations={self.loop_iterations}, recursion_depth={self.recursion_depth})")
+
+
+class BudgetMeter:
+    """
+    Spending of one run. Engines charge a unit with
+
+        meter.ticks -= 1
+        if meter.ticks < 0:
+            meter.checkpoint()
+
+    ticks is how many units are left before the next checkpoint, so fuel and clock are only
+    looked at once in CHECK_INTERVAL units, or exactly when fuel ends.
+    """
+    __slots__ = ("budget", "ticks", "granted", "actions", "deadline", "loop_limit", "depth_limit")
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.ticks = 0
+        # units given out by checkpoints so far, spent fuel is granted - ticks
+        self.granted = 0
+        self.actions = 0
+        self.deadline = time.perf_counter() + budget.seconds if budget.seconds is not None else None
+        # loops compare their counter with it, unlimited loops never reach it
+        self.loop_limit = budget.loop_iterations if budget.loop_iterations is not None else sys.maxsize
+        self.depth_limit = budget.recursion_depth if budget.recursion_depth is not None else sys.maxsize
+        self.grant(0)
+
+    @property
+    def spent(self):
+        return self.granted - self.ticks
+
+    def grant(self, spent):
+        ticks = CHECK_INTERVAL
+        if self.budget.fuel is not None:
+            ticks = min(ticks, self.budget.fuel - spent)
+        self.ticks = ticks
+        self.granted = spent + ticks
+
+    def checkpoint(self):
+        spent = self.granted - self.ticks
+        if self.budget.fuel is not None and spent > self.budget.fuel:
+            raise BudgetExhaustedException("fuel")
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise BudgetExhaustedException("time")
+        self.grant(spent)
+
+    def action(self):
+        # robot action is checked before robot gets it, so the last allowed one is the last done
+        self.actions += 1
+        if self.budget.actions is not None and self.actions > self.budget.actions:
+            raise BudgetExhaustedException("robot actions")
+        self.ticks -= 1
+        if self.ticks < 0:
+            self.checkpoint()
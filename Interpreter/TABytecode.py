@@ -0,0 +1,409 @@
+# ------------------------------------------------------------
+# TABytecode.py
+#
+# compiler from syntax tree to compact bytecode and binary file format for it,
+# compiled programs are executed by TAVirtualMachine
+# ------------------------------------------------------------
+import enum
+import struct
+import sys
+
+from Parser.TAParser import NodeOfST, NodeType, flatten_sentences
+from Variable import Variable
+
+MAGIC = b"TABC"
+FORMAT_VERSION = 4
+
+
+class OpCode(enum.IntEnum):
+    PUSH_CONST = 0       # const index
+    LOAD = 1             # name
+    DECLARE = 2          # type, name
+    DECLARE_MAP = 3      # name
+    CHECK_DECLARED = 4   # name
+    ASSIGN = 5           # name
+    INC = 6
+    DEC = 7
+    LT = 8
+    GT = 9
+    NOT = 10
+    OR = 11
+    POP = 12
+    JUMP = 13            # target
+    JUMP_IF_FALSE = 14   # target
+    ENTER_BLOCK = 15
+    LEAVE_BLOCK = 16
+    LOOP_START = 17      # loop slot
+    LOOP_TICK = 18       # loop slot
+    CALL = 19            # name, line, argument count, argument names...
+    CALL_RESULT = 20
+    STEP = 21
+    LOOK = 22
+    RIGHT = 23
+    LEFT = 24
+    BACK = 25
+    MAP_ACTION = 26      # action, result, map, x, y
+    SENTENCE = 27        # start of sentence, spends one unit of fuel
+
+
+# operands following every opcode, CALL has as many more as it has arguments
+OPERANDS = dict.fromkeys(OpCode, 0) | {
+    OpCode.PUSH_CONST: 1, OpCode.LOAD: 1, OpCode.DECLARE: 2, OpCode.DECLARE_MAP: 1, OpCode.CHECK_DECLARED: 1,
+    OpCode.ASSIGN: 1, OpCode.JUMP: 1, OpCode.JUMP_IF_FALSE: 1, OpCode.LOOP_START: 1, OpCode.LOOP_TICK: 1,
+    OpCode.CALL: 3, OpCode.MAP_ACTION: 5,
+}
+
+ROBOT_OPCODES = {"step": OpCode.STEP, "look": OpCode.LOOK, "right": OpCode.RIGHT, "left": OpCode.LEFT,
+                 "back": OpCode.BACK}
+BINARY_OPCODES = {NodeType.INC.value: OpCode.INC, NodeType.DEC.value: OpCode.DEC, "lt": OpCode.LT, "gt": OpCode.GT}
+
+CONST_INT = 0
+CONST_BOOLEAN = 1
+# kind of int constant in binary format which does not fit 64 bits, loaded as CONST_INT
+CONST_BIG_INT = 2
+
+
+class Sentence:
+    """Code range of one sentence, errors raised inside of it are reported for its node and skip to its end"""
+    __slots__ = ("start", "end", "node_type", "value", "lineno", "name")
+
+    def __init__(self, start, end, node_type, value, lineno, name):
+        self.start = start
+        self.end = end
+        self.node_type = node_type
+        self.value = value
+        self.lineno = lineno
+        self.name = name
+
+    def node(self):
+        # ErrorHandler only needs type, value, line number and name of the first child
+        child = NodeOfST(node_type=NodeType.ID.value, value=self.name, children=[], lineno=self.lineno)
+        return NodeOfST(node_type=self.node_type, value=self.value, children=[child], lineno=self.lineno)
+
+
+def call_node(name, lineno):
+    # node of the call errors of its checks are reported for
+    return NodeOfST(node_type=NodeType.Proc_call.value, value=name, children=[], lineno=lineno)
+
+
+class CodeObject:
+    def __init__(self, name, params):
+        self.name = name
+        self.params = params
+        self.code = []
+        self.sentences = []
+        self.loops = 0
+        # innermost sentence of every pc, made on the first lookup after code or sentences changed
+        self.handlers = None
+
+    def handler(self, pc):
+        # innermost sentence containing the instruction
+        handlers = self.handlers
+        if handlers is None or len(handlers) != len(self.code) + 1:
+            handlers = self.handlers = self.handler_table()
+        return handlers[pc] if 0 <= pc < len(handlers) else None
+
+    def handler_table(self):
+        # sentences nested in others start later, so filling ranges in order of start leaves innermost ones
+        handlers = [None] * (len(self.code) + 1)
+        for sentence in sorted(self.sentences, key=lambda sentence: sentence.start):
+            handlers[sentence.start:sentence.end] = [sentence] * (sentence.end - sentence.start)
+        return handlers
+
+
+def next_instruction(code, pc):
+    if code[pc] == OpCode.CALL:
+        return pc + 4 + code[pc + 3]
+    return pc + 1 + OPERANDS[code[pc]]
+
+
+def robot_lines(proc):
+    # source line of every robot instruction by its pc, for tracers
+    robot_opcodes = set(ROBOT_OPCODES.values())
+    lines = dict()
+    pc = 0
+    while pc < len(proc.code):
+        if proc.code[pc] in robot_opcodes:
+            sentence = proc.handler(pc)
+            lines[pc] = sentence.lineno if sentence is not None else -1
+        pc = next_instruction(proc.code, pc)
+    return lines
+
+
+class BytecodeProgram:
+    def __init__(self, strings, constants, procedures):
+        self.strings = strings
+        self.constants = constants
+        self.procedures = procedures
+
+    def func_table(self):
+        # procedure table in the shape produced by TAParser, bodies live in the bytecode
+        return {name: NodeOfST(node_type=NodeType.Proc.value, value=name,
+                               children={"args": list(proc.params), "body": None})
+                for name, proc in self.procedures.items()}
+
+
+class TABytecodeCompiler:
+    def __init__(self):
+        self.strings = []
+        self.string_index = dict()
+        self.constants = []
+        self.constant_index = dict()
+        self.current = None
+
+    def compile(self, func_table):
+        procedures = dict()
+        for name, proc in func_table.items():
+            self.current = CodeObject(name, list(proc.children["args"]))
+            self.sentences(proc.children["body"])
+            procedures[name] = self.current
+        return BytecodeProgram(self.strings, self.constants, procedures)
+
+    def name(self, value):
+        index = self.string_index.get(value)
+        if index is None:
+            index = self.string_index[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+    def constant(self, kind, value):
+        index = self.constant_index.get((kind, value))
+        if index is None:
+            index = self.constant_index[(kind, value)] = len(self.constants)
+            self.constants.append((kind, value))
+        return index
+
+    def emit(self, *instruction):
+        self.current.code.extend(instruction)
+        return len(self.current.code) - 1
+
+    def sentences(self, node):
+        for sentence in flatten_sentences(node):
+            self.sentence(sentence)
+
+    def sentence(self, node):
+        start = len(self.current.code)
+        self.emit(OpCode.SENTENCE)
+        if self.statement(node):
+            self.emit(OpCode.POP)
+        end = len(self.current.code)
+        value = node.value if isinstance(node.value, str) else ""
+        name = ""
+        if node.children and isinstance(node.children, list) and isinstance(node.children[0], NodeOfST):
+            name = node.children[0].value if isinstance(node.children[0].value, str) else ""
+        self.current.sentences.append(Sentence(start, end, node.type, value, node.lineno, name))
+
+    def statement(self, node):
+        # returns True when statement leaves value on the stack
+        match node.type:
+            case NodeType.Declaration.value:
+                self.expression(node.children[1])
+                self.emit(OpCode.DECLARE, self.name(node.value.value.lower()), self.name(node.children[0].value))
+            case NodeType.Assignment.value:
+                self.emit(OpCode.CHECK_DECLARED, self.name(node.value))
+                self.expression(node.children[0])
+                self.emit(OpCode.ASSIGN, self.name(node.value))
+            case NodeType.If.value:
+                self.if_else(node)
+            case NodeType.While.value:
+                self.while_loop(node)
+            case NodeType.Proc.value:
+                pass
+            case NodeType.MAP.value if node.value == "":
+                self.emit(OpCode.DECLARE_MAP, self.name(node.children[0].value))
+            case NodeType.MAP.value:
+                self.emit(OpCode.MAP_ACTION, self.name(node.value), *(self.name(arg) for arg in node.children))
+            case _:
+                self.expression(node)
+                return True
+        return False
+
+    def expression(self, node):
+        if isinstance(node, int):
+            self.emit(OpCode.PUSH_CONST, self.constant(CONST_INT, node))
+            return
+        if isinstance(node, str):
+            self.emit(OpCode.LOAD, self.name(node))
+            return
+        match node.type:
+            case NodeType.Expression.value:
+                self.expression(node.children[0])
+            case "logical" if isinstance(node.value, str):
+                self.emit(OpCode.PUSH_CONST, self.constant(CONST_BOOLEAN, int(node.value.lower() == "true")))
+            case "logical":
+                self.expression(node.value)
+            case "not":
+                self.logical_operand(node.children[0])
+                self.emit(OpCode.NOT)
+            case "or":
+                self.logical_operand(node.children[0])
+                self.logical_operand(node.children[1])
+                self.emit(OpCode.OR)
+            case NodeType.Proc_call.value:
+                args = node.children[0].children
+                self.emit(OpCode.CALL, self.name(node.value), node.lineno, len(args),
+                          *(self.name(arg) for arg in args))
+            case "robot":
+                self.emit(ROBOT_OPCODES[node.value.lower()])
+            case node_type if node_type in BINARY_OPCODES:
+                self.expression(node.children[0])
+                self.expression(node.children[1])
+                self.emit(BINARY_OPCODES[node_type])
+            case _:
+                raise ValueError(f"Can not compile node of type '{node.type}'")
+
+    def logical_operand(self, node):
+        self.expression(node)
+        if node.type == NodeType.Proc_call.value:
+            self.emit(OpCode.CALL_RESULT)
+
+    def if_else(self, node):
+        # cond; JUMP_IF_FALSE else; ENTER; then; LEAVE; JUMP end; else: ENTER; else-body; LEAVE; end:
+        self.expression(node.children[0])
+        jump_to_else = self.emit(OpCode.JUMP_IF_FALSE, -1)
+        self.emit(OpCode.ENTER_BLOCK)
+        self.sentences(node.children[1])
+        self.emit(OpCode.LEAVE_BLOCK)
+        if len(node.children) == 3:
+            jump_to_end = self.emit(OpCode.JUMP, -1)
+            self.current.code[jump_to_else] = len(self.current.code)
+            self.emit(OpCode.ENTER_BLOCK)
+            self.sentences(node.children[2])
+            self.emit(OpCode.LEAVE_BLOCK)
+            self.current.code[jump_to_end] = len(self.current.code)
+        else:
+            self.current.code[jump_to_else] = len(self.current.code)
+
+    def while_loop(self, node):
+        # LOOP_START; top: cond; JUMP_IF_FALSE end; ENTER; body; LEAVE; LOOP_TICK; JUMP top; end:
+        slot = self.current.loops
+        self.current.loops += 1
+        self.emit(OpCode.LOOP_START, slot)
+        top = len(self.current.code)
+        self.expression(node.children[0])
+        jump_to_end = self.emit(OpCode.JUMP_IF_FALSE, -1)
+        self.emit(OpCode.ENTER_BLOCK)
+        body = node.children[1]
+        if body.type == NodeType.SentenceList.value:
+            self.sentences(body)
+        else:
+            self.sentence(body)
+        self.emit(OpCode.LEAVE_BLOCK)
+        self.emit(OpCode.LOOP_TICK, slot)
+        self.emit(OpCode.JUMP, top)
+        self.current.code[jump_to_end] = len(self.current.code)
+
+
+###################################
+# binary format:
+# header:      magic "TABC", format version (H)
+# strings:     count (I), then length (H) + utf-8 bytes for every string
+# constants:   count (I), then kind (B) + value (q) for every constant,
+#              CONST_BIG_INT has length (I) + signed little-endian bytes of the value instead
+# procedures:  count (I), then for every procedure
+#              name (I), params count (I) + names (I*), loops (I),
+#              code length (I) + code (i*),
+#              sentences count (I) + start, end (I I), type, value (I I), lineno (i), name (I) for every sentence
+# all numbers are little-endian whatever byte order the host has
+
+def dump(program, file):
+    out = bytearray(MAGIC)
+    out += struct.pack("<H", FORMAT_VERSION)
+    strings = list(program.strings)
+    index = {value: i for i, value in enumerate(strings)}
+
+    def name(value):
+        if value not in index:
+            index[value] = len(strings)
+            strings.append(value)
+        return index[value]
+
+    body = bytearray()
+    body += struct.pack("<I", len(program.constants))
+    for kind, value in program.constants:
+        if -2 ** 63 <= value < 2 ** 63:
+            body += struct.pack("<Bq", kind, value)
+        else:
+            encoded = value.to_bytes((value.bit_length() + 8) // 8, "little", signed=True)
+            body += struct.pack("<BI", CONST_BIG_INT, len(encoded)) + encoded
+    body += struct.pack("<I", len(program.procedures))
+    for proc in program.procedures.values():
+        body += struct.pack("<II", name(proc.name), len(proc.params))
+        body += struct.pack(f"<{len(proc.params)}I", *[name(param) for param in proc.params])
+        body += struct.pack("<II", proc.loops, len(proc.code))
+        body += struct.pack(f"<{len(proc.code)}i", *proc.code)
+        body += struct.pack("<I", len(proc.sentences))
+        for s in proc.sentences:
+            body += struct.pack("<IIIIiI", s.start, s.end, name(s.node_type), name(s.value), s.lineno, name(s.name))
+
+    out += struct.pack("<I", len(strings))
+    for value in strings:
+        encoded = value.encode("utf-8")
+        out += struct.pack("<H", len(encoded)) + encoded
+    out += body
+    file.write(bytes(out))
+
+
+class BytecodeFormatError(Exception):
+    pass
+
+
+def load(file):
+    data = file.read()
+    if data[:4] != MAGIC:
+        raise BytecodeFormatError("Not a compiled robot program")
+    version, = struct.unpack_from("<H", data, 4)
+    if version != FORMAT_VERSION:
+        raise BytecodeFormatError(f"Unsupported bytecode version {version}, expected {FORMAT_VERSION}")
+    offset = 6
+
+    def read(fmt):
+        nonlocal offset
+        values = struct.unpack_from(fmt, data, offset)
+        offset += struct.calcsize(fmt)
+        return values
+
+    def read_constant():
+        nonlocal offset
+        kind, = read("<B")
+        if kind != CONST_BIG_INT:
+            return kind, read("<q")[0]
+        length, = read("<I")
+        offset += length
+        return CONST_INT, int.from_bytes(data[offset - length:offset], "little", signed=True)
+
+    strings = []
+    for _ in range(read("<I")[0]):
+        length, = read("<H")
+        strings.append(data[offset:offset + length].decode("utf-8"))
+        offset += length
+    constants = [read_constant() for _ in range(read("<I")[0])]
+    procedures = dict()
+    for _ in range(read("<I")[0]):
+        name, params_count = read("<II")
+        proc = CodeObject(strings[name], [strings[i] for i in read(f"<{params_count}I")])
+        proc.loops, code_length = read("<II")
+        proc.code = list(read(f"<{code_length}i"))
+        for _ in range(read("<I")[0]):
+            start, end, node_type, value, lineno, child = read("<IIIIiI")
+            proc.sentences.append(Sentence(start, end, strings[node_type], strings[value], lineno, strings[child]))
+        procedures[proc.name] = proc
+    return BytecodeProgram(strings, constants, procedures)
+
+
+def constant_values(program):
+    return [Variable("int", value) if kind == CONST_INT else Variable("boolean", bool(value))
+            for kind, value in program.constants]
+
+
+if __name__ == '__main__':
+    # python TABytecode.py <source> <output>
+    from Parser.TAParser import TAParser
+
+    with open(sys.argv[1], "r") as f:
+        source = f.read()
+    syntax_tree, func_table, has_syntax_errors = TAParser().parse(source)
+    if has_syntax_errors:
+        sys.exit(1)
+    with open(sys.argv[2], "wb") as f:
+        dump(TABytecodeCompiler().compile(func_table), f)
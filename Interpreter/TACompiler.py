@@ -0,0 +1,234 @@
+from Parser.TAParser import NodeType, flatten_sentences
+from ErrorHandler import *
+from Variable import Variable
+
+
+class TAClosureCompiler:
+    """
+    Turns syntax tree into tree of python closures, so node types are dispatched once at compile time
+    and running program only calls pre-bound functions. Every closure delegates to the same operations
+    of TAInterpreter that tree walker uses, so both engines behave identically.
+    """
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.procedures = dict()
+
+    def procedure(self, name):
+        # procedure bodies are compiled on the first call, recursive procedures find themselves in the cache
+        body = self.procedures.get(name)
+        if body is None:
+            body = self.compile_sentences(self.interpreter.func_table[name].children["body"])
+            self.procedures[name] = body
+        return body
+
+    def compile_sentences(self, node):
+        sentences = tuple(self.compile_sentence(sentence) for sentence in flatten_sentences(node))
+
+        def run():
+            for sentence in sentences:
+                sentence()
+
+        return run
+
+    def compile_sentence(self, node):
+        statement = self.compile_node(node)
+        if self.interpreter.tracer is not None:
+            statement = self.interpreter.tracer.sentence(statement, node.lineno)
+        if self.interpreter.profiler is not None and node.lineno >= 0:
+            statement = self.interpreter.profiler.sentence(statement, node.lineno)
+        report_error = self.interpreter.report_error
+        errors = tuple(SENTENCE_ERRORS)
+        meter = self.interpreter.meter
+
+        def run():
+            try:
+                meter.ticks -= 1
+                if meter.ticks < 0:
+                    meter.checkpoint()
+                statement()
+            except ReportedException:
+                pass
+            except errors as e:
+                report_error(node, e)
+            except BudgetExhaustedException as e:
+                e.locate(node)
+                raise
+
+        return run
+
+    def compile_node(self, node):
+        interpreter = self.interpreter
+        if isinstance(node, int):
+            value = Variable("int", node)
+            return lambda: value
+        if isinstance(node, str):
+            extract = interpreter.extract_variable_value
+            return lambda: extract(node)
+
+        match node.type:
+            case NodeType.Declaration.value:
+                return self.compile_declaration(node)
+            case NodeType.Assignment.value:
+                return self.compile_assignment(node)
+            case NodeType.Expression.value:
+                return self.compile_node(node.children[0])
+            case NodeType.If.value:
+                return self.compile_if_else(node)
+            case NodeType.While.value:
+                return self.compile_while(node)
+            case NodeType.Proc.value:
+                return lambda: None
+            case NodeType.Proc_call.value:
+                return self.compile_proc_call(node)
+            case NodeType.MAP.value:
+                if node.value == "":
+                    declare_map = interpreter.typed_as(node, interpreter.declare_map)
+                    name = node.children[0].value
+                    return lambda: declare_map(name)
+                map_action = interpreter.handle_map_action
+                return lambda: map_action(node)
+            case NodeType.INC.value:
+                return self.compile_binary(interpreter.typed_as(node, interpreter.inc), node.children[0],
+                                           node.children[1])
+            case NodeType.DEC.value:
+                return self.compile_binary(interpreter.typed_as(node, interpreter.dec), node.children[0],
+                                           node.children[1])
+            case "logical":
+                if isinstance(node.value, str):
+                    value = Variable("boolean", node.value.lower() == "true")
+                    return lambda: value
+                return self.compile_node(node.value)
+            case "not":
+                operand = self.compile_logical_operand(node.children[0])
+                logical_not = interpreter.typed_as(node, interpreter.logical_not)
+                return lambda: logical_not(operand())
+            case "or":
+                left = self.compile_logical_operand(node.children[0])
+                right = self.compile_logical_operand(node.children[1])
+                logical_or = interpreter.typed_as(node, interpreter.logical_or)
+                return lambda: logical_or(left(), right())
+            case "lt":
+                return self.compile_binary(interpreter.typed_as(node, interpreter.lt), node.children[0],
+                                           node.children[1])
+            case "gt":
+                return self.compile_binary(interpreter.typed_as(node, interpreter.gt), node.children[0],
+                                           node.children[1])
+            case "robot":
+                return self.compile_robot_action(node.value.lower())
+
+        raise ValueError(f"Can not compile node of type '{node.type}'")
+
+    def compile_binary(self, operation, left_node, right_node):
+        left = self.compile_node(left_node)
+        right = self.compile_node(right_node)
+        return lambda: operation(left(), right())
+
+    def compile_logical_operand(self, node):
+        if node.type == NodeType.Proc_call.value:
+            call = self.compile_proc_call(node)
+            result = self.interpreter.typed_as(node, self.interpreter.boolean_result)
+            return lambda: result(call())
+        return self.compile_node(node)
+
+    def compile_declaration(self, node):
+        decl_type = node.value.value.lower()
+        name = node.children[0].value
+        value = self.compile_node(node.children[1])
+        add_to_declare_table = self.interpreter.add_to_declare_table
+        convert = self.interpreter.typed_as(node, None)
+        return lambda: add_to_declare_table(decl_type, name, value(), convert)
+
+    def compile_assignment(self, node):
+        interpreter = self.interpreter
+        name = node.value
+        value = self.compile_node(node.children[0])
+        assign = interpreter.assign
+        convert = interpreter.typed_as(node, None)
+
+        def run():
+            if name not in interpreter.declaration_table[interpreter.visibility_scope]:
+                raise UndeclaredException
+            assign(name, value(), convert)
+
+        return run
+
+    def compile_if_else(self, node):
+        interpreter = self.interpreter
+        condition = self.compile_node(node.children[0])
+        then_statement = self.compile_sentences(node.children[1])
+        else_statement = self.compile_sentences(node.children[2]) if len(node.children) == 3 else None
+        to_bool = interpreter.typed_as(node, interpreter.condition)
+
+        def run():
+            value = to_bool(condition())
+            interpreter.createNewEnv()
+            try:
+                if value:
+                    then_statement()
+                elif else_statement is not None:
+                    else_statement()
+            finally:
+                interpreter.returnEnv()
+
+        return run
+
+    def compile_while(self, node):
+        interpreter = self.interpreter
+        condition = self.compile_node(node.children[0])
+        body_node = node.children[1]
+        if body_node.type == NodeType.SentenceList.value:
+            body = self.compile_sentences(body_node)
+        else:
+            body = self.compile_sentence(body_node)
+        to_bool = interpreter.typed_as(node, interpreter.condition)
+        loop_limit = interpreter.meter.loop_limit
+
+        def run():
+            counter = 0
+            while to_bool(condition()):
+                counter += 1
+                interpreter.createNewEnv()
+                try:
+                    body()
+                finally:
+                    interpreter.returnEnv()
+                if counter > loop_limit:
+                    raise BudgetExhaustedException("loop iterations")
+
+        return run
+
+    def compile_proc_call(self, node):
+        name = node.value
+        arg_names = tuple(node.children[0].children)
+        call_proc = self.interpreter.call_proc
+        procedure = self.procedure
+
+        def run_body(body_node):
+            procedure(name)()
+
+        def call():
+            try:
+                return call_proc(name, arg_names, run_body)
+            except CallException as e:
+                raise e.locate(node)
+
+        return call
+
+    def compile_robot_action(self, action):
+        interpreter = self.interpreter
+        match action:
+            case "step":
+                step = interpreter.step
+                return lambda: Variable("boolean", step())
+            case "look":
+                look = interpreter.look
+                return lambda: Variable("int", look())
+        turn = {"right": interpreter.right, "left": interpreter.left, "back": interpreter.back}[action]
+        done = Variable("boolean", True)
+
+        def run():
+            turn()
+            return done
+
+        return run
@@ -1,8 +1,13 @@
+import contextlib
 import copy
+import os
 from Parser.TAParser import *
 from Parser.TAParser import NodeType
+from Parser.TAOptimizer import TAOptimizer
 from ErrorHandler import *
-from TypeConverter import TypeConverter
+from TABudget import ExecutionBudget
+from TAMemo import arguments_key
+import TypeConverter as type_converter
 from Variable import Variable
 from collections import deque
 
@@ -18,160 +23,482 @@ class VariableList:
 
 
 class TAInterpreter:
-    def __init__(self):
-        self.parser = TAParser()
+    # "tree" walks the syntax tree node by node, "closure" compiles it into python closures once before running,
+    # "bytecode" runs it on TAVirtualMachine, "resolved" compiles closures with variables bound to frame slots,
+    # "unboxed" is "resolved" with plain python values instead of Variable objects,
+    # "stack" runs the bytecode with procedure calls on an explicit frame stack instead of python recursion
+    engines = ("tree", "closure", "bytecode", "resolved", "unboxed", "stack")
+    # engines which run the conversions and operations chosen by TATypeChecker
+    typed_engines = ("tree", "closure")
+
+    def __init__(self, engine="tree", optimize=False, flat_ast=False, parse_cache=None, profiler=None,
+                 budget=None, memo=None, typecheck=False, tracer=None):
+        if engine not in self.engines:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {self.engines}")
+        if typecheck and engine not in self.typed_engines:
+            raise ValueError(f"Engine '{engine}' does not run type checked programs, use one of {self.typed_engines}")
+        self.engine = engine
+        self.optimize = optimize
+        # flat_ast keeps syntax tree in array columns of TAFlatTree instead of NodeOfST objects
+        self.flat_ast = flat_ast
+        # TAParseCache shared by interpreters which run the same programs again
+        self.parse_cache = parse_cache
+        # TAProfiler which measures runs of this interpreter
+        self.profiler = profiler
+        # TATracer which records robot actions of the run
+        self.tracer = tracer
+        # ExecutionBudget of every run, meter counts what the current run spent
+        self.budget = budget if budget is not None else ExecutionBudget()
+        self.meter = None
+        # BudgetExhaustedException which ended the last run
+        self.exhausted = None
+        # TAMemoizer with caches of pure procedures, reported counts errors so calls which had some are not cached
+        self.memo = memo
+        self.reported = 0
+        # typecheck checks types before execution, typed is TypedProgram of the running program
+        self.typecheck = typecheck
+        self.typed = None
+        self._parser = None
         self.syntax_tree = None
         self.func_table = dict()
         self.declaration_table = [dict()]
         self.visibility_scope = 0
         self.recursion_depth = dict()
         self.variables = VariableList()
+        self.exit_found = False
 
         self.robot = None
 
+    @property
+    def parser(self):
+        # parser tables are only built when there is something to parse, precompiled programs never need them
+        if self._parser is None:
+            self._parser = TAParser.shared(self.flat_ast)
+        return self._parser
+
     def start(self, prog=None, robot=None):
         self.robot = robot
-        self.syntax_tree, self.func_table, has_syntax_errors = self.parser.parse(prog)
+        if hasattr(prog, "result"):
+            # IncrementalParse of TAIncremental keeps tree of the edited program up to date
+            parsed = prog.result()
+        elif self.parse_cache is not None:
+            parsed = self.parse_cache.parse(prog, lambda: self.parser, self.flat_ast)
+        else:
+            parsed = self.parser.parse(prog)
+        self.syntax_tree, self.func_table, has_syntax_errors = parsed
+        if self.optimize and not has_syntax_errors:
+            self.func_table = TAOptimizer().optimize(self.func_table)
         for key in self.func_table.keys():
             self.recursion_depth[key] = 0
         if not has_syntax_errors:
-            self.handleCaseWithoutSyntaxErrors()
+            if self.typecheck:
+                from TATypeChecker import TATypeChecker
+                self.typed = TATypeChecker().check(self.func_table)
+                self.typed.report(self)
+            if self.memo is not None:
+                self.memo.prepare(self.func_table)
+            self.meter = self.budget.meter()
+            self.exhausted = None
+            with self.profiling(), self.tracing():
+                self.handleCaseWithoutSyntaxErrors()
 
     def handleCaseWithoutSyntaxErrors(self):
         mainFuncKey = "main"
         if mainFuncKey in self.func_table.keys():
             start_node = self.func_table["main"].children["body"]
-            self.handleNode(start_node)
-            for d in self.declaration_table:
-                for key in d.keys():
-                    print(f"{key}: {d[key]}")
-                print()
+            try:
+                self.run_engine(start_node)
+            except BudgetExhaustedException as e:
+                self.report_exhausted(e)
+                return
+            self.print_declaration_table()
         else:
             ErrorHandler().raise_error(code=ErrorType.MissingProgramStartPoint.value)
             return
 
+    def run_engine(self, start_node):
+        if self.engine == "closure":
+            from TACompiler import TAClosureCompiler
+            TAClosureCompiler(self).compile_sentences(start_node)()
+        elif self.engine == "unboxed":
+            from TAUnboxed import TAUnboxedCompiler
+            TAUnboxedCompiler(self).run()
+        elif self.engine == "resolved":
+            from TAResolver import TAResolvingCompiler
+            TAResolvingCompiler(self).run()
+        elif self.engine == "bytecode":
+            from TABytecode import TABytecodeCompiler
+            from TAVirtualMachine import TAVirtualMachine
+            TAVirtualMachine(self, TABytecodeCompiler().compile(self.func_table)).run()
+        elif self.engine == "stack":
+            from TABytecode import TABytecodeCompiler
+            from TAStackMachine import TAStackMachine
+            TAStackMachine(self, TABytecodeCompiler().compile(self.func_table)).run()
+        else:
+            self.handleNode(start_node)
+
+    def start_compiled(self, program=None, robot=None):
+        # program is BytecodeProgram from TABytecodeCompiler or TABytecode.load, nothing is lexed or parsed
+        if self.engine == "stack":
+            from TAStackMachine import TAStackMachine as machine
+        else:
+            from TAVirtualMachine import TAVirtualMachine as machine
+        if self.prepare_compiled(program, robot):
+            try:
+                with self.profiling(), self.tracing():
+                    machine(self, program).run()
+            except BudgetExhaustedException as e:
+                self.report_exhausted(e)
+                return
+            self.print_declaration_table()
+        else:
+            ErrorHandler().raise_error(code=ErrorType.MissingProgramStartPoint.value)
+
+    def prepare_compiled(self, program, robot):
+        # state before the first instruction of program, False when it has no main
+        self.robot = robot
+        self.func_table = program.func_table()
+        for key in self.func_table.keys():
+            self.recursion_depth[key] = 0
+        if "main" not in self.func_table.keys():
+            return False
+        if self.memo is not None:
+            self.memo.prepare(self.func_table, program)
+        self.meter = self.budget.meter()
+        self.exhausted = None
+        return True
+
+    def profiling(self):
+        # profiler wraps methods of this interpreter only for the run, without it nothing is changed
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return self.profiler.attach(self)
+
+    def tracing(self):
+        if self.tracer is None:
+            return contextlib.nullcontext()
+        return self.tracer.attach(self)
+
+    def print_declaration_table(self):
+        for d in self.declaration_table:
+            for key in d.keys():
+                print(f"{key}: {d[key]}")
+            print()
+
+    def handleSentence(self, node):
+        # sentence is the unit of error recovery: report the error and go on with the next sentence
+        meter = self.meter
+        try:
+            meter.ticks -= 1
+            if meter.ticks < 0:
+                meter.checkpoint()
+            return self.handleNode(node)
+        except ReportedException:
+            pass
+        except tuple(SENTENCE_ERRORS) as e:
+            self.report_error(node, e)
+        except BudgetExhaustedException as e:
+            e.locate(node)
+            raise
+
+    def typed_as(self, node, dynamic):
+        # conversion or operation type checker chose for the node, dynamic one when types are known only now
+        if self.typed is None:
+            return dynamic
+        return self.typed.annotations.get(node, dynamic)
+
+    def report_error(self, node, error):
+        self.reported += 1
+        code = SENTENCE_ERRORS[type(error)]
+        if isinstance(error, CallException) and error.node is not None:
+            node = error.node
+        ErrorHandler().raise_error(node=node, code=code, type="variable")
+
+    def report_exhausted(self, error):
+        # the program ends, final values of variables are not shown
+        self.exhausted = error
+        ErrorHandler().raise_error(node=error.node, code=ErrorType.BudgetExhaustedError.value, type=error.reason)
+
     def handleNode(self, node):
         if node is None:
             return "None Node"
+        # leaves of the tree are kept as raw tokens: numbers are literals, strings are variable names
+        if isinstance(node, int):
+            return Variable("int", node)
+        if isinstance(node, str):
+            return self.extract_variable_value(node)
 
         node_type = node.type
         match node_type:
             case NodeType.Program.value:
-                self.handleNode(node.children)
+                self.handleNode(node.children[0])
             case NodeType.SentenceList.value:
                 for child in node.children:
-                    # print(child.type)
-                    self.handleNode(child)
+                    if child.type == NodeType.SentenceList.value:
+                        self.handleNode(child)
+                    else:
+                        self.handleSentence(child)
             case NodeType.Declaration.value:
                 # declaration-node has field value which equals type-node, and this type-node has field value
                 # which equals int-node or bool-node
-                type = node.value.value
+                type = node.value.value.lower()
                 children = node.children
-                try:
-                    self.declare(type, children)
-                except ValueException:
-                    print("[DEBUG]: Value Exception")
-                    pass
-                except UnexpectedTypeException:
-                    print("[DEBUG]: Unexpected Type Exception")
-                    pass
+                self.declare(type, children, self.typed_as(node, None))
             case NodeType.Assignment.value:
-                try:
-                    return self.handle_assignment(node)
-                except UndeclaredException:
-                    ErrorHandler().raise_error(node=node, code=ErrorType.UndeclaredError.value)
+                return self.handle_assignment(node)
             case NodeType.Expression.value:
-                return self.handleNode(node.children)
+                return self.handleNode(node.children[0])
             case NodeType.If.value:
                 self.handle_if_else(node)
             case NodeType.While.value:
                 self.handle_dowhile(node)
-
-            case NodeType.CallProc.value:
-                # node: type: func_call, value: name of calling function
-                try:
-                    self.handle_proc_cal(node)
-                except RecursionException:
-                    ErrorHandler().raise_error(node=node, code=ErrorType.RecursionError.value)
-                except UndeclaredFunctionException:
-                    ErrorHandler().raise_error(node=node, code=ErrorType.UndeclaredFunctionError.value)
-                except Exception:
-                    ErrorHandler().raise_error(code=ErrorType.UnexpectedError.value)
+            case NodeType.Proc.value:
+                # procedures are registered by the parser, declaration itself is not executed
+                pass
+            case NodeType.Proc_call.value:
+                # node: type: proc_call, value: name of calling function
+                return self.handle_proc_call(node)
+            case NodeType.MAP.value:
+                if node.value == "":
+                    self.typed_as(node, self.declare_map)(node.children[0].value)
+                else:
+                    self.handle_map_action(node)
+            case NodeType.INC.value:
+                return self.typed_as(node, self.inc)(self.handleNode(node.children[0]),
+                                                      self.handleNode(node.children[1]))
+            case NodeType.DEC.value:
+                return self.typed_as(node, self.dec)(self.handleNode(node.children[0]),
+                                                      self.handleNode(node.children[1]))
+            case "logical":
+                if isinstance(node.value, str):
+                    return Variable("boolean", node.value.lower() == "true")
+                return self.handleNode(node.value)
+            case "not":
+                return self.typed_as(node, self.logical_not)(self.handle_logical_operand(node.children[0]))
+            case "or":
+                return self.typed_as(node, self.logical_or)(self.handle_logical_operand(node.children[0]),
+                                                            self.handle_logical_operand(node.children[1]))
+            case "lt":
+                return self.typed_as(node, self.lt)(self.handleNode(node.children[0]),
+                                                     self.handleNode(node.children[1]))
+            case "gt":
+                return self.typed_as(node, self.gt)(self.handleNode(node.children[0]),
+                                                     self.handleNode(node.children[1]))
             case "robot":
-                match node.value:
-                    case "wall":
-                        return Variable('int', self.back())
-                    case "exit":
-                        return Variable('bool', self.exit())
-                    case "right":
-                        return self.right()
-                    case "left":
-                        return self.left()
-                    case "move":
-                        exp = self.handleNode(node.children)
-                        return Variable('bool', self.step(exp.value))
+                return self.handle_robot_action(node.value.lower())
 
             case _:
                 print("[DEBUG]: Errors in grammar and syntax tree building")
 
-    def declare(self, decl_type, children):
+    def handle_logical_operand(self, node):
+        if node.type == NodeType.Proc_call.value:
+            return self.typed_as(node, self.boolean_result)(self.handle_proc_call(node))
+        return self.handleNode(node)
+
+    def handle_robot_action(self, action):
+        match action:
+            case "step":
+                return Variable("boolean", self.step())
+            case "look":
+                return Variable("int", self.look())
+            case "right":
+                self.right()
+            case "left":
+                self.left()
+            case "back":
+                self.back()
+        return Variable("boolean", True)
+
+    ###################################
+    # operations shared by all execution engines
+
+    def declare(self, decl_type, children, convert=None):
         # Example: cint a = 5
         # where 5 is declaration_value
         declaration_name = children[0].value
         if len(children) == 2:
             declaration_value = children[1]
             expression = self.handleNode(declaration_value)
-            self.add_to_declare_table(decl_type, declaration_name, expression)
+            self.add_to_declare_table(decl_type, declaration_name, expression, convert)
         else:
             self.add_to_declare_table(decl_type, declaration_name, self.handleNode(None))
 
-    def add_to_declare_table(self, decl_type, decl_name, value):
-        expression = self.configure_declaration(decl_type, value)
+    def declare_map(self, decl_name):
+        self.add_to_declare_table("map", decl_name, Variable("map", dict()))
+
+    def add_to_declare_table(self, decl_type, decl_name, value, convert=None):
+        # convert is the conversion type checker chose for the declaration
+        if convert is not None:
+            expression = convert(value)
+        else:
+            expression = self.configure_declaration(decl_type, value)
         declaration_table_in_scope = self.declaration_table[self.visibility_scope]
         if decl_name not in declaration_table_in_scope.keys():
             declaration_table_in_scope[decl_name] = expression
+            self.variables.variables[decl_name] = expression
         else:
             raise RedeclarationException
 
     def configure_declaration(self, type, value):
-        if type == "cboolean" and isinstance(value.value, int):
-            return Variable("cboolean", bool(value.value))
-        elif type == "cint" and isinstance(value.value, bool):
-            return Variable("cint", int(value.value))
+        if type == "map":
+            return value
         return self.configure_variable(type, value)
 
     def configure_variable(self, type, value):
-        if type == "int" and value.type == "cint":
-            return TypeConverter().convert_type(type, Variable("int", value.value))
-        if type == "boolean" and value.type == "cboolean":
-            return TypeConverter().convert_type(type, value.value)
-        return TypeConverter().convert_type(type, value)
-
-    def extract_variable_value(self, node):
-        if node.value in self.declaration_table[self.visibility_scope].keys():
-            return self.declaration_table[self.visibility_scope][node.value]
+        return type_converter.convert(type, value)
+
+    def extract_variable_value(self, name):
+        if name in self.declaration_table[self.visibility_scope].keys():
+            return self.declaration_table[self.visibility_scope][name]
         else:
             raise UndeclaredException
 
-    ###################################
+    def assign(self, decl_name, new_value, convert=None):
+        if decl_name not in self.declaration_table[self.visibility_scope].keys():
+            raise UndeclaredException
+        if convert is not None:
+            # type checker already knows the variable is not constant and what its type takes
+            self.declaration_table[self.visibility_scope][decl_name] = convert(new_value)
+            return
+        var = self.declaration_table[self.visibility_scope][decl_name]
+        if var.type in ("cint", "cboolean"):
+            raise ConstantAssignmentException
+        self.declaration_table[self.visibility_scope][decl_name] = self.configure_variable(var.type, new_value)
+
     def handle_assignment(self, node):
         # met something like a := 5
         # a is decl_name
-        decl_name = node.value.value
+        decl_name = node.value
         if decl_name not in self.declaration_table[self.visibility_scope].keys():
             raise UndeclaredException
-        try:
-            var = self.declaration_table[self.visibility_scope][decl_name]
-            new_value = node.children[0]
-            new_value = self.handleNode(new_value)
-            self.declaration_table[self.visibility_scope][decl_name] = Variable(var.type, int(new_value.value))
-        except TypeException:
-            ErrorHandler().raise_error(node=node, code=ErrorType.TypeError.value)
-        except ConstantAssignmentException:
-            ErrorHandler().raise_error(node=node, code=ErrorType.ConstantAssignmentError.value)
+        self.assign(decl_name, self.handleNode(node.children[0]), self.typed_as(node, None))
+
+    def inc(self, left, right):
+        convert = type_converter.convert
+        return Variable("int", convert("int", left).value + convert("int", right).value)
+
+    def dec(self, left, right):
+        convert = type_converter.convert
+        return Variable("int", convert("int", left).value - convert("int", right).value)
+
+    def lt(self, left, right):
+        convert = type_converter.convert
+        return Variable("boolean", convert("int", left).value < convert("int", right).value)
+
+    def gt(self, left, right):
+        convert = type_converter.convert
+        return Variable("boolean", convert("int", left).value > convert("int", right).value)
+
+    def logical_not(self, operand):
+        return Variable("boolean", not type_converter.convert("boolean", operand).value)
+
+    def logical_or(self, left, right):
+        convert = type_converter.convert
+        return Variable("boolean", convert("boolean", left).value or convert("boolean", right).value)
+
+    def condition(self, value):
+        return type_converter.convert("boolean", value).value
+
+    def handle_map_action(self, node):
+        # bar/emp/set/clr [result map x y]
+        self.map_action(node.value, *node.children)
+
+    def map_action(self, action, result_name, map_name, x_name, y_name):
+        world = self.extract_variable_value(map_name)
+        if world.type != "map":
+            raise TypeException
+        cell = (type_converter.convert("int", self.extract_variable_value(x_name)).value,
+                type_converter.convert("int", self.extract_variable_value(y_name)).value)
+        match action.lower():
+            case "bar":
+                self.assign(result_name, Variable("boolean", world.value.get(cell) is True))
+            case "emp":
+                self.assign(result_name, Variable("boolean", world.value.get(cell) is False))
+            case "set":
+                world.value[cell] = self.condition(self.extract_variable_value(result_name))
+            case "clr":
+                world.value.pop(cell, None)
 
     ###################################
 
+    def handle_proc_call(self, node):
+        try:
+            return self.call_proc(node.value, node.children[0].children, self.handleNode)
+        except CallException as e:
+            raise e.locate(node)
+
+    def call_proc(self, name, arg_names, run_body):
+        # parameters are passed by reference: callee gets the values of caller variables,
+        # and their final values are written back when the procedure returns
+        params, args = self.proc_arguments(name, arg_names)
+        cache = None
+        if self.memo is not None:
+            cache, key = self.memo_lookup(name, args)
+            if cache is not None:
+                result = cache.get(key)
+                if result is not None:
+                    return self.return_values(arg_names, list(result))
+                reported = self.reported
+
+        saved_variables = self.variables
+        self.recursion_depth[name] += 1
+        self.declaration_table.append(dict(zip(params, args)))
+        self.visibility_scope += 1
+        self.variables = VariableList()
+        try:
+            run_body(self.func_table[name].children["body"])
+        finally:
+            callee_scope = self.declaration_table.pop()
+            self.visibility_scope -= 1
+            self.variables = saved_variables
+            self.recursion_depth[name] -= 1
+
+        result = [callee_scope[param] for param in params]
+        if cache is not None:
+            self.memo_store(cache, key, tuple(result), reported)
+        return self.return_values(arg_names, result)
+
+    def return_values(self, arg_names, result):
+        caller_scope = self.declaration_table[self.visibility_scope]
+        for arg, value in zip(arg_names, result):
+            caller_scope[arg] = value
+        return result
+
+    def memo_lookup(self, name, args):
+        # cache of the procedure and key of the call, None when the call is not cached
+        cache = self.memo.cache(name)
+        if cache is None:
+            return None, None
+        key = arguments_key(args)
+        return (cache, key) if key is not None else (None, None)
+
+    def memo_store(self, cache, key, result, reported):
+        # errors reported while the call ran would not be reported again by a cached one
+        if self.reported == reported:
+            cache.put(key, result)
+        else:
+            cache.skipped += 1
+
+    def proc_arguments(self, name, arg_names):
+        # checks of a call in the order every engine makes them; parameter names and values of arguments
+        if name not in self.func_table.keys():
+            raise UndeclaredFunctionException
+        params = self.func_table[name].children["args"]
+        if len(params) != len(arg_names):
+            raise MissingParameterException
+        if self.recursion_depth[name] >= self.meter.depth_limit:
+            raise RecursionException
+        return params, [self.extract_variable_value(arg) for arg in arg_names]
+
+    def boolean_result(self, result):
+        return self.proc_result("boolean", result)
+
+    def proc_result(self, type, result):
+        # in expressions the first parameter of the suitable type is the result of the call
+        for value in result:
+            if value.type in type or type in value.type:
+                return value
+        raise TypeException
 
     def createNewEnv(self):
         current = VariableList()
@@ -179,63 +506,52 @@ class TAInterpreter:
         self.variables.next = current
         self.variables = self.variables.next
 
-    def expression(self, node):
-        if node.type == 'variable':
-            return self.get_variable(node)
-        elif node.type == 'math expression':
-            return self.math_expression(node)
-        elif node.type == 'boolean':
-            return Variable(node.data, 'boolean')
-        elif node.type == 'call proc':
-            return self.proc_call(node)
-        elif node.type == 'Robot command':
-            return self.handleNode(node)
-        else:
-            raise ErrorType.UnexpectedError
-
     def returnEnv(self):
+        # names declared inside of the block are not visible after it
+        scope = self.declaration_table[self.visibility_scope]
+        for name in self.variables.variables.keys():
+            scope.pop(name, None)
         self.variables = self.variables.pre
+        self.variables.next = None
 
     def handle_if_else(self, node):
         # if-node has children = [conditionChild, bodyChild] | [conditionChild, bodyChild, elseChild]
-        condition = node.children[0]
-        # condition = TypeConverter().convert_type("bool", condition).value
         expression = node.children[0]
         then_statement = node.children[1]
-        if len(node.children) == 2:
-            self.createNewEnv()
-            expression = node.children[0]
-            condition = self.expression(expression)
-            condition = TypeConverter().convert_type('bool', condition).value
-            if condition == 'true':
-                self.handleNode(then_statement)
-        else:
-            else_statement = node.children[2]
-            self.createNewEnv()
-            condition = self.expression(expression)
-            condition = TypeConverter().convert_type('bool', condition).value
-            if condition == 'true':
+        condition = self.typed_as(node, self.condition)(self.handleNode(expression))
+        self.createNewEnv()
+        try:
+            if condition:
                 self.handleNode(then_statement)
-            elif condition == 'false':
-                self.handleNode(else_statement)
+            elif len(node.children) == 3:
+                self.handleNode(node.children[2])
+        finally:
             self.returnEnv()
 
     def handle_dowhile(self, node):
-        body = node.children[0]
-        expression = node.children[1]
-        self.createNewEnv()
+        # while-node has children = [conditionChild, bodyChild]
+        expression = node.children[0]
+        body = node.children[1]
+        condition = self.typed_as(node, self.condition)
         counter = 0
-        condition = 'true'
-        while condition == 'true':
+        while condition(self.handleNode(expression)):
             counter += 1
+            self.createNewEnv()
+            try:
+                self.handle_loop_body(body)
+            finally:
+                self.returnEnv()
+            if counter > self.meter.loop_limit:
+                raise BudgetExhaustedException("loop iterations")
+
+    def handle_loop_body(self, body):
+        if body.type == NodeType.SentenceList.value:
             self.handleNode(body)
-            condition = self.expression(expression)
-            condition = TypeConverter().convert_type('bool', condition).value
-            if counter > 1000:
-                raise RuntimeError()
-        self.returnEnv()
+        else:
+            self.handleSentence(body)
 
     def back(self):
+        self.meter.action()
         return self.robot.back()
 
     def exit(self):
@@ -245,25 +561,40 @@ class TAInterpreter:
         return result
 
     def right(self):
+        self.meter.action()
         return self.robot.right()
 
     def left(self):
+        self.meter.action()
         return self.robot.left()
 
-    def step(self, expression):
-        return self.robot.step(expression)
+    def look(self):
+        self.meter.action()
+        return self.robot.look()
+
+    def step(self):
+        self.meter.action()
+        result = self.robot.step()
+        if result and hasattr(self.robot, "exit"):
+            self.exit()
+        return result
 
 
-def create_robot(descriptor, window):
-    pass
+def create_robot(descriptor, window=None):
+    # descriptor is Maze or path of maze text file; robot is simulated, nothing is drawn into window
+    from Robot.TAMaze import Maze
+    from Robot.TARobot import SimulatedRobot
+    maze = descriptor if isinstance(descriptor, Maze) else Maze.load(descriptor)
+    return SimulatedRobot(maze)
 
 
 if __name__ == '__main__':
     interpreter = TAInterpreter()
     print("Enter filename: ", end="")
     filename = input()
-    s = f'/Users/MI/PycharmProjects/TARobot/Testing/test_interpreter__{filename}.txt'
-    #s = f'/Users/MI/PycharmProjects/TARobot/Testing/test_interpreter_exit_alg.txt'
+    testing = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Testing")
+    s = os.path.join(testing, f'test_interpreter_{filename}')
     f = open(s, "r")
     program = f.read()
     f.close()
+    interpreter.start(program)
@@ -0,0 +1,176 @@
+# ------------------------------------------------------------
+# TAMemo.py
+#
+# purity analysis of procedures and opt-in caches of results of pure procedures,
+# keyed by values of arguments, with LRU eviction and hit statistics
+# ------------------------------------------------------------
+from collections import OrderedDict
+
+from Parser.TAParser import NodeOfST, NodeType
+from TABytecode import OpCode, ROBOT_OPCODES, next_instruction
+
+DEFAULT_SIZE = 1024
+
+# opcodes which reach robot or map state
+EFFECT_OPCODES = frozenset(ROBOT_OPCODES.values()) | {OpCode.DECLARE_MAP, OpCode.MAP_ACTION}
+
+
+###################################
+# purity
+
+def node_effects(node, calls):
+    # True when the subtree moves robot or touches map, names of called procedures are added to calls
+    if not isinstance(node, NodeOfST):
+        return False
+    match node.type:
+        case "robot" | NodeType.MAP.value:
+            return True
+        case NodeType.Proc.value:
+            # nested declaration is registered by the parser, its body is not run here
+            return False
+        case NodeType.Proc_call.value:
+            calls.add(node.value)
+            return False
+    children = node.children.values() if isinstance(node.children, dict) else node.children
+    return node_effects(node.value, calls) or any(node_effects(child, calls) for child in children)
+
+
+def code_effects(code, strings, calls):
+    pc = 0
+    while pc < len(code):
+        op = code[pc]
+        if op in EFFECT_OPCODES:
+            return True
+        if op == OpCode.CALL:
+            calls.add(strings[code[pc + 1]])
+        pc = next_instruction(code, pc)
+    return False
+
+
+def pure_procedures(func_table, program=None):
+    """
+    Names of procedures which never move robot nor touch maps, directly or through procedures they call:
+    their results only depend on values of their arguments. Bodies are read from func_table, or from
+    the bytecode of program when the table was made by BytecodeProgram.func_table.
+    """
+    calls = dict()
+    impure = set()
+    for name, proc in func_table.items():
+        calls[name] = set()
+        if program is not None:
+            effects = code_effects(program.procedures[name].code, program.strings, calls[name])
+        else:
+            effects = node_effects(proc.children["body"], calls[name])
+        if effects:
+            impure.add(name)
+    # calls of impure or undeclared procedures make the caller impure, until nothing changes
+    changed = True
+    while changed:
+        changed = False
+        for name, callees in calls.items():
+            if name not in impure and any(callee in impure or callee not in calls for callee in callees):
+                impure.add(name)
+                changed = True
+    return frozenset(name for name in func_table if name not in impure)
+
+
+###################################
+# caches
+
+class ProcedureCache:
+    """Results of one procedure by arguments, least recently used ones are evicted over size"""
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # calls which reported errors, their results are not stored
+        self.skipped = 0
+
+    def get(self, key):
+        result = self.entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        if self.size <= 0:
+            return
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    @property
+    def hit_rate(self):
+        calls = self.hits + self.misses
+        return self.hits / calls if calls else 0.0
+
+    def as_dict(self):
+        return {"size": self.size, "entries": len(self.entries), "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "skipped": self.skipped, "hit_rate": self.hit_rate}
+
+
+class TAMemoizer:
+    """
+    TAInterpreter(memo=TAMemoizer()) caches results of pure procedures: a call whose arguments have the
+    same types and values as an earlier one gets final values of parameters that call ended with,
+    the body is not run. procedures limits caching to these names, None caches every pure one;
+    impure procedures are never cached, whatever is asked. size is the number of results kept for one
+    procedure, sizes overrides it by name. Calls which reported errors and calls with map arguments
+    are not stored. Cached calls spend no fuel and go no deeper, so a budget or recursion limit the
+    body would have run into is not reached. Caches stay valid for further runs of the same program.
+    """
+
+    def __init__(self, size=DEFAULT_SIZE, procedures=None, sizes=None):
+        self.size = size
+        self.procedures = None if procedures is None else frozenset(procedures)
+        self.sizes = dict(sizes or {})
+        self.pure = frozenset()
+        # procedure node the cache was made for and the cache, by name
+        self.caches = dict()
+
+    def prepare(self, func_table, program=None):
+        self.pure = pure_procedures(func_table, program)
+        for name in [name for name in self.caches if name not in func_table]:
+            del self.caches[name]
+        for name, proc in func_table.items():
+            source = program.procedures[name] if program is not None else proc
+            known = self.caches.get(name)
+            if known is not None and known[0] is source:
+                continue
+            if name in self.pure and (self.procedures is None or name in self.procedures):
+                self.caches[name] = (source, ProcedureCache(self.sizes.get(name, self.size)))
+            else:
+                self.caches.pop(name, None)
+
+    def cache(self, name):
+        known = self.caches.get(name)
+        return known[1] if known is not None else None
+
+    def stats(self):
+        return {name: cache.as_dict() for name, (_, cache) in sorted(self.caches.items())}
+
+    def summary(self):
+        rows = [f"{'procedure':<16} {'hits':>10} {'misses':>10} {'evicted':>10} {'hit rate':>9}"]
+        for name, stat in self.stats().items():
+            rows.append(f"{name:<16} {stat['hits']:>10} {stat['misses']:>10} {stat['evictions']:>10} "
+                        f"{stat['hit_rate']:>9.1%}")
+        return "\n".join(rows)
+
+
+def arguments_key(values):
+    # types and values of arguments, None when one of them is a map
+    return typed_arguments_key([value.type for value in values], [value.value for value in values])
+
+
+def typed_arguments_key(types, values):
+    if "map" in types:
+        return None
+    return tuple(zip(types, values))
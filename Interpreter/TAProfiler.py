@@ -0,0 +1,229 @@
+# ------------------------------------------------------------
+# TAProfiler.py
+#
+# opt-in profiler of TAInterpreter: hit counts and time per source line, node type,
+# procedure, robot action and type conversion, reported as json or collapsed stacks
+# ------------------------------------------------------------
+import argparse
+import contextlib
+import io
+import json
+import time
+
+import TypeConverter as type_converter_module
+
+
+class Stat:
+    # hits, total is time with everything called inside counted once even on recursion, own is time without callees
+    __slots__ = ("hits", "total", "own", "active")
+
+    def __init__(self):
+        self.hits = 0
+        self.total = 0
+        self.own = 0
+        self.active = 0
+
+    def as_dict(self):
+        return {"hits": self.hits, "total_ns": self.total, "own_ns": self.own}
+
+
+class TAProfiler:
+    """
+    TAInterpreter(profiler=TAProfiler()) measures the run: attach replaces methods of that one
+    interpreter by measuring wrappers for the run and puts the originals back after it, so
+    interpreters without profiler run the same code as before. Lines count every sentence run
+    and are measured by the tree and closure engines, node types by the tree engine, procedure
+    calls by the engines which call TAInterpreter.call_proc, robot actions and conversions decided
+    at runtime by TypeConverter.convert by all engines which use them; conversions chosen by
+    TATypeChecker are not decided at runtime and not counted. Other engines do not tell lines or
+    calls to the profiler, it refuses them unless made with lines=False or procedures=False.
+    Times are nanoseconds of clock; several runs with one profiler add up.
+    """
+    line_engines = ("tree", "closure")
+    procedure_engines = ("tree", "closure", "bytecode")
+
+    def __init__(self, clock=time.perf_counter_ns, lines=True, procedures=True):
+        self.clock = clock
+        self.per_line = lines
+        self.per_procedure = procedures
+        self.lines = dict()
+        self.node_types = dict()
+        self.procedures = dict()
+        self.actions = dict()
+        self.conversions = Stat()
+        # own time of every collapsed stack "main;while:3;robot step"
+        self.stacks = dict()
+        # open frames: [path, stats, start, time of callees]
+        self.frames = [["main", (), 0, 0]]
+
+    ###################################
+    # measuring
+
+    def stat(self, table, key):
+        stat = table.get(key)
+        if stat is None:
+            stat = table[key] = Stat()
+        return stat
+
+    def measure(self, label, stats, call, *args):
+        for stat in stats:
+            stat.hits += 1
+            stat.active += 1
+        frame = [self.frames[-1][0] + ";" + label, stats, 0, 0]
+        self.frames.append(frame)
+        frame[2] = self.clock()
+        try:
+            return call(*args)
+        finally:
+            elapsed = self.clock() - frame[2]
+            self.frames.pop()
+            own = elapsed - frame[3]
+            self.frames[-1][3] += elapsed
+            self.stacks[frame[0]] = self.stacks.get(frame[0], 0) + own
+            for stat in stats:
+                stat.active -= 1
+                stat.own += own
+                if not stat.active:
+                    stat.total += elapsed
+
+    def sentence(self, statement, lineno):
+        # statement of the closure engine measured as its line
+        if not self.per_line:
+            return statement
+        stats = (self.stat(self.lines, lineno),)
+        label = f"line {lineno}"
+        measure = self.measure
+        return lambda: measure(label, stats, statement)
+
+    def check(self, engine):
+        if self.per_line and engine not in self.line_engines:
+            raise ValueError(f"Engine '{engine}' does not report lines to profiler, use one of "
+                             f"{self.line_engines} or TAProfiler(lines=False)")
+        if self.per_procedure and engine not in self.procedure_engines:
+            raise ValueError(f"Engine '{engine}' does not report procedure calls to profiler, use one of "
+                             f"{self.procedure_engines} or TAProfiler(procedures=False)")
+
+    @contextlib.contextmanager
+    def attach(self, interpreter):
+        self.check(interpreter.engine)
+        profiler = self
+        measure = self.measure
+        handle_node = interpreter.handleNode
+        handle_sentence = interpreter.handleSentence
+        call_proc = interpreter.call_proc
+        convert = type_converter_module.convert
+
+        def profiled_handle_node(node):
+            # raw tokens and None are leaves of other nodes and are measured with them
+            if node is None or isinstance(node, (int, str)):
+                return handle_node(node)
+            node_type = node.type
+            return measure(node_type, (profiler.stat(profiler.node_types, node_type),), handle_node, node)
+
+        def profiled_handle_sentence(node):
+            # a line is hit once per sentence run on it, not once per node of the sentence
+            lineno = node.lineno
+            if lineno < 0:
+                return handle_sentence(node)
+            return measure(f"line {lineno}", (profiler.stat(profiler.lines, lineno),), handle_sentence, node)
+
+        def profiled_call_proc(name, arg_names, run_body):
+            return measure(f"proc {name}", (profiler.stat(profiler.procedures, name),),
+                           call_proc, name, arg_names, run_body)
+
+        def profiled_convert(declared_type, value):
+            return measure("convert", (profiler.conversions,), convert, declared_type, value)
+
+        def profiled_action(action):
+            original = getattr(interpreter, action)
+            stats = (profiler.stat(profiler.actions, action),)
+            return lambda: measure(f"robot {action}", stats, original)
+
+        replaced = {"handleNode": profiled_handle_node, "handleSentence": profiled_handle_sentence,
+                    "call_proc": profiled_call_proc}
+        for action in ("step", "look", "right", "left", "back"):
+            replaced[action] = profiled_action(action)
+        interpreter.__dict__.update(replaced)
+        # engines look convert up in the module at every conversion, so the module is measured while the run lasts
+        type_converter_module.convert = profiled_convert
+        start = self.clock()
+        try:
+            yield self
+        finally:
+            elapsed = self.clock() - start
+            type_converter_module.convert = convert
+            for name in replaced:
+                del interpreter.__dict__[name]
+            root = self.frames[0]
+            self.stacks["main"] = self.stacks.get("main", 0) + elapsed - root[3]
+            root[3] = 0
+
+    ###################################
+    # reports
+
+    def as_dict(self):
+        return {
+            # the closure engine makes stats of lines when it compiles them, lines never run are left out
+            "lines": {str(lineno): stat.as_dict() for lineno, stat in sorted(self.lines.items()) if stat.hits},
+            "node_types": {name: stat.as_dict() for name, stat in sorted(self.node_types.items())},
+            "procedures": {name: stat.as_dict() for name, stat in sorted(self.procedures.items())},
+            "actions": {name: stat.as_dict() for name, stat in sorted(self.actions.items())},
+            "conversions": self.conversions.as_dict(),
+        }
+
+    def write_json(self, file):
+        json.dump(self.as_dict(), file, indent=2)
+        file.write("\n")
+
+    def write_collapsed(self, file):
+        # "stack own_ns" per line, input of flamegraph.pl and speedscope
+        for stack, own in sorted(self.stacks.items()):
+            if own > 0:
+                file.write(f"{stack} {own}\n")
+
+    def summary(self, source=None, limit=10):
+        lines = source.splitlines() if source is not None else []
+        rows = [f"{'line':>6} {'hits':>10} {'total ms':>10} {'own ms':>10}"]
+        hottest = sorted(((lineno, stat) for lineno, stat in self.lines.items() if stat.hits),
+                         key=lambda item: item[1].own, reverse=True)[:limit]
+        for lineno, stat in hottest:
+            text = lines[lineno - 1].strip() if 0 < lineno <= len(lines) else ""
+            rows.append(f"{lineno:>6} {stat.hits:>10} {stat.total / 1e6:>10.3f} {stat.own / 1e6:>10.3f}  {text}")
+        for title, table in (("node type", self.node_types), ("procedure", self.procedures),
+                             ("action", self.actions), ("conversion", {"convert": self.conversions})):
+            for name, stat in sorted(table.items(), key=lambda item: item[1].own, reverse=True):
+                if stat.hits:
+                    rows.append(f"{title:>10} {name:<16} {stat.hits:>10} {stat.total / 1e6:>10.3f} "
+                                f"{stat.own / 1e6:>10.3f}")
+        return "\n".join(rows)
+
+
+if __name__ == '__main__':
+    # python TAProfiler.py <program> [--maze M] [--engine E] [--json F] [--collapsed F]
+    from Robot.TAMaze import Maze
+    from Robot.TARobot import SimulatedRobot
+    from TAInterpreter import TAInterpreter
+
+    arguments = argparse.ArgumentParser(description="Profile robot program")
+    arguments.add_argument("program")
+    arguments.add_argument("--maze", default=None)
+    arguments.add_argument("--engine", default="tree", choices=TAInterpreter.engines)
+    arguments.add_argument("--json", default=None)
+    arguments.add_argument("--collapsed", default=None)
+    options = arguments.parse_args()
+    lines = options.engine in TAProfiler.line_engines
+    procedures = options.engine in TAProfiler.procedure_engines
+    with open(options.program, "r") as f:
+        source = f.read()
+
+    robot = SimulatedRobot(Maze.load(options.maze)) if options.maze else None
+    profiler = TAProfiler(lines=lines, procedures=procedures)
+    with contextlib.redirect_stdout(io.StringIO()):
+        TAInterpreter(engine=options.engine, profiler=profiler).start(source, robot)
+    print(profiler.summary(source))
+    if options.json:
+        with open(options.json, "w") as f:
+            profiler.write_json(f)
+    if options.collapsed:
+        with open(options.collapsed, "w") as f:
+            profiler.write_collapsed(f)
@@ -0,0 +1,521 @@
+# ------------------------------------------------------------
+# TAResolver.py
+#
+# closure engine with names resolved before execution: every variable of a procedure
+# gets fixed slot in flat frame list, so reads and writes are indexed loads
+# ------------------------------------------------------------
+from Parser.TAParser import NodeOfST, NodeType
+from ErrorHandler import *
+from TACompiler import TAClosureCompiler
+from TAMemo import arguments_key
+from TypeConverter import CONVERSIONS
+from Variable import Variable
+
+# outcome of value or declaration which raises whenever it runs
+FAILS = "fails"
+
+
+def value_outcome(node, binding):
+    """
+    Type of the value of expression node when computing it can not raise, FAILS when it always
+    raises and None when that is known only at runtime. binding(name) gives (type, certain) of
+    a declared name, certain when the name is always declared where it is read, or None.
+    """
+    if isinstance(node, int):
+        return "int"
+    if isinstance(node, str):
+        found = binding(node)
+        if found is None:
+            return FAILS
+        value_type, certain = found
+        return value_type if certain else None
+    if not isinstance(node, NodeOfST):
+        return None
+    match node.type:
+        case NodeType.Expression.value:
+            return value_outcome(node.children[0], binding)
+        case "logical" if isinstance(node.value, str):
+            return "boolean"
+        case "logical":
+            return value_outcome(node.value, binding)
+        case NodeType.INC.value | NodeType.DEC.value | "lt" | "gt":
+            operands = [value_outcome(child, binding) for child in node.children]
+            if FAILS in operands or "map" in operands:
+                return FAILS
+            if None in operands:
+                return None
+            return "int" if node.type in (NodeType.INC.value, NodeType.DEC.value) else "boolean"
+        case "robot":
+            return "int" if node.value.lower() == "look" else "boolean"
+    # logical operations take procedure calls, which are known only at runtime
+    return None
+
+
+def declaration_outcome(decl_type, value_node, binding):
+    # type the declaration stores when it can not fail (before the name is looked at), FAILS or None
+    value_type = value_outcome(value_node, binding)
+    if value_type is None or value_type is FAILS:
+        return value_type
+    return decl_type if CONVERSIONS.get((decl_type, value_type)) is not None else FAILS
+
+
+class Block:
+    # names declared in one block of procedure and slots they were bound to; certain names are
+    # declared whenever the code after their declaration runs, borrowed are (marker, slot) of names
+    # of enclosing blocks declared again in this one, marker is set when the declaration filled slot;
+    # sites are (name, marker) of declarations of the top level block in source order, marker of the
+    # declaration which bound the name is None
+    def __init__(self, first_slot):
+        self.names = dict()
+        self.types = dict()
+        self.certain = dict()
+        self.borrowed = []
+        self.sites = []
+        self.first_slot = first_slot
+        self.next_slot = first_slot
+
+
+class ResolvedProcedure:
+    def __init__(self, params, size, body, top_level):
+        self.params = params
+        self.size = size
+        self.body = body
+        self.top_level = top_level
+
+
+class TAResolvingCompiler(TAClosureCompiler):
+    """
+    Closure compiler which binds every variable reference to slot of procedure frame at compile time.
+    Blocks of if and while get slots after the slots of enclosing block and clear them on exit, so frame
+    is allocated once per call. Undeclared names and redeclarations of names which are always declared
+    are reported before execution, sentences containing them are aborted when executed. Declaration
+    which may fail leaves its name uncertain: declaring it again reuses the slot and raises
+    RedeclarationException at runtime when the slot is filled.
+    """
+
+    def __init__(self, interpreter):
+        super().__init__(interpreter)
+        self.frame = None
+        self.blocks = []
+        self.size = 0
+        self.sentence_node = None
+        self.to_bool = interpreter.condition
+
+    ###################################
+    # compile time
+
+    def compile_program(self):
+        for name, proc in self.interpreter.func_table.items():
+            params = list(proc.children["args"])
+            top_level = Block(0)
+            for param in params:
+                # main started by the program has no parameters declared
+                self.bind(top_level, param, certain=name != "main")
+            self.blocks = [top_level]
+            self.size = top_level.next_slot
+            body = self.compile_sentences(proc.children["body"])
+            self.procedures[name] = ResolvedProcedure(params, self.size, body, top_level)
+
+    def bind(self, block, name, static_type=None, certain=True):
+        # static_type is type of the declaration, parameters take type of caller variables
+        slot = self.new_slot(block)
+        block.names[name] = slot
+        block.types[name] = static_type
+        block.certain[name] = certain
+        return slot
+
+    def new_slot(self, block):
+        slot = block.next_slot
+        block.next_slot += 1
+        self.size = max(self.size, block.next_slot)
+        return slot
+
+    def find(self, name):
+        # block in which name is bound
+        for block in reversed(self.blocks):
+            if name in block.names:
+                return block
+        return None
+
+    def lookup(self, name):
+        block = self.find(name)
+        return block.names[name] if block is not None else None
+
+    def lookup_type(self, name):
+        block = self.find(name)
+        return block.types[name] if block is not None else None
+
+    def binding(self, name):
+        block = self.find(name)
+        return (block.types[name], block.certain[name]) if block is not None else None
+
+    def declaration_slot(self, name, decl_type, outcome):
+        """
+        (slot, checked, marker) of declaration of name: checked when slot may be filled already,
+        marker is the slot which tells that slot of enclosing block was filled by this block.
+        slot is None when the declaration never declares:
+        its value or conversion always fails, or the name is always declared already, which is
+        reported now. Declaration of uncertain name gets its slot back and checks it at runtime.
+        """
+        if outcome is FAILS:
+            return None, False, None
+        block = self.blocks[-1]
+        found = self.find(name)
+        if found is None:
+            if len(self.blocks) == 1:
+                block.sites.append((name, None))
+            return self.bind(block, name, decl_type, outcome is not None), False, None
+        if found.certain[name]:
+            self.static_error(RedeclarationException())
+            return None, False, None
+        slot = found.names[name]
+        if found.types[name] != decl_type:
+            found.types[name] = None
+        if found is block and len(self.blocks) > 1:
+            return slot, True, None
+        if found is block:
+            # top level keeps which declaration filled the slot, so names are shown in declaration order
+            marker = self.new_slot(block)
+            block.sites.append((name, marker))
+            return slot, True, marker
+        marker = self.new_slot(block)
+        block.borrowed.append((marker, slot))
+        return slot, True, marker
+
+    def static_error(self, exception):
+        self.interpreter.report_error(self.sentence_node, exception)
+
+    def compile_sentence(self, node):
+        outer_sentence = self.sentence_node
+        self.sentence_node = node
+        statement = self.compile_node(node)
+        self.sentence_node = outer_sentence
+        if self.interpreter.tracer is not None:
+            statement = self.interpreter.tracer.sentence(statement, node.lineno)
+        report_error = self.interpreter.report_error
+        errors = tuple(SENTENCE_ERRORS)
+        meter = self.interpreter.meter
+
+        def run():
+            try:
+                meter.ticks -= 1
+                if meter.ticks < 0:
+                    meter.checkpoint()
+                statement()
+            except ReportedException:
+                pass
+            except errors as e:
+                report_error(node, e)
+            except BudgetExhaustedException as e:
+                e.locate(node)
+                raise
+
+        return run
+
+    def compile_block(self, node, single_sentence=False):
+        parent = self.blocks[-1]
+        block = Block(parent.next_slot)
+        self.blocks.append(block)
+        body = self.compile_sentence(node) if single_sentence else self.compile_sentences(node)
+        self.blocks.pop()
+        if block.borrowed:
+            body = self.release_borrowed(body, tuple(block.borrowed))
+        return body, block.first_slot, block.next_slot
+
+    def release_borrowed(self, body, borrowed):
+        # names the block declared in slots of enclosing blocks are not visible after it
+        compiler = self
+
+        def run():
+            body()
+            frame = compiler.frame
+            for marker, slot in borrowed:
+                if frame[marker] is not None:
+                    frame[slot] = None
+
+        return run
+
+    ###################################
+    # variables
+
+    def compile_node(self, node):
+        if isinstance(node, str):
+            return self.compile_read(node)
+        if isinstance(node, NodeOfST) and node.type == NodeType.MAP.value:
+            if node.value == "":
+                return self.compile_map_declaration(node)
+            return self.compile_map_action(node)
+        return super().compile_node(node)
+
+    def compile_read(self, name):
+        slot = self.lookup(name)
+        if slot is None:
+            self.static_error(UndeclaredException())
+
+            def undeclared():
+                raise ReportedException
+
+            return undeclared
+
+        compiler = self
+
+        def read():
+            value = compiler.frame[slot]
+            if value is None:
+                raise UndeclaredException
+            return value
+
+        return read
+
+    def compile_declaration(self, node):
+        decl_type = node.value.value.lower()
+        name = node.children[0].value
+        value = self.compile_node(node.children[1])
+        outcome = declaration_outcome(decl_type, node.children[1], self.binding)
+        slot, checked, marker = self.declaration_slot(name, decl_type, outcome)
+        configure_declaration = self.interpreter.configure_declaration
+        compiler = self
+        if slot is None:
+            def never_declared():
+                configure_declaration(decl_type, value())
+                raise ReportedException
+
+            return never_declared
+
+        if not checked:
+            def declare():
+                compiler.frame[slot] = configure_declaration(decl_type, value())
+
+            return declare
+
+        def declare_checked():
+            new_value = configure_declaration(decl_type, value())
+            frame = compiler.frame
+            if frame[slot] is not None:
+                raise RedeclarationException
+            frame[slot] = new_value
+            if marker is not None:
+                frame[marker] = True
+
+        return declare_checked
+
+    def compile_map_declaration(self, node):
+        name = node.children[0].value
+        slot, checked, marker = self.declaration_slot(name, "map", "map")
+        if slot is None:
+            def redeclaration():
+                raise ReportedException
+
+            return redeclaration
+
+        compiler = self
+
+        def declare():
+            frame = compiler.frame
+            if frame[slot] is not None:
+                raise RedeclarationException
+            frame[slot] = Variable("map", dict())
+            if marker is not None:
+                frame[marker] = True
+
+        return declare
+
+    def compile_assignment(self, node):
+        slot = self.lookup(node.value)
+        if slot is None:
+            self.static_error(UndeclaredException())
+
+            def undeclared():
+                raise ReportedException
+
+            return undeclared
+
+        value = self.compile_node(node.children[0])
+        configure_variable = self.interpreter.configure_variable
+        compiler = self
+
+        def assign():
+            if compiler.frame[slot] is None:
+                raise UndeclaredException
+            new_value = value()
+            frame = compiler.frame
+            var = frame[slot]
+            if var.type in ("cint", "cboolean"):
+                raise ConstantAssignmentException
+            frame[slot] = configure_variable(var.type, new_value)
+
+        return assign
+
+    def compile_map_action(self, node):
+        # bar/emp/set/clr [result map x y]
+        slots = [self.lookup(name) for name in node.children]
+        if None in slots:
+            self.static_error(UndeclaredException())
+
+            def undeclared():
+                raise ReportedException
+
+            return undeclared
+
+        result_slot, map_slot, x_slot, y_slot = slots
+        action = node.value.lower()
+        interpreter = self.interpreter
+        compiler = self
+
+        def read(slot):
+            value = compiler.frame[slot]
+            if value is None:
+                raise UndeclaredException
+            return value
+
+        def map_action():
+            world = read(map_slot)
+            if world.type != "map":
+                raise TypeException
+            cell = (interpreter.configure_variable("int", read(x_slot)).value,
+                    interpreter.configure_variable("int", read(y_slot)).value)
+            match action:
+                case "bar" | "emp":
+                    result = read(result_slot)
+                    if result.type in ("cint", "cboolean"):
+                        raise ConstantAssignmentException
+                    found = world.value.get(cell) is (action == "bar")
+                    compiler.frame[result_slot] = interpreter.configure_variable(result.type,
+                                                                                 Variable("boolean", found))
+                case "set":
+                    world.value[cell] = interpreter.condition(read(result_slot))
+                case "clr":
+                    world.value.pop(cell, None)
+
+        return map_action
+
+    ###################################
+    # blocks
+
+    def compile_if_else(self, node):
+        condition = self.compile_node(node.children[0])
+        then_statement, then_first, then_last = self.compile_block(node.children[1])
+        if len(node.children) == 3:
+            else_statement, else_first, else_last = self.compile_block(node.children[2])
+        else:
+            else_statement, else_first, else_last = None, 0, 0
+        to_bool = self.to_bool
+        compiler = self
+        then_clear = [None] * (then_last - then_first)
+        else_clear = [None] * (else_last - else_first)
+
+        def run():
+            if to_bool(condition()):
+                then_statement()
+                if then_clear:
+                    compiler.frame[then_first:then_last] = then_clear
+            elif else_statement is not None:
+                else_statement()
+                if else_clear:
+                    compiler.frame[else_first:else_last] = else_clear
+
+        return run
+
+    def compile_while(self, node):
+        condition = self.compile_node(node.children[0])
+        body_node = node.children[1]
+        body, first, last = self.compile_block(body_node,
+                                               single_sentence=body_node.type != NodeType.SentenceList.value)
+        to_bool = self.to_bool
+        compiler = self
+        clear = [None] * (last - first)
+        loop_limit = self.interpreter.meter.loop_limit
+
+        def run():
+            counter = 0
+            while to_bool(condition()):
+                counter += 1
+                body()
+                if clear:
+                    compiler.frame[first:last] = clear
+                if counter > loop_limit:
+                    raise BudgetExhaustedException("loop iterations")
+
+        return run
+
+    ###################################
+    # procedures
+
+    def compile_proc_call(self, node):
+        name = node.value
+        arg_names = list(node.children[0].children)
+        arg_slots = [self.lookup(arg) for arg in arg_names]
+        undeclared_args = None in arg_slots
+        if undeclared_args:
+            self.static_error(UndeclaredException())
+        interpreter = self.interpreter
+        procedures = self.procedures
+        compiler = self
+        count = len(arg_slots)
+        cache = interpreter.memo.cache(name) if interpreter.memo is not None else None
+
+        def call():
+            # same checks and order as TAInterpreter.call_proc
+            if name not in interpreter.func_table:
+                raise UndeclaredFunctionException().locate(node)
+            proc = procedures[name]
+            if len(proc.params) != count:
+                raise MissingParameterException().locate(node)
+            if interpreter.recursion_depth[name] >= interpreter.meter.depth_limit:
+                raise RecursionException().locate(node)
+            if undeclared_args:
+                raise ReportedException
+            caller = compiler.frame
+            callee = [None] * proc.size
+            for i, slot in enumerate(arg_slots):
+                value = caller[slot]
+                if value is None:
+                    raise UndeclaredException
+                callee[i] = value
+            key = arguments_key(callee[:count]) if cache is not None else None
+            if key is not None:
+                result = cache.get(key)
+                if result is not None:
+                    for slot, value in zip(arg_slots, result):
+                        caller[slot] = value
+                    return list(result)
+                reported = interpreter.reported
+
+            interpreter.recursion_depth[name] += 1
+            compiler.frame = callee
+            try:
+                proc.body()
+            finally:
+                compiler.frame = caller
+                interpreter.recursion_depth[name] -= 1
+
+            result = callee[:count]
+            if key is not None:
+                interpreter.memo_store(cache, key, tuple(result), reported)
+            for slot, value in zip(arg_slots, result):
+                caller[slot] = value
+            return result
+
+        return call
+
+    ###################################
+    # run time
+
+    def run(self, name="main"):
+        self.compile_program()
+        proc = self.procedures[name]
+        self.frame = [None] * proc.size
+        proc.body()
+        # final values of main are shown the same way other engines show them
+        self.interpreter.declaration_table = [{var: self.frame[proc.top_level.names[var]]
+                                               for var in self.declaration_order(proc)}]
+
+    def declaration_order(self, proc):
+        # declared names of top level in the order the tree engine declares them: by the declaration
+        # which filled the slot, the one which set its marker or else the one which bound the name
+        filled = dict()
+        for position, (name, marker) in enumerate(proc.top_level.sites):
+            if marker is None or self.frame[marker]:
+                filled[name] = position
+        names = [name for name, slot in proc.top_level.names.items() if self.frame[slot] is not None]
+        return sorted(names, key=lambda name: filled.get(name, -1))
@@ -0,0 +1,304 @@
+# ------------------------------------------------------------
+# TASnapshot.py
+#
+# runs of the stack engine which stop after a chosen robot action: the state of the run
+# is taken into a snapshot which shares program, maze and values with it, and goes on
+# in the same or other mazes, restored in this process or in forked ones
+# ------------------------------------------------------------
+import contextlib
+import io
+import os
+import pickle
+import sys
+import time
+
+from ErrorHandler import *
+from Parser.TAOptimizer import TAOptimizer
+from Parser.TAParser import TAParser
+from Robot.TARobot import SimulatedRobot
+from TABatch import MazeResult
+from TABytecode import BytecodeProgram, TABytecodeCompiler
+from TAInterpreter import TAInterpreter, VariableList
+from TAStackMachine import Frame, TAStackMachine
+from Variable import Variable
+
+ROBOT_ACTIONS = ("step", "look", "right", "left", "back")
+
+
+###################################
+# values
+
+def copy_value(value, copies):
+    # maps are the only values changed in place, every state gets its own copy of them;
+    # copies keeps one map one map wherever the state refers to it
+    if value.__class__ is Variable:
+        if value.type != "map":
+            return value
+        copy = copies.get(id(value))
+        if copy is None:
+            copy = copies[id(value)] = Variable("map", dict(value.value))
+        return copy
+    if value.__class__ is list:
+        return [copy_value(item, copies) for item in value]
+    return value
+
+
+def copy_scope(scope, copies):
+    return {name: copy_value(value, copies) for name, value in scope.items()}
+
+
+def chain_names(variables):
+    # names declared by every open block of the chain, outermost block first
+    blocks = []
+    while variables is not None:
+        blocks.append(tuple(variables.variables))
+        variables = variables.pre
+    return tuple(reversed(blocks))
+
+
+def build_chain(blocks, scope):
+    variables = None
+    for names in blocks:
+        block = VariableList()
+        block.variables = {name: scope.get(name) for name in names}
+        if variables is not None:
+            block.pre = variables
+            variables.next = block
+        variables = block
+    return variables
+
+
+class Snapshot:
+    """
+    State of a paused TAExecution in tuples: scopes of the open calls, names of their open blocks,
+    frames of the machine with its operand stack, recursion depths, robot and budget meter.
+    Variables are replaced on assignment and never changed, so they are shared with the run;
+    maps are copied when the snapshot is taken and again on every restore. Program and maze
+    are not part of it, a snapshot is restored into an execution of the same program.
+    """
+    __slots__ = ("scopes", "chain", "frames", "stack", "recursion_depth", "robot", "meter",
+                 "exit_found", "reported")
+
+    def size(self):
+        # length of the state in bytes as it is sent to another process
+        return len(pickle.dumps(self, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+
+###################################
+# execution
+
+def compile_program(program, optimize=False):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        _, func_table, has_syntax_errors = TAParser.shared().parse(program)
+    if has_syntax_errors:
+        raise ValueError(f"Program has syntax errors:\n{output.getvalue()}")
+    if optimize:
+        func_table = TAOptimizer().optimize(func_table)
+    return TABytecodeCompiler().compile(func_table)
+
+
+class TAExecution:
+    """
+    Run of a program by the stack engine which can stop and go on. run(until) stops right after
+    the robot action at which until(execution) is true; snapshot() takes the state there and
+    restore(snapshot) puts it back. branch(maze) goes on from the same point as a new execution,
+    with the robot where it stands now in another maze of the same size; branches(mazes) finishes
+    one of them in every maze, fork=True does it in forked processes which take the state of this
+    one without copying it. program is source or BytecodeProgram, which branches share.
+    """
+
+    def __init__(self, program, robot, budget=None, memo=None, optimize=False):
+        if not isinstance(program, BytecodeProgram):
+            program = compile_program(program, optimize)
+        self.program = program
+        self.interpreter = TAInterpreter(engine="stack", budget=budget, memo=memo)
+        if not self.interpreter.prepare_compiled(program, robot):
+            raise ValueError("Program has no main procedure")
+        self.machine = TAStackMachine(self.interpreter, program)
+        self.machine.execute(program.procedures["main"])
+        self.finished = False
+
+    @property
+    def robot(self):
+        return self.interpreter.robot
+
+    def run(self, until=None):
+        # True when the program ended, False when it stopped at until
+        if self.finished:
+            return True
+        interpreter = self.interpreter
+        replaced = {action: self.paused(getattr(interpreter, action), until)
+                    for action in ROBOT_ACTIONS} if until is not None else dict()
+        interpreter.__dict__.update(replaced)
+        try:
+            self.finished = self.machine.resume()
+        except BudgetExhaustedException as e:
+            interpreter.report_exhausted(e)
+            self.finished = True
+        finally:
+            for action in replaced:
+                del interpreter.__dict__[action]
+        return self.finished
+
+    def paused(self, action, until):
+        def run():
+            result = action()
+            if until(self):
+                raise PausedException(result)
+            return result
+        return run
+
+    def variables(self):
+        return {name: var.value for name, var in self.interpreter.declaration_table[0].items()}
+
+    ###################################
+    # snapshots
+
+    def snapshot(self):
+        interpreter = self.interpreter
+        machine = self.machine
+        if self.finished:
+            raise ValueError("Finished execution has no state to take")
+        copies = dict()
+        snapshot = Snapshot()
+        snapshot.scopes = tuple(copy_scope(scope, copies) for scope in interpreter.declaration_table)
+        snapshot.chain = chain_names(interpreter.variables)
+        snapshot.frames = tuple((frame.proc.name, frame.pc, tuple(frame.loops), frame.base, frame.name,
+                                 frame.arg_names, chain_names(frame.variables),
+                                 tuple(frame.tail_names.items()) if frame.tail_names is not None else None,
+                                 copy_value(frame.returns, copies), frame.memo)
+                                for frame in machine.frames[:machine.depth + 1])
+        snapshot.stack = tuple(copy_value(value, copies) for value in machine.stack)
+        snapshot.recursion_depth = tuple(interpreter.recursion_depth.items())
+        snapshot.robot = interpreter.robot.state()
+        meter = interpreter.meter
+        remaining = meter.deadline - time.perf_counter() if meter.deadline is not None else None
+        snapshot.meter = (meter.ticks, meter.granted, meter.actions, remaining)
+        snapshot.exit_found = interpreter.exit_found
+        snapshot.reported = interpreter.reported
+        return snapshot
+
+    def restore(self, snapshot, robot=None):
+        # robot takes the place of the current one, it gets position and counters of the snapshot
+        interpreter = self.interpreter
+        machine = self.machine
+        copies = dict()
+        interpreter.declaration_table = [copy_scope(scope, copies) for scope in snapshot.scopes]
+        interpreter.visibility_scope = len(snapshot.scopes) - 1
+        interpreter.variables = build_chain(snapshot.chain, interpreter.declaration_table[-1]) or VariableList()
+        procedures = self.program.procedures
+        frames = machine.frames
+        for depth, state in enumerate(snapshot.frames):
+            if depth == len(frames):
+                frames.append(Frame())
+            frame = frames[depth]
+            (proc, frame.pc, loops, frame.base, frame.name, frame.arg_names, chain, tail_names,
+             returns, frame.memo) = state
+            frame.proc = procedures[proc]
+            frame.loops = list(loops)
+            frame.variables = build_chain(chain, interpreter.declaration_table[depth - 1]) if depth else None
+            frame.tail_names = dict(tail_names) if tail_names is not None else None
+            frame.returns = copy_value(returns, copies)
+        machine.depth = len(snapshot.frames) - 1
+        machine.stack = [copy_value(value, copies) for value in snapshot.stack]
+        interpreter.recursion_depth = dict(snapshot.recursion_depth)
+        if robot is not None:
+            interpreter.robot = robot
+        interpreter.robot.restore(snapshot.robot)
+        meter = interpreter.meter
+        meter.ticks, meter.granted, meter.actions, remaining = snapshot.meter
+        meter.deadline = time.perf_counter() + remaining if remaining is not None else None
+        interpreter.exit_found = snapshot.exit_found
+        interpreter.reported = snapshot.reported
+        self.finished = False
+
+    ###################################
+    # branches
+
+    def robot_in(self, maze):
+        # robot of maze which stands where the robot of this execution stands
+        robot = self.interpreter.robot
+        if maze is None:
+            maze = robot.maze
+        if (maze.width, maze.height) != (robot.maze.width, robot.maze.height):
+            raise ValueError(f"Maze of size {maze.width}x{maze.height} can not continue run in "
+                             f"{robot.maze.width}x{robot.maze.height}")
+        return SimulatedRobot(maze, start=(robot.x, robot.y), heading=robot.heading)
+
+    def branch(self, maze=None, snapshot=None):
+        # new execution which goes on from snapshot, the current state by default, in maze
+        if snapshot is None:
+            snapshot = self.snapshot()
+        interpreter = self.interpreter
+        branch = TAExecution(self.program, self.robot_in(maze), interpreter.budget, interpreter.memo)
+        branch.restore(snapshot)
+        return branch
+
+    def finish(self, index=None):
+        # runs to the end, MazeResult of the rest of the run
+        robot = self.interpreter.robot
+        result = MazeResult(index, index)
+        errors = io.StringIO()
+        begin = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(errors):
+            try:
+                self.run()
+                if self.interpreter.exhausted is None:
+                    result.variables = self.variables()
+            except Exception as e:
+                sys.stderr.write(f"[ERROR]: {type(e).__name__}: {e}\n")
+        result.elapsed = time.perf_counter() - begin
+        result.exit_found = self.interpreter.exit_found
+        result.steps = robot.steps
+        result.actions = robot.actions
+        result.position = robot.position()
+        result.errors = [line for line in errors.getvalue().splitlines() if line]
+        return result
+
+    def branches(self, mazes, fork=False):
+        # MazeResult of the rest of the run in every maze, this execution stays where it is
+        if not fork:
+            snapshot = self.snapshot()
+            return [self.branch(maze, snapshot).finish(index) for index, maze in enumerate(mazes)]
+        if not hasattr(os, "fork"):
+            raise OSError("os.fork is not available on this platform")
+        robots = [self.robot_in(maze) for maze in mazes]
+        children = []
+        for index, robot in enumerate(robots):
+            read, write = os.pipe()
+            sys.stdout.flush()
+            sys.stderr.flush()
+            pid = os.fork()
+            if pid == 0:
+                # child goes on from the state it was forked with, only the robot is replaced
+                os.close(read)
+                try:
+                    robot.restore(self.interpreter.robot.state())
+                    self.interpreter.robot = robot
+                    data = pickle.dumps(self.finish(index), protocol=pickle.HIGHEST_PROTOCOL)
+                    with os.fdopen(write, "wb") as output:
+                        output.write(data)
+                finally:
+                    os._exit(0)
+            os.close(write)
+            children.append((pid, read))
+        results = []
+        for index, (pid, read) in enumerate(children):
+            with os.fdopen(read, "rb") as data:
+                data = data.read()
+            os.waitpid(pid, 0)
+            if data:
+                results.append(pickle.loads(data))
+            else:
+                result = MazeResult(index, index)
+                result.errors = ["[ERROR]: forked run ended without result"]
+                results.append(result)
+        return results
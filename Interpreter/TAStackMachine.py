@@ -0,0 +1,358 @@
+# ------------------------------------------------------------
+# TAStackMachine.py
+#
+# bytecode machine which keeps procedure calls in its own stack of frames instead of
+# python recursion, calls in tail position take over the frame of their caller
+# ------------------------------------------------------------
+from ErrorHandler import *
+from TABytecode import call_node, next_instruction
+from TAInterpreter import VariableList
+from TAVirtualMachine import (PUSH_CONST, LOAD, DECLARE, DECLARE_MAP, CHECK_DECLARED, ASSIGN, INC, DEC, LT, GT,
+                              NOT, OR, POP, JUMP, JUMP_IF_FALSE, ENTER_BLOCK, LEAVE_BLOCK, LOOP_START, LOOP_TICK,
+                              CALL, CALL_RESULT, STEP, LOOK, RIGHT, LEFT, BACK, MAP_ACTION, SENTENCE,
+                              TAVirtualMachine)
+from Variable import Variable
+
+
+class Frame:
+    """
+    One active call. Code, pc and loop counters of the running frame are locals of execute, they are
+    stored here while the frame waits for its callee; the rest is what the return needs.
+    """
+    __slots__ = ("proc", "pc", "loops", "base", "name", "arg_names", "variables", "tail_names", "returns", "memo")
+
+    def __init__(self):
+        self.proc = None
+        self.pc = 0
+        self.loops = None
+        # height of the shared operand stack when the call started
+        self.base = 0
+        self.name = None
+        # caller variables which take final values of the parameters
+        self.arg_names = None
+        # block list of the caller, given back to interpreter on return
+        self.variables = None
+        # procedures whose frames were taken over by tail calls, with counts; their depth is released on return
+        self.tail_names = None
+        # values the caller gets, in terms of the parameters of the running procedure: index of
+        # the parameter or value fixed by a tail call; None is all parameters in their order
+        self.returns = None
+        # cache, key and count of reported errors when the call started, for calls whose result is cached
+        self.memo = None
+
+
+def call_sites(proc, strings):
+    # argument names of every CALL by its pc, and whether the call is in tail position: after it the
+    # procedure only drops the result, leaves blocks and ends
+    code = proc.code
+    calls = dict()
+    pc = 0
+    while pc < len(code):
+        after = next_instruction(code, pc)
+        if code[pc] == CALL:
+            calls[pc] = (tuple(strings[index] for index in code[pc + 4:after]), ends_after(code, after))
+        pc = after
+    return calls
+
+
+def ends_after(code, pc):
+    jumps = set()
+    while pc < len(code):
+        op = code[pc]
+        if op == POP or op == LEAVE_BLOCK:
+            pc += 1
+        elif op == JUMP and pc not in jumps:
+            jumps.add(pc)
+            pc = code[pc + 1]
+        else:
+            return False
+    return True
+
+
+class TAStackMachine(TAVirtualMachine):
+    """
+    TAVirtualMachine without recursion: CALL stores the caller into its Frame and goes on with the code
+    of the callee in the same loop, end of the code returns to the frame below. Frames are made once and
+    reused, they share one operand stack; a call also takes the scope dict and block list of interpreter.
+    Call in tail position takes over the frame of the caller, the values it has to give back are
+    composed into the frame, so tail recursion runs in constant memory; a cached call keeps its cache
+    entry in the frame and the callee which takes it over is not stored. Calls taken over still count in
+    recursion depth of the budget, deep recursion needs ExecutionBudget(recursion_depth=...) raised.
+    """
+
+    def __init__(self, interpreter, program, frames=64):
+        super().__init__(interpreter, program)
+        self.frames = [Frame() for _ in range(frames)]
+        self.calls = {name: call_sites(proc, program.strings) for name, proc in program.procedures.items()}
+
+    def run(self, name="main"):
+        self.execute(self.program.procedures[name])
+        return self.resume()
+
+    def execute(self, proc):
+        # machine before the first instruction of proc, resume runs it
+        frame = self.frames[0]
+        frame.proc = proc
+        frame.pc = 0
+        frame.loops = [0] * proc.loops
+        frame.base = 0
+        self.stack = []
+        self.depth = 0
+
+    def resume(self):
+        # runs from the stored frame until the program ends, True, or until a robot action
+        # raises PausedException, False; the frame is then stored to go on after the action
+        interpreter = self.interpreter
+        meter = interpreter.meter
+        loop_limit = meter.loop_limit
+        declaration_table = interpreter.declaration_table
+        recursion_depth = interpreter.recursion_depth
+        memo = interpreter.memo
+        tracer = interpreter.tracer
+        robot_lines = self.robot_lines
+        procedures = self.program.procedures
+        strings = self.strings
+        constants = self.constants
+        frames = self.frames
+        sites = self.calls
+        stack = self.stack
+        push = stack.append
+        pop = stack.pop
+        depth = self.depth
+        frame = frames[depth]
+        proc = frame.proc
+        code = proc.code
+        end = len(code)
+        loops = frame.loops
+        calls = sites[proc.name]
+        pc = frame.pc
+        while True:
+            try:
+                while pc < end:
+                    op = code[pc]
+                    if op == LOAD:
+                        push(interpreter.extract_variable_value(strings[code[pc + 1]]))
+                        pc += 2
+                    elif op == PUSH_CONST:
+                        push(constants[code[pc + 1]])
+                        pc += 2
+                    elif op == JUMP_IF_FALSE:
+                        if interpreter.condition(pop()):
+                            pc += 2
+                        else:
+                            pc = code[pc + 1]
+                    elif op == JUMP:
+                        pc = code[pc + 1]
+                    elif op == SENTENCE:
+                        meter.ticks -= 1
+                        if meter.ticks < 0:
+                            meter.checkpoint()
+                        pc += 1
+                    elif op == INC:
+                        right = pop()
+                        push(interpreter.inc(pop(), right))
+                        pc += 1
+                    elif op == DEC:
+                        right = pop()
+                        push(interpreter.dec(pop(), right))
+                        pc += 1
+                    elif op == LT:
+                        right = pop()
+                        push(interpreter.lt(pop(), right))
+                        pc += 1
+                    elif op == GT:
+                        right = pop()
+                        push(interpreter.gt(pop(), right))
+                        pc += 1
+                    elif op == NOT:
+                        push(interpreter.logical_not(pop()))
+                        pc += 1
+                    elif op == OR:
+                        right = pop()
+                        push(interpreter.logical_or(pop(), right))
+                        pc += 1
+                    elif op == CHECK_DECLARED:
+                        if strings[code[pc + 1]] not in declaration_table[interpreter.visibility_scope]:
+                            raise UndeclaredException
+                        pc += 2
+                    elif op == ASSIGN:
+                        interpreter.assign(strings[code[pc + 1]], pop())
+                        pc += 2
+                    elif op == ENTER_BLOCK:
+                        interpreter.createNewEnv()
+                        pc += 1
+                    elif op == LEAVE_BLOCK:
+                        interpreter.returnEnv()
+                        pc += 1
+                    elif op == LOOP_TICK:
+                        slot = code[pc + 1]
+                        loops[slot] += 1
+                        if loops[slot] > loop_limit:
+                            raise BudgetExhaustedException("loop iterations")
+                        pc += 2
+                    elif op == LOOP_START:
+                        loops[code[pc + 1]] = 0
+                        pc += 2
+                    elif op == POP:
+                        pop()
+                        pc += 1
+                    elif op == STEP:
+                        if tracer is not None:
+                            tracer.line = robot_lines[proc.name][pc]
+                        push(Variable("boolean", interpreter.step()))
+                        pc += 1
+                    elif op == LOOK:
+                        if tracer is not None:
+                            tracer.line = robot_lines[proc.name][pc]
+                        push(Variable("int", interpreter.look()))
+                        pc += 1
+                    elif op == RIGHT or op == LEFT or op == BACK:
+                        if tracer is not None:
+                            tracer.line = robot_lines[proc.name][pc]
+                        if op == RIGHT:
+                            interpreter.right()
+                        elif op == LEFT:
+                            interpreter.left()
+                        else:
+                            interpreter.back()
+                        push(Variable("boolean", True))
+                        pc += 1
+                    elif op == DECLARE:
+                        interpreter.add_to_declare_table(strings[code[pc + 1]], strings[code[pc + 2]], pop())
+                        pc += 3
+                    elif op == CALL:
+                        name = strings[code[pc + 1]]
+                        arg_names, tail = calls[pc]
+                        try:
+                            params, args = interpreter.proc_arguments(name, arg_names)
+                        except CallException as e:
+                            raise e.locate(call_node(name, code[pc + 2]))
+                        cache = None
+                        if memo is not None:
+                            cache, key = interpreter.memo_lookup(name, args)
+                            if cache is not None:
+                                result = cache.get(key)
+                                if result is not None:
+                                    push(interpreter.return_values(arg_names, list(result)))
+                                    pc += 4 + len(arg_names)
+                                    continue
+                        recursion_depth[name] += 1
+                        if depth and tail:
+                            self.take_over(frame, proc, name, arg_names)
+                            declaration_table[-1] = dict(zip(params, args))
+                        else:
+                            frame.proc = proc
+                            frame.pc = pc + 4 + len(arg_names)
+                            frame.loops = loops
+                            depth += 1
+                            if depth == len(frames):
+                                frames.append(Frame())
+                            frame = frames[depth]
+                            frame.base = len(stack)
+                            frame.name = name
+                            frame.arg_names = arg_names
+                            frame.variables = interpreter.variables
+                            frame.memo = (cache, key, interpreter.reported) if cache is not None else None
+                            declaration_table.append(dict(zip(params, args)))
+                            interpreter.visibility_scope += 1
+                        interpreter.variables = VariableList()
+                        proc = procedures[name]
+                        code = proc.code
+                        end = len(code)
+                        loops = [0] * proc.loops
+                        calls = sites[name]
+                        pc = 0
+                    elif op == CALL_RESULT:
+                        push(interpreter.proc_result("boolean", pop()))
+                        pc += 1
+                    elif op == DECLARE_MAP:
+                        interpreter.declare_map(strings[code[pc + 1]])
+                        pc += 2
+                    elif op == MAP_ACTION:
+                        interpreter.map_action(*(strings[index] for index in code[pc + 1:pc + 6]))
+                        pc += 6
+                    else:
+                        raise ValueError(f"Unknown opcode {op} at {pc}")
+                if not depth:
+                    return True
+                # end of the code returns to the frame below with final values of the parameters
+                result = self.leave(frame, proc)
+                if frame.memo is not None:
+                    interpreter.memo_store(frame.memo[0], frame.memo[1], tuple(result), frame.memo[2])
+                    frame.memo = None
+                caller_scope = declaration_table[-1]
+                for arg, value in zip(frame.arg_names, result):
+                    caller_scope[arg] = value
+                frame.arg_names = frame.returns = None
+                depth -= 1
+                frame = frames[depth]
+                push(result)
+                proc = frame.proc
+                code = proc.code
+                end = len(code)
+                loops = frame.loops
+                calls = sites[proc.name]
+                pc = frame.pc
+            except PausedException as e:
+                # the action is done, its result is pushed as the instruction would
+                op = code[pc]
+                if op == LOOK:
+                    push(Variable("int", e.result))
+                else:
+                    push(Variable("boolean", e.result if op == STEP else True))
+                frame.proc = proc
+                frame.pc = pc + 1
+                frame.loops = loops
+                self.depth = depth
+                return False
+            except tuple(SENTENCE_ERRORS) as e:
+                # same recovery as in tree walker: report error for the sentence and continue after it
+                sentence = proc.handler(pc)
+                interpreter.report_error(sentence.node(), e)
+                del stack[frame.base:]
+                pc = sentence.end
+            except BudgetExhaustedException as e:
+                e.locate(proc.handler(pc).node())
+                # the program ends, open calls give back what they took from interpreter
+                while depth:
+                    self.leave(frame, proc)
+                    depth -= 1
+                    frame = frames[depth]
+                    proc = frame.proc
+                raise
+
+    def take_over(self, frame, proc, name, arg_names):
+        # after the callee the caller would only return its parameters: each one is the final value of
+        # the last argument it is passed as, or stays as it is now
+        scope = self.interpreter.declaration_table[-1]
+        returns = []
+        for param in proc.params:
+            source = scope[param]
+            for i, arg in enumerate(arg_names):
+                if arg == param:
+                    source = i
+            returns.append(source)
+        if frame.returns is not None:
+            # values fixed are never ints, ints are indices of the parameters
+            returns = [returns[source] if type(source) is int else source for source in frame.returns]
+        frame.returns = returns
+        if frame.tail_names is None:
+            frame.tail_names = dict()
+        frame.tail_names[name] = frame.tail_names.get(name, 0) + 1
+
+    def leave(self, frame, proc):
+        # releases scope, block list and recursion depth of the call, returns what the caller gets
+        interpreter = self.interpreter
+        scope = interpreter.declaration_table.pop()
+        interpreter.visibility_scope -= 1
+        interpreter.variables = frame.variables
+        frame.variables = None
+        interpreter.recursion_depth[frame.name] -= 1
+        if frame.tail_names is not None:
+            for name, count in frame.tail_names.items():
+                interpreter.recursion_depth[name] -= count
+            frame.tail_names = None
+        values = [scope[param] for param in proc.params]
+        if frame.returns is None:
+            return values
+        return [values[source] if type(source) is int else source for source in frame.returns]
@@ -0,0 +1,423 @@
+# ------------------------------------------------------------
+# TATrace.py
+#
+# opt-in recording of robot actions into compact append-only binary traces: action,
+# result and source line of every action, with seek index, and replay of traces
+# into robot backends or visualizers without the interpreter
+# ------------------------------------------------------------
+import argparse
+import bisect
+import contextlib
+import struct
+import sys
+
+from Robot.TAMaze import DIRECTIONS
+
+MAGIC = b"TATR"
+INDEX_MAGIC = b"TAIX"
+FORMAT_VERSION = 1
+ACTIONS = ("step", "look", "right", "left", "back")
+STEP, LOOK, RIGHT, LEFT, BACK = range(len(ACTIONS))
+# records between two entries of seek index
+INDEX_INTERVAL = 4096
+# records are collected in memory and written in blocks of about this many bytes
+BUFFER_BYTES = 1 << 16
+
+# binary format, little-endian:
+# header:   magic "TATR", format version (H), start x, start y (I I), start heading (B)
+# records:  tag (B): action in bits 0-2, step moved robot in bit 3, line differs from the previous record in bit 4;
+#           line - previous line as zigzag varint when bit 4 is set, distance as varint for look
+# index:    written when the trace is finished: count (I), then entries of CHECKPOINT
+# trailer:  magic "TAIX", index offset, records count (Q Q)
+# trace of a run which never finished has no index and trailer, reader rebuilds the index from records
+HEADER = struct.Struct("<4sHIIB")
+CHECKPOINT = struct.Struct("<QQiIIBQ")
+TRAILER = struct.Struct("<4sQQ")
+
+MOVED = 0x08
+NEW_LINE = 0x10
+
+
+class TraceFormatError(Exception):
+    pass
+
+
+class TraceMismatch(Exception):
+    # robot backend gave another result than the recorded one
+    def __init__(self, event, result):
+        super().__init__(f"Record {event.index} ({event.action} at line {event.line}): "
+                         f"trace has {event.result}, robot gave {result}")
+        self.event = event
+        self.result = result
+
+
+def write_varint(out, value):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def zigzag(value):
+    return value << 1 if value >= 0 else ((-value) << 1) - 1
+
+
+def unzigzag(value):
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+class TraceState:
+    """Robot as the trace tells it before record index: position, heading, successful steps, last line"""
+    __slots__ = ("index", "offset", "line", "x", "y", "heading", "steps")
+
+    def __init__(self, index, offset, line, x, y, heading, steps):
+        self.index = index
+        # file offset of the record
+        self.offset = offset
+        self.line = line
+        self.x = x
+        self.y = y
+        self.heading = heading
+        self.steps = steps
+
+    def copy(self):
+        return TraceState(self.index, self.offset, self.line, self.x, self.y, self.heading, self.steps)
+
+    def advance(self, action, result):
+        if action == STEP:
+            if result:
+                dx, dy = DIRECTIONS[self.heading]
+                self.x += dx
+                self.y += dy
+                self.steps += 1
+        elif action == RIGHT:
+            self.heading = (self.heading + 1) & 3
+        elif action == LEFT:
+            self.heading = (self.heading - 1) & 3
+        elif action == BACK:
+            self.heading = (self.heading + 2) & 3
+        self.index += 1
+
+    def position(self):
+        return self.x, self.y, self.heading
+
+    def __repr__(self):
+        return (f"TraceState(index={self.index}, line={self.line}, x={self.x}, y={self.y}, "
+                f"heading={self.heading}, steps={self.steps})")
+
+
+class TraceEvent:
+    """One recorded action: result is bool for step, distance for look, None for turns; x, y, heading after it"""
+    __slots__ = ("index", "action", "result", "line", "x", "y", "heading")
+
+    def __init__(self, index, action, result, line, x, y, heading):
+        self.index = index
+        self.action = action
+        self.result = result
+        self.line = line
+        self.x = x
+        self.y = y
+        self.heading = heading
+
+    def __repr__(self):
+        return (f"TraceEvent({self.index}, {self.action}, result={self.result}, line={self.line}, "
+                f"at=({self.x}, {self.y}), heading={self.heading})")
+
+
+###################################
+# recording
+
+class TATracer:
+    """
+    TAInterpreter(tracer=TATracer(path)) records every robot action of the run: attach replaces robot
+    actions of that one interpreter by recording wrappers for the run, engines keep the line of the
+    running sentence in line while a tracer is attached. file is a path or a binary file object,
+    the trace is finished with its seek index when the run ends; one tracer records one run.
+    Records are usually one byte, two when the line changes, one more for distance of look.
+    """
+
+    def __init__(self, file, index_interval=INDEX_INTERVAL, buffer_bytes=BUFFER_BYTES):
+        self.file = file
+        self.index_interval = index_interval
+        self.buffer_bytes = buffer_bytes
+        # line of the sentence which is running, set by engines
+        self.line = -1
+        self.records = 0
+        self.index = []
+        self.finished = False
+
+    def sentence(self, statement, lineno):
+        # statement of compiled engines which keeps line of its sentence while it runs
+        tracer = self
+
+        def run():
+            outer = tracer.line
+            tracer.line = lineno
+            try:
+                statement()
+            finally:
+                tracer.line = outer
+
+        return run
+
+    @contextlib.contextmanager
+    def attach(self, interpreter):
+        if self.finished:
+            raise ValueError("Tracer has already recorded a run")
+        owned = not hasattr(self.file, "write")
+        out = open(self.file, "wb") if owned else self.file
+        robot = interpreter.robot
+        x, y, heading = robot.position() if hasattr(robot, "position") else (0, 0, 0)
+        out.write(HEADER.pack(MAGIC, FORMAT_VERSION, x, y, heading))
+        tracer = self
+        buffer = bytearray()
+        # bytes written to out before buffer
+        written = HEADER.size
+        state = TraceState(0, written, 0, x, y, heading, 0)
+        interval = self.index_interval
+        limit = self.buffer_bytes
+
+        def record(action, tag, distance=None):
+            nonlocal written
+            if not state.index % interval:
+                state.offset = written + len(buffer)
+                tracer.index.append(state.copy())
+            line = tracer.line
+            if line != state.line:
+                buffer.append(tag | NEW_LINE)
+                write_varint(buffer, zigzag(line - state.line))
+                state.line = line
+            else:
+                buffer.append(tag)
+            if distance is not None:
+                write_varint(buffer, distance)
+            state.advance(action, tag & MOVED)
+            if len(buffer) >= limit:
+                out.write(buffer)
+                written += len(buffer)
+                buffer.clear()
+
+        def recorded(action):
+            original = getattr(interpreter, action)
+            code = ACTIONS.index(action)
+            if code == STEP:
+                def run():
+                    result = original()
+                    record(STEP, STEP | MOVED if result else STEP)
+                    return result
+            elif code == LOOK:
+                def run():
+                    result = original()
+                    record(LOOK, LOOK, int(result))
+                    return result
+            else:
+                def run():
+                    result = original()
+                    record(code, code)
+                    return result
+            return run
+
+        handle_sentence = interpreter.handleSentence
+
+        def traced_handle_sentence(node):
+            outer = tracer.line
+            tracer.line = node.lineno
+            try:
+                return handle_sentence(node)
+            finally:
+                tracer.line = outer
+
+        replaced = {action: recorded(action) for action in ACTIONS}
+        replaced["handleSentence"] = traced_handle_sentence
+        # wrappers of a profiler attached before are wrapped and put back after the run
+        previous = {name: interpreter.__dict__[name] for name in replaced if name in interpreter.__dict__}
+        interpreter.__dict__.update(replaced)
+        try:
+            yield self
+        finally:
+            for name in replaced:
+                del interpreter.__dict__[name]
+            interpreter.__dict__.update(previous)
+            out.write(buffer)
+            written += len(buffer)
+            self.records = state.index
+            index = bytearray(struct.pack("<I", len(self.index)))
+            for entry in self.index:
+                index += CHECKPOINT.pack(entry.index, entry.offset, entry.line, entry.x, entry.y, entry.heading,
+                                         entry.steps)
+            out.write(index)
+            out.write(TRAILER.pack(INDEX_MAGIC, written, self.records))
+            self.finished = True
+            if owned:
+                out.close()
+            else:
+                out.flush()
+
+
+###################################
+# reading
+
+class TraceReader:
+    """
+    Reads trace written by TATracer. len is the number of records, events(start, stop) decodes them
+    from the checkpoint of seek index nearest before start, state(index) is where the robot was
+    before record index. Traces without index are indexed while they are opened.
+    """
+
+    def __init__(self, source, index_interval=INDEX_INTERVAL):
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            data = bytes(source)
+        elif hasattr(source, "read"):
+            data = source.read()
+        else:
+            with open(source, "rb") as f:
+                data = f.read()
+        if len(data) < HEADER.size or data[:4] != MAGIC:
+            raise TraceFormatError("Not a robot trace")
+        magic, version, x, y, heading = HEADER.unpack_from(data, 0)
+        if version != FORMAT_VERSION:
+            raise TraceFormatError(f"Unsupported trace version {version}, expected {FORMAT_VERSION}")
+        self.data = data
+        self.start = TraceState(0, HEADER.size, 0, x, y, heading, 0)
+        self.end = len(data)
+        self.index = self.read_index()
+        if self.index is None:
+            self.index = self.build_index(index_interval)
+        if not self.index:
+            self.index = [self.start.copy()]
+        self.checkpoints = [entry.index for entry in self.index]
+
+    def read_index(self):
+        data = self.data
+        if len(data) < HEADER.size + TRAILER.size:
+            return None
+        magic, offset, records = TRAILER.unpack_from(data, len(data) - TRAILER.size)
+        if magic != INDEX_MAGIC or not HEADER.size <= offset <= len(data) - TRAILER.size - 4:
+            return None
+        count, = struct.unpack_from("<I", data, offset)
+        if offset + 4 + count * CHECKPOINT.size != len(data) - TRAILER.size:
+            return None
+        self.end = offset
+        self.records = records
+        return [TraceState(*CHECKPOINT.unpack_from(data, offset + 4 + i * CHECKPOINT.size)) for i in range(count)]
+
+    def build_index(self, interval):
+        index = []
+        state = self.start.copy()
+        for _ in self.decode(state):
+            if not state.index % interval:
+                index.append(state.copy())
+        self.records = state.index
+        return [self.start.copy()] + [entry for entry in index if entry.index < self.records]
+
+    def decode(self, state, stop=None):
+        # yields (action, result) of records from state, which is advanced past each of them
+        data = self.data
+        end = self.end
+        offset = state.offset
+        while offset < end and (stop is None or state.index < stop):
+            tag = data[offset]
+            offset += 1
+            if tag & NEW_LINE:
+                value = shift = 0
+                while True:
+                    byte = data[offset]
+                    offset += 1
+                    value |= (byte & 0x7F) << shift
+                    shift += 7
+                    if byte < 0x80:
+                        break
+                state.line += unzigzag(value)
+            action = tag & 0x07
+            if action >= len(ACTIONS):
+                raise TraceFormatError(f"Damaged trace record at offset {state.offset}")
+            if action == LOOK:
+                result = shift = 0
+                while True:
+                    byte = data[offset]
+                    offset += 1
+                    result |= (byte & 0x7F) << shift
+                    shift += 7
+                    if byte < 0x80:
+                        break
+            elif action == STEP:
+                result = bool(tag & MOVED)
+            else:
+                result = None
+            state.advance(action, result)
+            state.offset = offset
+            yield action, result
+
+    def __len__(self):
+        return self.records
+
+    def state(self, index):
+        if not 0 <= index <= self.records:
+            raise IndexError(f"Record {index} is out of trace of {self.records} records")
+        state = self.index[bisect.bisect_right(self.checkpoints, index) - 1].copy()
+        for _ in self.decode(state, index):
+            pass
+        return state
+
+    def events(self, start=0, stop=None):
+        stop = self.records if stop is None else min(stop, self.records)
+        state = self.state(start)
+        for action, result in self.decode(state, stop):
+            yield TraceEvent(state.index - 1, ACTIONS[action], result, state.line, state.x, state.y, state.heading)
+
+    def lines(self):
+        # records by source line
+        counts = dict()
+        state = self.start.copy()
+        for _ in self.decode(state):
+            counts[state.line] = counts.get(state.line, 0) + 1
+        return counts
+
+
+###################################
+# replay
+
+def replay(reader, robot=None, start=0, stop=None, check=True, on_event=None):
+    """
+    Drives robot by the actions of records start to stop and calls on_event(event) for each of them,
+    robot None only gives the events to on_event (visualizer). Robot is placed where the trace has it
+    before start, which needs x, y and heading of SimulatedRobot; check raises TraceMismatch when
+    robot gives another result than the recorded one. Returns the number of replayed records.
+    """
+    if robot is not None and start:
+        state = reader.state(start)
+        robot.x, robot.y, robot.heading = state.x, state.y, state.heading
+    count = 0
+    for event in reader.events(start, stop):
+        if robot is not None:
+            result = getattr(robot, event.action)()
+            if check and event.result is not None and result != event.result:
+                raise TraceMismatch(event, result)
+        if on_event is not None:
+            on_event(event)
+        count += 1
+    return count
+
+
+if __name__ == '__main__':
+    # python TATrace.py <trace> [--from N] [--count K] [--maze M]: prints records, with maze checks them against it
+    arguments = argparse.ArgumentParser(description="Print or replay robot trace")
+    arguments.add_argument("trace")
+    arguments.add_argument("--from", dest="start", type=int, default=0)
+    arguments.add_argument("--count", type=int, default=20)
+    arguments.add_argument("--maze", default=None)
+    options = arguments.parse_args()
+
+    reader = TraceReader(options.trace)
+    print(f"{len(reader)} records, {len(reader.index)} index entries, starts at {reader.start.position()}")
+    stop = options.start + options.count
+    robot = None
+    if options.maze:
+        from Robot.TAMaze import Maze
+        from Robot.TARobot import SimulatedRobot
+        robot = SimulatedRobot(Maze.load(options.maze))
+    try:
+        replay(reader, robot, options.start, stop, on_event=print)
+    except TraceMismatch as e:
+        print(f"[ERROR]: {e}")
+        sys.exit(1)
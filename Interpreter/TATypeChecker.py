@@ -0,0 +1,364 @@
+# ------------------------------------------------------------
+# TATypeChecker.py
+#
+# type checking before execution: types of expressions are inferred from declarations and
+# parameters from call sites, illegal declarations and assignments are reported with their
+# lines, and nodes get the exact conversion or operation their values need
+# ------------------------------------------------------------
+from Parser.TAParser import NodeOfST, NodeType, flatten_sentences
+from ErrorHandler import *
+from TAResolver import FAILS, declaration_outcome
+from TypeConverter import CONVERSIONS
+from Variable import Variable
+
+INT_TYPES = ("int", "cint")
+BOOLEAN_TYPES = ("boolean", "cboolean")
+CONSTANT_TYPES = ("cint", "cboolean")
+VALUE_TYPES = INT_TYPES + BOOLEAN_TYPES
+
+# type of parameter of procedure which no call has reached yet
+UNSET = "unset"
+
+
+###################################
+# operations on values of known types
+
+def rejected(*values):
+    # sentence whose error was reported before execution is aborted when its values are computed
+    raise ReportedException
+
+
+def truth(value):
+    return value.value
+
+
+def typed_inc(left, right):
+    # python bools are 0 and 1 in arithmetic and comparison, as converted booleans are
+    return Variable("int", left.value + right.value)
+
+
+def typed_dec(left, right):
+    return Variable("int", left.value - right.value)
+
+
+def typed_lt(left, right):
+    return Variable("boolean", left.value < right.value)
+
+
+def typed_gt(left, right):
+    return Variable("boolean", left.value > right.value)
+
+
+def typed_not(operand):
+    return Variable("boolean", not operand.value)
+
+
+def typed_or(left, right):
+    return Variable("boolean", left.value or right.value)
+
+
+ARITHMETIC = {NodeType.INC.value: (typed_inc, "int"), NodeType.DEC.value: (typed_dec, "int"),
+              "lt": (typed_lt, "boolean"), "gt": (typed_gt, "boolean")}
+
+
+def result_at(index):
+    # boolean result of procedure call in expression is the value of its argument at index
+    return lambda result: result[index]
+
+
+def join(known, found):
+    # types of one parameter met at two calls: the same type stays, different ones are unknown
+    if known is UNSET:
+        return found
+    if found is UNSET or found == known:
+        return known
+    return None
+
+
+class TypedProgram:
+    """
+    What TATypeChecker found for one func_table. annotations maps nodes to functions engines call
+    instead of deciding on type names at runtime:
+
+        declaration, assignment       value -> value converted to type of the variable
+        inc, dec, lt, gt, not, or     operands -> result
+        if, while                     condition value -> python bool
+        procedure call in expression  values of arguments after the call -> result
+
+    Nodes without annotation have types known only at runtime and keep dynamic checks.
+    Nodes whose error is certain get rejected, errors holds (sentence node, exception) of them.
+    """
+
+    def __init__(self):
+        self.annotations = dict()
+        self.errors = []
+        # inferred types of parameters by procedure, None where calls pass different types
+        self.param_types = dict()
+
+    def get(self, node, default=None):
+        return self.annotations.get(node, default)
+
+    def report(self, interpreter):
+        for node, error in self.errors:
+            interpreter.report_error(node, error)
+
+
+class TATypeChecker:
+    """
+    Every variable holds values of its declared type, so a name has one type in the block it is
+    declared in. Parameters take the types of the caller variables: a parameter gets a type when
+    all calls of the procedure pass variables of that type, inferred until nothing changes.
+    Redeclarations, assignments to constants and conversions which always fail are reported before
+    execution, once for the sentence whatever number of times it runs, also when it never runs.
+    """
+
+    def __init__(self, max_rounds=64):
+        self.max_rounds = max_rounds
+        self.program = None
+        self.param_types = dict()
+        self.func_table = dict()
+        self.found = dict()
+        self.called = set()
+        self.blocks = []
+        # names which may be unbound: parameters of main, unbound when main starts the program and bound
+        # when procedure calls it, and names of declarations which may fail
+        self.maybe = set()
+        self.sentence_node = None
+
+    def check(self, func_table):
+        self.param_types = {name: [UNSET] * len(proc.children["args"]) for name, proc in func_table.items()}
+        called = set()
+        for _ in range(self.max_rounds):
+            program = self.walk(func_table, called)
+            if self.found == self.param_types and self.called == called:
+                break
+            self.param_types = self.found
+            called = self.called
+        else:
+            # inference did not settle, every parameter is checked at runtime
+            self.param_types = {name: [None] * len(types) for name, types in self.param_types.items()}
+            program = self.walk(func_table, set(func_table))
+        program.param_types = {name: [None if param_type is UNSET else param_type for param_type in types]
+                               for name, types in self.param_types.items()}
+        return program
+
+    def walk(self, func_table, called):
+        self.program = TypedProgram()
+        self.found = {name: list(types) for name, types in self.param_types.items()}
+        self.called = set()
+        self.func_table = func_table
+        for name, proc in func_table.items():
+            params = proc.children["args"]
+            if name == "main":
+                top = {param: None for param in params} if "main" in called else dict()
+                self.maybe = set(top)
+            else:
+                top = dict(zip(params, self.param_types[name]))
+                self.maybe = set()
+            self.blocks = [top]
+            self.sentences(proc.children["body"])
+        return self.program
+
+    ###################################
+    # names
+
+    def bound(self, name):
+        return any(name in block for block in self.blocks)
+
+    def lookup(self, name):
+        for block in reversed(self.blocks):
+            if name in block:
+                return block[name]
+        return None
+
+    def type_of(self, name):
+        found = self.lookup(name)
+        return None if found is UNSET else found
+
+    def binding(self, name):
+        # names of uncertain declarations have no type, the rest are declared wherever they are bound
+        return (self.type_of(name), True) if self.bound(name) else None
+
+    def annotate(self, node, annotation):
+        self.program.annotations[node] = annotation
+
+    def error(self, node, exception):
+        self.program.errors.append((self.sentence_node, exception))
+        self.annotate(node, rejected)
+
+    ###################################
+    # sentences
+
+    def sentences(self, node):
+        for sentence in flatten_sentences(node):
+            outer_sentence = self.sentence_node
+            self.sentence_node = sentence
+            self.sentence(sentence)
+            self.sentence_node = outer_sentence
+
+    def block(self, node):
+        self.blocks.append(dict())
+        self.sentences(node)
+        self.blocks.pop()
+
+    def sentence(self, node):
+        if not isinstance(node, NodeOfST):
+            return
+        match node.type:
+            case NodeType.Declaration.value:
+                self.declaration(node)
+            case NodeType.MAP.value if node.value == "":
+                name = node.children[0].value
+                if name in self.maybe:
+                    self.blocks[-1][name] = None
+                elif self.bound(name):
+                    self.error(node, RedeclarationException())
+                else:
+                    self.blocks[-1][name] = "map"
+            case NodeType.Assignment.value:
+                self.assignment(node)
+            case NodeType.If.value:
+                self.condition(node)
+                self.block(node.children[1])
+                if len(node.children) == 3:
+                    self.block(node.children[2])
+            case NodeType.While.value:
+                self.condition(node)
+                self.block(node.children[1])
+            case NodeType.Proc.value | NodeType.MAP.value:
+                # nested procedures are checked by their own entry of func_table, map actions at runtime
+                pass
+            case NodeType.Proc_call.value:
+                self.call(node)
+            case _:
+                self.expression(node)
+
+    def declaration(self, node):
+        if len(node.children) != 2:
+            return
+        decl_type = node.value.value.lower()
+        name = node.children[0].value
+        value_type = self.expression(node.children[1])
+        if name in self.maybe:
+            self.blocks[-1][name] = None
+            return
+        # value is converted before the name is looked at, as add_to_declare_table does
+        convert = CONVERSIONS.get((decl_type, value_type)) if value_type is not None else None
+        outcome = declaration_outcome(decl_type, node.children[1], self.binding)
+        if value_type is not None and convert is None:
+            self.error(node, TypeException())
+        elif outcome is FAILS:
+            # value raises whenever it runs, the name is never looked at
+            pass
+        elif self.bound(name):
+            self.error(node, RedeclarationException())
+        else:
+            if convert is not None:
+                self.annotate(node, convert)
+            if outcome is None:
+                # declaration may fail, the name and its later declarations are checked at runtime
+                self.blocks[-1][name] = None
+                self.maybe.add(name)
+            elif outcome is not FAILS:
+                self.blocks[-1][name] = decl_type
+
+    def assignment(self, node):
+        value_type = self.expression(node.children[0])
+        target_type = self.type_of(node.value)
+        if target_type is None:
+            # undeclared name or parameter of unknown type
+            return
+        if target_type in CONSTANT_TYPES:
+            self.error(node, ConstantAssignmentException())
+        elif value_type is not None:
+            convert = CONVERSIONS.get((target_type, value_type))
+            if convert is None:
+                self.error(node, TypeException())
+            else:
+                self.annotate(node, convert)
+
+    def condition(self, node):
+        condition_type = self.expression(node.children[0])
+        if condition_type in BOOLEAN_TYPES:
+            self.annotate(node, truth)
+        elif condition_type is not None:
+            self.error(node, TypeException())
+
+    ###################################
+    # expressions: type of the value, None when known only at runtime
+
+    def expression(self, node):
+        if node is None:
+            return None
+        if isinstance(node, int):
+            return "int"
+        if isinstance(node, str):
+            return self.type_of(node)
+
+        match node.type:
+            case NodeType.Expression.value:
+                return self.expression(node.children[0])
+            case "logical" if isinstance(node.value, str):
+                return "boolean"
+            case "logical":
+                return self.expression(node.value)
+            case NodeType.INC.value | NodeType.DEC.value | "lt" | "gt":
+                operation, result_type = ARITHMETIC[node.type]
+                operand_types = (self.expression(node.children[0]), self.expression(node.children[1]))
+                if "map" in operand_types:
+                    self.error(node, TypeException())
+                elif all(operand_type in VALUE_TYPES for operand_type in operand_types):
+                    self.annotate(node, operation)
+                return result_type
+            case "not":
+                self.logical(node, typed_not, [node.children[0]])
+                return "boolean"
+            case "or":
+                self.logical(node, typed_or, node.children)
+                return "boolean"
+            case "robot":
+                return "int" if node.value.lower() == "look" else "boolean"
+            case NodeType.Proc_call.value:
+                return self.call_result(node)
+        return None
+
+    def logical(self, node, operation, operands):
+        operand_types = [self.call_result(operand) if operand.type == NodeType.Proc_call.value
+                         else self.expression(operand) for operand in operands]
+        if all(operand_type in BOOLEAN_TYPES for operand_type in operand_types):
+            self.annotate(node, operation)
+        elif any(operand_type is not None and operand_type not in BOOLEAN_TYPES for operand_type in operand_types):
+            self.error(node, TypeException())
+
+    ###################################
+    # procedures
+
+    def call(self, node):
+        # types of the arguments, None for the call which raises before the callee runs
+        name = node.value
+        arg_names = node.children[0].children
+        proc = self.func_table.get(name)
+        if proc is None or len(proc.children["args"]) != len(arg_names):
+            return None
+        if not all(self.bound(arg) for arg in arg_names):
+            return None
+        arg_types = [self.lookup(arg) for arg in arg_names]
+        self.called.add(name)
+        found = self.found[name]
+        for i, arg_type in enumerate(arg_types):
+            found[i] = join(found[i], arg_type)
+        return [None if arg_type is UNSET else arg_type for arg_type in arg_types]
+
+    def call_result(self, node):
+        # parameters come back with the types of the arguments, the first boolean one is the result
+        arg_types = self.call(node)
+        if arg_types is None:
+            return None
+        for i, arg_type in enumerate(arg_types):
+            if arg_type is None:
+                return None
+            if arg_type in BOOLEAN_TYPES:
+                self.annotate(node, result_at(i))
+                return arg_type
+        self.error(node, TypeException())
+        return None
@@ -0,0 +1,404 @@
+# ------------------------------------------------------------
+# TAUnboxed.py
+#
+# resolved closure engine where values are plain python ints, bools and dicts:
+# no Variable or TypeConverter is created while program runs
+# ------------------------------------------------------------
+import operator
+
+from Parser.TAParser import NodeOfST, NodeType
+from ErrorHandler import *
+from TAMemo import typed_arguments_key
+from TAResolver import TAResolvingCompiler, declaration_outcome
+from Variable import Variable
+
+INT_TYPES = ("int", "cint")
+BOOLEAN_TYPES = ("boolean", "cboolean")
+CONSTANT_TYPES = ("cint", "cboolean")
+
+
+def static_type(decl_type):
+    # type of values stored by declaration, None when it is known only at runtime
+    if decl_type in INT_TYPES:
+        return "int"
+    if decl_type in BOOLEAN_TYPES:
+        return "boolean"
+    return decl_type
+
+
+def to_int(value):
+    if value.__class__ is int:
+        return value
+    if value.__class__ is bool:
+        return 1 if value else 0
+    raise TypeException
+
+
+def to_bool(value):
+    if value.__class__ is bool:
+        return value
+    raise TypeException
+
+
+def configure(decl_type, value):
+    # same conversions TypeConverter does for Variable: boolean converts to int, nothing else converts
+    if decl_type in INT_TYPES:
+        return to_int(value)
+    if decl_type in BOOLEAN_TYPES:
+        return to_bool(value)
+    if value.__class__ is dict:
+        return value
+    raise TypeException
+
+
+class TAUnboxedCompiler(TAResolvingCompiler):
+    """
+    Frame slots hold native values and parallel list holds declared type of every slot.
+    Expressions are compiled together with their static type, so conversions are emitted
+    only where type is not known before execution (procedure parameters).
+    Variable objects are created only for the final declaration table.
+    """
+
+    def __init__(self, interpreter):
+        super().__init__(interpreter)
+        self.types = None
+        self.to_bool = to_bool
+
+    def compile_node(self, node):
+        if isinstance(node, NodeOfST):
+            match node.type:
+                case NodeType.Declaration.value:
+                    return self.compile_declaration(node)
+                case NodeType.Assignment.value:
+                    return self.compile_assignment(node)
+                case NodeType.If.value:
+                    return self.compile_if_else(node)
+                case NodeType.While.value:
+                    return self.compile_while(node)
+                case NodeType.Proc.value:
+                    return lambda: None
+                case NodeType.MAP.value if node.value == "":
+                    return self.compile_map_declaration(node)
+                case NodeType.MAP.value:
+                    return self.compile_map_action(node)
+        return self.compile_value(node)[0]
+
+    ###################################
+    # expressions: (closure, static type)
+
+    def compile_value(self, node):
+        if isinstance(node, int):
+            return (lambda: node), "int"
+        if isinstance(node, str):
+            return self.compile_read(node), static_type(self.lookup_type(node))
+
+        match node.type:
+            case NodeType.Expression.value:
+                return self.compile_value(node.children[0])
+            case "logical" if isinstance(node.value, str):
+                value = node.value.lower() == "true"
+                return (lambda: value), "boolean"
+            case "logical":
+                return self.compile_value(node.value)
+            case NodeType.INC.value:
+                return self.compile_arithmetic(node, operator.add), "int"
+            case NodeType.DEC.value:
+                return self.compile_arithmetic(node, operator.sub), "int"
+            case "lt":
+                return self.compile_arithmetic(node, operator.lt), "boolean"
+            case "gt":
+                return self.compile_arithmetic(node, operator.gt), "boolean"
+            case "not":
+                operand, operand_type = self.compile_logical_value(node.children[0])
+                if operand_type == "boolean":
+                    return (lambda: not operand()), "boolean"
+                return (lambda: not to_bool(operand())), "boolean"
+            case "or":
+                return self.compile_or(node), "boolean"
+            case NodeType.Proc_call.value:
+                return self.compile_proc_call(node), None
+            case "robot":
+                return self.compile_robot_action(node.value.lower()), \
+                    "int" if node.value.lower() == "look" else "boolean"
+
+        raise ValueError(f"Can not compile node of type '{node.type}'")
+
+    def compile_arithmetic(self, node, operation):
+        left, left_type = self.compile_value(node.children[0])
+        right, right_type = self.compile_value(node.children[1])
+        # python bools already behave as 0 and 1 in arithmetic and comparison
+        if left_type in ("int", "boolean") and right_type in ("int", "boolean"):
+            return lambda: operation(left(), right())
+
+        def run():
+            left_value = left()
+            right_value = right()
+            return operation(to_int(left_value), to_int(right_value))
+
+        return run
+
+    def compile_or(self, node):
+        left, left_type = self.compile_logical_value(node.children[0])
+        right, right_type = self.compile_logical_value(node.children[1])
+        # both operands are always evaluated, procedure calls in them have effects
+        if left_type == "boolean" and right_type == "boolean":
+            def run():
+                left_value = left()
+                right_value = right()
+                return left_value or right_value
+
+            return run
+
+        def run():
+            left_value = left()
+            right_value = right()
+            return to_bool(left_value) or to_bool(right_value)
+
+        return run
+
+    def compile_logical_value(self, node):
+        if node.type == NodeType.Proc_call.value:
+            call = self.compile_proc_call(node)
+
+            def result():
+                # first parameter of boolean type is the result of the call
+                values, types = call()
+                for value, value_type in zip(values, types):
+                    if value_type in BOOLEAN_TYPES:
+                        return value
+                raise TypeException
+
+            return result, "boolean"
+        return self.compile_value(node)
+
+    def compile_robot_action(self, action):
+        interpreter = self.interpreter
+        match action:
+            case "step":
+                step = interpreter.step
+                return lambda: bool(step())
+            case "look":
+                look = interpreter.look
+                return lambda: int(look())
+        turn = {"right": interpreter.right, "left": interpreter.left, "back": interpreter.back}[action]
+
+        def run():
+            turn()
+            return True
+
+        return run
+
+    ###################################
+    # variables
+
+    def compile_declaration(self, node):
+        decl_type = node.value.value.lower()
+        name = node.children[0].value
+        value, value_type = self.compile_value(node.children[1])
+        outcome = declaration_outcome(decl_type, node.children[1], self.binding)
+        slot, checked, marker = self.declaration_slot(name, decl_type, outcome)
+        compiler = self
+        if slot is None:
+            def never_declared():
+                configure(decl_type, value())
+                raise ReportedException
+
+            return never_declared
+
+        if checked:
+            def declare_checked():
+                new_value = configure(decl_type, value())
+                if compiler.frame[slot] is not None:
+                    raise RedeclarationException
+                compiler.frame[slot] = new_value
+                compiler.types[slot] = decl_type
+                if marker is not None:
+                    compiler.frame[marker] = True
+
+            return declare_checked
+
+        if value_type is not None and value_type == static_type(decl_type):
+            def declare():
+                compiler.frame[slot] = value()
+                compiler.types[slot] = decl_type
+        else:
+            def declare():
+                compiler.frame[slot] = configure(decl_type, value())
+                compiler.types[slot] = decl_type
+
+        return declare
+
+    def compile_map_declaration(self, node):
+        name = node.children[0].value
+        slot, checked, marker = self.declaration_slot(name, "map", "map")
+        if slot is None:
+            def redeclaration():
+                raise ReportedException
+
+            return redeclaration
+
+        compiler = self
+
+        def declare():
+            if compiler.frame[slot] is not None:
+                raise RedeclarationException
+            compiler.frame[slot] = dict()
+            compiler.types[slot] = "map"
+            if marker is not None:
+                compiler.frame[marker] = True
+
+        return declare
+
+    def compile_assignment(self, node):
+        slot = self.lookup(node.value)
+        if slot is None:
+            self.static_error(UndeclaredException())
+
+            def undeclared():
+                raise ReportedException
+
+            return undeclared
+
+        target_type = self.lookup_type(node.value)
+        value, value_type = self.compile_value(node.children[0])
+        compiler = self
+
+        # declared variable which is not constant and gets value of its own type needs no checks
+        if target_type in ("int", "boolean") and value_type == target_type:
+            def assign():
+                if compiler.frame[slot] is None:
+                    raise UndeclaredException
+                new_value = value()
+                compiler.frame[slot] = new_value
+
+            return assign
+
+        def assign():
+            if compiler.frame[slot] is None:
+                raise UndeclaredException
+            new_value = value()
+            decl_type = compiler.types[slot]
+            if decl_type in CONSTANT_TYPES:
+                raise ConstantAssignmentException
+            compiler.frame[slot] = configure(decl_type, new_value)
+
+        return assign
+
+    def compile_map_action(self, node):
+        # bar/emp/set/clr [result map x y]
+        slots = [self.lookup(name) for name in node.children]
+        if None in slots:
+            self.static_error(UndeclaredException())
+
+            def undeclared():
+                raise ReportedException
+
+            return undeclared
+
+        result_slot, map_slot, x_slot, y_slot = slots
+        action = node.value.lower()
+        compiler = self
+
+        def read(slot):
+            value = compiler.frame[slot]
+            if value is None:
+                raise UndeclaredException
+            return value
+
+        def map_action():
+            world = read(map_slot)
+            if world.__class__ is not dict:
+                raise TypeException
+            cell = (to_int(read(x_slot)), to_int(read(y_slot)))
+            match action:
+                case "bar" | "emp":
+                    read(result_slot)
+                    decl_type = compiler.types[result_slot]
+                    if decl_type in CONSTANT_TYPES:
+                        raise ConstantAssignmentException
+                    found = world.get(cell) is (action == "bar")
+                    compiler.frame[result_slot] = configure(decl_type, found)
+                case "set":
+                    world[cell] = to_bool(read(result_slot))
+                case "clr":
+                    world.pop(cell, None)
+
+        return map_action
+
+    ###################################
+    # procedures
+
+    def compile_proc_call(self, node):
+        name = node.value
+        arg_slots = [self.lookup(arg) for arg in node.children[0].children]
+        undeclared_args = None in arg_slots
+        if undeclared_args:
+            self.static_error(UndeclaredException())
+        interpreter = self.interpreter
+        procedures = self.procedures
+        compiler = self
+        count = len(arg_slots)
+        cache = interpreter.memo.cache(name) if interpreter.memo is not None else None
+
+        def call():
+            # same checks and order as TAInterpreter.call_proc
+            if name not in interpreter.func_table:
+                raise UndeclaredFunctionException().locate(node)
+            proc = procedures[name]
+            if len(proc.params) != count:
+                raise MissingParameterException().locate(node)
+            if interpreter.recursion_depth[name] >= interpreter.meter.depth_limit:
+                raise RecursionException().locate(node)
+            if undeclared_args:
+                raise ReportedException
+            caller = compiler.frame
+            caller_types = compiler.types
+            callee = [None] * proc.size
+            callee_types = [None] * proc.size
+            for i, slot in enumerate(arg_slots):
+                value = caller[slot]
+                if value is None:
+                    raise UndeclaredException
+                callee[i] = value
+                callee_types[i] = caller_types[slot]
+            key = typed_arguments_key(callee_types[:count], callee[:count]) if cache is not None else None
+            if key is not None:
+                result = cache.get(key)
+                if result is not None:
+                    values, types = result
+                    for slot, value in zip(arg_slots, values):
+                        caller[slot] = value
+                    return list(values), list(types)
+                reported = interpreter.reported
+
+            interpreter.recursion_depth[name] += 1
+            compiler.frame = callee
+            compiler.types = callee_types
+            try:
+                proc.body()
+            finally:
+                compiler.frame = caller
+                compiler.types = caller_types
+                interpreter.recursion_depth[name] -= 1
+
+            if key is not None:
+                interpreter.memo_store(cache, key, (tuple(callee[:count]), tuple(callee_types[:count])), reported)
+            for i, slot in enumerate(arg_slots):
+                caller[slot] = callee[i]
+            return callee[:count], callee_types[:count]
+
+        return call
+
+    ###################################
+    # run time
+
+    def run(self, name="main"):
+        self.compile_program()
+        proc = self.procedures[name]
+        self.frame = [None] * proc.size
+        self.types = [None] * proc.size
+        proc.body()
+        # values become Variable objects only here, for the final declaration table
+        names = proc.top_level.names
+        self.interpreter.declaration_table = [{var: Variable(self.types[names[var]], self.frame[names[var]])
+                                               for var in self.declaration_order(proc)}]
@@ -0,0 +1,200 @@
+# ------------------------------------------------------------
+# TAVirtualMachine.py
+#
+# stack machine running programs compiled by TABytecodeCompiler
+# ------------------------------------------------------------
+from ErrorHandler import *
+from TABytecode import OpCode, call_node, constant_values, robot_lines
+from Variable import Variable
+
+PUSH_CONST = OpCode.PUSH_CONST.value
+LOAD = OpCode.LOAD.value
+DECLARE = OpCode.DECLARE.value
+DECLARE_MAP = OpCode.DECLARE_MAP.value
+CHECK_DECLARED = OpCode.CHECK_DECLARED.value
+ASSIGN = OpCode.ASSIGN.value
+INC = OpCode.INC.value
+DEC = OpCode.DEC.value
+LT = OpCode.LT.value
+GT = OpCode.GT.value
+NOT = OpCode.NOT.value
+OR = OpCode.OR.value
+POP = OpCode.POP.value
+JUMP = OpCode.JUMP.value
+JUMP_IF_FALSE = OpCode.JUMP_IF_FALSE.value
+ENTER_BLOCK = OpCode.ENTER_BLOCK.value
+LEAVE_BLOCK = OpCode.LEAVE_BLOCK.value
+LOOP_START = OpCode.LOOP_START.value
+LOOP_TICK = OpCode.LOOP_TICK.value
+CALL = OpCode.CALL.value
+CALL_RESULT = OpCode.CALL_RESULT.value
+STEP = OpCode.STEP.value
+LOOK = OpCode.LOOK.value
+RIGHT = OpCode.RIGHT.value
+LEFT = OpCode.LEFT.value
+BACK = OpCode.BACK.value
+MAP_ACTION = OpCode.MAP_ACTION.value
+SENTENCE = OpCode.SENTENCE.value
+
+
+class TAVirtualMachine:
+    """
+    Executes bytecode with the runtime of TAInterpreter: declarations, scopes, procedure calls and robot
+    are shared with other engines, only the dispatch is replaced by a loop over integer opcodes.
+    """
+
+    def __init__(self, interpreter, program):
+        self.interpreter = interpreter
+        self.program = program
+        self.strings = program.strings
+        self.constants = constant_values(program)
+        # lines of robot instructions by procedure, only kept for tracer of interpreter
+        self.robot_lines = None
+        if interpreter.tracer is not None:
+            self.robot_lines = {name: robot_lines(proc) for name, proc in program.procedures.items()}
+
+    def run(self, name="main"):
+        self.execute(self.program.procedures[name])
+
+    def run_body(self, name):
+        return lambda body_node: self.execute(self.program.procedures[name])
+
+    def execute(self, proc):
+        interpreter = self.interpreter
+        meter = interpreter.meter
+        loop_limit = meter.loop_limit
+        tracer = interpreter.tracer
+        lines = self.robot_lines[proc.name] if tracer is not None else None
+        strings = self.strings
+        constants = self.constants
+        code = proc.code
+        end = len(code)
+        loops = [0] * proc.loops
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        pc = 0
+        while True:
+            try:
+                while pc < end:
+                    op = code[pc]
+                    if op == LOAD:
+                        push(interpreter.extract_variable_value(strings[code[pc + 1]]))
+                        pc += 2
+                    elif op == PUSH_CONST:
+                        push(constants[code[pc + 1]])
+                        pc += 2
+                    elif op == JUMP_IF_FALSE:
+                        if interpreter.condition(pop()):
+                            pc += 2
+                        else:
+                            pc = code[pc + 1]
+                    elif op == JUMP:
+                        pc = code[pc + 1]
+                    elif op == SENTENCE:
+                        meter.ticks -= 1
+                        if meter.ticks < 0:
+                            meter.checkpoint()
+                        pc += 1
+                    elif op == INC:
+                        right = pop()
+                        push(interpreter.inc(pop(), right))
+                        pc += 1
+                    elif op == DEC:
+                        right = pop()
+                        push(interpreter.dec(pop(), right))
+                        pc += 1
+                    elif op == LT:
+                        right = pop()
+                        push(interpreter.lt(pop(), right))
+                        pc += 1
+                    elif op == GT:
+                        right = pop()
+                        push(interpreter.gt(pop(), right))
+                        pc += 1
+                    elif op == NOT:
+                        push(interpreter.logical_not(pop()))
+                        pc += 1
+                    elif op == OR:
+                        right = pop()
+                        push(interpreter.logical_or(pop(), right))
+                        pc += 1
+                    elif op == CHECK_DECLARED:
+                        if strings[code[pc + 1]] not in interpreter.declaration_table[interpreter.visibility_scope]:
+                            raise UndeclaredException
+                        pc += 2
+                    elif op == ASSIGN:
+                        interpreter.assign(strings[code[pc + 1]], pop())
+                        pc += 2
+                    elif op == ENTER_BLOCK:
+                        interpreter.createNewEnv()
+                        pc += 1
+                    elif op == LEAVE_BLOCK:
+                        interpreter.returnEnv()
+                        pc += 1
+                    elif op == LOOP_TICK:
+                        slot = code[pc + 1]
+                        loops[slot] += 1
+                        if loops[slot] > loop_limit:
+                            raise BudgetExhaustedException("loop iterations")
+                        pc += 2
+                    elif op == LOOP_START:
+                        loops[code[pc + 1]] = 0
+                        pc += 2
+                    elif op == POP:
+                        pop()
+                        pc += 1
+                    elif op == STEP:
+                        if tracer is not None:
+                            tracer.line = lines[pc]
+                        push(Variable("boolean", interpreter.step()))
+                        pc += 1
+                    elif op == LOOK:
+                        if tracer is not None:
+                            tracer.line = lines[pc]
+                        push(Variable("int", interpreter.look()))
+                        pc += 1
+                    elif op == RIGHT or op == LEFT or op == BACK:
+                        if tracer is not None:
+                            tracer.line = lines[pc]
+                        if op == RIGHT:
+                            interpreter.right()
+                        elif op == LEFT:
+                            interpreter.left()
+                        else:
+                            interpreter.back()
+                        push(Variable("boolean", True))
+                        pc += 1
+                    elif op == DECLARE:
+                        interpreter.add_to_declare_table(strings[code[pc + 1]], strings[code[pc + 2]], pop())
+                        pc += 3
+                    elif op == CALL:
+                        name = strings[code[pc + 1]]
+                        count = code[pc + 3]
+                        arg_names = [strings[index] for index in code[pc + 4:pc + 4 + count]]
+                        try:
+                            push(interpreter.call_proc(name, arg_names, self.run_body(name)))
+                        except CallException as e:
+                            raise e.locate(call_node(name, code[pc + 2]))
+                        pc += 4 + count
+                    elif op == CALL_RESULT:
+                        push(interpreter.proc_result("boolean", pop()))
+                        pc += 1
+                    elif op == DECLARE_MAP:
+                        interpreter.declare_map(strings[code[pc + 1]])
+                        pc += 2
+                    elif op == MAP_ACTION:
+                        interpreter.map_action(*(strings[index] for index in code[pc + 1:pc + 6]))
+                        pc += 6
+                    else:
+                        raise ValueError(f"Unknown opcode {op} at {pc}")
+                return
+            except tuple(SENTENCE_ERRORS) as e:
+                # same recovery as in tree walker: report error for the sentence and continue after it
+                sentence = proc.handler(pc)
+                interpreter.report_error(sentence.node(), e)
+                stack.clear()
+                pc = sentence.end
+            except BudgetExhaustedException as e:
+                e.locate(proc.handler(pc).node())
+                raise
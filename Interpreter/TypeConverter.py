@@ -1,4 +1,34 @@
 from Variable import Variable
+from ErrorHandler import TypeException
+
+TYPES = ("int", "cint", "boolean", "cboolean", "map")
+
+
+def same(value):
+    return value
+
+
+def conversion(declared_type, value_type):
+    # function which stores value of value_type as declared_type, None when it does not convert
+    if declared_type == value_type:
+        return same
+    if declared_type in ("int", "cint") and value_type in ("boolean", "cboolean"):
+        return lambda value: Variable(declared_type, 1 if value.value else 0)
+    if value_type in declared_type or declared_type in value_type:
+        return lambda value: Variable(declared_type, value.value)
+    return None
+
+
+# every pair of types is decided once, conversion at runtime is one lookup
+CONVERSIONS = {(declared_type, value_type): conversion(declared_type, value_type)
+               for declared_type in TYPES for value_type in TYPES}
+
+
+def convert(declared_type, value):
+    convert_value = CONVERSIONS.get((declared_type, value.type))
+    if convert_value is None:
+        raise TypeException
+    return convert_value(value)
 
 
 class TypeConverter:
@@ -6,12 +36,7 @@ class TypeConverter:
         pass
 
     def convert_type(self, declared_type, value):
-        if declared_type == value.type:
-            return value
-        elif declared_type == "int" and value.type == "bool":
-            return self.convert_bool_to_int(value)
-        elif value.type in declared_type:
-            return Variable(declared_type, value.value)
+        return convert(declared_type, value)
 
     def convert_bool_to_int(self, value):
         if not value.value:
@@ -3,11 +3,146 @@
 #
 # tokenizer for language from task
 # ------------------------------------------------------------
-import ply.lex as lexer
+import importlib
+import os
+import re
+
+CHUNK_SIZE = 1 << 16
+
+
+def chunks_of(source, chunk_size=CHUNK_SIZE):
+    # file object or iterable of strings
+    if hasattr(source, "read"):
+        return iter(lambda: source.read(chunk_size), "")
+    return iter(source)
+
+
+def safe_cut(text):
+    # tokens contain line breaks only at their end (new lines, '...' continuations, comments), so text
+    # is lexed the same way in two parts when it is cut after line break followed by something else
+    end = len(text.rstrip("\n"))
+    return text.rfind("\n", 0, end) + 1
+
+
+class TokenStream:
+    # lexer interface TAParser.parse needs over generator of tokens
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.lineno = 1
+
+    def token(self):
+        token = next(self.tokens, None)
+        if token is not None:
+            self.lineno = token.lineno
+        return token
+
+
+class LexToken:
+    # token as ply.lex makes it, with the attributes ply parser sets on it during error recovery
+    __slots__ = ("type", "value", "lineno", "lexpos", "lexer", "endlineno", "endlexpos")
+
+    def __repr__(self):
+        return f"LexToken({self.type},{self.value!r},{self.lineno},{self.lexpos})"
+
+
+class FrozenLexer:
+    """
+    token() of ply.lex over master regex of shipped Lexer/lextab.py, without importing ply: ply imports
+    inspect, which is most of the start of a process. Rules are methods of TALexer named in the table,
+    they get tokens with lexer set to this object and may change lineno and lexpos or call skip.
+    """
+
+    def __init__(self, rules, lextab="Lexer.lextab"):
+        table = importlib.import_module(lextab)
+        self.master = [(re.compile(pattern, table._lexreflags),
+                        [entry if entry is None or entry[0] is None else (getattr(rules, entry[0]), entry[1])
+                         for entry in names])
+                       for pattern, names in table._lexstatere["INITIAL"]]
+        self.ignore = table._lexstateignore.get("INITIAL", "")
+        self.error = getattr(rules, table._lexstateerrorf["INITIAL"])
+        self.lexdata = None
+        self.lexpos = 0
+        self.lexlen = 0
+        self.lexmatch = None
+        self.lineno = 1
+
+    def input(self, data):
+        self.lexdata = data
+        self.lexpos = 0
+        self.lexlen = len(data)
+
+    def skip(self, n):
+        self.lexpos += n
+
+    def token(self):
+        lexpos = self.lexpos
+        lexdata = self.lexdata
+        while lexpos < self.lexlen:
+            if lexdata[lexpos] in self.ignore:
+                lexpos += 1
+                continue
+            for master, rules in self.master:
+                match = master.match(lexdata, lexpos)
+                if match:
+                    break
+            else:
+                # the error rule reports the character and skips it
+                tok = LexToken()
+                tok.type = "error"
+                tok.value = lexdata[lexpos:]
+                tok.lineno = self.lineno
+                tok.lexpos = lexpos
+                tok.lexer = self
+                self.lexpos = lexpos
+                new_token = self.error(tok)
+                if self.lexpos == lexpos:
+                    raise ValueError(f"Illegal character '{lexdata[lexpos]}' at index {lexpos}")
+                lexpos = self.lexpos
+                if new_token:
+                    return new_token
+                continue
+
+            tok = LexToken()
+            tok.value = match.group()
+            tok.lineno = self.lineno
+            tok.lexpos = lexpos
+            func, tok.type = rules[match.lastindex]
+            lexpos = match.end()
+            if func is None:
+                if tok.type:
+                    self.lexpos = lexpos
+                    return tok
+                continue
+            # rules which return nothing drop their text, as new lines after '...' and comments
+            tok.lexer = self
+            self.lexmatch = match
+            self.lexpos = lexpos
+            new_token = func(tok)
+            if new_token:
+                return new_token
+            lexpos = self.lexpos
+        self.lexpos = lexpos + 1
+        return None
+
 
 class TALexer(object):
-    def __init__(self):
-        self.lexer = lexer.lex(module=self)
+    shared_lexer = None
+
+    def __init__(self, frozen=False):
+        if frozen:
+            # rules are not validated again, master regex is read from shipped Lexer/lextab.py
+            self.lexer = FrozenLexer(self)
+        else:
+            # ply is imported only when some lexer is really built from its rules
+            import ply.lex as lexer
+            self.lexer = lexer.lex(module=self)
+
+    @classmethod
+    def shared(cls):
+        # one frozen lexer per process, every parse sets new input and line number
+        if cls.shared_lexer is None:
+            cls.shared_lexer = cls(frozen=True)
+        return cls.shared_lexer
 
     reserved = {
         "true": "TRUE", "false": "FALSE",
@@ -87,20 +222,47 @@ class TALexer(object):
     def input(self, data):
         return self.lexer.input(data)
 
+    def tokenize(self, text):
+        self.lexer.input(text)
+        while True:
+            token = self.lexer.token()
+            if token is None:
+                return
+            yield token
+
+    def tokenize_stream(self, source, chunk_size=CHUNK_SIZE):
+        # source is file object or iterable of chunks, only the unfinished tail of text is kept between chunks.
+        # Line numbers go on from lexer.lineno, positions of tokens count from the start of their part
+        tail = ""
+        for chunk in chunks_of(source, chunk_size):
+            tail += chunk
+            cut = safe_cut(tail)
+            if cut:
+                yield from self.tokenize(tail[:cut])
+                tail = tail[cut:]
+        if tail:
+            yield from self.tokenize(tail)
+
+    def stream(self, source, chunk_size=CHUNK_SIZE):
+        return TokenStream(self.tokenize_stream(source, chunk_size))
+
+    def token_array(self, source, chunk_size=CHUNK_SIZE):
+        # whole program as TATokenArray.TokenArray, source is string, file object or iterable of chunks.
+        # Illegal characters are reported here, before parser reports its errors
+        from Lexer.TATokenArray import TokenArray
+        self.lexer.lineno = 1
+        if isinstance(source, str):
+            return TokenArray().extend(self.tokenize(source))
+        return TokenArray().extend(self.tokenize_stream(source, chunk_size))
+
 
 if __name__ == '__main__':
     print("Test filename: ", end="")
     filename = input()
-    filepath = '/Users/MI/PycharmProjects/TARobot/Testing/test_interpreter_' + filename
+    testing = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Testing")
+    filepath = os.path.join(testing, 'test_interpreter_' + filename)
 
-    f = open(filepath, 'r+')
-    data = f.read()
-    f.close()
     lexer = TALexer()
-    lexer.input(data)
-    while True:
-        token = lexer.token()
-        if token is None:
-            break
-        else:
+    with open(filepath, 'r') as f:
+        for token in lexer.tokenize_stream(f):
             print(token)
\ No newline at end of file
@@ -0,0 +1,100 @@
+# ------------------------------------------------------------
+# TATokenArray.py
+#
+# compact storage of lexed program: token type ids, values and lines in
+# parallel arrays, read back by parser one short-lived token at a time
+# ------------------------------------------------------------
+from array import array
+
+from Lexer.TALexer import TALexer
+
+TOKEN_NAMES = list(TALexer.tokens)
+TOKEN_IDS = {name: token_id for token_id, name in enumerate(TOKEN_NAMES)}
+INT_DECIMAL = TOKEN_IDS["INT_DECIMAL"]
+
+
+class ArrayToken:
+    # attributes ply parser reads from tokens and sets on them during error recovery
+    __slots__ = ("type", "value", "lineno", "lexpos", "lexer", "endlineno", "endlexpos")
+
+    def __init__(self, token_type, value, lineno, lexpos):
+        self.type = token_type
+        self.value = value
+        self.lineno = lineno
+        self.lexpos = lexpos
+
+    def __repr__(self):
+        return f"LexToken({self.type},{self.value!r},{self.lineno},{self.lexpos})"
+
+
+class TokenArray:
+    """
+    Token i has type TOKEN_NAMES[types[i]] and line lines[i]. values[i] is the number of INT_DECIMAL
+    and index in strings pool for the rest: names and keywords of a program repeat a lot.
+    Numbers are never negative, one which does not fit 64 bits is kept in big_ints and values
+    has -1 - its index there. Positions are not kept, token index stands for lexpos.
+    """
+
+    def __init__(self):
+        self.types = array("B")
+        self.values = array("q")
+        self.lines = array("i")
+        self.strings = []
+        self.string_ids = dict()
+        self.big_ints = []
+
+    def __len__(self):
+        return len(self.types)
+
+    def append(self, token):
+        token_id = TOKEN_IDS[token.type]
+        self.types.append(token_id)
+        if token_id == INT_DECIMAL:
+            if token.value < 2 ** 63:
+                self.values.append(token.value)
+            else:
+                self.big_ints.append(token.value)
+                self.values.append(-len(self.big_ints))
+        else:
+            string_id = self.string_ids.get(token.value)
+            if string_id is None:
+                string_id = self.string_ids[token.value] = len(self.strings)
+                self.strings.append(token.value)
+            self.values.append(string_id)
+        self.lines.append(token.lineno)
+
+    def extend(self, tokens):
+        for token in tokens:
+            self.append(token)
+        return self
+
+    def token(self, index):
+        token_id = self.types[index]
+        value = self.values[index]
+        if token_id != INT_DECIMAL:
+            value = self.strings[value]
+        elif value < 0:
+            value = self.big_ints[-1 - value]
+        return ArrayToken(TOKEN_NAMES[token_id], value, self.lines[index], index)
+
+    def reader(self):
+        return TokenArrayReader(self)
+
+    def nbytes(self):
+        return sum(column.itemsize * len(column) for column in (self.types, self.values, self.lines))
+
+
+class TokenArrayReader:
+    # lexer interface TAParser.parse needs: token() gives next token or None at the end
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.index = 0
+        self.lineno = 1
+
+    def token(self):
+        if self.index >= len(self.tokens):
+            return None
+        token = self.tokens.token(self.index)
+        self.index += 1
+        self.lineno = token.lineno
+        return token
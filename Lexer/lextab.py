@@ -0,0 +1,10 @@
+# lextab.py. This file automatically created by PLY (version 3.11). Don't edit!
+_tabversion   = '3.10'
+_lextokens    = set(('ASSIGN', 'BACK', 'BAR', 'BOOLEAN', 'CBOOLEAN', 'CINT', 'CLR', 'DEC', 'DO', 'ELSE', 'EMP', 'EQUAL', 'FALSE', 'GT', 'IF', 'INC', 'INT', 'INT_DECIMAL', 'LEFT', 'LEFT_BRACKET', 'LEFT_SQUARE_BRACKET', 'LOOK', 'LT', 'MAP', 'NEW_LINE', 'NOT', 'OR', 'PROC', 'RIGHT', 'RIGHT_BRACKET', 'RIGHT_SQUARE_BRACKET', 'SET', 'STEP', 'TRUE', 'VARIABLE', 'WHILE'))
+_lexreflags   = 64
+_lexliterals  = ''
+_lexstateinfo = {'INITIAL': 'inclusive'}
+_lexstatere   = {'INITIAL': [('(?P<t_VARIABLE>[a-zA-Z][a-zA-Z_0-9]*)|(?P<t_INT_DECIMAL>\\d+)|(?P<t_LINE_BREAK>\\.\\.\\.\\n+)|(?P<t_NEW_LINE>\\n+)|(?P<t_comment>//.*\\n+)|(?P<t_ASSIGN>\\:\\=)|(?P<t_EQUAL>\\=)|(?P<t_LEFT_BRACKET>\\()|(?P<t_LEFT_SQUARE_BRACKET>\\[)|(?P<t_RIGHT_BRACKET>\\))|(?P<t_RIGHT_SQUARE_BRACKET>\\])', [None, ('t_VARIABLE', 'VARIABLE'), ('t_INT_DECIMAL', 'INT_DECIMAL'), ('t_LINE_BREAK', 'LINE_BREAK'), ('t_NEW_LINE', 'NEW_LINE'), ('t_comment', 'comment'), (None, 'ASSIGN'), (None, 'EQUAL'), (None, 'LEFT_BRACKET'), (None, 'LEFT_SQUARE_BRACKET'), (None, 'RIGHT_BRACKET'), (None, 'RIGHT_SQUARE_BRACKET')])]}
+_lexstateignore = {'INITIAL': ' \t'}
+_lexstateerrorf = {'INITIAL': 't_error'}
+_lexstateeoff = {}
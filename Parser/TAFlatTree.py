@@ -0,0 +1,320 @@
+# ------------------------------------------------------------
+# TAFlatTree.py
+#
+# array-backed syntax tree: node type, value, line and child offsets of every node
+# are kept in parallel array columns instead of one NodeOfST object per node,
+# sentence lists and argument lists are stored flat
+# ------------------------------------------------------------
+import sys
+from array import array
+
+from Parser.TAParser import NodeOfST, NodeType
+
+# raw VARIABLE and INT_DECIMAL tokens of expressions become leaves of these types,
+# cursors give them back as str and int the way NodeOfST tree keeps them
+NAME = "name"
+NUMBER = "number"
+TYPE_NAMES = [node_type.value for node_type in NodeType] + ["logical", "robot", "not", "or", "lt", "gt", "error",
+                                                              NAME, NUMBER]
+TYPE_IDS = {name: type_id for type_id, name in enumerate(TYPE_NAMES)}
+
+# what values column holds for the node
+STRING = 0
+INTEGER = 1
+NODE = 2
+# int out of the range of values column, values keeps its index in big_ints
+BIG_INTEGER = 3
+
+
+class FlatTree:
+    """
+    Columns are indexed by node number: types, kinds and values describe the node,
+    children of node i are edges[first[i]:first[i] + counts[i]].
+    Strings are interned in one pool, values column keeps their index; ints which do not
+    fit 64 bits are kept in big_ints the same way.
+    """
+
+    def __init__(self):
+        self.types = array("B")
+        self.kinds = array("B")
+        self.values = array("q")
+        self.lines = array("i")
+        self.first = array("I")
+        self.counts = array("I")
+        self.edges = array("I")
+        self.strings = []
+        self.string_ids = dict()
+        self.big_ints = []
+        # lists which still grow while parsing (sentence lists, arguments), written to edges
+        # when they become child of another node
+        self.pending = dict()
+
+    def __len__(self):
+        return len(self.types)
+
+    def add(self, node_type, value="", lineno=-1, children=()):
+        index = len(self.types)
+        self.types.append(TYPE_IDS[node_type])
+        if value.__class__ is str:
+            self.kinds.append(STRING)
+            self.values.append(self.string(value))
+        elif -2 ** 63 <= value < 2 ** 63:
+            self.kinds.append(INTEGER)
+            self.values.append(value)
+        else:
+            self.kinds.append(BIG_INTEGER)
+            self.values.append(len(self.big_ints))
+            self.big_ints.append(value)
+        self.lines.append(lineno)
+        for child in children:
+            if child in self.pending:
+                self.set_children(child, self.pending.pop(child))
+        self.first.append(len(self.edges))
+        self.counts.append(len(children))
+        self.edges.extend(children)
+        return index
+
+    def add_list(self, node_type, lineno, children):
+        # children of the list are written when it becomes child of another node
+        index = self.add(node_type, lineno=lineno)
+        self.pending[index] = list(children)
+        return index
+
+    def set_children(self, index, children):
+        self.first[index] = len(self.edges)
+        self.counts[index] = len(children)
+        self.edges.extend(children)
+
+    def set_node_value(self, index, child):
+        self.kinds[index] = NODE
+        self.values[index] = child
+
+    def string(self, value):
+        string_id = self.string_ids.get(value)
+        if string_id is None:
+            string_id = self.string_ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+    ###################################
+    # reading without cursors
+
+    def type_of(self, index):
+        return TYPE_NAMES[self.types[index]]
+
+    def value_of(self, index):
+        # raw value: str, int, or index of node for logical nodes wrapping an operation
+        kind = self.kinds[index]
+        if kind == STRING:
+            return self.strings[self.values[index]]
+        if kind == BIG_INTEGER:
+            return self.big_ints[self.values[index]]
+        return self.values[index]
+
+    def lineno_of(self, index):
+        return self.lines[index]
+
+    def children_of(self, index):
+        if index in self.pending:
+            return self.pending[index]
+        first = self.first[index]
+        return self.edges[first:first + self.counts[index]]
+
+    def preorder(self, index):
+        # indices of the subtree, node before its children, without recursion
+        stack = [index]
+        while stack:
+            index = stack.pop()
+            yield index
+            if self.kinds[index] == NODE:
+                stack.append(self.values[index])
+            stack.extend(reversed(self.children_of(index)))
+
+    ###################################
+    # cursors
+
+    def node(self, index):
+        # leaves are given back as the raw tokens NodeOfST tree has in their place
+        node_type = self.types[index]
+        if node_type == TYPE_IDS[NAME] or node_type == TYPE_IDS[NUMBER]:
+            return self.value_of(index)
+        return FlatNode(self, index)
+
+    def nbytes(self):
+        columns = (self.types, self.kinds, self.values, self.lines, self.first, self.counts, self.edges)
+        return sum(column.itemsize * len(column) for column in columns) + \
+            sys.getsizeof(self.strings) + sum(sys.getsizeof(string) for string in self.strings) + \
+            sum(sys.getsizeof(value) for value in self.big_ints)
+
+
+class FlatNode(NodeOfST):
+    """
+    Cursor over one node of FlatTree with the attributes of NodeOfST, so engines, optimizer
+    and bytecode compiler walk flat trees unchanged. Cursors are created on access and hold
+    only the tree and node index.
+    """
+    __slots__ = ("tree", "index")
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    @property
+    def type(self):
+        return TYPE_NAMES[self.tree.types[self.index]]
+
+    @property
+    def value(self):
+        if self.tree.kinds[self.index] == NODE:
+            return self.tree.node(self.tree.values[self.index])
+        return self.tree.value_of(self.index)
+
+    @property
+    def children(self):
+        tree = self.tree
+        return [tree.node(child) for child in tree.children_of(self.index)]
+
+    @property
+    def lineno(self):
+        return self.tree.lines[self.index]
+
+    def __eq__(self, other):
+        return isinstance(other, FlatNode) and other.tree is self.tree and other.index == self.index
+
+    def __hash__(self):
+        return hash((id(self.tree), self.index))
+
+
+class FlatSTBuilder:
+    """
+    Node builder for TAParser which fills FlatTree: TAParser(node_builder=FlatSTBuilder()).
+    Values passed between rules are node indices, except for strings of int and boolean rules.
+    """
+
+    def __init__(self):
+        self.tree = FlatTree()
+
+    def start(self):
+        self.tree = FlatTree()
+
+    def finish(self, result):
+        self.tree.pending.clear()
+        return None if result is None else self.tree.node(result)
+
+    def register(self, func_table, proc):
+        tree = self.tree
+        args, body = tree.children_of(proc)
+        func_table[tree.value_of(proc)] = NodeOfST(node_type=NodeType.Proc.value, value=tree.value_of(proc),
+                                                   children={"args": [tree.node(arg) for arg in tree.children_of(args)],
+                                                             "body": tree.node(body)},
+                                                   lineno=tree.lineno_of(proc))
+
+    def program(self, p):
+        p[0] = self.tree.add(NodeType.Program.value, "prog", p.lineno(1), [p[1]])
+
+    def sentence_list(self, p):
+        if len(p) == 2:
+            p[0] = self.tree.add_list(NodeType.SentenceList.value, p.lineno(1), [p[1]])
+        elif len(p) == 3:
+            # sentences are appended to the one list instead of nesting lists
+            self.tree.pending[p[1]].append(p[2])
+            p[0] = p[1]
+
+    def single_sentence(self, p):
+        p[0] = p[1]
+
+    def declaration(self, p):
+        tree = self.tree
+        child = tree.add(NodeType.ID.value, p[2], p.lineno(2))
+        if len(p) == 5:
+            p[0] = tree.add(NodeType.Declaration.value, lineno=p.lineno(2), children=[child, p[4]])
+            tree.set_node_value(p[0], p[1])
+        elif len(p) == 3:
+            p[0] = tree.add(NodeType.MAP.value, lineno=p.lineno(2), children=[child])
+
+    def type(self, p):
+        p[0] = self.tree.add(NodeType.Type.value, p[1], p.lineno(1))
+
+    def int(self, p):
+        p[0] = p[1]
+
+    def boolean(self, p):
+        p[0] = p[1]
+
+    def assignment(self, p):
+        p[0] = self.tree.add(NodeType.Assignment.value, p[1], p.lineno(2), [p[3]])
+
+    def inc(self, p):
+        p[0] = self.tree.add(NodeType.INC.value, lineno=p.lineno(2), children=[p[2], p[3]])
+
+    def dec(self, p):
+        p[0] = self.tree.add(NodeType.DEC.value, lineno=p.lineno(2), children=[p[2], p[3]])
+
+    def robot_action(self, p):
+        p[0] = self.tree.add("robot", p[1], p.lineno(1))
+
+    def expression(self, p):
+        child = p[1]
+        if p.slice[1].type == "VARIABLE":
+            child = self.tree.add(NAME, p[1], p.lineno(1))
+        p[0] = self.tree.add(NodeType.Expression.value, lineno=p.lineno(1), children=[child])
+
+    def logical(self, p):
+        if p.slice[1].type in ("TRUE", "FALSE"):
+            p[0] = self.tree.add("logical", p[1], p.lineno(1))
+        else:
+            p[0] = self.tree.add("logical", lineno=p.lineno(1))
+            self.tree.set_node_value(p[0], p[1])
+
+    def not_p(self, p):
+        p[0] = self.tree.add("not", lineno=p.lineno(2), children=[p[2]])
+
+    def or_p(self, p):
+        p[0] = self.tree.add("or", lineno=p.lineno(2), children=[p[2], p[3]])
+
+    def or_arg(self, p):
+        p[0] = p[1]
+
+    def lt(self, p):
+        p[0] = self.tree.add("lt", lineno=p.lineno(2), children=[p[2], p[3]])
+
+    def gt(self, p):
+        p[0] = self.tree.add("gt", lineno=p.lineno(2), children=[p[2], p[3]])
+
+    def math_expression(self, p):
+        if p.slice[1].type == "INT_DECIMAL":
+            p[0] = self.tree.add(NUMBER, p[1], p.lineno(1))
+        else:
+            p[0] = p[1]
+
+    def while_p(self, p):
+        body = p[5] if len(p) == 6 else p[7]
+        p[0] = self.tree.add(NodeType.While.value, lineno=p.lineno(1), children=[p[2], body])
+
+    def proc(self, p):
+        p[0] = self.tree.add(NodeType.Proc.value, p[2], p.lineno(1), [p[4], p[8]])
+
+    def proc_args(self, p):
+        tree = self.tree
+        if len(p) == 2:
+            p[0] = tree.add_list(NodeType.Arguments.value, p.lineno(1), [tree.add(NAME, p[1], p.lineno(1))])
+        else:
+            tree.pending[p[1]].append(tree.add(NAME, p[2], p.lineno(2)))
+            p[0] = p[1]
+
+    def proc_call(self, p):
+        p[0] = self.tree.add(NodeType.Proc_call.value, p[1], p.lineno(1), [p[3]])
+
+    def map_action(self, p):
+        tree = self.tree
+        names = [tree.add(NAME, p[i], p.lineno(i)) for i in range(3, 7)]
+        p[0] = tree.add(NodeType.MAP.value, p[1], p.lineno(1), names)
+
+    def if_p(self, p):
+        children = [p[2], p[5]] if len(p) == 7 else [p[2], p[5], p[10]]
+        p[0] = self.tree.add(NodeType.If.value, lineno=p.lineno(1), children=children)
+
+    def declaration_error1(self, p):
+        p[0] = self.tree.add("error", "bad declaration", p.lineno(2), [self.tree.add(NAME, p[2], p.lineno(2))])
+        sys.stderr.write(
+            f"Line {p.lineno(2)} [SYNTAX ERROR]: Bad declaration configuration: variable '{p[2]}' should have initial value\n")
@@ -0,0 +1,246 @@
+# ------------------------------------------------------------
+# TAFrozenParser.py
+#
+# LALR parser over tables of shipped Parser/parsetab.py which runs as ply.yacc.LRParser
+# does with line tracking, without importing ply: ply imports inspect, which is most
+# of the start of a process. Tables are made by ply, see TAParser.freeze_tables
+# ------------------------------------------------------------
+import importlib
+
+# symbols shifted before error recovery ends, ply.yacc.error_count
+ERROR_COUNT = 3
+
+
+class Symbol:
+    # terminal or nonterminal on the stack, tokens of the lexer are kept as they are
+    def __str__(self):
+        return self.type
+
+    def __repr__(self):
+        return str(self)
+
+
+class Production:
+    # p of grammar rules, as ply.yacc.YaccProduction: p[n] is value of symbol n, p[0] is the result
+    def __init__(self, stack):
+        self.slice = None
+        self.stack = stack
+        self.lexer = None
+        self.parser = None
+
+    def __getitem__(self, n):
+        if isinstance(n, slice):
+            return [symbol.value for symbol in self.slice[n]]
+        if n >= 0:
+            return self.slice[n].value
+        return self.stack[n].value
+
+    def __setitem__(self, n, value):
+        self.slice[n].value = value
+
+    def __len__(self):
+        return len(self.slice)
+
+    def lineno(self, n):
+        return getattr(self.slice[n], "lineno", 0)
+
+    def set_lineno(self, n, lineno):
+        self.slice[n].lineno = lineno
+
+    def linespan(self, n):
+        start = getattr(self.slice[n], "lineno", 0)
+        return start, getattr(self.slice[n], "endlineno", start)
+
+    def lexpos(self, n):
+        return getattr(self.slice[n], "lexpos", 0)
+
+    def set_lexpos(self, n, lexpos):
+        self.slice[n].lexpos = lexpos
+
+    def lexspan(self, n):
+        start = getattr(self.slice[n], "lexpos", 0)
+        return start, getattr(self.slice[n], "endlexpos", start)
+
+    def error(self):
+        raise SyntaxError
+
+
+class FrozenParser:
+    """
+    FrozenParser(rules, error_rule) parses with the tables of Parser/parsetab.py, rules has the p_ methods
+    they name. Reductions, error tokens and the calls of error_rule are those of ply.yacc.LRParser.parse
+    with tracking, so trees and messages of syntax errors are the same.
+    """
+
+    def __init__(self, rules, error_rule, parsetab="Parser.parsetab"):
+        table = importlib.import_module(parsetab)
+        self.action = table._lr_action
+        self.goto = table._lr_goto
+        # (name of nonterminal, length, rule) of every production
+        self.productions = [(name, length, getattr(rules, func) if func else None)
+                            for _, name, length, func, _, _ in table._lr_productions]
+        # states with one reduction reduce without reading the next token
+        self.defaulted_states = dict()
+        for state, actions in self.action.items():
+            moves = list(actions.values())
+            if len(moves) == 1 and moves[0] < 0:
+                self.defaulted_states[state] = moves[0]
+        self.errorfunc = error_rule
+        self.errorok = True
+        self.token = None
+        self.state = 0
+        self.statestack = []
+        self.symstack = []
+
+    def errok(self):
+        self.errorok = True
+
+    def restart(self):
+        del self.statestack[:]
+        del self.symstack[:]
+        symbol = Symbol()
+        symbol.type = "$end"
+        self.symstack.append(symbol)
+        self.statestack.append(0)
+
+    def parse(self, input=None, lexer=None, debug=False, tracking=False):
+        if debug:
+            raise ValueError("Debug output is written by parser ply builds, use TAParser() for it")
+        actions = self.action
+        goto = self.goto
+        productions = self.productions
+        defaulted_states = self.defaulted_states
+        lookahead = None
+        lookaheadstack = []
+        errorcount = 0
+        if input is not None:
+            lexer.input(input)
+        get_token = self.token = lexer.token
+
+        statestack = self.statestack = [0]
+        start = Symbol()
+        start.type = "$end"
+        symstack = self.symstack = [start]
+        p = Production(symstack)
+        p.lexer = lexer
+        p.parser = self
+        state = 0
+        while True:
+            if state not in defaulted_states:
+                if not lookahead:
+                    lookahead = lookaheadstack.pop() if lookaheadstack else get_token()
+                    if not lookahead:
+                        lookahead = Symbol()
+                        lookahead.type = "$end"
+                t = actions[state].get(lookahead.type)
+            else:
+                t = defaulted_states[state]
+
+            if t is not None:
+                if t > 0:
+                    # shift
+                    statestack.append(t)
+                    state = t
+                    symstack.append(lookahead)
+                    lookahead = None
+                    if errorcount:
+                        errorcount -= 1
+                    continue
+
+                if t < 0:
+                    # reduce
+                    name, length, rule = productions[-t]
+                    symbol = Symbol()
+                    symbol.type = name
+                    symbol.value = None
+                    if length:
+                        targ = symstack[-length - 1:]
+                        targ[0] = symbol
+                        if tracking:
+                            first, last = targ[1], targ[-1]
+                            symbol.lineno = first.lineno
+                            symbol.lexpos = first.lexpos
+                            symbol.endlineno = getattr(last, "endlineno", last.lineno)
+                            symbol.endlexpos = getattr(last, "endlexpos", last.lexpos)
+                    else:
+                        targ = [symbol]
+                        if tracking:
+                            symbol.lineno = lexer.lineno
+                            symbol.lexpos = lexer.lexpos
+                    p.slice = targ
+                    try:
+                        if length:
+                            del symstack[-length:]
+                        self.state = state
+                        rule(p)
+                        if length:
+                            del statestack[-length:]
+                        symstack.append(symbol)
+                        state = goto[statestack[-1]][name]
+                        statestack.append(state)
+                    except SyntaxError:
+                        # rule called p.error(): its symbols go back on the stack and error recovery starts
+                        lookaheadstack.append(lookahead)
+                        symstack.extend(targ[1:-1])
+                        statestack.pop()
+                        state = statestack[-1]
+                        symbol.type = "error"
+                        symbol.value = "error"
+                        lookahead = symbol
+                        errorcount = ERROR_COUNT
+                        self.errorok = False
+                    continue
+
+                # accept
+                return getattr(symstack[-1], "value", None)
+
+            # syntax error: the error rule is called for the first error of recovery, then the
+            # stack is unwound until some state shifts error token
+            if errorcount == 0 or self.errorok:
+                errorcount = ERROR_COUNT
+                self.errorok = False
+                errtoken = lookahead if lookahead.type != "$end" else None
+                if errtoken is not None and not hasattr(errtoken, "lexer"):
+                    errtoken.lexer = lexer
+                self.state = state
+                tok = self.errorfunc(errtoken)
+                if self.errorok:
+                    lookahead = tok
+                    continue
+            else:
+                errorcount = ERROR_COUNT
+
+            if len(statestack) <= 1 and lookahead.type != "$end":
+                # everything was unwound, the token is dropped
+                lookahead = None
+                state = 0
+                del lookaheadstack[:]
+                continue
+
+            if lookahead.type == "$end":
+                return None
+
+            if lookahead.type != "error":
+                symbol = symstack[-1]
+                if symbol.type == "error":
+                    if tracking:
+                        symbol.endlineno = getattr(lookahead, "lineno", symbol.lineno)
+                        symbol.endlexpos = getattr(lookahead, "lexpos", symbol.lexpos)
+                    lookahead = None
+                    continue
+                error = Symbol()
+                error.type = "error"
+                if hasattr(lookahead, "lineno"):
+                    error.lineno = error.endlineno = lookahead.lineno
+                if hasattr(lookahead, "lexpos"):
+                    error.lexpos = error.endlexpos = lookahead.lexpos
+                error.value = lookahead
+                lookaheadstack.append(lookahead)
+                lookahead = error
+            else:
+                symbol = symstack.pop()
+                if tracking:
+                    lookahead.lineno = symbol.lineno
+                    lookahead.lexpos = symbol.lexpos
+                statestack.pop()
+                state = statestack[-1]
@@ -0,0 +1,329 @@
+# ------------------------------------------------------------
+# TAIncremental.py
+#
+# incremental parsing of edited programs: sentences touched by an edit are lexed and
+# parsed again as a separate program and spliced into the tree of the previous parse
+# ------------------------------------------------------------
+import contextlib
+import io
+import sys
+
+from Parser.TAParser import NodeOfST, NodeSTBuilder, NodeType, TAParser
+
+
+class SpanNode(NodeOfST):
+    """
+    Node with line kept relative to the sentence it belongs to: when lines are inserted
+    or removed above, only the sentence moves and all its nodes report new lineno.
+    """
+
+    def __init__(self, node_type, value, children=None, lineno=-1):
+        self.unit = None
+        self.line = lineno
+        # lines of '(' and ')' of every block of if, while and proc
+        self.brackets = None
+        self.first_line = lineno
+        super().__init__(node_type, value, children, lineno)
+
+    @property
+    def lineno(self):
+        if self.unit is None:
+            return self.line
+        return self.unit.line() + self.line
+
+    @lineno.setter
+    def lineno(self, value):
+        self.unit = None
+        self.line = value
+
+    def anchor(self, unit, line=None):
+        if line is None:
+            line = self.lineno - unit.line()
+        self.unit = unit
+        self.line = line
+
+
+class IncrementalBuilder(NodeSTBuilder):
+    # sentence lists are flat, so sentences are spliced in place, and sentences know their lines
+    node_class = SpanNode
+
+    def sentence_list(self, p):
+        if len(p) == 2:
+            p[0] = SpanNode(node_type=NodeType.SentenceList.value, value="", children=[p[1]], lineno=p.lineno(1))
+        else:
+            p[1].children.append(p[2])
+            p[0] = p[1]
+
+    def single_sentence(self, p):
+        p[0] = p[1]
+        p[0].first_line = p.lineno(1)
+
+    def if_p(self, p):
+        super().if_p(p)
+        p[0].brackets = [(p.lineno(3), p.lineno(6))]
+        if len(p) != 7:
+            p[0].brackets.append((p.lineno(8), p.lineno(11)))
+
+    def while_p(self, p):
+        super().while_p(p)
+        if len(p) != 6:
+            p[0].brackets = [(p.lineno(5), p.lineno(8))]
+
+    def proc(self, p):
+        super().proc(p)
+        p[0].brackets = [(p.lineno(6), p.lineno(9))]
+
+
+class Unit:
+    # sentence of a block, its first line is kept relative to the start of the block
+    def __init__(self, node, block, offset):
+        self.node = node
+        self.block = block
+        self.offset = offset
+        self.blocks = []
+
+    def line(self):
+        return self.block.line() + self.offset
+
+
+class Block:
+    # body of if, while or proc between lines of its brackets, or the whole program when owner is None;
+    # start is the first line after '(' and end is the line of ')', both relative to the owner sentence
+    def __init__(self, owner, start, end, body):
+        self.owner = owner
+        self.start = start
+        self.end = end
+        self.body = body
+        self.units = []
+
+    def line(self):
+        return self.start if self.owner is None else self.owner.line() + self.start
+
+    def end_line(self):
+        return self.end if self.owner is None else self.owner.line() + self.end
+
+
+class IncrementalParse:
+    """
+    Parse of a program which can be edited: tree, funcTable and syntax error flag as TAParser.parse
+    gives them, lines of the source and blocks with the sentences they consist of.
+    """
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.syntax_tree = None
+        self.func_table = dict()
+        self.has_syntax_errors = False
+        self.program = None
+        # ("full" | "fragment", number of reparsed lines) of the last parse
+        self.last_parse = None
+
+    @property
+    def source(self):
+        return "".join(self.lines)
+
+    def result(self):
+        return self.syntax_tree, self.func_table, self.has_syntax_errors
+
+
+class TAIncrementalParser:
+    """
+    parse(source) parses whole program, edit(parse, first_line, line_count, text) replaces line_count lines
+    starting at first_line (1-based) with text and updates the parse. Only sentences of the innermost block
+    containing the edit which overlap it are parsed again. Edits which break the structure of blocks or
+    leave syntax errors are handled by parsing the whole program, so error messages are the same.
+    """
+
+    def __init__(self):
+        self.parser = TAParser(node_builder=IncrementalBuilder(), frozen=True)
+
+    def parse(self, source):
+        document = IncrementalParse(source.splitlines(keepends=True))
+        self.parse_all(document)
+        return document
+
+    def parse_all(self, document):
+        document.syntax_tree, func_table, document.has_syntax_errors = self.parser.parse(document.source)
+        document.last_parse = ("full", len(document.lines))
+        document.program = None
+        document.func_table = func_table
+        if document.has_syntax_errors or document.syntax_tree is None:
+            return
+        body = document.syntax_tree.children[0]
+        document.program = Block(None, 1, len(document.lines) + 1, body)
+        self.build_units(document.program, body.children)
+        document.syntax_tree.anchor(document.program.units[0], 0)
+        document.func_table = self.func_table(document.program)
+
+    ###################################
+    # blocks and sentences
+
+    def build_units(self, block, sentences, at=0):
+        units = []
+        for node in sentences:
+            unit = Unit(node, block, node.first_line - block.line())
+            units.append(unit)
+            self.anchor(node, unit)
+            bodies = [child for child in node.children if isinstance(child, NodeOfST) and
+                      child.type == NodeType.SentenceList.value]
+            for (opening, closing), body in zip(node.brackets or (), bodies):
+                inner = Block(unit, opening + 1 - unit.line(), closing - unit.line(), body)
+                unit.blocks.append(inner)
+                self.build_units(inner, body.children)
+        block.units[at:at] = units
+        if block.units:
+            # sentence list starts where its first sentence does
+            block.body.anchor(block.units[0], 0)
+        return units
+
+    def anchor(self, node, unit):
+        # nodes of the sentence move with it, sentences of its blocks have units of their own
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            node.anchor(unit)
+            if isinstance(node.value, SpanNode):
+                stack.append(node.value)
+            children = node.children.values() if isinstance(node.children, dict) else node.children
+            for child in children:
+                if isinstance(child, SpanNode) and not (child.type == NodeType.SentenceList.value and node.brackets):
+                    stack.append(child)
+
+    def func_table(self, block):
+        # procedures are registered in the order parser reduces them: inner ones before the one containing them
+        table = dict()
+
+        def register(unit):
+            for inner in unit.blocks:
+                for child in inner.units:
+                    register(child)
+            if unit.node.type == NodeType.Proc.value:
+                proc = unit.node
+                entry = SpanNode(node_type=NodeType.Proc.value, value=proc.value,
+                                 children={"args": proc.children[0].children, "body": proc.children[1]},
+                                 lineno=proc.lineno)
+                entry.anchor(unit)
+                table[proc.value] = entry
+
+        for unit in block.units:
+            register(unit)
+        return table
+
+    def has_procs(self, units):
+        return any(unit.node.type == NodeType.Proc.value or
+                   any(self.has_procs(inner.units) for inner in unit.blocks) for unit in units)
+
+    ###################################
+    # edits
+
+    def edit(self, document, first_line, line_count, text):
+        if text and not text.endswith("\n") and first_line - 1 + line_count < len(document.lines):
+            # text replaces whole lines, the line after it stays separate
+            text += "\n"
+        new_lines = text.splitlines(keepends=True)
+        document.lines[first_line - 1:first_line - 1 + line_count] = new_lines
+        if document.program is None or not self.reparse(document, first_line, first_line + line_count,
+                                                        len(new_lines) - line_count):
+            self.parse_all(document)
+        return document
+
+    def innermost(self, block, first, last):
+        # block whose body contains lines first..last-1 (or insertion before first when they are equal)
+        while True:
+            touched = self.touched(block, first, last)
+            if len(touched) != 1:
+                return block, touched
+            unit = block.units[touched[0]]
+            inner = [b for b in unit.blocks if b.line() <= first and last <= b.end_line()]
+            if not inner:
+                return block, touched
+            block = inner[0]
+
+    def region(self, block, index):
+        # lines from the sentence (from the block start for the first one) to the next sentence or the end of block
+        start = block.line() if index == 0 else block.units[index].line()
+        end = block.units[index + 1].line() if index + 1 < len(block.units) else block.end_line()
+        return start, end
+
+    def find(self, block, line):
+        # index of the sentence whose region contains line, sentences of block go in order of lines
+        low, high = 0, len(block.units) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if block.units[middle].line() <= line:
+                low = middle
+            else:
+                high = middle - 1
+        return low
+
+    def touched(self, block, first, last):
+        if not block.units or first < block.line() or last > block.end_line():
+            return []
+        if first == last:
+            return [self.find(block, first)]
+        return list(range(self.find(block, first), self.find(block, last - 1) + 1))
+
+    def reparse(self, document, first, last, delta):
+        block, touched = self.innermost(document.program, first, last)
+        if not touched:
+            return False
+        start = self.region(block, touched[0])[0]
+        end = self.region(block, touched[-1])[1]
+
+        text = "".join(document.lines[start - 1:end - 1 + delta])
+        # new lines after '(' belong to its NEW_LINE token, program itself can not start with them
+        stripped = text if block.owner is None else text.lstrip("\n")
+        fragment_line = start + len(text) - len(stripped)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            if stripped:
+                tree, _, has_syntax_errors = self.parser.parse(stripped, first_line=fragment_line)
+            else:
+                tree, has_syntax_errors = None, False
+        if has_syntax_errors or output.getvalue() or (stripped and tree is None):
+            return False
+        sentences = tree.children[0].children if tree is not None else []
+
+        removed = block.units[touched[0]:touched[-1] + 1]
+        if not sentences and len(removed) == len(block.units):
+            # block can not be empty, parsing whole program reports it
+            return False
+        if delta:
+            # lines of sentences after the edit and of blocks containing it move by delta
+            for unit in block.units[touched[-1] + 1:]:
+                unit.offset += delta
+            self.move_end(block, delta)
+
+        del block.units[touched[0]:touched[-1] + 1]
+        block.body.children[touched[0]:touched[-1] + 1] = sentences
+        self.build_units(block, sentences, at=touched[0])
+        document.syntax_tree.anchor(document.program.units[0], 0)
+        if self.has_procs(removed) or self.has_procs(block.units[touched[0]:touched[0] + len(sentences)]):
+            document.func_table = self.func_table(document.program)
+        document.last_parse = ("fragment", end - start + delta)
+        return True
+
+    def move_end(self, block, delta):
+        while True:
+            block.end += delta
+            unit = block.owner
+            if unit is None:
+                return
+            for later in unit.blocks[unit.blocks.index(block) + 1:]:
+                later.start += delta
+                later.end += delta
+            outer = unit.block
+            for later in outer.units[outer.units.index(unit) + 1:]:
+                later.offset += delta
+            block = outer
+
+
+if __name__ == '__main__':
+    # python TAIncremental.py <source> <line> <count> <text>: prints tree after replacing lines
+    with open(sys.argv[1], "r") as f:
+        data = f.read()
+    incremental = TAIncrementalParser()
+    document = incremental.parse(data)
+    incremental.edit(document, int(sys.argv[2]), int(sys.argv[3]), sys.argv[4].replace("\\n", "\n"))
+    print(document.syntax_tree)
+    print(document.last_parse)
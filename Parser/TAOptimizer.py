@@ -0,0 +1,243 @@
+# ------------------------------------------------------------
+# TAOptimizer.py
+#
+# optimization pass over syntax tree built by TAParser:
+# folds constant inc/dec/lt/gt/not/or subtrees, substitutes values of cint/cboolean constants
+# and removes unreachable if/else branches and while false loops
+# ------------------------------------------------------------
+import sys
+
+from Parser.TAParser import NodeOfST, NodeType, flatten_sentences, TAParser
+
+
+def source(node):
+    # renders expression back to the program text, used in debug log
+    if not isinstance(node, NodeOfST):
+        return str(node)
+    match node.type:
+        case NodeType.Expression.value:
+            return source(node.children[0])
+        case "logical":
+            return source(node.value)
+        case NodeType.Proc_call.value:
+            return f"{node.value} [{' '.join(node.children[0].children)}]"
+        case "robot":
+            return node.value
+    return " ".join([node.type] + [source(child) for child in node.children])
+
+
+class Scope:
+    def __init__(self, declared=()):
+        self.declared = set(declared)
+        self.constants = dict()
+
+
+class TAOptimizer:
+    def __init__(self, debug=False):
+        self.debug = debug
+        self.log = []
+        self.scopes = []
+        self.lineno = -1
+
+    def optimize(self, func_table):
+        return {name: self.procedure(proc) for name, proc in func_table.items()}
+
+    def report(self, message):
+        # inner nodes of expressions do not know their line, so the line of current sentence is used
+        entry = f"line {self.lineno}: {message}"
+        self.log.append(entry)
+        if self.debug:
+            print(f"[DEBUG]: {entry}", file=sys.stderr)
+
+    def procedure(self, proc):
+        # procedure is a separate scope where only its parameters are declared
+        self.scopes = [Scope(proc.children["args"])]
+        body = self.sentences(proc.children["body"])
+        return NodeOfST(node_type=proc.type, value=proc.value,
+                        children={"args": proc.children["args"], "body": body}, lineno=proc.lineno)
+
+    ###################################
+    # statements
+
+    def sentences(self, node):
+        result = []
+        for sentence in flatten_sentences(node):
+            result.extend(self.sentence(sentence))
+        return NodeOfST(node_type=NodeType.SentenceList.value, value="", children=result, lineno=node.lineno)
+
+    def block(self, node):
+        # bodies of if and while are executed in their own environment
+        self.scopes.append(Scope())
+        try:
+            return self.sentences(node)
+        finally:
+            self.scopes.pop()
+
+    def sentence(self, node):
+        # returns list of sentences replacing the node
+        self.lineno = node.lineno
+        match node.type:
+            case NodeType.Declaration.value:
+                return [self.declaration(node)]
+            case NodeType.MAP.value if node.value == "":
+                self.scopes[-1].declared.add(node.children[0].value)
+            case NodeType.Assignment.value:
+                return [NodeOfST(node_type=node.type, value=node.value,
+                                 children=[self.expression(node.children[0])], lineno=node.lineno)]
+            case NodeType.If.value:
+                return self.if_else(node)
+            case NodeType.While.value:
+                return self.while_loop(node)
+            case NodeType.INC.value | NodeType.DEC.value | "logical":
+                folded = self.fold(node)
+                if self.constant(folded) is not None:
+                    # constant expression used as sentence does nothing
+                    self.report(f"removed sentence without effect '{source(node)}'")
+                    return []
+                return [folded]
+        return [node]
+
+    def declaration(self, node):
+        decl_type = node.value.value.lower()
+        name = node.children[0].value
+        value = self.expression(node.children[1])
+        constant = self.constant(value)
+        declared = any(name in scope.declared for scope in self.scopes)
+        scope = self.scopes[-1]
+        scope.declared.add(name)
+        # only declarations which surely succeed define constant: name is free and value converts to the type
+        if not declared and constant is not None:
+            if decl_type == "cint":
+                scope.constants[name] = int(constant)
+            elif decl_type == "cboolean" and isinstance(constant, bool):
+                scope.constants[name] = constant
+        return NodeOfST(node_type=node.type, value=node.value, children=[node.children[0], value], lineno=node.lineno)
+
+    def if_else(self, node):
+        condition = self.fold(node.children[0])
+        value = self.constant(condition)
+        if value is None:
+            children = [condition] + [self.block(branch) for branch in node.children[1:]]
+            return [NodeOfST(node_type=node.type, value=node.value, children=children, lineno=node.lineno)]
+
+        if value:
+            taken = node.children[1]
+            if len(node.children) == 3:
+                self.report(f"removed unreachable else branch of 'if {source(condition)}'")
+        elif len(node.children) == 3:
+            taken = node.children[2]
+            self.report(f"removed unreachable then branch of 'if {source(condition)}'")
+        else:
+            self.report(f"removed unreachable 'if {source(condition)}'")
+            return []
+
+        body = self.block(taken)
+        if any(self.declares(sentence) for sentence in body.children):
+            # declarations of the branch must stay local to it
+            condition = NodeOfST(node_type="logical", value="true", children=[], lineno=condition.lineno)
+            return [NodeOfST(node_type=node.type, value=node.value, children=[condition, body], lineno=node.lineno)]
+        return body.children
+
+    def while_loop(self, node):
+        condition = self.fold(node.children[0])
+        if self.constant(condition) is False:
+            self.report(f"removed body of 'while {source(condition)}'")
+            return []
+        body = node.children[1]
+        if body.type == NodeType.SentenceList.value:
+            body = self.block(body)
+        else:
+            body = self.block(NodeOfST(node_type=NodeType.SentenceList.value, value="", children=[body],
+                                       lineno=body.lineno))
+        return [NodeOfST(node_type=node.type, value=node.value, children=[condition, body], lineno=node.lineno)]
+
+    def declares(self, node):
+        return node.type == NodeType.Declaration.value or (node.type == NodeType.MAP.value and node.value == "")
+
+    ###################################
+    # expressions
+
+    def lookup(self, name):
+        for scope in reversed(self.scopes):
+            if name in scope.constants:
+                return scope.constants[name]
+            if name in scope.declared:
+                return None
+        return None
+
+    def constant(self, node):
+        # value of folded expression if it is a literal, None otherwise
+        if isinstance(node, int):
+            return node
+        if isinstance(node, NodeOfST):
+            if node.type == NodeType.Expression.value:
+                return self.constant(node.children[0])
+            if node.type == "logical" and isinstance(node.value, str):
+                return node.value.lower() == "true"
+        return None
+
+    def literal(self, value, lineno):
+        if isinstance(value, bool):
+            return NodeOfST(node_type="logical", value="true" if value else "false", children=[], lineno=lineno)
+        return value
+
+    def expression(self, node):
+        # child of declaration or assignment: expression node or raw token
+        if isinstance(node, NodeOfST) and node.type == NodeType.Expression.value:
+            return NodeOfST(node_type=node.type, value=node.value, children=[self.fold(node.children[0])],
+                            lineno=node.lineno)
+        return self.fold(node)
+
+    def fold(self, node):
+        if isinstance(node, str):
+            value = self.lookup(node)
+            return node if value is None else self.literal(value, -1)
+        if not isinstance(node, NodeOfST):
+            return node
+
+        match node.type:
+            case NodeType.Expression.value:
+                return self.expression(node)
+            case "logical" if isinstance(node.value, str):
+                return node
+            case "logical":
+                folded = self.fold(node.value)
+                if isinstance(folded, NodeOfST) and folded.type == "logical":
+                    return folded
+                return NodeOfST(node_type=node.type, value=folded, children=[], lineno=node.lineno)
+            case NodeType.INC.value | NodeType.DEC.value | "lt" | "gt" | "not" | "or":
+                children = [self.fold(child) for child in node.children]
+                values = [self.constant(child) for child in children]
+                if all(value is not None for value in values):
+                    value = self.evaluate(node.type, values)
+                    self.report(f"folded '{source(node)}' into {str(value).lower()}")
+                    return self.literal(value, node.lineno)
+                return NodeOfST(node_type=node.type, value=node.value, children=children, lineno=node.lineno)
+        return node
+
+    def evaluate(self, node_type, values):
+        match node_type:
+            case NodeType.INC.value:
+                return int(values[0]) + int(values[1])
+            case NodeType.DEC.value:
+                return int(values[0]) - int(values[1])
+            case "lt":
+                return values[0] < values[1]
+            case "gt":
+                return values[0] > values[1]
+            case "not":
+                return not values[0]
+            case "or":
+                return values[0] or values[1]
+
+
+if __name__ == '__main__':
+    # python TAOptimizer.py <source>: prints what was folded and removed
+    with open(sys.argv[1], "r") as f:
+        data = f.read()
+    syntax_tree, func_table, hasErrors = TAParser().parse(data)
+    optimizer = TAOptimizer()
+    for name, proc in optimizer.optimize(func_table).items():
+        print(f"proc {name}:")
+        print(proc.children["body"])
+    print("\n".join(optimizer.log))
@@ -0,0 +1,161 @@
+# ------------------------------------------------------------
+# TAParseCache.py
+#
+# cache of parse results keyed by hash of the source and version of the grammar:
+# bounded in-memory LRU tier and optional directory of pickled results shared by processes
+# ------------------------------------------------------------
+import contextlib
+import hashlib
+import io
+import os
+import pickle
+import sys
+import tempfile
+from collections import OrderedDict
+
+from Parser.TAParser import NodeOfST, NodeType, TAParser
+
+FORMAT_VERSION = 1
+
+
+def grammar_version():
+    # productions and tokens decide which tree is built, tables do not have to exist to know them
+    rules = sorted(f"{name}:{getattr(TAParser, name).__doc__}" for name in dir(TAParser) if name.startswith("p_"))
+    digest = hashlib.sha256()
+    digest.update(f"{FORMAT_VERSION}\n{' '.join(TAParser.tokens)}\n".encode())
+    digest.update("\n".join(rules).encode())
+    return digest.hexdigest()[:16]
+
+
+def sentence_list_chain(base, links):
+    # rebuilds left-recursive sentence_list from its innermost list and (lineno, sentence) pairs
+    node = base
+    for lineno, sentence in links:
+        node = NodeOfST(node_type=NodeType.SentenceList.value, value="", children=[node, sentence], lineno=lineno)
+    return node
+
+
+def is_sentence_chain(node):
+    return type(node) is NodeOfST and node.type == NodeType.SentenceList.value and len(node.children) == 2 \
+        and isinstance(node.children[0], NodeOfST) and node.children[0].type == NodeType.SentenceList.value
+
+
+class TreePickler(pickle.Pickler):
+    """
+    Sentence lists of long programs nest as deep as they have sentences, which is too deep for pickle:
+    chains are stored as the innermost list and flat list of the sentences appended to it.
+    """
+
+    def reducer_override(self, obj):
+        if not is_sentence_chain(obj):
+            return NotImplemented
+        links = []
+        while is_sentence_chain(obj):
+            links.append((obj.lineno, obj.children[1]))
+            obj = obj.children[0]
+        links.reverse()
+        return sentence_list_chain, (obj, links)
+
+
+class TAParseCache:
+    """
+    parse(source, parser) returns (syntax_tree, funcTable, hasSyntaxErrors) like TAParser.parse.
+    parser may be TAParser or function creating it, it is only called on miss of both tiers.
+    Messages lexer and parser printed about errors are kept with the result and printed again on hit.
+    Trees from cache are shared between runs, engines must not change them.
+    """
+
+    def __init__(self, maxsize=128, directory=None):
+        self.maxsize = maxsize
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+        self.disk_writes = 0
+        self.version = grammar_version()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def key(self, source, flat_ast=False):
+        digest = hashlib.sha256(f"{self.version}:{'flat' if flat_ast else 'tree'}:".encode())
+        digest.update(source.encode())
+        return digest.hexdigest()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "disk_hits": self.disk_hits, "disk_writes": self.disk_writes, "size": len(self.entries)}
+
+    def clear(self):
+        self.entries.clear()
+
+    def parse(self, source, parser, flat_ast=False):
+        key = self.key(source, flat_ast)
+        result = self.entries.get(key)
+        if result is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        else:
+            result = self.load(key)
+            if result is not None:
+                self.disk_hits += 1
+            else:
+                self.misses += 1
+                result = self.parse_source(source, parser)
+                self.store(key, result)
+            self.remember(key, result)
+        parsed, output = result
+        if output:
+            sys.stdout.write(output)
+        syntax_tree, func_table, has_syntax_errors = parsed
+        # callers may replace procedures in their table, cached one stays as parsed
+        return syntax_tree, dict(func_table), has_syntax_errors
+
+    def parse_source(self, source, parser):
+        if isinstance(parser, type) or not hasattr(parser, "parse"):
+            parser = parser()
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            parsed = parser.parse(source)
+        return parsed, output.getvalue()
+
+    def remember(self, key, result):
+        if self.maxsize <= 0:
+            return
+        self.entries[key] = result
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    ###################################
+    # disk tier
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.tapickle")
+
+    def load(self, key):
+        if self.directory is None:
+            return None
+        try:
+            with open(self.path(key), "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # damaged or stale file is parsed again and overwritten
+            return None
+
+    def store(self, key, result):
+        if self.directory is None:
+            return
+        # file is renamed into place, so other processes never read half-written result
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                TreePickler(f, protocol=pickle.HIGHEST_PROTOCOL).dump(result)
+            os.replace(tmp_path, self.path(key))
+            self.disk_writes += 1
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
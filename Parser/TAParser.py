@@ -1,8 +1,8 @@
 import enum
+import os
 import sys
 
 from Lexer.TALexer import TALexer
-import ply.yacc as yacc
 
 
 class NodeType(enum.Enum):
@@ -41,34 +41,68 @@ class NodeOfST:
 
     def __str__(self, level=0):
         result = "\t" * level + repr(self) + "\n"
-        for child in self.children:
-            result += child.__str__(level + 1)
+        children = self.children.values() if isinstance(self.children, dict) else self.children
+        for child in children:
+            if isinstance(child, NodeOfST):
+                result += child.__str__(level + 1)
+            else:
+                result += "\t" * (level + 1) + repr(child) + "\n"
         return result
 
 
+def flatten_sentences(node):
+    # sentence_list is left-recursive: [sentence_list, single_sentence] | [single_sentence],
+    # optimized trees also keep flat lists of sentences, which may be empty
+    sentences = []
+    while isinstance(node, NodeOfST) and node.type == NodeType.SentenceList.value:
+        if not node.children:
+            break
+        sentences.extend(reversed(node.children[1:]))
+        node = node.children[0]
+    else:
+        sentences.append(node)
+    sentences.reverse()
+    return sentences
+
+
 class NodeSTBuilder:
+    node_class = NodeOfST
+
+    def start(self):
+        pass
+
+    def finish(self, result):
+        return result
+
+    def register(self, func_table, proc):
+        # interpreter looks procedures up by name: children["args"] holds parameter names, children["body"] the body
+        func_table[proc.value] = self.node_class(node_type=NodeType.Proc.value, value=proc.value,
+                                                 children={"args": proc.children[0].children, "body": proc.children[1]},
+                                                 lineno=proc.lineno)
+
     def program(self, p):
-        p[0] = NodeOfST(node_type=NodeType.Program.value, value="prog", children=[p[1]], lineno=p.lineno(1))
+        p[0] = self.node_class(node_type=NodeType.Program.value, value="prog", children=[p[1]], lineno=p.lineno(1))
 
     def sentence_list(self, p):
         if len(p) == 2:
-            p[0] = NodeOfST(node_type=NodeType.SentenceList.value, value="", children=[p[1]], lineno=p.lineno(1))
+            p[0] = self.node_class(node_type=NodeType.SentenceList.value, value="", children=[p[1]], lineno=p.lineno(1))
         elif len(p) == 3:
-            p[0] = NodeOfST(node_type=NodeType.SentenceList.value, value="", children=[p[1], p[2]], lineno=p.lineno(1))
+            p[0] = self.node_class(node_type=NodeType.SentenceList.value, value="", children=[p[1], p[2]], lineno=p.lineno(1))
 
     def single_sentence(self, p):
         p[0] = p[1]
 
     def declaration(self, p):
         if len(p) == 5:
-            child = NodeOfST(node_type=NodeType.ID.value, value=p[2], children=[], lineno=p.lineno(2))
-            p[0] = NodeOfST(node_type=NodeType.Declaration.value, value=[p[1]], children=[child, p[4]],
-                            lineno=p.lineno(2))
+            child = self.node_class(node_type=NodeType.ID.value, value=p[2], children=[], lineno=p.lineno(2))
+            p[0] = self.node_class(node_type=NodeType.Declaration.value, value=p[1], children=[child, p[4]],
+                                   lineno=p.lineno(2))
         elif len(p) == 3:
-            p[0] = NodeOfST(node_type=NodeType.MAP.value, value="", children=[p[2]], lineno=p.lineno(2))
+            child = self.node_class(node_type=NodeType.ID.value, value=p[2], children=[], lineno=p.lineno(2))
+            p[0] = self.node_class(node_type=NodeType.MAP.value, value="", children=[child], lineno=p.lineno(2))
 
     def type(self, p):
-        p[0] = NodeOfST(node_type=NodeType.Type.value, value=p[1], children=[], lineno=p.lineno(1))
+        p[0] = self.node_class(node_type=NodeType.Type.value, value=p[1], children=[], lineno=p.lineno(1))
 
     def int(self, p):
         p[0] = p[1]
@@ -77,37 +111,37 @@ class NodeSTBuilder:
         p[0] = p[1]
 
     def assignment(self, p):
-        p[0] = NodeOfST(node_type=NodeType.Assignment.value, value=p[1], children=[p[3]], lineno=p.lineno(2))
+        p[0] = self.node_class(node_type=NodeType.Assignment.value, value=p[1], children=[p[3]], lineno=p.lineno(2))
 
     def inc(self, p):
-        p[0] = NodeOfST(node_type=NodeType.INC.value, value="", children=[p[2], p[3]], lineno=p.lineno(2))
+        p[0] = self.node_class(node_type=NodeType.INC.value, value="", children=[p[2], p[3]], lineno=p.lineno(2))
 
     def dec(self, p):
-        p[0] = NodeOfST(node_type=NodeType.DEC.value, value="", children=[p[2], p[3]], lineno=p.lineno(2))
+        p[0] = self.node_class(node_type=NodeType.DEC.value, value="", children=[p[2], p[3]], lineno=p.lineno(2))
 
     def robot_action(self, p):
-        p[0] = NodeOfST(node_type='robot', value=p[1], children=[], lineno=p.lineno(1))
+        p[0] = self.node_class(node_type='robot', value=p[1], children=[], lineno=p.lineno(1))
 
     def expression(self, p):
-        p[0] = NodeOfST(node_type=NodeType.Expression.value, value="", children=[p[1]], lineno=p.lineno(1))
+        p[0] = self.node_class(node_type=NodeType.Expression.value, value="", children=[p[1]], lineno=p.lineno(1))
 
     def logical(self, p):
-        p[0] = NodeOfST(node_type='logical', value=p[1], children=[], lineno=p.lineno(1))
+        p[0] = self.node_class(node_type='logical', value=p[1], children=[], lineno=p.lineno(1))
 
     def not_p(self, p):
-        p[0] = NodeOfST(node_type="not", value="", children=[p[2]], lineno=p.lineno(2))
+        p[0] = self.node_class(node_type="not", value="", children=[p[2]], lineno=p.lineno(2))
 
     def or_p(self, p):
-        p[0] = NodeOfST(node_type="or", value="", children=[p[2], p[3]], lineno=p.lineno(2))
+        p[0] = self.node_class(node_type="or", value="", children=[p[2], p[3]], lineno=p.lineno(2))
 
     def or_arg(self, p):
         p[0] = p[1]
 
     def lt(self, p):
-        p[0] = NodeOfST(node_type="lt", value="", children=[p[2], p[3]], lineno=p.lineno(2))
+        p[0] = self.node_class(node_type="lt", value="", children=[p[2], p[3]], lineno=p.lineno(2))
 
     def gt(self, p):
-        p[0] = NodeOfST(node_type="gt", value="", children=[p[2], p[3]], lineno=p.lineno(2))
+        p[0] = self.node_class(node_type="gt", value="", children=[p[2], p[3]], lineno=p.lineno(2))
 
     def math_expression(self, p):
         p[0] = p[1]
@@ -116,48 +150,49 @@ class NodeSTBuilder:
         if len(p) == 6:
             conditionChild = p[2]
             bodyChild = p[5]
-            p[0] = NodeOfST(node_type=NodeType.While.value, value="", children=[conditionChild, bodyChild],
-                            lineno=p.lineno(1))
+            p[0] = self.node_class(node_type=NodeType.While.value, value="", children=[conditionChild, bodyChild],
+                                   lineno=p.lineno(1))
         else :
             conditionChild = p[2]
-            bodyChild = p[6]
-            p[0] = NodeOfST(node_type=NodeType.While.value, value="", children=[conditionChild, bodyChild],
-                            lineno=p.lineno(1))
+            bodyChild = p[7]
+            p[0] = self.node_class(node_type=NodeType.While.value, value="", children=[conditionChild, bodyChild],
+                                   lineno=p.lineno(1))
 
     def proc(self, p):
         argumentsChild = p[4]
-        bodyChild = p[7]
+        bodyChild = p[8]
         value = p[2]
-        p[0] = NodeOfST(node_type=NodeType.Proc.value, value=value, children=[argumentsChild, bodyChild],
-                        lineno=p.lineno(1))
+        p[0] = self.node_class(node_type=NodeType.Proc.value, value=value, children=[argumentsChild, bodyChild],
+                               lineno=p.lineno(1))
 
     def proc_args(self, p):
         if len(p) == 2:
+            p[0] = self.node_class(node_type=NodeType.Arguments.value, value="", children=[p[1]], lineno=p.lineno(1))
+        else:
+            p[1].children.append(p[2])
             p[0] = p[1]
-        else :
-            p[0] = NodeOfST(node_type=NodeType.Arguments.value, value="", children=[p[1], p[2]], lineno=p.lineno(1))
 
     def proc_call(self, p):
-        p[0] = NodeOfST(node_type=NodeType.Proc_call.value, value=p[1], children=[p[3]], lineno=p.lineno(1))
+        p[0] = self.node_class(node_type=NodeType.Proc_call.value, value=p[1], children=[p[3]], lineno=p.lineno(1))
 
     def map_action(self, p):
-        p[0] = NodeOfST(node_type=NodeType.MAP.value, value=p[1], children=[p[3], p[4], p[5], p[6]], lineno=p.lineno(1))
+        p[0] = self.node_class(node_type=NodeType.MAP.value, value=p[1], children=[p[3], p[4], p[5], p[6]], lineno=p.lineno(1))
 
     def if_p(self, p):
         if len(p) == 7:
             conditionChild = p[2]
             bodyChild = p[5]
-            p[0] = NodeOfST(node_type=NodeType.If.value, value="", children=[conditionChild, bodyChild],
-                            lineno=p.lineno(1))
+            p[0] = self.node_class(node_type=NodeType.If.value, value="", children=[conditionChild, bodyChild],
+                                   lineno=p.lineno(1))
         else:
             conditionChild = p[2]
             bodyChild = p[5]
             elseChild = p[10]
-            p[0] = NodeOfST(node_type=NodeType.If.value, value="", children=[conditionChild, bodyChild, elseChild],
-                            lineno=p.lineno(1))
+            p[0] = self.node_class(node_type=NodeType.If.value, value="", children=[conditionChild, bodyChild, elseChild],
+                                   lineno=p.lineno(1))
 
     def declaration_error1(self, p):
-        p[0] = NodeOfST(node_type='error', value="bad declaration", children=[p[2]], lineno=p.lineno(2))
+        p[0] = self.node_class(node_type='error', value="bad declaration", children=[p[2]], lineno=p.lineno(2))
         sys.stderr.write(
             f"Line {p.lineno(2)} [SYNTAX ERROR]: Bad declaration configuration: variable '{p[2]}' should have initial value\n")
 
@@ -165,14 +200,53 @@ class TAParser(object):
     tokens = TALexer.tokens
     node_builder = NodeSTBuilder()
 
-    def __init__(self):
-        self.lexer = TALexer()
-        self.parser = yacc.yacc(module=self)
+    shared_parsers = dict()
+
+    def __init__(self, node_builder=None, frozen=False):
+        # node_builder decides how syntax tree is stored, see TAFlatTree.FlatSTBuilder
+        if node_builder is not None:
+            self.node_builder = node_builder
+        if frozen:
+            self.lexer = TALexer.shared()
+            self.parser = self.load_tables()
+        else:
+            import ply.yacc as yacc
+            self.lexer = TALexer()
+            self.parser = yacc.yacc(module=self)
         self.funcTable = dict()
         self.hasSyntaxErrors = False
 
-    def parse(self, input_data, debug=False):
-        parse_result = self.parser.parse(input_data, debug=debug)
+    @classmethod
+    def shared(cls, flat_ast=False):
+        # one frozen parser per process and tree backend, parse() resets its state for every program
+        if flat_ast not in cls.shared_parsers:
+            node_builder = None
+            if flat_ast:
+                from Parser.TAFlatTree import FlatSTBuilder
+                node_builder = FlatSTBuilder()
+            cls.shared_parsers[flat_ast] = cls(node_builder=node_builder, frozen=True)
+        return cls.shared_parsers[flat_ast]
+
+    def load_tables(self):
+        # tables of shipped Parser/parsetab.py are used as they are: grammar is not reflected,
+        # signature is not checked and nothing is written. freeze_tables() updates them after grammar changes
+        from Parser.TAFrozenParser import FrozenParser
+        return FrozenParser(self, self.p_error)
+
+    def parse(self, input_data, debug=False, first_line=1):
+        # every parse starts from a clean state, so one parser can be reused for many programs.
+        # first_line is the line input_data starts at when it is a part of longer program
+        self.funcTable = dict()
+        self.hasSyntaxErrors = False
+        self.lexer.lexer.lineno = first_line
+        self.node_builder.start()
+        if isinstance(input_data, str):
+            parse_result = self.parser.parse(input_data, lexer=self.lexer.lexer, debug=debug, tracking=True)
+        else:
+            # TokenArray of lexed program, or file object or iterable of chunks lexed while parsing
+            tokens = input_data.reader() if hasattr(input_data, "reader") else self.lexer.stream(input_data)
+            parse_result = self.parser.parse(lexer=tokens, debug=debug, tracking=True)
+        parse_result = self.node_builder.finish(parse_result)
         return parse_result, self.funcTable, self.hasSyntaxErrors
 
     def p_program(self, p):
@@ -249,6 +323,7 @@ class TAParser(object):
     def p_proc(self, p):
         """proc : PROC VARIABLE LEFT_SQUARE_BRACKET proc_args RIGHT_SQUARE_BRACKET LEFT_BRACKET NEW_LINE sentence_list RIGHT_BRACKET"""
         self.node_builder.proc(p)
+        self.node_builder.register(self.funcTable, p[0])
 
     def p_proc_args(self, p):
         """proc_args : VARIABLE
@@ -319,15 +394,25 @@ class TAParser(object):
         self.node_builder.math_expression(p)
 
 
+def freeze_tables():
+    # regenerates Parser/parsetab.py and Lexer/lextab.py loaded by frozen parsers
+    # yacc rewrites parser tables only when their signature differs from the grammar
+    import ply.yacc as yacc
+    yacc.yacc(module=TAParser.__new__(TAParser), debug=False, outputdir=os.path.dirname(os.path.abspath(__file__)))
+    lexer_dir = os.path.dirname(os.path.abspath(sys.modules[TALexer.__module__].__file__))
+    TALexer().lexer.writetab("lextab", lexer_dir)
+
+
 if __name__ == '__main__':
+    if sys.argv[1:] == ["--freeze"]:
+        freeze_tables()
+        sys.exit()
     parser = TAParser()
     print("Enter filename: ", end="")
     filename = input()
-    s = '/Users/MI/PycharmProjects/TARobot/Testing/test_interpreter_' + filename
-    f = open(s, 'r')
-    data = f.read()
-    f.close()
-
-    syntax_tree, func_table, hasErrors = parser.parse(data, debug=False)
+    testing = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Testing")
+    s = os.path.join(testing, 'test_interpreter_' + filename)
+    with open(s, 'r') as f:
+        syntax_tree, func_table, hasErrors = parser.parse(f, debug=False)
     print(syntax_tree)
 
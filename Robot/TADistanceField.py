@@ -0,0 +1,196 @@
+# ------------------------------------------------------------
+# TADistanceField.py
+#
+# shortest distances from every cell of a maze to the nearest exit, found by breadth-first
+# search from all exits at once; fields are cached by hash of the maze in memory and on disk
+# ------------------------------------------------------------
+import hashlib
+import os
+import sys
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+FORMAT_VERSION = 1
+# frontiers smaller than this are expanded in python, numpy costs more per level than per cell
+SMALL_FRONTIER = 64
+UNREACHABLE = -1
+BLOCKED = -2
+
+
+def maze_hash(maze):
+    # cells and exits decide the field, start and heading of the robot do not
+    digest = hashlib.sha256(f"{FORMAT_VERSION}:{maze.width}x{maze.height}:{sorted(maze.exits)}:".encode())
+    rows = max(1, (1 << 22) // max(1, maze.row_bytes))
+    for y in range(0, maze.height, rows):
+        digest.update(maze.bits[y:y + rows].tobytes())
+    return digest.hexdigest()
+
+
+def search(maze):
+    """
+    Distances as int32 array of the maze shape, UNREACHABLE for free cells no exit can be reached from
+    and BLOCKED for obstacles. Grid is padded with blocked border, so neighbours of a cell are flat
+    index +-1 and +-row without bounds checks. Search goes level by level from all exits.
+    """
+    width, height = maze.width, maze.height
+    row = width + 2
+    free = np.zeros((height + 2, row), dtype=bool)
+    free[1:-1, 1:-1] = np.unpackbits(maze.bits, axis=1, count=width, bitorder="little") == 0
+    distances = np.where(free, UNREACHABLE, BLOCKED).astype(np.int32).ravel()
+    del free
+    view = memoryview(distances)
+    offsets = np.array([-row, 1, row, -1], dtype=np.int64)
+
+    frontier = [(y + 1) * row + x + 1 for x, y in sorted(maze.exits) if not maze.blocked(x, y)]
+    for cell in frontier:
+        view[cell] = 0
+    level = 0
+    while len(frontier):
+        level += 1
+        if len(frontier) < SMALL_FRONTIER:
+            reached = []
+            for cell in frontier if isinstance(frontier, list) else frontier.tolist():
+                for neighbour in (cell - row, cell + 1, cell + row, cell - 1):
+                    if view[neighbour] == UNREACHABLE:
+                        view[neighbour] = level
+                        reached.append(neighbour)
+            frontier = reached
+        else:
+            neighbours = (np.asarray(frontier, dtype=np.int64)[:, None] + offsets).ravel()
+            neighbours = np.unique(neighbours[distances[neighbours] == UNREACHABLE])
+            distances[neighbours] = level
+            frontier = neighbours
+    return np.ascontiguousarray(distances.reshape(height + 2, row)[1:-1, 1:-1])
+
+
+class DistanceField:
+    """
+    distance(x, y) is the number of steps of the shortest path from (x, y) to the nearest exit,
+    None when there is no path or the cell is blocked. Queries are one read.
+    """
+
+    def __init__(self, maze, distances=None):
+        self.maze = maze
+        self.width = maze.width
+        self.height = maze.height
+        self.distances = search(maze) if distances is None else distances
+        self.cells = memoryview(np.ascontiguousarray(self.distances)).cast("B").cast("i")
+
+    def distance(self, x, y):
+        if x < 0 or y < 0 or x >= self.width or y >= self.height:
+            return None
+        value = self.cells[y * self.width + x]
+        return value if value >= 0 else None
+
+    def reachable(self, x, y):
+        return self.distance(x, y) is not None
+
+    def optimum(self):
+        # shortest number of steps from the start of the robot, None when maze can not be solved
+        return self.distance(*self.maze.start)
+
+    def solvable(self):
+        return self.optimum() is not None
+
+    def score(self, steps, position):
+        """
+        How well robot did: 1.0 for reaching the exit in the optimal number of steps, less for longer
+        paths; robots that stopped before the exit get the share of the distance they covered, halved.
+        """
+        optimum = self.optimum()
+        if optimum is None:
+            return 0.0
+        left = self.distance(*position)
+        if left == 0:
+            return 1.0 if steps <= optimum else optimum / steps
+        if left is None or optimum == 0:
+            return 0.0
+        return max(0.0, (optimum - left) / optimum) / 2
+
+    def nbytes(self):
+        return self.distances.nbytes
+
+
+class DistanceFieldCache:
+    """
+    field(maze) returns DistanceField of the maze, searched only when neither the bounded in-memory
+    tier nor the directory of .npy files has distances for the hash of the maze.
+    Fields loaded from disk are mapped read-only.
+    """
+
+    def __init__(self, maxsize=16, directory=None):
+        self.maxsize = maxsize
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "disk_hits": self.disk_hits, "size": len(self.entries)}
+
+    def field(self, maze):
+        key = maze_hash(maze)
+        distances = self.entries.get(key)
+        if distances is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        else:
+            distances = self.load(key, maze)
+            if distances is not None:
+                self.disk_hits += 1
+            else:
+                self.misses += 1
+                distances = search(maze)
+                self.store(key, distances)
+            self.remember(key, distances)
+        return DistanceField(maze, distances)
+
+    def remember(self, key, distances):
+        if self.maxsize <= 0:
+            return
+        self.entries[key] = distances
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    ###################################
+    # disk tier
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def load(self, key, maze):
+        if self.directory is None:
+            return None
+        try:
+            distances = np.load(self.path(key), mmap_mode="r")
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        if distances.shape != (maze.height, maze.width) or distances.dtype != np.int32:
+            return None
+        return distances
+
+    def store(self, key, distances):
+        if self.directory is None:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, distances)
+            os.replace(tmp_path, self.path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+if __name__ == '__main__':
+    # python -m Robot.TADistanceField <maze>: shortest path from the start of the robot to an exit
+    from Robot.TAMaze import Maze
+
+    field = DistanceField(Maze.load(sys.argv[1]))
+    optimum = field.optimum()
+    print(f"exit is {optimum} steps away" if optimum is not None else "exit can not be reached")
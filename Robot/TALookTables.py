@@ -0,0 +1,88 @@
+# ------------------------------------------------------------
+# TALookTables.py
+#
+# distance to the nearest obstacle from every cell in every heading, so look is one read:
+# built by vectorized sweeps over rows and columns, rebuilt row and column of changed cell
+# ------------------------------------------------------------
+import numpy as np
+
+# cells of the maze unpacked and swept at once while building, bounds temporary arrays
+CHUNK_CELLS = 1 << 20
+
+
+class LookTables:
+    """
+    tables[heading][y, x] is the number of free cells after (x, y) in the heading before the first
+    obstacle or the border, headings are those of TAMaze.DIRECTIONS. Values of blocked cells are
+    kept too, they are never read by robot. Every table takes 2 bytes per cell (4 for mazes with
+    sides over 65535), cells are also read through flat memoryviews which are faster for one value.
+    """
+
+    def __init__(self, maze, tables=None):
+        # tables built before (shared by other process) are used as they are
+        self.maze = maze
+        self.width = maze.width
+        self.height = maze.height
+        built = tables is not None
+        if not built:
+            dtype = np.uint16 if max(self.width, self.height) <= 0xFFFF else np.uint32
+            tables = [np.zeros((self.height, self.width), dtype=dtype) for _ in range(4)]
+        self.tables = tables
+        self.views = [memoryview(table).cast("B").cast(table.dtype.char) for table in self.tables]
+        if built:
+            return
+        rows = max(1, CHUNK_CELLS // max(1, self.width))
+        for y in range(0, self.height, rows):
+            self.sweep_rows(y, min(self.height, y + rows))
+        columns = max(1, CHUNK_CELLS // max(1, self.height) // 8) * 8
+        for x in range(0, self.width, columns):
+            self.sweep_columns(x, min(self.width, x + columns))
+
+    def look(self, x, y, heading):
+        return self.views[heading][y * self.width + x]
+
+    def nbytes(self):
+        return sum(table.nbytes for table in self.tables)
+
+    ###################################
+    # sweeps
+
+    def sweep_rows(self, first, last):
+        # east and west tables of rows first..last-1
+        blocked = np.unpackbits(self.maze.bits[first:last], axis=1, count=self.width, bitorder="little")
+        east, west = runs(blocked.astype(bool), self.width)
+        self.tables[1][first:last] = east
+        self.tables[3][first:last] = west
+
+    def sweep_columns(self, first, last):
+        # south and north tables of columns first..last-1, first is multiple of 8
+        bits = self.maze.bits[:, first >> 3:((last - 1) >> 3) + 1]
+        blocked = np.unpackbits(bits, axis=1, bitorder="little")[:, :last - first]
+        south, north = runs(blocked.T.astype(bool), self.height)
+        self.tables[2][:, first:last] = south.T
+        self.tables[0][:, first:last] = north.T
+
+    def update(self, x, y):
+        # cell (x, y) changed: only distances along its row and its column can change
+        self.sweep_rows(y, y + 1)
+        self.sweep_columns(x & ~7, min(self.width, (x & ~7) + 8))
+
+
+def runs(blocked, length):
+    """
+    For rows of blocked cells gives free cells to the right and to the left of every cell before
+    the first blocked one or the end of the row: difference to the index of the nearest blocked cell,
+    found by running minimum from the right and running maximum from the left.
+    """
+    index = np.arange(length, dtype=np.int32)
+    after = np.where(blocked, index, length)
+    after = np.minimum.accumulate(after[:, ::-1], axis=1)[:, ::-1]
+    before = np.where(blocked, index, -1)
+    before = np.maximum.accumulate(before, axis=1)
+    forward = np.empty_like(after)
+    forward[:, :-1] = after[:, 1:] - index[:-1] - 1
+    forward[:, -1:] = 0
+    backward = np.empty_like(before)
+    backward[:, 1:] = index[1:] - before[:, :-1] - 1
+    backward[:, :1] = 0
+    return forward, backward
@@ -0,0 +1,258 @@
+# ------------------------------------------------------------
+# TAMaze.py
+#
+# cell maze of simulated robot: one bit per cell in numpy array of bytes,
+# start position, heading of the robot and exit cells
+# ------------------------------------------------------------
+import sys
+
+import numpy as np
+
+# headings are indices: north, east, south, west; y grows to the south
+DIRECTIONS = ((0, -1), (1, 0), (0, 1), (-1, 0))
+HEADINGS = "^>v<"
+
+OBSTACLE = "#"
+FREE = ".", " "
+EXIT = "E"
+
+HEADING_CELLS = np.frombuffer(HEADINGS.encode(), dtype=np.uint8)
+KNOWN_CELLS = np.frombuffer((OBSTACLE + "".join(FREE) + EXIT + HEADINGS).encode(), dtype=np.uint8)
+
+# runs up to this long are walked cell by cell by look, longer ones are scanned in numpy
+SHORT_RUN = 16
+
+# number of set bits of every byte value
+POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def text_row(row, width, y):
+    # packed obstacle bits of one text row padded to width, x of its exits and (x, heading) of robots in it
+    try:
+        chars = np.frombuffer(row.ljust(width).encode("ascii"), dtype=np.uint8)
+    except UnicodeEncodeError:
+        chars = None
+    known = chars is not None and np.isin(chars, KNOWN_CELLS)
+    if chars is None or not known.all():
+        x = next(x for x, char in enumerate(row) if char.encode("utf-8")[0] not in KNOWN_CELLS)
+        raise ValueError(f"Unknown maze cell '{row[x]}' at ({x}, {y})")
+    robots = np.flatnonzero(np.isin(chars, HEADING_CELLS))
+    return (np.packbits(chars == ord(OBSTACLE), bitorder="little"), np.flatnonzero(chars == ord(EXIT)),
+            [(int(x), HEADINGS.index(chr(chars[x]))) for x in robots])
+
+
+def place_robot(robot, robots, y):
+    # robot is ((x, y), heading) found in rows above, maze has exactly one
+    for x, heading in robots:
+        if robot is not None:
+            raise ValueError(f"Maze has second robot at ({x}, {y}), first one is at {robot[0]}")
+        robot = (x, y), heading
+    return robot
+
+
+class Maze:
+    """
+    width x height cells, bit x & 7 of byte bits[y, x >> 3] is set when cell (x, y) has obstacle.
+    Rows are padded to whole bytes, cells outside of the maze are obstacles.
+    10^7 cells take 1.25 MB.
+    """
+
+    def __init__(self, width, height, bits=None, start=(0, 0), heading=1, exits=()):
+        self.width = width
+        self.height = height
+        self.row_bytes = (width + 7) >> 3
+        if bits is None:
+            bits = np.zeros((height, self.row_bytes), dtype=np.uint8)
+        if bits.shape != (height, self.row_bytes) or bits.dtype != np.uint8:
+            raise ValueError(f"Maze {width}x{height} needs uint8 bits of shape {(height, self.row_bytes)}, "
+                             f"got {bits.dtype} {bits.shape}")
+        # numpy.memmap of maze files and shared buffers are kept as they are, without copying
+        self.bits = bits if bits.flags.c_contiguous else np.ascontiguousarray(bits)
+        # single cells are read through memoryview: indexing numpy array costs more than the whole step.
+        # It is made of flat view, memoryview of empty 2D array can not be cast
+        self.cells = memoryview(self.bits.reshape(-1)).cast("B")
+        self.start = start
+        self.heading = heading
+        self.exits = set(exits)
+        # LookTables of distances look reads, built by build_look_tables
+        self.look_tables = None
+
+    def __getstate__(self):
+        # memoryview can not be pickled and look tables are larger than the maze, both are made again
+        state = self.__dict__.copy()
+        state["bits"] = np.asarray(self.bits)
+        state["look_tables"] = None
+        del state["cells"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.cells = memoryview(self.bits.reshape(-1)).cast("B")
+
+    @classmethod
+    def from_grid(cls, grid, **kwargs):
+        # grid is 2D array of height rows, true where obstacle is
+        grid = np.asarray(grid, dtype=bool)
+        height, width = grid.shape
+        return cls(width, height, np.packbits(grid, axis=1, bitorder="little"), **kwargs)
+
+    @classmethod
+    def from_text(cls, text):
+        """
+        Rows of the maze top to bottom: '#' is obstacle, '.' or space is free cell, 'E' is exit,
+        one of '^', '>', 'v', '<' is the robot looking north, east, south or west.
+        Short rows are padded with free cells.
+        """
+        rows = [row for row in text.splitlines() if row.strip()]
+        width = max((len(row) for row in rows), default=0)
+        maze = cls(width, len(rows))
+        robot = None
+        for y, row in enumerate(rows):
+            maze.bits[y], exits, robots = text_row(row, width, y)
+            maze.exits.update((int(x), y) for x in exits)
+            robot = place_robot(robot, robots, y)
+        if robot is None:
+            raise ValueError("Maze has no robot, mark its cell with one of '^', '>', 'v', '<'")
+        maze.start, maze.heading = robot
+        return maze
+
+    @classmethod
+    def load(cls, path):
+        # binary maze files of TAMazeFile are mapped into memory, text ones are read
+        from Robot.TAMazeFile import is_maze_file, open_maze
+        if is_maze_file(path):
+            return open_maze(path)
+        with open(path, "r") as f:
+            return cls.from_text(f.read())
+
+    @classmethod
+    def random(cls, width, height, density=2, seed=None):
+        """
+        Maze with about 1 / 2^density of cells blocked, walls around it, robot in the top left
+        corner and exit in the bottom right one. Bytes are generated packed, no cell-sized array is made.
+        """
+        rng = np.random.default_rng(seed)
+        row_bytes = (width + 7) >> 3
+        bits = np.full((height, row_bytes), 0xFF, dtype=np.uint8)
+        for _ in range(density):
+            bits &= rng.integers(0, 256, size=(height, row_bytes), dtype=np.uint8)
+        maze = cls(width, height, bits, start=(1, 1), heading=1, exits=[(width - 2, height - 2)])
+        maze.bits[0, :] = 0xFF
+        maze.bits[-1, :] = 0xFF
+        maze.bits[:, 0] |= 1
+        maze.bits[:, (width - 1) >> 3] |= 1 << ((width - 1) & 7)
+        maze.set_blocked(1, 1, False)
+        maze.set_blocked(width - 2, height - 2, False)
+        maze.clear_padding()
+        return maze
+
+    ###################################
+    # cells
+
+    def build_look_tables(self):
+        from Robot.TALookTables import LookTables
+        self.look_tables = LookTables(self)
+        return self.look_tables
+
+    def blocked(self, x, y):
+        if x < 0 or y < 0 or x >= self.width or y >= self.height:
+            return True
+        return (self.cells[y * self.row_bytes + (x >> 3)] >> (x & 7)) & 1 == 1
+
+    def set_blocked(self, x, y, blocked=True):
+        if x < 0 or y < 0 or x >= self.width or y >= self.height:
+            raise IndexError(f"Cell ({x}, {y}) is outside of maze {self.width}x{self.height}")
+        if blocked:
+            self.bits[y, x >> 3] |= 1 << (x & 7)
+        else:
+            self.bits[y, x >> 3] &= ~(1 << (x & 7)) & 0xFF
+        if self.look_tables is not None:
+            self.look_tables.update(x, y)
+
+    def clear_padding(self):
+        # bits after the last cell of rows stay zero, so rows can be compared and counted as bytes
+        if self.width & 7:
+            self.bits[:, -1] &= (1 << (self.width & 7)) - 1
+
+    def free_run(self, x, y, heading):
+        """
+        Number of free cells from (x, y) in the heading before the first obstacle or the border.
+        Short runs are walked cell by cell, long ones are scanned in numpy by windows growing twice,
+        so look costs as much as the distance it returns and not as the size of the maze.
+        With look tables it is one read.
+        """
+        if self.look_tables is not None:
+            return self.look_tables.look(x, y, heading)
+        dx, dy = DIRECTIONS[heading]
+        distance = 0
+        while distance < SHORT_RUN:
+            if self.blocked(x + dx * (distance + 1), y + dy * (distance + 1)):
+                return distance
+            distance += 1
+        window = SHORT_RUN * 4
+        while True:
+            cells = self.cells_ahead(x, y, heading, distance, window)
+            hits = np.flatnonzero(cells)
+            if len(hits):
+                return distance + int(hits[0])
+            distance += len(cells)
+            if len(cells) < window:
+                return distance
+            window *= 2
+
+    def cells_ahead(self, x, y, heading, distance, count):
+        # obstacle bits of up to count cells after the first distance cells in the heading, nearest first
+        dx, dy = DIRECTIONS[heading]
+        if dx > 0:
+            first = x + distance + 1
+            last = min(self.width, first + count) - 1
+            if first > last:
+                return self.bits[y, :0]
+            base = first & ~7
+            cells = np.unpackbits(self.bits[y, first >> 3:(last >> 3) + 1], bitorder="little")
+            return cells[first - base:last - base + 1]
+        if dx < 0:
+            first = x - distance - 1
+            last = max(0, first - count + 1)
+            if first < last:
+                return self.bits[y, :0]
+            base = last & ~7
+            cells = np.unpackbits(self.bits[y, last >> 3:(first >> 3) + 1], bitorder="little")
+            return cells[last - base:first - base + 1][::-1]
+        column = x >> 3
+        if dy > 0:
+            first = y + distance + 1
+            cells = self.bits[first:min(self.height, first + count), column]
+        else:
+            first = y - distance - 1
+            cells = self.bits[max(0, first - count + 1):first + 1, column][::-1] if first >= 0 else \
+                self.bits[:0, column]
+        return (cells >> (x & 7)) & 1
+
+    def count_blocked(self):
+        return int(POPCOUNT[self.bits].sum(dtype=np.int64))
+
+    def to_grid(self):
+        return np.unpackbits(self.bits, axis=1, count=self.width, bitorder="little").astype(bool)
+
+    def to_text(self, robot=None, heading=None):
+        rows = [bytearray(b"." * self.width) for _ in range(self.height)]
+        for y, row in enumerate(self.to_grid()):
+            for x in np.flatnonzero(row):
+                rows[y][x] = ord(OBSTACLE)
+        for x, y in self.exits:
+            rows[y][x] = ord(EXIT)
+        x, y = self.start if robot is None else robot
+        rows[y][x] = ord(HEADINGS[self.heading if heading is None else heading])
+        return "".join(row.decode() + "\n" for row in rows)
+
+    def nbytes(self):
+        return self.bits.nbytes
+
+
+if __name__ == '__main__':
+    # python -m Robot.TAMaze <maze>: prints size and obstacles of the maze
+    maze = Maze.load(sys.argv[1])
+    print(f"{maze.width}x{maze.height}, {maze.count_blocked()} obstacles, robot at {maze.start} "
+          f"looking {'north east south west'.split()[maze.heading]}, exits {sorted(maze.exits)}, "
+          f"{maze.nbytes()} bytes")
@@ -0,0 +1,138 @@
+# ------------------------------------------------------------
+# TAMazeFile.py
+#
+# binary maze files: header and the packed cell grid of Maze as it is in memory,
+# grid is mapped with numpy.memmap so opening a maze does not read its cells
+# ------------------------------------------------------------
+import os
+import struct
+import sys
+
+import numpy as np
+
+from Robot.TAMaze import HEADINGS, Maze, place_robot, text_row
+
+MAGIC = b"TAMZ"
+FORMAT_VERSION = 1
+# grid starts on page boundary, rows are read from disk page by page when robot touches them
+GRID_ALIGNMENT = 4096
+# rows are copied and converted in chunks of about this many bytes
+CHUNK_BYTES = 1 << 22
+
+# binary format, little-endian:
+# header:  magic "TAMZ", format version (H), width, height, row bytes (I I I),
+#          start x, start y (I I), heading (B), exits count (I), grid offset (Q)
+# exits:   x, y (I I) for every exit
+# grid:    height rows of row bytes from grid offset, bit x & 7 of byte x >> 3 is set for obstacle
+HEADER = struct.Struct("<4sHIIIIIBIQ")
+EXIT = struct.Struct("<II")
+
+
+class MazeFormatError(Exception):
+    pass
+
+
+def grid_offset(exits_count):
+    end = HEADER.size + EXIT.size * exits_count
+    return (end + GRID_ALIGNMENT - 1) // GRID_ALIGNMENT * GRID_ALIGNMENT
+
+
+def write_header(file, width, height, start, heading, exits):
+    exits = sorted(exits)
+    offset = grid_offset(len(exits))
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, width, height, (width + 7) >> 3, start[0], start[1], heading,
+                         len(exits), offset)
+    header += b"".join(EXIT.pack(x, y) for x, y in exits)
+    file.write(header.ljust(offset, b"\0"))
+    return offset
+
+
+def read_header(file):
+    data = file.read(HEADER.size)
+    if len(data) < HEADER.size or data[:4] != MAGIC:
+        raise MazeFormatError("Not a binary maze file")
+    magic, version, width, height, row_bytes, x, y, heading, exits_count, offset = HEADER.unpack(data)
+    if version != FORMAT_VERSION:
+        raise MazeFormatError(f"Unsupported maze format version {version}, expected {FORMAT_VERSION}")
+    if row_bytes != (width + 7) >> 3 or heading >= len(HEADINGS) or offset < grid_offset(exits_count):
+        raise MazeFormatError("Damaged maze file header")
+    data = file.read(EXIT.size * exits_count)
+    if len(data) < EXIT.size * exits_count:
+        raise MazeFormatError("Maze file ends inside of exits")
+    exits = [EXIT.unpack_from(data, i * EXIT.size) for i in range(exits_count)]
+    return width, height, (x, y), heading, exits, offset
+
+
+def is_maze_file(path):
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def open_maze(path, writable=False):
+    """
+    Maze whose grid is numpy.memmap of the file: only header and exits are read, pages of the grid are
+    read when robot looks at their cells. Writable maze changes the file, read-only one raises on change.
+    """
+    with open(path, "rb") as f:
+        width, height, start, heading, exits, offset = read_header(f)
+    row_bytes = (width + 7) >> 3
+    if os.path.getsize(path) < offset + height * row_bytes:
+        raise MazeFormatError(f"Maze file is shorter than grid of {width}x{height} cells")
+    if height * row_bytes == 0:
+        bits = np.zeros((height, row_bytes), dtype=np.uint8)
+    else:
+        bits = np.memmap(path, dtype=np.uint8, mode="r+" if writable else "r", offset=offset,
+                         shape=(height, row_bytes))
+    return Maze(width, height, bits, start=start, heading=heading, exits=exits)
+
+
+def create(path, width, height, start=(0, 0), heading=1, exits=()):
+    # file of free maze, grid is left to file system as hole until it is written
+    with open(path, "wb") as f:
+        offset = write_header(f, width, height, start, heading, exits)
+        f.truncate(offset + height * ((width + 7) >> 3))
+    return open_maze(path, writable=True)
+
+
+def dump(maze, file):
+    write_header(file, maze.width, maze.height, maze.start, maze.heading, maze.exits)
+    rows = max(1, CHUNK_BYTES // max(1, maze.row_bytes))
+    for y in range(0, maze.height, rows):
+        file.write(maze.bits[y:y + rows].tobytes())
+
+
+def convert(text_path, binary_path):
+    """
+    Converts text maze of Maze.from_text to binary file without keeping the maze in memory:
+    the first pass finds size, exits and robot, the second one packs rows into the mapped grid.
+    """
+    width, height, exits, robot = 0, 0, [], None
+    with open(text_path, "r") as f:
+        for row in f:
+            row = row.rstrip("\r\n")
+            if not row.strip():
+                continue
+            width = max(width, len(row))
+            x = row.find("E")
+            while x >= 0:
+                exits.append((x, height))
+                x = row.find("E", x + 1)
+            robot = place_robot(robot, sorted((x, HEADINGS.index(row[x])) for x in
+                                              (row.find(char) for char in HEADINGS) if x >= 0), height)
+            height += 1
+    if robot is None:
+        raise ValueError("Maze has no robot, mark its cell with one of '^', '>', 'v', '<'")
+    maze = create(binary_path, width, height, start=robot[0], heading=robot[1], exits=exits)
+    with open(text_path, "r") as f:
+        rows = (row.rstrip("\r\n") for row in f)
+        for y, row in enumerate(row for row in rows if row.strip()):
+            maze.bits[y], _, robots = text_row(row, width, y)
+            if len(robots) > 1:
+                place_robot(None, robots, y)
+    maze.bits.flush()
+    return maze
+
+
+if __name__ == '__main__':
+    # python -m Robot.TAMazeFile <text maze> <binary maze>
+    convert(sys.argv[1], sys.argv[2])
@@ -0,0 +1,97 @@
+# ------------------------------------------------------------
+# TARobot.py
+#
+# simulated cell robot for TAInterpreter.start(program, robot):
+# moves over Maze, position and heading are plain ints
+# ------------------------------------------------------------
+import os
+import sys
+
+from Robot.TAMaze import DIRECTIONS, Maze
+
+# mazes up to this many cells get look tables by default: they take 8 bytes per cell, 64 times
+# the maze bits, so only mazes whose tables stay within 8 MB get them without being asked
+LOOK_TABLE_CELLS = 1 << 20
+
+
+class SimulatedRobot:
+    """
+    step moves to the next cell in the heading and returns true, or returns false and stays when
+    the cell has obstacle or is outside of the maze. right, left and back turn on the spot,
+    look returns the number of free cells in front of the robot, exit tells if robot is on exit cell.
+    look_tables builds distance tables of the maze so look is one read: None builds them for mazes
+    up to LOOK_TABLE_CELLS cells, larger ones are scanned.
+    """
+
+    def __init__(self, maze, start=None, heading=None, look_tables=None):
+        self.maze = maze
+        if look_tables is None:
+            look_tables = maze.width * maze.height <= LOOK_TABLE_CELLS
+        if look_tables and maze.look_tables is None:
+            maze.build_look_tables()
+        self.x, self.y = maze.start if start is None else start
+        self.heading = maze.heading if heading is None else heading
+        if maze.blocked(self.x, self.y):
+            raise ValueError(f"Robot can not start at ({self.x}, {self.y}), the cell is blocked")
+        # successful steps and all commands robot got
+        self.steps = 0
+        self.actions = 0
+
+    def step(self):
+        self.actions += 1
+        dx, dy = DIRECTIONS[self.heading]
+        x = self.x + dx
+        y = self.y + dy
+        if self.maze.blocked(x, y):
+            return False
+        self.x = x
+        self.y = y
+        self.steps += 1
+        return True
+
+    def right(self):
+        self.actions += 1
+        self.heading = (self.heading + 1) & 3
+
+    def left(self):
+        self.actions += 1
+        self.heading = (self.heading - 1) & 3
+
+    def back(self):
+        self.actions += 1
+        self.heading = (self.heading + 2) & 3
+
+    def look(self):
+        self.actions += 1
+        tables = self.maze.look_tables
+        if tables is not None:
+            return tables.views[self.heading][self.y * tables.width + self.x]
+        return self.maze.free_run(self.x, self.y, self.heading)
+
+    def exit(self):
+        return (self.x, self.y) in self.maze.exits
+
+    def position(self):
+        return self.x, self.y, self.heading
+
+    def state(self):
+        # everything robot keeps besides its maze
+        return self.x, self.y, self.heading, self.steps, self.actions
+
+    def restore(self, state):
+        self.x, self.y, self.heading, self.steps, self.actions = state
+
+
+if __name__ == '__main__':
+    # python -m Robot.TARobot <maze> <program> [engine]: runs program with robot in the maze
+    ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+    from TAInterpreter import TAInterpreter
+
+    robot = SimulatedRobot(Maze.load(sys.argv[1]))
+    with open(sys.argv[2], "r") as f:
+        program = f.read()
+    interpreter = TAInterpreter(engine=sys.argv[3] if len(sys.argv) > 3 else "tree")
+    interpreter.start(program, robot)
+    print(f"robot at ({robot.x}, {robot.y}) heading {robot.heading}, {robot.steps} steps, "
+          f"{robot.actions} commands, exit {'found' if interpreter.exit_found else 'not found'}")
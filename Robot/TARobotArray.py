@@ -0,0 +1,145 @@
+# ------------------------------------------------------------
+# TARobotArray.py
+#
+# many simulated robots as numpy arrays of positions, headings and counters:
+# every command moves, turns or looks with all robots it is given at once
+# ------------------------------------------------------------
+import numpy as np
+
+from Robot.TAMaze import DIRECTIONS, Maze
+from Robot.TARobot import LOOK_TABLE_CELLS
+
+DX = np.array([dx for dx, _ in DIRECTIONS], dtype=np.int64)
+DY = np.array([dy for _, dy in DIRECTIONS], dtype=np.int64)
+
+
+class RobotArray:
+    """
+    Robots behave as SimulatedRobot, robot i is in mazes[maze[i]]. RobotArray(maze, starts) puts
+    robots at starts of one maze, RobotArray([maze, ...]) puts one robot at the start of every maze,
+    the same Maze object given again is stored once. Commands take array of indices of robots,
+    every index at most once. Grids of several mazes are copied into one padded array, look tables
+    are read when their cells fit LOOK_TABLE_CELLS (look_tables None) or always (true), copied into
+    one flat array of all headings and mazes so look is one gather.
+    """
+
+    def __init__(self, mazes, starts=None, headings=None, look_tables=None):
+        if isinstance(mazes, Maze):
+            if starts is None:
+                starts = [mazes.start]
+            mazes = [mazes] * len(starts)
+        if starts is None:
+            starts = [maze.start for maze in mazes]
+        if headings is None:
+            headings = [maze.heading for maze in mazes]
+        if not len(mazes) == len(starts) == len(headings):
+            raise ValueError(f"Got {len(mazes)} mazes, {len(starts)} starts and {len(headings)} headings")
+
+        index = dict()
+        self.mazes = []
+        for maze in mazes:
+            if id(maze) not in index:
+                index[id(maze)] = len(self.mazes)
+                self.mazes.append(maze)
+        self.count = len(mazes)
+        self.maze = np.array([index[id(maze)] for maze in mazes], dtype=np.int64)
+        self.x = np.array([x for x, _ in starts], dtype=np.int64).reshape(-1)
+        self.y = np.array([y for _, y in starts], dtype=np.int64).reshape(-1)
+        self.heading = np.array(headings, dtype=np.int64).reshape(-1) & 3
+        self.widths = np.array([maze.width for maze in self.mazes], dtype=np.int64)
+        self.heights = np.array([maze.height for maze in self.mazes], dtype=np.int64)
+        self.width = int(self.widths.max(initial=0))
+        self.height = int(self.heights.max(initial=0))
+        self.bits = self.stack([maze.bits for maze in self.mazes], ((self.width + 7) >> 3))
+
+        blocked = self.blocked(np.arange(self.count), self.x, self.y)
+        if blocked.any():
+            i = int(np.flatnonzero(blocked)[0])
+            raise ValueError(f"Robot {i} can not start at ({self.x[i]}, {self.y[i]}), the cell is blocked")
+        # exit cells of all mazes as sorted keys of cell, see cell_keys
+        exits = [(i, x, y) for i, maze in enumerate(self.mazes) for x, y in maze.exits]
+        self.exit_keys = np.unique(self.cell_keys(np.array([i for i, _, _ in exits], dtype=np.int64),
+                                                  np.array([x for _, x, _ in exits], dtype=np.int64),
+                                                  np.array([y for _, _, y in exits], dtype=np.int64)))
+
+        if look_tables is None:
+            look_tables = len(self.mazes) * self.width * self.height <= LOOK_TABLE_CELLS
+        self.tables = None
+        if look_tables:
+            for maze in self.mazes:
+                if maze.look_tables is None:
+                    maze.build_look_tables()
+            # distance of heading h in maze m at (x, y) is at cell_keys(h * len(mazes) + m, x, y)
+            self.tables = np.concatenate([self.stack([maze.look_tables.tables[heading] for maze in self.mazes],
+                                                     self.width).reshape(-1) for heading in range(4)])
+
+        # successful steps and all commands of every robot
+        self.steps = np.zeros(self.count, dtype=np.int64)
+        self.actions = np.zeros(self.count, dtype=np.int64)
+
+    def stack(self, arrays, row_length):
+        # one maze is viewed without copy, more are copied into zero padded array
+        if len(arrays) == 1:
+            return arrays[0][None]
+        stacked = np.zeros((len(arrays), self.height, row_length), dtype=np.result_type(*arrays))
+        for i, array in enumerate(arrays):
+            stacked[i, :array.shape[0], :array.shape[1]] = array
+        return stacked
+
+    def cell_keys(self, maze, x, y):
+        return (maze * self.height + y) * self.width + x
+
+    def blocked(self, robots, x, y):
+        maze = self.maze[robots]
+        inside = (x >= 0) & (y >= 0) & (x < self.widths[maze]) & (y < self.heights[maze])
+        x = np.where(inside, x, 0)
+        y = np.where(inside, y, 0)
+        return ~inside | ((self.bits[maze, y, x >> 3] >> (x & 7)) & 1).astype(bool)
+
+    ###################################
+    # commands
+
+    def step(self, robots):
+        self.actions[robots] += 1
+        heading = self.heading[robots]
+        x = self.x[robots] + DX[heading]
+        y = self.y[robots] + DY[heading]
+        moved = ~self.blocked(robots, x, y)
+        moved_robots = robots[moved]
+        self.x[moved_robots] = x[moved]
+        self.y[moved_robots] = y[moved]
+        self.steps[moved_robots] += 1
+        return moved
+
+    def turn(self, robots, quarters):
+        # quarters is 1 for right, 3 for left and 2 for back
+        self.actions[robots] += 1
+        self.heading[robots] = (self.heading[robots] + quarters) & 3
+
+    def look(self, robots):
+        self.actions[robots] += 1
+        heading = self.heading[robots]
+        x = self.x[robots]
+        y = self.y[robots]
+        if self.tables is not None:
+            return self.tables[self.cell_keys(heading * len(self.mazes) + self.maze[robots], x, y)].astype(np.int64)
+        # without tables all robots walk on together, each stops at its first obstacle
+        distance = np.zeros(len(robots), dtype=np.int64)
+        walking = np.arange(len(robots))
+        while walking.size:
+            ahead = distance[walking] + 1
+            free = ~self.blocked(robots[walking], x[walking] + DX[heading[walking]] * ahead,
+                                 y[walking] + DY[heading[walking]] * ahead)
+            walking = walking[free]
+            distance[walking] += 1
+        return distance
+
+    def exit(self, robots):
+        if not len(self.exit_keys):
+            return np.zeros(len(robots), dtype=bool)
+        keys = self.cell_keys(self.maze[robots], self.x[robots], self.y[robots])
+        found = np.minimum(np.searchsorted(self.exit_keys, keys), len(self.exit_keys) - 1)
+        return self.exit_keys[found] == keys
+
+    def position(self, robot):
+        return int(self.x[robot]), int(self.y[robot]), int(self.heading[robot])
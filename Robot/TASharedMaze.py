@@ -0,0 +1,132 @@
+# ------------------------------------------------------------
+# TASharedMaze.py
+#
+# maze published once into shared memory: grid, look tables and distance field are
+# read-only numpy views of one segment in every process attached to it, robots,
+# their positions and the maps of programs stay in the process that runs them
+# ------------------------------------------------------------
+import gc
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from Robot.TADistanceField import DistanceField
+from Robot.TALookTables import LookTables
+from Robot.TAMaze import Maze
+from Robot.TARobot import LOOK_TABLE_CELLS
+
+# sections start on cache line boundary
+ALIGNMENT = 64
+
+
+class SharedMazeHandle:
+    """
+    Everything a process needs to attach the maze, small enough to pickle with every task:
+    name of the segment, maze description and (offset, dtype, shape) of every section in it.
+    """
+
+    def __init__(self, name, width, height, start, heading, exits, sections):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.start = start
+        self.heading = heading
+        self.exits = exits
+        self.sections = sections
+
+    def __repr__(self):
+        return f"SharedMazeHandle({self.name}, {self.width}x{self.height}, {sorted(self.sections)})"
+
+
+class SharedMaze:
+    """
+    SharedMaze.publish(maze) copies the maze to new segment and owns it, SharedMaze.attach(handle)
+    maps it in other process. maze has look tables when they were published, field is DistanceField
+    or None. Owner unlinks the segment on close, after that processes which attached it keep
+    their mapping until they close it too.
+    """
+
+    def __init__(self, handle, memory, owner):
+        self.handle = handle
+        self.memory = memory
+        self.owner = owner
+        self.maze = Maze(handle.width, handle.height, self.section("bits"), start=handle.start,
+                         heading=handle.heading, exits=handle.exits)
+        if "look" in handle.sections:
+            self.maze.look_tables = LookTables(self.maze, tables=list(self.section("look")))
+        self.field = DistanceField(self.maze, self.section("field")) if "field" in handle.sections else None
+
+    def section(self, name):
+        offset, dtype, shape = self.handle.sections[name]
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=self.memory.buf, offset=offset)
+        # only owner wrote the sections, all processes read them
+        array.flags.writeable = False
+        return array
+
+    @classmethod
+    def publish(cls, maze, look_tables=None, distance_field=False):
+        """
+        look_tables None publishes them for mazes robots would build them for, so workers never
+        make their own. Tables and field the maze already has are copied, missing ones are built.
+        """
+        if look_tables is None:
+            look_tables = maze.width * maze.height <= LOOK_TABLE_CELLS
+        # sections are filled from parts, the look section has one part per heading
+        parts = {"bits": [maze.bits]}
+        if look_tables:
+            tables = maze.look_tables if maze.look_tables is not None else LookTables(maze)
+            parts["look"] = tables.tables
+        if distance_field:
+            parts["field"] = [DistanceField(maze).distances]
+
+        sections = dict()
+        size = 0
+        for name, arrays in parts.items():
+            size = (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+            shape = arrays[0].shape if name != "look" else (len(arrays),) + arrays[0].shape
+            sections[name] = (size, arrays[0].dtype.str, shape)
+            size += sum(array.nbytes for array in arrays)
+        memory = shared_memory.SharedMemory(create=True, size=max(1, size))
+        try:
+            for name, arrays in parts.items():
+                offset, dtype, shape = sections[name]
+                target = np.ndarray(shape, dtype=np.dtype(dtype), buffer=memory.buf, offset=offset)
+                if name == "look":
+                    for heading, table in enumerate(arrays):
+                        target[heading] = table
+                else:
+                    target[...] = arrays[0]
+                del target
+            handle = SharedMazeHandle(memory.name, maze.width, maze.height, maze.start, maze.heading,
+                                      sorted(maze.exits), sections)
+            return cls(handle, memory, owner=True)
+        except BaseException:
+            memory.close()
+            memory.unlink()
+            raise
+
+    @classmethod
+    def attach(cls, handle):
+        return cls(handle, shared_memory.SharedMemory(name=handle.name), owner=False)
+
+    def nbytes(self):
+        return self.memory.size
+
+    def close(self):
+        # views into the segment must be dropped before its buffer is released
+        self.maze = None
+        self.field = None
+        try:
+            self.memory.close()
+        except BufferError:
+            # maze and its look tables refer to each other, their views go with the cycle
+            gc.collect()
+            self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
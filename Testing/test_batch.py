@@ -0,0 +1,96 @@
+# ------------------------------------------------------------
+# test_batch.py
+#
+# TABatchRunner in this process and on worker processes against running the
+# program serially maze by maze: robots, errors, variables, scores and budgets
+# ------------------------------------------------------------
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+TESTING = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TESTING)
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+from Robot.TADistanceField import DistanceField
+from Robot.TAMaze import Maze
+from Robot.TAMazeFile import dump
+from Robot.TARobot import SimulatedRobot
+from TABatch import TABatchRunner
+from TABudget import ExecutionBudget
+from TAInterpreter import TAInterpreter
+
+PROGRAM = open(os.path.join(TESTING, "test_interpreter_maze_loops")).read()
+# errors are reported by every run, the one in the loop many times
+ERRORS = "proc main [x] (\nint a = b\nint i = 0\nwhile lt inc i 0 3\ndo (\n    i := inc i 1\n    c := i\n    step\n)\n)\n"
+MAZES = [Maze.random(24, 24, density=3, seed=seed) for seed in range(6)] + \
+        [Maze.load(os.path.join(TESTING, "maze_small"))]
+
+
+def serial(program, maze, engine, budget=None):
+    robot = SimulatedRobot(maze)
+    interpreter = TAInterpreter(engine=engine, budget=budget)
+    errors = io.StringIO()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(errors):
+        interpreter.start(program, robot)
+    variables = None
+    if interpreter.exhausted is None:
+        variables = {name: var.value for name, var in interpreter.declaration_table[0].items()}
+    return (interpreter.exit_found, robot.steps, robot.actions, robot.position(),
+            [line for line in errors.getvalue().splitlines() if line], variables)
+
+
+def batched(result):
+    return result.exit_found, result.steps, result.actions, result.position, result.errors, result.variables
+
+
+@pytest.mark.parametrize("engine", ["tree", "closure", "bytecode", "stack"])
+@pytest.mark.parametrize("program", [PROGRAM, ERRORS])
+def test_batch_in_process_matches_serial(engine, program):
+    results = TABatchRunner(program, engine=engine, workers=0, chunk_size=3).run_all(MAZES)
+    assert [result.index for result in results] == list(range(len(MAZES)))
+    assert [batched(result) for result in results] == [serial(program, maze, engine) for maze in MAZES]
+
+
+@pytest.mark.parametrize("engine", ["tree", "bytecode"])
+def test_batch_on_workers_matches_serial(engine, tmp_path):
+    # workers open maze files themselves and get Maze objects pickled
+    paths = []
+    for index, maze in enumerate(MAZES[:3]):
+        paths.append(str(tmp_path / f"maze_{index}"))
+        with open(paths[-1], "wb") as f:
+            dump(maze, f)
+    results = TABatchRunner(PROGRAM, engine=engine, workers=2, chunk_size=2).run_all(paths + MAZES[3:])
+    assert [result.maze for result in results] == paths + list(range(3, len(MAZES)))
+    assert [batched(result) for result in results] == [serial(PROGRAM, maze, engine) for maze in MAZES]
+
+
+def test_scores_are_those_of_distance_field():
+    mazes = MAZES + [Maze.from_text(">#E\n")]
+    results = TABatchRunner(PROGRAM, workers=0, score=True, skip_unsolvable=True).run_all(mazes)
+    for result, maze in zip(results, mazes):
+        field = DistanceField(maze)
+        assert result.optimum == field.optimum()
+        if field.solvable():
+            assert not result.skipped
+            assert result.score == field.score(result.steps, result.position[:2])
+        else:
+            assert result.skipped and result.score == 0.0 and result.actions == 0
+
+
+def test_budget_ends_runs():
+    budget = ExecutionBudget(actions=20)
+    results = TABatchRunner(PROGRAM, workers=0, budget=budget).run_all(MAZES[:2])
+    for result, maze in zip(results, MAZES):
+        assert batched(result) == serial(PROGRAM, maze, "bytecode", ExecutionBudget(actions=20))
+        assert result.actions == 20 and result.variables is None and result.errors
+
+
+def test_program_with_syntax_errors_is_refused():
+    with pytest.raises(ValueError, match="syntax errors"):
+        TABatchRunner("proc main [x] (\nint a = \n)\n")
+    with pytest.raises(ValueError, match="Unknown engine"):
+        TABatchRunner(PROGRAM, engine="jit")
@@ -0,0 +1,85 @@
+# ------------------------------------------------------------
+# test_bench_suite.py
+#
+# compare of Benchmark/bench_suite.py over stored runs: regressions past the threshold,
+# missing stages and runs of different machines; small suite run stored and compared
+# ------------------------------------------------------------
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+TESTING = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TESTING)
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter"), os.path.join(ROOT, "Benchmark")]
+
+import bench_suite
+from bench_suite import compare, run_suite, workloads
+
+METADATA = {"machine": "x86_64", "processor": "cpu", "python": "CPython 3.11.7", "scale": 1.0}
+
+
+def report(best, **metadata):
+    return {"metadata": METADATA | metadata,
+            "results": {key: {"params": {}, "best": time, "median": time, "runs": [time]} for key, time in best.items()}}
+
+
+def test_slower_stages_are_regressions(capsys):
+    old = report({"flat/lex": 1.0, "flat/parse": 1.0, "maze/execute tree": 1.0, "robot/robot": 1.0})
+    new = report({"flat/lex": 1.05, "flat/parse": 1.2, "maze/execute tree": 0.5, "robot/robot": 1.1})
+    assert compare(old, new, 0.1) == ["flat/parse"]
+    printed = capsys.readouterr().out
+    assert "flat/parse" in printed and "REGRESSION" in printed
+    assert "faster" in printed.splitlines()[2]
+    assert "WARNING" not in printed
+    assert compare(old, new, 0.01) == ["flat/lex", "flat/parse", "robot/robot"]
+
+
+def test_missing_stages_are_shown_not_compared(capsys):
+    old = report({"flat/lex": 1.0, "nested/lex": 1.0})
+    new = report({"flat/lex": 1.0, "recursive/lex": 5.0})
+    new["results"]["flat/lex"] = {"params": {}, "error": "RecursionError: too deep"}
+    assert compare(old, new, 0.1) == []
+    rows = capsys.readouterr().out.splitlines()
+    assert len(rows) == 3 and all("->" in row for row in rows)
+    assert rows[0].split() == ["flat/lex:", "1000.00", "ms", "->", "-"]
+
+
+@pytest.mark.parametrize("field", ["machine", "processor", "python", "scale"])
+def test_different_machines_are_warned_about(capsys, field):
+    compare(report({"flat/lex": 1.0}), report({"flat/lex": 1.0}, **{field: "other"}), 0.1)
+    assert f"[WARNING]: runs differ in {field}" in capsys.readouterr().out
+
+
+def test_stored_runs_are_compared_by_command_line(tmp_path):
+    old, same, slower = tmp_path / "old.json", tmp_path / "same.json", tmp_path / "slower.json"
+    old.write_text(json.dumps(report({"flat/lex": 1.0})))
+    same.write_text(json.dumps(report({"flat/lex": 1.02})))
+    slower.write_text(json.dumps(report({"flat/lex": 1.5})))
+    script = os.path.join(ROOT, "Benchmark", "bench_suite.py")
+    passed = subprocess.run([sys.executable, script, "compare", str(old), str(same)], capture_output=True, text=True)
+    assert passed.returncode == 0 and "no regressions" in passed.stdout
+    failed = subprocess.run([sys.executable, script, "compare", str(old), str(slower), "--threshold", "0.2"],
+                            capture_output=True, text=True)
+    assert failed.returncode == 1 and "1 regressions over 20%" in failed.stdout
+
+
+def test_workloads_are_valid_programs():
+    for workload in workloads(0.01):
+        for stage, run in bench_suite.stages(workload, ["tree"]):
+            run()
+
+
+def test_small_run_is_stored_and_compared(tmp_path, capsys):
+    options = argparse.Namespace(scale=0.01, repeat=2, engines=["tree", "bytecode"], only=["flat/*", "robot/*"])
+    stored = run_suite(options)
+    assert sorted(stored["results"]) == ["flat/execute bytecode", "flat/execute tree", "flat/lex", "flat/parse",
+                                         "robot/robot"]
+    for result in stored["results"].values():
+        assert len(result["runs"]) == 2 and result["best"] == min(result["runs"])
+    assert stored["metadata"]["engines"] == ["tree", "bytecode"] and stored["metadata"]["scale"] == 0.01
+    loaded = json.loads(json.dumps(stored))
+    assert compare(loaded, loaded, 0.1) == []
@@ -0,0 +1,130 @@
+# ------------------------------------------------------------
+# test_distance_field.py
+#
+# distance fields against plain breadth-first search from every exit,
+# scores of robots and fields kept by DistanceFieldCache in memory and on disk
+# ------------------------------------------------------------
+import os
+import sys
+from collections import deque
+
+import numpy as np
+import pytest
+
+TESTING = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TESTING)
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+import Robot.TADistanceField as TADistanceField
+from Robot.TADistanceField import BLOCKED, UNREACHABLE, DistanceField, DistanceFieldCache, maze_hash, search
+from Robot.TAMaze import DIRECTIONS, Maze
+
+
+def naive_distances(maze):
+    distances = {}
+    queue = deque()
+    for exit_cell in maze.exits:
+        if not maze.blocked(*exit_cell):
+            distances[exit_cell] = 0
+            queue.append(exit_cell)
+    while queue:
+        x, y = queue.popleft()
+        for dx, dy in DIRECTIONS:
+            cell = (x + dx, y + dy)
+            if cell not in distances and not maze.blocked(*cell):
+                distances[cell] = distances[(x, y)] + 1
+                queue.append(cell)
+    expected = np.full((maze.height, maze.width), UNREACHABLE, dtype=np.int32)
+    expected[maze.to_grid()] = BLOCKED
+    for (x, y), distance in distances.items():
+        expected[y, x] = distance
+    return expected
+
+
+def random_maze(width, height, density, exits, seed):
+    rng = np.random.default_rng(seed)
+    cells = [(int(x), int(y)) for x, y in zip(rng.integers(0, width, exits), rng.integers(0, height, exits))]
+    return Maze.from_grid(rng.random((height, width)) < density, exits=cells)
+
+
+@pytest.mark.parametrize("small_frontier", [0, 64, 10 ** 9])
+@pytest.mark.parametrize("width, height, density, exits", [
+    (1, 1, 0.0, 1), (9, 4, 0.3, 1), (40, 30, 0.25, 1), (40, 30, 0.4, 3), (120, 80, 0.1, 5), (17, 5, 0.3, 0),
+])
+def test_search_matches_naive(monkeypatch, small_frontier, width, height, density, exits):
+    # frontiers are expanded in python below SMALL_FRONTIER and in numpy above it
+    monkeypatch.setattr(TADistanceField, "SMALL_FRONTIER", small_frontier)
+    maze = random_maze(width, height, density, exits, width * height + exits)
+    distances = search(maze)
+    assert distances.dtype == np.int32
+    assert (distances == naive_distances(maze)).all()
+
+
+def test_blocked_exit_is_not_reached():
+    maze = Maze.from_text("#E.\n>..\n")
+    maze.set_blocked(1, 0)
+    field = DistanceField(maze)
+    assert not field.solvable()
+    assert field.distance(1, 0) is None and field.distance(-1, 0) is None
+
+
+def test_field_of_small_maze():
+    field = DistanceField(Maze.load(os.path.join(TESTING, "maze_small")))
+    assert field.optimum() == 14
+    assert field.distance(8, 8) == 0 and field.distance(0, 0) is None
+    assert field.reachable(7, 8) and not field.reachable(9, 9)
+
+
+def test_score():
+    field = DistanceField(Maze.from_text(">...E\n"))
+    assert field.optimum() == 4
+    assert field.score(4, (4, 0)) == 1.0
+    assert field.score(8, (4, 0)) == 0.5
+    assert field.score(2, (2, 0)) == 0.25
+    assert field.score(0, (0, 0)) == 0.0
+    assert DistanceField(Maze.from_text(">.#E\n")).score(0, (0, 0)) == 0.0
+
+
+def test_hash_depends_on_cells_and_exits_only():
+    maze = Maze.random(30, 20, seed=1)
+    moved = Maze.random(30, 20, seed=1)
+    moved.start, moved.heading = (3, 3), 0
+    assert maze_hash(maze) == maze_hash(moved)
+    moved.exits.add((1, 2))
+    assert maze_hash(maze) != maze_hash(moved)
+    changed = Maze.random(30, 20, seed=1)
+    changed.set_blocked(5, 5, not changed.blocked(5, 5))
+    assert maze_hash(maze) != maze_hash(changed)
+
+
+def test_cache_hits_and_misses():
+    cache = DistanceFieldCache(maxsize=1)
+    first, second = Maze.random(30, 20, seed=1), Maze.random(30, 20, seed=2)
+    cache.field(first)
+    assert (cache.field(Maze.random(30, 20, seed=1)).distances == naive_distances(first)).all()
+    cache.field(second)
+    cache.field(first)
+    assert cache.stats() == {"hits": 1, "misses": 3, "disk_hits": 0, "size": 1}
+
+
+def test_disk_cache_is_shared(tmp_path):
+    maze = Maze.random(50, 40, seed=3)
+    DistanceFieldCache(directory=str(tmp_path)).field(maze)
+    cache = DistanceFieldCache(directory=str(tmp_path))
+    field = cache.field(maze)
+    assert cache.stats() == {"hits": 0, "misses": 0, "disk_hits": 1, "size": 1}
+    assert isinstance(field.distances, np.memmap) and not field.distances.flags.writeable
+    assert (field.distances == naive_distances(maze)).all()
+    assert field.optimum() == DistanceField(maze).optimum()
+
+
+def test_damaged_disk_entry_is_searched_again(tmp_path):
+    maze = Maze.random(50, 40, seed=3)
+    cache = DistanceFieldCache(directory=str(tmp_path))
+    np.save(cache.path(maze_hash(maze)), np.zeros((2, 2), dtype=np.int32))
+    assert (cache.field(maze).distances == naive_distances(maze)).all()
+    with open(cache.path(maze_hash(maze)), "wb") as f:
+        f.write(b"not an array")
+    cache = DistanceFieldCache(directory=str(tmp_path))
+    assert (cache.field(maze).distances == naive_distances(maze)).all()
+    assert cache.misses == 1
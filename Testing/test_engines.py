@@ -0,0 +1,145 @@
+# ------------------------------------------------------------
+# test_engines.py
+#
+# programs of Testing and small cases of declarations which may fail, run by every engine
+# and by lockstep: output, robot commands and errors must be those of the tree engine
+# ------------------------------------------------------------
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+TESTING = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TESTING)
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+from Robot.TAMaze import Maze
+from Robot.TARobot import SimulatedRobot
+from Robot.TARobotArray import RobotArray
+from TAInterpreter import TAInterpreter
+from TALockstep import TALockstepRunner
+
+
+def main(body):
+    return "proc main [x] (\n" + body + ")\n"
+
+
+PROGRAMS = {name: os.path.join(TESTING, name) for name in sorted(os.listdir(TESTING))
+            if name.startswith("test_interpreter")}
+CASES = {
+    # redeclaration of a name whose declaration failed is a new declaration
+    "failed_then_declared": main("cboolean a = 4\nint a = dec 4 5\n"),
+    "undeclared_then_declared": main("int b = b\ncboolean b = false\n"),
+    "same_type_redeclared": main("int b = c\nint c = 2\nint b = c\nint b = 3\n"),
+    "inner_block_declares": main("int a = c\nint c = 1\nif lt inc c 0 2 (\n    cint a = 7\n    c := a\n)\n"
+                                 "int d = c\nint a = 5\n"),
+    "inner_block_redeclares": main("int c = 1\nint a = c\nif lt inc c 0 2 (\n    cint a = 7\n    c := a\n)\n"
+                                   "int d = c\n"),
+    "parameter_redeclared": main("int x = 3\nint x = 4\n"),
+    "map_redeclared": main("map m\nmap m\nint m = 1\n"),
+    "loop_redeclares": main("int i = 0\nwhile lt inc i 0 3\ndo (\n    int k = z\n    int k = i\n"
+                            "    i := inc i 1\n)\n"),
+    "big_literal": main("int a = 99999999999999999999\nint b = inc a 1\n"),
+    # failed checks of calls inside expressions are reported for the call, not for the sentence
+    "call_errors": "proc p [a b] (\na := b\n)\n\nproc r [a] (\nr [a]\n)\n\n"
+                   + main("boolean c = true\nc := not p [c]\nboolean d = not p [c]\nc := not undefined_proc [c]\n"
+                          "c := not r [c]\n"),
+    # declaration whose value always fails never looks at its name, which is a parameter here
+    "failing_value_redeclares": "proc q [m] (\nint m = b\n)\n\n" + main("int c = 1\nq [c]\n"),
+    # names are shown in the order they were declared at runtime, not in the order they were first seen
+    "declaration_order": "proc p [a b] (\na := b\n)\n\n"
+                         + main("boolean c = true\nboolean b = not p [c]\nint i3 = 3\ncint b = 2\nint x = 1\n"
+                                "map m\n"),
+}
+SOURCES = {name: open(path).read() for name, path in PROGRAMS.items()} | CASES
+# lockstep keeps ints in int64 columns and halts robots which need more
+INT64_OVERFLOW = {"big_literal"}
+# and a column has one type, programs which may declare a name with two types are not run
+MIXED_TYPES = {"declaration_order"}
+ENGINES = [(engine, False) for engine in TAInterpreter.engines] + \
+          [(engine, True) for engine in TAInterpreter.typed_engines]
+
+
+class CommandRobot(SimulatedRobot):
+    # simulated robot which keeps every command with what it returned
+    def __init__(self, maze):
+        super().__init__(maze)
+        self.commands = []
+
+    def step(self):
+        moved = super().step()
+        self.commands.append(("step", moved))
+        return moved
+
+    def look(self):
+        distance = super().look()
+        self.commands.append(("look", distance))
+        return distance
+
+    def right(self):
+        self.commands.append(("right", None))
+        return super().right()
+
+    def left(self):
+        self.commands.append(("left", None))
+        return super().left()
+
+    def back(self):
+        self.commands.append(("back", None))
+        return super().back()
+
+
+@pytest.fixture(scope="module")
+def maze():
+    return Maze.load(os.path.join(TESTING, "maze_small"))
+
+
+def run(source, maze, engine="tree", typecheck=False):
+    robot = CommandRobot(maze)
+    interpreter = TAInterpreter(engine=engine, typecheck=typecheck)
+    output = io.StringIO()
+    errors = io.StringIO()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(errors):
+        interpreter.start(source, robot)
+    # engines which resolve names before the run report a static error once, not on every execution
+    return output.getvalue(), robot.commands, sorted(set(errors.getvalue().splitlines())), interpreter
+
+
+@pytest.mark.parametrize("engine, typecheck", ENGINES)
+@pytest.mark.parametrize("name", SOURCES)
+def test_engine_matches_tree(name, engine, typecheck, maze):
+    expected = run(SOURCES[name], maze)[:3]
+    assert run(SOURCES[name], maze, engine, typecheck)[:3] == expected
+
+
+def test_call_errors_name_the_call(maze):
+    assert run(SOURCES["call_errors"], maze)[2] == [
+        "[ERROR]: Function with 'undefined_proc' you trying to call at line 13 is not declared, "
+        "check that it is spelled correctly",
+        "[ERROR]: Maximum recursion depth reached while calling function with name 'r'",
+        "[ERROR]: Missing passing parameters in calling function with name 'p' at line 11",
+        "[ERROR]: Missing passing parameters in calling function with name 'p' at line 12",
+    ]
+
+
+@pytest.mark.parametrize("name", SOURCES)
+def test_lockstep_matches_tree(name, maze):
+    if name in MIXED_TYPES:
+        with pytest.raises(ValueError, match="'b' declared as cint at line 9 may be declared as boolean"):
+            TALockstepRunner(SOURCES[name])
+        return
+    try:
+        runner = TALockstepRunner(SOURCES[name])
+    except ValueError:
+        pytest.skip("program has syntax errors")
+    result = runner.run(RobotArray([maze]))[0]
+    if name in INT64_OVERFLOW:
+        assert result.errors == ["[ERROR]: OverflowError: integer does not fit 64 bits"]
+        return
+    _, commands, errors, interpreter = run(SOURCES[name], maze)
+    variables = {variable: value.value for variable, value in interpreter.declaration_table[0].items()}
+    assert result.variables == variables
+    assert result.actions == len(commands)
+    assert sorted(set(result.errors)) == errors
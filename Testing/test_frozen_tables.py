@@ -0,0 +1,102 @@
+# ------------------------------------------------------------
+# test_frozen_tables.py
+#
+# shipped Parser/parsetab.py and Lexer/lextab.py must be those ply builds from the grammar,
+# and frozen lexer and parser must give the tokens, trees and messages ply gives
+# ------------------------------------------------------------
+import contextlib
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+
+TESTING = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TESTING)
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+import Lexer.lextab as lextab
+import Parser.parsetab as parsetab
+from Lexer.TALexer import TALexer
+from Parser.TAParser import TAParser
+
+PROGRAMS = {name: open(os.path.join(TESTING, name)).read() for name in sorted(os.listdir(TESTING))
+            if name.startswith("test_interpreter")}
+# syntax errors with recovery, illegal characters, line breaks and comments
+EDGE_CASES = {
+    "empty": "",
+    "missing_value": "proc main [x] (\nint a = \nint b = 2\n)\n",
+    "bad_declaration": "proc main [x] (\nint = 3\nboolean b = true\n)\n",
+    "unclosed_block": "proc main [x] (\nif lt inc x 0 2 (\nx := 1\n)\n",
+    "extra_bracket": "proc main [x] (\nx := 1\n))\nproc p [a] (\na := 2\n)\n",
+    "illegal_character": "proc main [x] (\nint a = 1 $ 2\nint b = #\n)\n",
+    "line_break": "proc main [x] (\nint a = inc ...\n1 2\n// comment\nint b = a\n)\n",
+}
+SOURCES = PROGRAMS | EDGE_CASES
+
+
+def tokens(lexer, source):
+    lexer.lexer.lineno = 1
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        lexed = [(t.type, t.value, t.lineno, t.lexpos) for t in lexer.tokenize(source)]
+    return lexed, output.getvalue()
+
+
+def parsed(parser, source):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        tree, func_table, has_syntax_errors = parser.parse(source)
+    return str(tree), sorted(func_table), has_syntax_errors, output.getvalue()
+
+
+def test_parser_tables_match_grammar():
+    import ply.yacc as yacc
+    built = yacc.yacc(module=TAParser.__new__(TAParser), write_tables=False, debug=False,
+                      errorlog=yacc.NullLogger())
+    assert built.action == parsetab._lr_action
+    assert built.goto == parsetab._lr_goto
+    assert [(p.name, p.len, p.func) for p in built.productions] == \
+           [(name, length, func) for _, name, length, func, _, _ in parsetab._lr_productions]
+
+
+def test_lexer_tables_match_rules():
+    built = TALexer().lexer
+    assert built.lexstateretext["INITIAL"] == [regex for regex, _ in lextab._lexstatere["INITIAL"]]
+    assert built.lexstateignore == lextab._lexstateignore
+    assert built.lextokens == lextab._lextokens
+
+
+@pytest.mark.parametrize("name", SOURCES)
+def test_frozen_lexer_matches_ply(name):
+    assert tokens(TALexer(frozen=True), SOURCES[name]) == tokens(TALexer(), SOURCES[name])
+
+
+@pytest.mark.parametrize("name", SOURCES)
+def test_frozen_parser_matches_ply(name):
+    assert parsed(TAParser.shared(), SOURCES[name]) == parsed(TAParser(), SOURCES[name])
+
+
+def test_shared_parser_is_reused():
+    parser = TAParser.shared()
+    assert TAParser.shared() is parser
+    assert parsed(parser, EDGE_CASES["missing_value"])[2]
+    # state of the failed parse does not leak into the next one
+    assert parsed(parser, PROGRAMS["test_interpreter_counters"]) == \
+           parsed(TAParser(), PROGRAMS["test_interpreter_counters"])
+
+
+def test_frozen_parser_has_no_debug_output():
+    with pytest.raises(ValueError):
+        TAParser.shared().parse("proc main [x] (\n)\n", debug=True)
+
+
+def test_frozen_parse_does_not_import_ply():
+    script = ("import sys\n"
+              f"sys.path[:0] = [{ROOT!r}, {os.path.join(ROOT, 'Interpreter')!r}]\n"
+              "from Parser.TAParser import TAParser\n"
+              "TAParser.shared().parse('proc main [x] (\\nint a = 1\\n)\\n')\n"
+              "print(sorted(name for name in sys.modules if name.split('.')[0] == 'ply'))\n")
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,145 @@
+# ------------------------------------------------------------
+# test_incremental.py
+#
+# trees, lines, procedures and messages after edits of TAIncrementalParser
+# must be those of parsing the edited source again from scratch
+# ------------------------------------------------------------
+import contextlib
+import io
+import os
+import random
+import sys
+
+import pytest
+
+TESTING = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TESTING)
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+from Parser.TAIncremental import TAIncrementalParser
+from Parser.TAParser import NodeOfST
+from TAInterpreter import TAInterpreter
+
+PROGRAM = ("proc p [a b] (\n"
+           "    a := inc b 1\n"
+           ")\n"
+           "\n"
+           "proc main [x] (\n"
+           "    int i = 0\n"
+           "    while lt inc i 0 3\n"
+           "    do (\n"
+           "        if lt inc i 0 2 (\n"
+           "            x := inc x 1\n"
+           "        ) else (\n"
+           "            x := dec x 1\n"
+           "        )\n"
+           "        i := inc i 1\n"
+           "    )\n"
+           "    p [x i]\n"
+           ")\n")
+PROGRAMS = {name: open(os.path.join(TESTING, name)).read() for name in sorted(os.listdir(TESTING))
+            if name.startswith("test_interpreter")} | {"nested": PROGRAM}
+# replacement lines: sentences, blocks, broken structure and syntax errors
+TEXTS = ["", "    x := inc x 2\n", "int k = 4\n", "left\n", "\n", "    p [x x]\n", "if lt inc x 0 1 (\n", ")\n",
+         "proc q [c] (\nc := 1\n)\n", "int = \n", "while lt inc x 0 1\ndo (\nx := inc x 1\n)\n", "x := $\n"]
+
+
+def dump(node):
+    # type, value, line and children of every node, lines of moved sentences included
+    if not isinstance(node, NodeOfST):
+        return node
+    children = node.children.items() if isinstance(node.children, dict) else enumerate(node.children)
+    return node.type, dump(node.value), node.lineno, [(key, dump(child)) for key, child in children]
+
+
+def quiet(function, *args):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        result = function(*args)
+    return result, output.getvalue()
+
+
+def state(document, messages):
+    tree, func_table, has_syntax_errors = document.result()
+    return dump(tree), {name: dump(proc) for name, proc in func_table.items()}, has_syntax_errors, messages
+
+
+def fresh(source):
+    document, messages = quiet(TAIncrementalParser().parse, source)
+    return state(document, messages)
+
+
+def edit(incremental, document, first_line, line_count, text):
+    _, messages = quiet(incremental.edit, document, first_line, line_count, text)
+    return state(document, messages)
+
+
+def test_edit_inside_block_reparses_fragment():
+    incremental = TAIncrementalParser()
+    document = incremental.parse(PROGRAM)
+    assert edit(incremental, document, 10, 1, "            x := inc x 5\n") == fresh(document.source)
+    assert document.last_parse == ("fragment", 1)
+    assert edit(incremental, document, 14, 0, "        left\n        right\n") == fresh(document.source)
+    assert document.last_parse[0] == "fragment"
+    # lines after the insertion moved
+    assert document.func_table["main"].lineno == 5
+    assert document.syntax_tree.children[0].children[1].children[1].children[-1].lineno == 18
+
+
+def test_edit_of_procedures_updates_table():
+    incremental = TAIncrementalParser()
+    document = incremental.parse(PROGRAM)
+    assert edit(incremental, document, 4, 0, "proc q [c] (\n    c := 1\n)\n") == fresh(document.source)
+    assert sorted(document.func_table) == ["main", "p", "q"]
+    assert edit(incremental, document, 1, 3, "") == fresh(document.source)
+    assert sorted(document.func_table) == ["main", "q"]
+
+
+def test_broken_structure_parses_whole_program():
+    incremental = TAIncrementalParser()
+    document = incremental.parse(PROGRAM)
+    assert edit(incremental, document, 11, 1, "        )\n") == fresh(document.source)
+    assert document.last_parse[0] == "full"
+    assert document.has_syntax_errors
+    # program is repaired by the next edit
+    assert edit(incremental, document, 11, 1, "        ) else (\n") == fresh(document.source)
+    assert not document.has_syntax_errors
+
+
+def test_syntax_error_messages_are_those_of_full_parse():
+    incremental = TAIncrementalParser()
+    document = incremental.parse(PROGRAM)
+    expected = edit(incremental, document, 6, 1, "    int i = \n")
+    assert expected[3]
+    assert expected == fresh(document.source)
+
+
+@pytest.mark.parametrize("name", PROGRAMS)
+def test_random_edits_match_full_parse(name):
+    generator = random.Random(name)
+    incremental = TAIncrementalParser()
+    document = incremental.parse(PROGRAMS[name])
+    for _ in range(150):
+        first_line = generator.randint(1, len(document.lines) + 1)
+        line_count = generator.randint(0, min(2, len(document.lines) + 1 - first_line))
+        text = generator.choice(TEXTS + document.lines)
+        replaced = "".join(document.lines[first_line - 1:first_line - 1 + line_count])
+        length = len(document.lines)
+        assert edit(incremental, document, first_line, line_count, text) == fresh(document.source), \
+            (first_line, line_count, text, document.source)
+        if document.has_syntax_errors:
+            # broken program is repaired by undoing the edit, so later edits are mostly reparsed in fragments
+            undo = line_count + len(document.lines) - length
+            assert edit(incremental, document, first_line, undo, replaced) == fresh(document.source)
+
+
+def test_edited_program_runs_as_its_source():
+    incremental = TAIncrementalParser()
+    document = incremental.parse(PROGRAM)
+    incremental.edit(document, 7, 1, "    while lt inc i 0 5\n")
+    incremental.edit(document, 16, 0, "    int y = x\n")
+    # messages of the run name lines of the edited source
+    edited = TAInterpreter()
+    parsed = TAInterpreter()
+    assert quiet(edited.start, document) == quiet(parsed.start, document.source)
+    assert edited.declaration_table[0]["i"].value == 5
@@ -0,0 +1,110 @@
+# ------------------------------------------------------------
+# test_lexer_stream.py
+#
+# programs lexed in chunks of any size and kept in TokenArray must give the tokens,
+# lines, messages and syntax trees of the whole string lexed at once
+# ------------------------------------------------------------
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+TESTING = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TESTING)
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+from Lexer.TALexer import TALexer, chunks_of, safe_cut
+from Parser.TAParser import TAParser
+
+PROGRAMS = {name: open(os.path.join(TESTING, name)).read() for name in sorted(os.listdir(TESTING))
+            if name.startswith("test_interpreter")}
+# tokens which end with line breaks, blank lines, illegal characters and numbers which need more than 64 bits
+EDGE_CASES = {
+    "line_breaks": "proc main [x] (\n\n\nint a = inc ...\n\n1 2\n// comment\n\n\nint b = a\n\n)\n\n",
+    "illegal_character": "proc main [x] (\nint a = 1 $ 2\n\nint b = #\n)\n",
+    "big_int": "proc main [x] (\nint a = 99999999999999999999\nint b = 18446744073709551616\n)\n",
+    "no_final_line_break": "proc main [x] (\nint a = 1\n)",
+}
+SOURCES = PROGRAMS | EDGE_CASES
+CHUNK_SIZES = [1, 2, 7, 64, 1 << 16]
+
+
+def lexed(tokens):
+    # positions count from the start of every chunk, so only types, values and lines are compared
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        result = [(token.type, token.value, token.lineno) for token in tokens]
+    return result, output.getvalue()
+
+
+def whole(source):
+    lexer = TALexer(frozen=True)
+    lexer.lexer.lineno = 1
+    return lexed(lexer.tokenize(source))
+
+
+def pieces(source, size):
+    return [source[i:i + size] for i in range(0, len(source), size)]
+
+
+def parsed(source):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        tree, func_table, has_syntax_errors = TAParser.shared().parse(source)
+    return str(tree), sorted(func_table), has_syntax_errors, output.getvalue()
+
+
+@pytest.mark.parametrize("size", CHUNK_SIZES)
+@pytest.mark.parametrize("name", SOURCES)
+def test_chunks_match_whole_string(name, size):
+    lexer = TALexer(frozen=True)
+    lexer.lexer.lineno = 1
+    assert lexed(lexer.tokenize_stream(pieces(SOURCES[name], size))) == whole(SOURCES[name])
+
+
+@pytest.mark.parametrize("size", CHUNK_SIZES)
+@pytest.mark.parametrize("name", SOURCES)
+def test_file_matches_whole_string(name, size):
+    lexer = TALexer(frozen=True)
+    lexer.lexer.lineno = 1
+    assert lexed(lexer.tokenize_stream(io.StringIO(SOURCES[name]), size)) == whole(SOURCES[name])
+
+
+@pytest.mark.parametrize("name", SOURCES)
+def test_token_array_keeps_tokens(name):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        tokens = TALexer(frozen=True).token_array(pieces(SOURCES[name], 7))
+    reader = tokens.reader()
+    assert lexed(iter(reader.token, None))[0] == whole(SOURCES[name])[0]
+    assert output.getvalue() == whole(SOURCES[name])[1]
+    assert len(tokens) == len(whole(SOURCES[name])[0])
+
+
+@pytest.mark.parametrize("name", SOURCES)
+def test_parse_of_stream_matches_string(name):
+    source = SOURCES[name]
+    expected = parsed(source)
+    assert parsed(pieces(source, 7)) == expected
+    assert parsed(io.StringIO(source)) == expected
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        tokens = TALexer(frozen=True).token_array(source)
+    tree, func_table, has_syntax_errors, messages = parsed(tokens)
+    # illegal characters were reported when the array was built, before the errors of parser
+    assert (tree, func_table, has_syntax_errors) == expected[:3]
+    assert sorted((output.getvalue() + messages).split("\n\n")) == sorted(expected[3].split("\n\n"))
+
+
+def test_safe_cut():
+    assert safe_cut("int a = 1\nint b") == len("int a = 1\n")
+    assert safe_cut("int a = inc ...\n\n") == 0
+    assert safe_cut("int a\n\n\nb") == len("int a\n\n\n")
+    assert safe_cut("int a") == 0
+
+
+def test_chunks_of():
+    assert list(chunks_of(io.StringIO("abcde"), 2)) == ["ab", "cd", "e"]
+    assert list(chunks_of(["ab", "c"])) == ["ab", "c"]
@@ -0,0 +1,115 @@
+# ------------------------------------------------------------
+# test_look_tables.py
+#
+# look tables against looking cell by cell: built in chunks, updated after
+# changes of cells, read by robot, and programs run the same with them
+# ------------------------------------------------------------
+import contextlib
+import io
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+TESTING = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TESTING)
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+import Robot.TALookTables as TALookTables
+from Robot.TALookTables import LookTables
+from Robot.TAMaze import DIRECTIONS, Maze
+from Robot.TARobot import SimulatedRobot
+from TAInterpreter import TAInterpreter
+
+SIZES = [(1, 1), (7, 3), (8, 5), (9, 4), (17, 9), (100, 7), (5, 100), (33, 33)]
+
+
+def naive_look(maze, x, y, heading):
+    dx, dy = DIRECTIONS[heading]
+    distance = 0
+    while not maze.blocked(x + dx * (distance + 1), y + dy * (distance + 1)):
+        distance += 1
+    return distance
+
+
+def assert_tables_match(maze, tables):
+    for y in range(maze.height):
+        for x in range(maze.width):
+            if maze.blocked(x, y):
+                continue
+            for heading in range(4):
+                assert tables.look(x, y, heading) == naive_look(maze, x, y, heading), (x, y, heading)
+
+
+def random_maze(width, height, density, seed):
+    return Maze.from_grid(np.random.default_rng(seed).random((height, width)) < density)
+
+
+@pytest.mark.parametrize("width, height", SIZES)
+@pytest.mark.parametrize("density", [0.05, 0.4])
+def test_tables_match_naive_look(width, height, density):
+    maze = random_maze(width, height, density, width * height)
+    tables = LookTables(maze)
+    assert tables.tables[0].dtype == np.uint16
+    assert_tables_match(maze, tables)
+
+
+@pytest.mark.parametrize("chunk_cells", [1, 7, 64])
+def test_tables_built_in_chunks(monkeypatch, chunk_cells):
+    maze = random_maze(29, 23, 0.3, chunk_cells)
+    whole = LookTables(maze)
+    monkeypatch.setattr(TALookTables, "CHUNK_CELLS", chunk_cells)
+    chunked = LookTables(maze)
+    assert all((first == second).all() for first, second in zip(whole.tables, chunked.tables))
+
+
+def test_tables_follow_changed_cells():
+    maze = random_maze(21, 13, 0.3, 5)
+    maze.build_look_tables()
+    generator = random.Random(5)
+    for _ in range(100):
+        maze.set_blocked(generator.randrange(21), generator.randrange(13), generator.random() < 0.3)
+        rebuilt = LookTables(maze)
+        assert all((first == second).all() for first, second in zip(maze.look_tables.tables, rebuilt.tables))
+    assert_tables_match(maze, maze.look_tables)
+
+
+def test_shared_tables_are_not_built_again():
+    maze = random_maze(12, 12, 0.3, 2)
+    tables = LookTables(maze).tables
+    shared = LookTables(maze, tables)
+    assert shared.tables is tables
+    assert_tables_match(maze, shared)
+
+
+def test_robot_reads_tables():
+    # robots read tables of their maze whenever it has them, so each one has its own
+    maze = Maze.random(40, 30, seed=4)
+    plain = SimulatedRobot(Maze.random(40, 30, seed=4), look_tables=False)
+    assert plain.maze.look_tables is None
+    tabled = SimulatedRobot(maze, look_tables=True)
+    assert maze.look_tables is not None
+    generator = random.Random(4)
+    for _ in range(2000):
+        command = generator.choice(["step", "step", "look", "right", "left", "back"])
+        assert getattr(tabled, command)() == getattr(plain, command)()
+        assert tabled.look() == naive_look(maze, plain.x, plain.y, plain.heading)
+        assert tabled.position() == plain.position()
+
+
+def run(program, robot):
+    interpreter = TAInterpreter()
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        interpreter.start(program, robot)
+    return output.getvalue(), robot.state()
+
+
+@pytest.mark.parametrize("name", ["test_interpreter_maze_loops", "test_interpreter_alltokens"])
+def test_programs_run_the_same(name):
+    program = open(os.path.join(TESTING, name)).read()
+    plain = run(program, SimulatedRobot(Maze.load(os.path.join(TESTING, "maze_small")), look_tables=False))
+    tabled = run(program, SimulatedRobot(Maze.load(os.path.join(TESTING, "maze_small")), look_tables=True))
+    assert tabled == plain
@@ -0,0 +1,170 @@
+# ------------------------------------------------------------
+# test_maze.py
+#
+# bit-packed Maze against plain boolean grids: cells, padding, text format,
+# look scanning packed rows and columns, and SimulatedRobot walking it
+# ------------------------------------------------------------
+import os
+import pickle
+import random
+import sys
+
+import numpy as np
+import pytest
+
+TESTING = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TESTING)
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+from Robot.TAMaze import DIRECTIONS, SHORT_RUN, Maze
+from Robot.TARobot import SimulatedRobot
+
+# widths around whole bytes, runs longer than SHORT_RUN and scan windows need sparse wide mazes
+SIZES = [(1, 1), (7, 3), (8, 5), (9, 4), (17, 9), (300, 7), (5, 300)]
+
+
+def random_grid(width, height, density, seed):
+    return np.random.default_rng(seed).random((height, width)) < density
+
+
+def naive_blocked(grid, x, y):
+    height, width = grid.shape
+    return not (0 <= x < width and 0 <= y < height) or bool(grid[y, x])
+
+
+def naive_run(grid, x, y, heading):
+    dx, dy = DIRECTIONS[heading]
+    distance = 0
+    while not naive_blocked(grid, x + dx * (distance + 1), y + dy * (distance + 1)):
+        distance += 1
+    return distance
+
+
+@pytest.mark.parametrize("width, height", SIZES)
+def test_bits_match_grid(width, height):
+    grid = random_grid(width, height, 0.3, width * height)
+    maze = Maze.from_grid(grid)
+    assert maze.bits.shape == (height, (width + 7) >> 3)
+    assert (maze.to_grid() == grid).all()
+    assert maze.count_blocked() == grid.sum()
+    for y in range(-1, height + 1):
+        for x in range(-1, min(width, 40) + 1):
+            assert maze.blocked(x, y) == naive_blocked(grid, x, y)
+
+
+def test_set_blocked_keeps_other_cells():
+    grid = random_grid(13, 6, 0.5, 1)
+    maze = Maze.from_grid(grid)
+    generator = random.Random(1)
+    for _ in range(200):
+        x, y, blocked = generator.randrange(13), generator.randrange(6), generator.random() < 0.5
+        maze.set_blocked(x, y, blocked)
+        grid[y, x] = blocked
+        assert (maze.to_grid() == grid).all()
+    with pytest.raises(IndexError):
+        maze.set_blocked(13, 0)
+
+
+@pytest.mark.parametrize("width, height", SIZES)
+@pytest.mark.parametrize("density", [0.02, 0.3])
+def test_free_run_matches_walk(width, height, density):
+    grid = random_grid(width, height, density, width + height)
+    maze = Maze.from_grid(grid)
+    for y in range(height):
+        for x in range(width):
+            for heading in range(4):
+                assert maze.free_run(x, y, heading) == naive_run(grid, x, y, heading)
+
+
+def test_long_runs_are_scanned():
+    maze = Maze.from_grid(np.zeros((3, 1000), dtype=bool))
+    maze.set_blocked(SHORT_RUN * 20, 1)
+    assert maze.free_run(0, 1, 1) == SHORT_RUN * 20 - 1
+    assert maze.free_run(999, 1, 3) == 999 - SHORT_RUN * 20 - 1
+    assert maze.free_run(0, 0, 1) == 999
+
+
+def test_text_round_trip():
+    text = open(os.path.join(TESTING, "maze_small")).read()
+    maze = Maze.from_text(text)
+    assert maze.to_text() == text.replace(" ", ".")
+    assert maze.start == (1, 1) and maze.heading == 1
+    assert maze.exits == {(8, 8)}
+    assert Maze.from_text("#v\n..E\n").to_text() == "#v.\n..E\n"
+
+
+@pytest.mark.parametrize("text, message", [
+    ("#>x\n", "Unknown maze cell 'x' at \\(2, 0\\)"),
+    ("#>\n#ü\n", "Unknown maze cell 'ü' at \\(1, 1\\)"),
+    (">.\n.<\n", "second robot at \\(1, 1\\)"),
+    ("#..\n", "no robot"),
+])
+def test_bad_text(text, message):
+    with pytest.raises(ValueError, match=message):
+        Maze.from_text(text)
+
+
+def test_bad_bits():
+    with pytest.raises(ValueError):
+        Maze(9, 2, np.zeros((2, 1), dtype=np.uint8))
+    with pytest.raises(ValueError):
+        Maze(9, 2, np.zeros((2, 2), dtype=np.int64))
+
+
+@pytest.mark.parametrize("width, height", [(10, 10), (37, 21), (64, 3)])
+def test_random_maze(width, height):
+    maze = Maze.random(width, height, seed=width)
+    grid = maze.to_grid()
+    assert grid[0].all() and grid[-1].all() and grid[:, 0].all() and grid[:, -1].all()
+    assert not maze.blocked(1, 1) and not maze.blocked(width - 2, height - 2)
+    # padding bits are clear, so counting bytes counts cells
+    assert maze.count_blocked() == grid.sum()
+    assert (Maze.random(width, height, seed=width).bits == maze.bits).all()
+
+
+def test_pickle_keeps_cells():
+    maze = Maze.random(20, 11, seed=3)
+    maze.build_look_tables()
+    copy = pickle.loads(pickle.dumps(maze))
+    assert copy.look_tables is None
+    assert (copy.bits == maze.bits).all() and copy.exits == maze.exits and copy.start == maze.start
+    copy.set_blocked(2, 2, False)
+    assert not copy.blocked(2, 2)
+
+
+def test_robot_walks_like_grid():
+    grid = random_grid(40, 30, 0.25, 7)
+    grid[1, 1] = False
+    maze = Maze.from_grid(grid, start=(1, 1), heading=2, exits=[(1, 1)])
+    robot = SimulatedRobot(maze, look_tables=False)
+    assert maze.look_tables is None and robot.exit()
+    x, y, heading = 1, 1, 2
+    generator = random.Random(7)
+    for actions in range(1, 2001):
+        command = generator.choice(["step", "step", "look", "right", "left", "back"])
+        result = getattr(robot, command)()
+        if command == "step":
+            dx, dy = DIRECTIONS[heading]
+            moved = not naive_blocked(grid, x + dx, y + dy)
+            if moved:
+                x, y = x + dx, y + dy
+            assert result == moved
+        elif command == "look":
+            assert result == naive_run(grid, x, y, heading)
+        else:
+            heading = (heading + {"right": 1, "left": 3, "back": 2}[command]) % 4
+        assert robot.position() == (x, y, heading)
+    assert robot.actions == actions
+
+
+def test_robot_can_not_start_on_obstacle():
+    with pytest.raises(ValueError):
+        SimulatedRobot(Maze.from_grid(np.ones((2, 2), dtype=bool)))
+
+
+@pytest.mark.parametrize("width, height", [(0, 0), (0, 3), (5, 0)])
+def test_empty_maze(width, height):
+    maze = Maze(width, height)
+    assert maze.count_blocked() == 0
+    assert maze.blocked(0, 0)
+    assert pickle.loads(pickle.dumps(maze)).blocked(0, 0)
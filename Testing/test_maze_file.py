@@ -0,0 +1,130 @@
+# ------------------------------------------------------------
+# test_maze_file.py
+#
+# binary maze files: mazes written, converted from text and mapped back
+# must keep their cells, robot and exits, damaged files are refused
+# ------------------------------------------------------------
+import os
+import struct
+import sys
+
+import numpy as np
+import pytest
+
+TESTING = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TESTING)
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+import Robot.TAMazeFile as TAMazeFile
+from Robot.TAMaze import Maze
+from Robot.TAMazeFile import GRID_ALIGNMENT, HEADER, MazeFormatError, convert, create, dump, open_maze
+
+
+def same_maze(first, second):
+    return (first.width, first.height, first.start, first.heading, first.exits) == \
+           (second.width, second.height, second.start, second.heading, second.exits) and \
+           (np.asarray(first.bits) == np.asarray(second.bits)).all()
+
+
+def write(maze, path):
+    with open(path, "wb") as f:
+        dump(maze, f)
+    return path
+
+
+@pytest.mark.parametrize("width, height", [(10, 10), (13, 7), (64, 3), (1001, 17)])
+def test_dump_round_trip(tmp_path, width, height):
+    maze = Maze.random(width, height, seed=width)
+    maze.exits.add((1, 2))
+    path = write(maze, tmp_path / "maze")
+    loaded = Maze.load(str(path))
+    assert isinstance(loaded.bits, np.memmap)
+    assert same_maze(loaded, maze)
+    # grid starts on page boundary
+    assert loaded.bits.offset % GRID_ALIGNMENT == 0
+
+
+def test_rows_are_written_in_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(TAMazeFile, "CHUNK_BYTES", 5)
+    maze = Maze.random(30, 23, seed=1)
+    assert same_maze(open_maze(str(write(maze, tmp_path / "maze"))), maze)
+
+
+def test_empty_maze(tmp_path):
+    maze = Maze(0, 0)
+    assert same_maze(open_maze(str(write(maze, tmp_path / "maze"))), maze)
+
+
+@pytest.mark.parametrize("text", [
+    open(os.path.join(TESTING, "maze_small")).read(),
+    "\n#E#..\n\n#v  E\n..#\n",
+    "<" + "." * 40 + "E\n" + "#" * 42 + "\n",
+])
+def test_convert_matches_text(tmp_path, text):
+    (tmp_path / "maze.txt").write_text(text)
+    converted = convert(str(tmp_path / "maze.txt"), str(tmp_path / "maze"))
+    assert same_maze(converted, Maze.from_text(text))
+    assert same_maze(Maze.load(str(tmp_path / "maze")), Maze.from_text(text))
+
+
+@pytest.mark.parametrize("text, message", [
+    ("#..\n...\n", "no robot"),
+    (">..<\n", "second robot"),
+    (">..\n..v\n", "second robot"),
+    (">.x\n", "Unknown maze cell"),
+])
+def test_convert_refuses_bad_text(tmp_path, text, message):
+    (tmp_path / "maze.txt").write_text(text)
+    with pytest.raises(ValueError, match=message):
+        convert(str(tmp_path / "maze.txt"), str(tmp_path / "maze"))
+
+
+def test_writable_maze_changes_file(tmp_path):
+    path = str(tmp_path / "maze")
+    maze = create(path, 20, 9, start=(2, 3), heading=2, exits=[(5, 5)])
+    assert maze.count_blocked() == 0
+    maze.set_blocked(7, 4)
+    maze.bits.flush()
+    del maze
+    loaded = open_maze(path)
+    assert loaded.blocked(7, 4) and loaded.count_blocked() == 1
+    assert (loaded.start, loaded.heading, loaded.exits) == ((2, 3), 2, {(5, 5)})
+    with pytest.raises(ValueError):
+        loaded.set_blocked(1, 1)
+
+
+def test_text_file_is_not_maze_file(tmp_path):
+    path = tmp_path / "maze.txt"
+    path.write_text(">.E\n")
+    assert not TAMazeFile.is_maze_file(str(path))
+    with pytest.raises(MazeFormatError, match="Not a binary maze file"):
+        open_maze(str(path))
+    assert Maze.load(str(path)).exits == {(2, 0)}
+
+
+def damaged(tmp_path, change):
+    data = open(write(Maze.random(16, 16, seed=2), tmp_path / "maze"), "rb").read()
+    (tmp_path / "damaged").write_bytes(change(data))
+    return str(tmp_path / "damaged")
+
+
+def changed_header(field, value):
+    def change(data):
+        fields = list(HEADER.unpack_from(data))
+        fields[field] = value(fields[field])
+        return HEADER.pack(*fields) + data[HEADER.size:]
+    return change
+
+
+@pytest.mark.parametrize("change, message", [
+    (changed_header(1, lambda version: 9), "Unsupported maze format version 9"),
+    (changed_header(4, lambda row_bytes: row_bytes + 1), "Damaged maze file header"),
+    (changed_header(7, lambda heading: 4), "Damaged maze file header"),
+    (changed_header(8, lambda exits: 10 ** 6), "Damaged maze file header"),
+    (lambda data: data[:HEADER.size - 1], "Not a binary maze file"),
+    (lambda data: data[:HEADER.size + 4], "ends inside of exits"),
+    (lambda data: data[:-1], "shorter than grid"),
+])
+def test_damaged_files_are_refused(tmp_path, change, message):
+    with pytest.raises(MazeFormatError, match=message):
+        open_maze(damaged(tmp_path, change))
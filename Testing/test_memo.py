@@ -0,0 +1,228 @@
+# ------------------------------------------------------------
+# test_memo.py
+#
+# purity of procedures, hits, misses, evictions and skipped calls of TAMemoizer caches,
+# and runs with caches which must give what runs without them give, on every engine
+# ------------------------------------------------------------
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+TESTING = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TESTING)
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+from Parser.TAParser import TAParser
+from Robot.TAMaze import Maze
+from Robot.TARobot import SimulatedRobot
+from TABytecode import TABytecodeCompiler
+from TAInterpreter import TAInterpreter
+from TAMemo import ProcedureCache, TAMemoizer, pure_procedures
+
+PURITY = """proc pure [a] (
+a := inc a 1
+)
+
+proc moves [a] (
+step
+)
+
+proc calls_moves [a] (
+pure [a]
+moves [a]
+)
+
+proc calls_undeclared [a] (
+nowhere [a]
+)
+
+proc maps [a] (
+map m
+)
+
+proc declares [a] (
+proc inner [b] (
+    step
+)
+a := 1
+)
+
+proc ping [a] (
+if gt inc a 0 0 (
+    a := dec a 1
+    pong [a]
+)
+)
+
+proc pong [a] (
+ping [a]
+)
+
+proc main [x] (
+int c = 2
+ping [c]
+)
+"""
+CALLS = """proc sq [a r] (
+r := inc a a
+)
+
+proc bad [a] (
+a := inc a undefined
+)
+
+proc main [x] (
+int v = 3
+int r = 0
+sq [v r]
+r := 0
+sq [v r]
+int w = 4
+r := 0
+sq [w r]
+r := 0
+sq [v r]
+bad [v]
+bad [v]
+r := 0
+sq [v r]
+)
+"""
+FIB = """proc fib [n r] (
+if lt inc n 0 2 (
+    r := n
+) else (
+    int a = dec n 1
+    int ra = 0
+    fib [a ra]
+    int b = dec n 2
+    int rb = 0
+    fib [b rb]
+    r := inc ra rb
+)
+)
+
+proc walker [k] (
+step
+fib [k k]
+left
+)
+
+proc main [x] (
+int n = 12
+int r = 0
+fib [n r]
+boolean t = true
+int q = 0
+fib [t q]
+int z = 3
+walker [z]
+if not fib [t q] (
+    x := 1
+)
+)
+"""
+RESOLVING_ENGINES = ("resolved", "unboxed")
+PROGRAMS = {name: open(os.path.join(TESTING, name)).read() for name in sorted(os.listdir(TESTING))
+            if name.startswith("test_interpreter")} | {"calls": CALLS, "fib": FIB}
+
+
+def parse(source):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return TAParser().parse(source)[1]
+
+
+def run(source, engine="tree", memo=None):
+    robot = SimulatedRobot(Maze.load(os.path.join(TESTING, "maze_small")))
+    interpreter = TAInterpreter(engine=engine, memo=memo)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        interpreter.start(source, robot)
+    return output.getvalue(), robot.state()
+
+
+def test_pure_procedures():
+    func_table = parse(PURITY)
+    assert pure_procedures(func_table) == {"pure", "declares", "ping", "pong", "main"}
+    program = TABytecodeCompiler().compile(func_table)
+    assert pure_procedures(program.func_table(), program) == pure_procedures(func_table)
+
+
+@pytest.mark.parametrize("engine", TAInterpreter.engines)
+@pytest.mark.parametrize("name", PROGRAMS)
+def test_memo_does_not_change_runs(engine, name):
+    assert run(PROGRAMS[name], engine, TAMemoizer(size=8)) == run(PROGRAMS[name], engine)
+
+
+@pytest.mark.parametrize("engine", TAInterpreter.engines)
+def test_hits_misses_and_skipped_calls(engine):
+    memo = TAMemoizer()
+    output, _ = run(CALLS, engine, memo)
+    assert sorted(memo.caches) == ["bad", "main", "sq"]
+    stats = memo.stats()["sq"]
+    assert (stats["hits"], stats["misses"], stats["entries"], stats["evictions"]) == (3, 2, 2, 0)
+    assert stats["hit_rate"] == 0.6
+    stats = memo.stats()["bad"]
+    if engine in RESOLVING_ENGINES:
+        # undeclared name is reported once before the run, calls themselves report nothing and are stored
+        assert (stats["hits"], stats["misses"], stats["entries"], stats["skipped"]) == (1, 1, 1, 0)
+        assert output.count("line 6") == 1
+    else:
+        # calls which reported errors are not stored, so both report them
+        assert (stats["hits"], stats["misses"], stats["entries"], stats["skipped"]) == (0, 2, 0, 2)
+        assert output.count("line 6") == 2
+
+
+@pytest.mark.parametrize("engine", ["tree", "bytecode", "stack"])
+def test_least_recently_used_results_are_evicted(engine):
+    memo = TAMemoizer(sizes={"sq": 1})
+    run(CALLS, engine, memo)
+    stats = memo.stats()["sq"]
+    assert (stats["hits"], stats["misses"], stats["entries"], stats["evictions"]) == (2, 3, 1, 2)
+
+
+def test_procedure_cache_order():
+    cache = ProcedureCache(2)
+    for key in ("a", "b"):
+        cache.put(key, (key,))
+    assert cache.get("a") == ("a",)
+    cache.put("c", ("c",))
+    assert cache.get("b") is None and cache.get("a") == ("a",) and cache.get("c") == ("c",)
+    assert cache.as_dict() | {"hit_rate": None} == {"size": 2, "entries": 2, "hits": 3, "misses": 1,
+                                                    "evictions": 1, "skipped": 0, "hit_rate": None}
+    unbounded = ProcedureCache(0)
+    unbounded.put("a", ("a",))
+    assert unbounded.get("a") is None
+
+
+def test_only_asked_pure_procedures_are_cached():
+    memo = TAMemoizer(procedures=["sq", "moves"])
+    run(CALLS, memo=memo)
+    assert sorted(memo.caches) == ["sq"]
+    memo = TAMemoizer(procedures=["moves", "calls_moves"])
+    memo.prepare(parse(PURITY))
+    assert memo.caches == {}
+
+
+def test_map_arguments_are_not_cached():
+    source = "proc keep [m] (\nint a = 1\n)\n\nproc main [x] (\nmap m\nkeep [m]\nkeep [m]\n)\n"
+    memo = TAMemoizer()
+    assert run(source, memo=memo) == run(source)
+    assert memo.stats()["keep"]["hits"] == 0 and memo.stats()["keep"]["entries"] == 0
+
+
+def test_caches_stay_for_further_runs():
+    memo = TAMemoizer()
+    func_table = parse(CALLS)
+    memo.prepare(func_table)
+    cache = memo.cache("sq")
+    memo.prepare(func_table)
+    assert memo.cache("sq") is cache
+    # procedures parsed again are other procedures
+    memo.prepare(parse(CALLS))
+    assert memo.cache("sq") is not cache
+    memo.prepare(parse(PURITY))
+    assert memo.cache("sq") is None and memo.cache("pure") is not None
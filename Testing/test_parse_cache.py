@@ -0,0 +1,155 @@
+# ------------------------------------------------------------
+# test_parse_cache.py
+#
+# hits, misses and invalidation of TAParseCache in memory and on disk:
+# results from cache must be those TAParser gives for the same source
+# ------------------------------------------------------------
+import os
+import sys
+
+import pytest
+
+TESTING = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TESTING)
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+from Parser.TAParseCache import TAParseCache
+from Parser.TAParser import TAParser
+from TAInterpreter import TAInterpreter
+
+PROGRAM = "proc main [x] (\nint a = 1\nint b = inc a 2\n)\n"
+OTHER = "proc main [x] (\nint a = 2\n)\n"
+BROKEN = "proc main [x] (\nint a = \n)\n"
+
+
+class CountingParser:
+    # factory for the cache which counts how many times it had to parse
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return TAParser()
+
+
+def expected(source):
+    tree, func_table, has_syntax_errors = TAParser().parse(source)
+    return str(tree), sorted(func_table), has_syntax_errors
+
+
+def result(parsed):
+    tree, func_table, has_syntax_errors = parsed
+    return str(tree), sorted(func_table), has_syntax_errors
+
+
+def test_miss_then_hit():
+    cache = TAParseCache()
+    parser = CountingParser()
+    first = cache.parse(PROGRAM, parser)
+    second = cache.parse(PROGRAM, parser)
+    assert result(first) == result(second) == expected(PROGRAM)
+    assert second[0] is first[0]
+    assert parser.calls == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0, "disk_hits": 0, "disk_writes": 0, "size": 1}
+
+
+def test_hit_returns_own_function_table():
+    cache = TAParseCache()
+    _, func_table, _ = cache.parse(PROGRAM, TAParser)
+    func_table.clear()
+    assert sorted(cache.parse(PROGRAM, TAParser)[1]) == ["main"]
+
+
+def test_other_source_and_backend_miss():
+    cache = TAParseCache()
+    parser = CountingParser()
+    cache.parse(PROGRAM, parser)
+    assert result(cache.parse(OTHER, parser)) == expected(OTHER)
+    cache.parse(PROGRAM, parser, flat_ast=True)
+    assert parser.calls == 3
+    assert cache.misses == 3 and cache.hits == 0
+
+
+def test_grammar_version_invalidates(tmp_path):
+    cache = TAParseCache(directory=str(tmp_path))
+    cache.parse(PROGRAM, TAParser)
+    changed = TAParseCache(directory=str(tmp_path))
+    changed.version = "changed grammar"
+    parser = CountingParser()
+    assert result(changed.parse(PROGRAM, parser)) == expected(PROGRAM)
+    assert parser.calls == 1
+    assert changed.disk_hits == 0 and changed.misses == 1
+
+
+def test_least_recently_used_is_evicted():
+    cache = TAParseCache(maxsize=2)
+    parser = CountingParser()
+    cache.parse(PROGRAM, parser)
+    cache.parse(OTHER, parser)
+    cache.parse(PROGRAM, parser)
+    cache.parse(BROKEN, parser)
+    assert cache.evictions == 1
+    cache.parse(PROGRAM, parser)
+    assert parser.calls == 3
+    cache.parse(OTHER, parser)
+    assert parser.calls == 4
+
+
+def test_clear_and_no_memory_tier():
+    cache = TAParseCache()
+    parser = CountingParser()
+    cache.parse(PROGRAM, parser)
+    cache.clear()
+    cache.parse(PROGRAM, parser)
+    uncached = TAParseCache(maxsize=0)
+    uncached.parse(PROGRAM, parser)
+    uncached.parse(PROGRAM, parser)
+    assert parser.calls == 4
+    assert uncached.stats()["size"] == 0
+
+
+def test_syntax_errors_are_printed_on_hit(capsys):
+    cache = TAParseCache()
+    assert cache.parse(BROKEN, TAParser)[2]
+    printed = capsys.readouterr().out
+    assert printed
+    assert cache.parse(BROKEN, TAParser)[2]
+    assert capsys.readouterr().out == printed
+
+
+def test_disk_tier_is_shared(tmp_path):
+    writer = TAParseCache(directory=str(tmp_path))
+    writer.parse(PROGRAM, TAParser)
+    assert writer.disk_writes == 1
+    reader = TAParseCache(directory=str(tmp_path))
+    parser = CountingParser()
+    assert result(reader.parse(PROGRAM, parser)) == expected(PROGRAM)
+    assert parser.calls == 0
+    assert reader.disk_hits == 1
+    reader.parse(PROGRAM, parser)
+    assert reader.hits == 1
+
+
+@pytest.mark.parametrize("flat_ast", [False, True])
+def test_long_program_is_pickled(tmp_path, flat_ast):
+    # sentence lists nest as deep as the program is long, the loaded tree must still run
+    # (closure engine, tree engine itself recurses once per sentence)
+    program = "proc main [x] (\nint a = 0\n" + "a := inc a 1\n" * 5000 + ")\n"
+    TAParseCache(directory=str(tmp_path)).parse(program, TAParser, flat_ast)
+    cache = TAParseCache(directory=str(tmp_path))
+    interpreter = TAInterpreter(engine="closure", flat_ast=flat_ast, parse_cache=cache)
+    interpreter.start(program)
+    assert cache.disk_hits == 1 and cache.misses == 0
+    assert interpreter.declaration_table[0]["a"].value == 5000
+
+
+def test_damaged_file_is_parsed_again(tmp_path):
+    cache = TAParseCache(directory=str(tmp_path))
+    cache.parse(PROGRAM, TAParser)
+    with open(cache.path(cache.key(PROGRAM)), "wb") as f:
+        f.write(b"not a pickle")
+    parser = CountingParser()
+    reader = TAParseCache(directory=str(tmp_path))
+    assert result(reader.parse(PROGRAM, parser)) == expected(PROGRAM)
+    assert parser.calls == 1 and reader.disk_writes == 1
+    assert TAParseCache(directory=str(tmp_path)).parse(PROGRAM, parser) and parser.calls == 1
@@ -0,0 +1,162 @@
+# ------------------------------------------------------------
+# test_profiler.py
+#
+# counts of TAProfiler for programs whose runs are known, the same counts from every
+# engine which reports them, and times of a counting clock which must add up
+# ------------------------------------------------------------
+import contextlib
+import io
+import itertools
+import json
+import os
+import sys
+
+import pytest
+
+TESTING = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TESTING)
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+import TypeConverter
+from Robot.TAMaze import Maze
+from Robot.TARobot import SimulatedRobot
+from TAInterpreter import TAInterpreter
+from TAProfiler import TAProfiler
+
+# p changes i it gets, so the loop runs twice
+PROGRAM = ("proc p [a] (\n"
+           "a := inc a 1\n"
+           ")\n"
+           "\n"
+           "proc main [x] (\n"
+           "int i = 0\n"
+           "while lt inc i 0 4\n"
+           "do (\n"
+           "    i := inc i 1\n"
+           "    p [i]\n"
+           "    step\n"
+           ")\n"
+           "right\n"
+           "int b = true\n"
+           ")\n")
+RECURSIVE = ("proc r [a] (\n"
+             "a := dec a 1\n"
+             "if gt inc a 0 0 (\n"
+             "    r [a]\n"
+             ")\n"
+             ")\n"
+             "\n"
+             "proc main [x] (\n"
+             "int n = 3\n"
+             "r [n]\n"
+             ")\n")
+LINES = {"2": 2, "6": 1, "7": 1, "9": 2, "10": 2, "11": 2, "13": 1, "14": 1}
+ACTIONS = {"back": 0, "left": 0, "look": 0, "right": 1, "step": 2}
+
+
+def hits(table):
+    return {name: stat["hits"] for name, stat in table.items()}
+
+
+def profile(source, engine, profiler=None, interpreter=None):
+    if profiler is None:
+        profiler = TAProfiler(lines=engine in TAProfiler.line_engines,
+                              procedures=engine in TAProfiler.procedure_engines)
+    if interpreter is None:
+        interpreter = TAInterpreter(engine=engine, profiler=profiler)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        interpreter.start(source, SimulatedRobot(Maze.load(os.path.join(TESTING, "maze_small"))))
+    return profiler
+
+
+class CountingClock:
+    # every read is one tick later, so times count reads of the clock
+    def __init__(self):
+        self.ticks = itertools.count()
+        self.first = None
+        self.last = None
+
+    def __call__(self):
+        self.last = next(self.ticks)
+        if self.first is None:
+            self.first = self.last
+        return self.last
+
+
+@pytest.mark.parametrize("engine", TAInterpreter.engines)
+def test_counts_of_known_run(engine):
+    counts = profile(PROGRAM, engine).as_dict()
+    assert hits(counts["lines"]) == (LINES if engine in TAProfiler.line_engines else {})
+    assert hits(counts["procedures"]) == ({"p": 2} if engine in TAProfiler.procedure_engines else {})
+    assert hits(counts["actions"]) == ACTIONS
+
+
+def test_conversions_are_the_same_for_every_engine():
+    # unboxed engine converts values of its own columns, it never calls TypeConverter.convert
+    counts = {engine: profile(PROGRAM, engine).as_dict()["conversions"]["hits"] for engine in TAInterpreter.engines}
+    assert counts.pop("unboxed") == 0
+    assert counts["tree"] > 0
+    assert set(counts.values()) == {counts["tree"]}
+
+
+def test_node_types_of_tree_engine():
+    node_types = hits(profile(PROGRAM, "tree").as_dict()["node_types"])
+    assert node_types["while"] == 1
+    assert node_types["proc_call"] == 2
+    assert node_types["robot"] == 3
+    assert profile(PROGRAM, "closure").as_dict()["node_types"] == {}
+
+
+@pytest.mark.parametrize("engine", ["tree", "closure", "bytecode"])
+def test_times_add_up(engine):
+    clock = CountingClock()
+    profiler = TAProfiler(clock=clock, lines=engine in TAProfiler.line_engines)
+    profile(RECURSIVE, engine, profiler)
+    procedure = profiler.procedures["r"]
+    assert procedure.hits == 3
+    # own times of all stacks are the whole run, recursion is counted once in total
+    assert sum(profiler.stacks.values()) == clock.last - clock.first
+    assert procedure.total == sum(own for stack, own in profiler.stacks.items() if "proc r" in stack)
+    assert 0 < procedure.own < procedure.total
+    for stat in itertools.chain(profiler.lines.values(), profiler.node_types.values(), profiler.actions.values()):
+        assert 0 <= stat.own <= stat.total and stat.active == 0
+
+
+def test_runs_add_up():
+    profiler = TAProfiler()
+    profile(PROGRAM, "tree", profiler)
+    profile(PROGRAM, "tree", profiler)
+    assert hits(profiler.as_dict()["lines"]) == {line: count * 2 for line, count in LINES.items()}
+
+
+def test_run_leaves_interpreter_as_it_was():
+    convert = TypeConverter.convert
+    interpreter = TAInterpreter(profiler=TAProfiler())
+    profile(PROGRAM, "tree", interpreter.profiler, interpreter)
+    assert TypeConverter.convert is convert
+    assert not {"handleNode", "handleSentence", "call_proc", "step", "look"} & set(interpreter.__dict__)
+
+
+@pytest.mark.parametrize("engine", ["bytecode", "resolved", "unboxed", "stack"])
+def test_engines_without_lines_are_refused(engine):
+    with pytest.raises(ValueError, match="does not report lines"):
+        profile(PROGRAM, engine, TAProfiler())
+    if engine not in TAProfiler.procedure_engines:
+        with pytest.raises(ValueError, match="does not report procedure calls"):
+            profile(PROGRAM, engine, TAProfiler(lines=False))
+
+
+def test_reports():
+    profiler = profile(PROGRAM, "tree")
+    report = io.StringIO()
+    profiler.write_json(report)
+    assert json.loads(report.getvalue()) == profiler.as_dict()
+    collapsed = io.StringIO()
+    profiler.write_collapsed(collapsed)
+    for row in collapsed.getvalue().splitlines():
+        stack, own = row.rsplit(" ", 1)
+        assert stack.startswith("main") and profiler.stacks[stack] == int(own) > 0
+    summary = profiler.summary(PROGRAM).splitlines()
+    assert summary[0].split() == ["line", "hits", "total", "ms", "own", "ms"]
+    assert any(row.endswith("i := inc i 1") for row in summary)
@@ -0,0 +1,110 @@
+# ------------------------------------------------------------
+# test_shared_maze.py
+#
+# mazes published to shared memory: attached copies must read the cells, look tables
+# and distance field of the maze, and runs on them must be those of serial runs
+# ------------------------------------------------------------
+import contextlib
+import io
+import os
+import sys
+
+import numpy as np
+import pytest
+
+TESTING = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TESTING)
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+from Robot.TADistanceField import DistanceField, search
+from Robot.TALookTables import LookTables
+from Robot.TAMaze import Maze
+from Robot.TARobot import SimulatedRobot
+from Robot.TASharedMaze import SharedMaze
+from TABatch import TABatchRunner
+from TAInterpreter import TAInterpreter
+
+PROGRAM = open(os.path.join(TESTING, "test_interpreter_maze_loops")).read()
+MAZES = [Maze.random(width, 20, density=3, seed=width) for width in (9, 24, 37)] + \
+        [Maze.load(os.path.join(TESTING, "maze_small"))]
+
+
+def run(maze):
+    robot = SimulatedRobot(maze)
+    interpreter = TAInterpreter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        interpreter.start(PROGRAM, robot)
+    return interpreter.exit_found, robot.state(), {name: var.value for name, var in
+                                                   interpreter.declaration_table[0].items()}
+
+
+@pytest.mark.parametrize("index", range(len(MAZES)))
+def test_attached_maze_reads_published_one(index):
+    maze = MAZES[index]
+    with SharedMaze.publish(maze, look_tables=True, distance_field=True) as published:
+        attached = SharedMaze.attach(published.handle)
+        try:
+            shared = attached.maze
+            assert (shared.width, shared.height, shared.start, shared.heading, shared.exits) == \
+                   (maze.width, maze.height, maze.start, maze.heading, maze.exits)
+            assert (shared.bits == maze.bits).all()
+            expected = LookTables(maze).tables
+            assert all((first == second).all() for first, second in zip(shared.look_tables.tables, expected))
+            assert (attached.field.distances == search(maze)).all()
+            assert attached.field.optimum() == published.field.optimum()
+        finally:
+            attached.close()
+
+
+def test_shared_sections_are_read_only():
+    with SharedMaze.publish(MAZES[0], distance_field=True) as published:
+        with pytest.raises(ValueError):
+            published.maze.set_blocked(1, 1)
+        with pytest.raises(ValueError):
+            published.field.distances[0, 0] = 1
+
+
+def test_sections_are_optional():
+    with SharedMaze.publish(MAZES[1], look_tables=False) as published:
+        assert sorted(published.handle.sections) == ["bits"]
+        assert published.maze.look_tables is None and published.field is None
+        assert (published.maze.bits == MAZES[1].bits).all()
+
+
+def test_existing_tables_are_copied():
+    maze = Maze.random(30, 30, seed=5)
+    tables = maze.build_look_tables()
+    with SharedMaze.publish(maze) as published:
+        assert all((first == second).all() for first, second in zip(published.maze.look_tables.tables,
+                                                                    tables.tables))
+        assert not np.shares_memory(published.maze.look_tables.tables[0], tables.tables[0])
+
+
+@pytest.mark.parametrize("index", range(len(MAZES)))
+def test_robot_on_shared_maze_runs_as_on_maze(index):
+    with SharedMaze.publish(MAZES[index]) as published:
+        assert run(published.maze) == run(MAZES[index])
+
+
+def test_closed_segment_is_unlinked():
+    published = SharedMaze.publish(MAZES[0])
+    handle = published.handle
+    published.close()
+    with pytest.raises(FileNotFoundError):
+        SharedMaze.attach(handle)
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_batch_on_shared_mazes_matches_serial(workers):
+    published = [SharedMaze.publish(maze, distance_field=True) for maze in MAZES]
+    try:
+        results = TABatchRunner(PROGRAM, engine="tree", workers=workers, chunk_size=1, score=True) \
+            .run_all([shared.handle for shared in published])
+    finally:
+        for shared in published:
+            shared.close()
+    for result, maze in zip(results, MAZES):
+        exit_found, (x, y, heading, steps, actions), variables = run(maze)
+        assert (result.exit_found, result.position, result.steps, result.actions, result.variables) == \
+               (exit_found, (x, y, heading), steps, actions, variables)
+        assert result.optimum == DistanceField(maze).optimum()
@@ -0,0 +1,224 @@
+# ------------------------------------------------------------
+# test_snapshot.py
+#
+# runs of TAExecution which stop after robot actions, are taken into snapshots, restored
+# and branched, in this process and in forked ones, against runs which never stopped
+# ------------------------------------------------------------
+import contextlib
+import io
+import os
+import pickle
+import sys
+
+import pytest
+
+TESTING = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TESTING)
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+from Robot.TAMaze import Maze
+from Robot.TARobot import SimulatedRobot
+from TABudget import ExecutionBudget
+from TAInterpreter import TAInterpreter
+from TASnapshot import TAExecution, compile_program
+
+# wall follower which turns through a recursive procedure, so runs stop inside calls
+FOLLOWER = """proc turn [n] (
+left
+n := dec n 1
+if gt inc n 0 0 (
+    turn [n]
+)
+)
+
+proc main [x] (
+boolean moved = false
+int count = 0
+while lt 0 1
+do (
+    int n = 3
+    turn [n]
+    while lt inc look 0 1
+    do (
+        left
+    )
+    moved := step
+    count := inc count 1
+)
+)
+"""
+# turn calls itself before its action, so three calls are open at the first one
+NESTED = ("proc turn [n] (\nn := dec n 1\nif gt inc n 0 0 (\n    turn [n]\n)\nleft\n)\n\n"
+          "proc main [x] (\nint n = 3\nturn [n]\nstep\n)\n")
+MAPS = "proc keep [m k] (\nk := inc k 1\nstep\n)\n\nproc main [x] (\nmap m\nint k = 0\nkeep [m k]\nkeep [m k]\n)\n"
+PROGRAMS = {"follower": FOLLOWER, "maze_loops": open(os.path.join(TESTING, "test_interpreter_maze_loops")).read()}
+ACTIONS = 400
+MAZE = os.path.join(TESTING, "maze_small")
+
+
+def budget():
+    return ExecutionBudget(fuel=None, actions=ACTIONS)
+
+
+def variables(interpreter):
+    return {name: var.value for name, var in interpreter.declaration_table[0].items()}
+
+
+def uninterrupted(program, maze):
+    robot = SimulatedRobot(maze)
+    interpreter = TAInterpreter(engine="stack", budget=budget())
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        interpreter.start(program, robot)
+    return interpreter.exit_found, robot.state(), variables(interpreter)
+
+
+def finished(execution):
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        assert execution.run()
+    return execution.interpreter.exit_found, execution.robot.state(), variables(execution.interpreter)
+
+
+def paused(program, actions, maze=None):
+    execution = TAExecution(program, SimulatedRobot(maze or Maze.load(MAZE)), budget=budget())
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        assert not execution.run(lambda run: run.robot.actions == actions)
+    assert execution.robot.actions == actions
+    return execution
+
+
+def variants(maze, count):
+    # copies of maze with other cells of its far half blocked
+    mazes = []
+    for seed in range(count):
+        variant = Maze(maze.width, maze.height, maze.bits.copy(), start=maze.start, heading=maze.heading,
+                       exits=maze.exits)
+        for offset in range(3):
+            x, y = maze.width - 2 - (seed + offset) % (maze.width // 2), maze.height - 2 - offset
+            if (x, y) not in maze.exits:
+                variant.set_blocked(x, y)
+        mazes.append(variant)
+    return mazes
+
+
+@pytest.mark.parametrize("name", PROGRAMS)
+@pytest.mark.parametrize("actions", [1, 2, 57, 200, ACTIONS - 1])
+def test_stopped_run_goes_on_as_uninterrupted(name, actions):
+    program = PROGRAMS[name]
+    assert finished(paused(program, actions)) == uninterrupted(program, Maze.load(MAZE))
+
+
+@pytest.mark.parametrize("name", PROGRAMS)
+def test_many_stops_change_nothing(name):
+    program = PROGRAMS[name]
+    execution = TAExecution(program, SimulatedRobot(Maze.load(MAZE)), budget=budget())
+    stops = 0
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        while not execution.run(lambda run: run.robot.actions % 7 == 0):
+            stops += 1
+    assert stops == ACTIONS // 7
+    assert finished(execution) == uninterrupted(program, Maze.load(MAZE))
+
+
+@pytest.mark.parametrize("name", PROGRAMS)
+@pytest.mark.parametrize("actions", [3, 150])
+def test_restored_snapshot_runs_again(name, actions):
+    execution = paused(PROGRAMS[name], actions)
+    snapshot = execution.snapshot()
+    first = finished(execution)
+    execution.restore(snapshot)
+    assert execution.robot.actions == actions
+    assert finished(execution) == first
+    # snapshot sent to another process is the same state
+    execution.restore(pickle.loads(pickle.dumps(snapshot)))
+    assert finished(execution) == first
+    assert snapshot.size() == len(pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def test_snapshot_inside_recursion():
+    execution = paused(NESTED, 1)
+    snapshot = execution.snapshot()
+    assert [frame[0] for frame in snapshot.frames] == ["main", "turn", "turn", "turn"]
+    assert dict(snapshot.recursion_depth)["turn"] == 3
+    branch = execution.branch()
+    assert finished(branch) == finished(execution) == uninterrupted(NESTED, Maze.load(MAZE))
+    # tail call of follower reuses the frame of the call
+    assert [frame[0] for frame in paused(FOLLOWER, 2).snapshot().frames] == ["main", "turn"]
+
+
+def test_maps_are_not_shared_with_snapshot():
+    execution = paused(MAPS, 1)
+    snapshot = execution.snapshot()
+    scope = execution.interpreter.declaration_table[-1]
+    # callee has the map of main by reference, snapshot keeps one copy of it for both
+    live = execution.interpreter.declaration_table[0]["m"]
+    live.value[(1, 1)] = True
+    assert snapshot.scopes[0]["m"].value == {}
+    assert snapshot.scopes[-1]["m"] is snapshot.scopes[0]["m"]
+    assert scope["m"] is live
+    execution.restore(snapshot)
+    restored = execution.interpreter.declaration_table
+    assert restored[0]["m"].value == {} and restored[0]["m"] is not snapshot.scopes[0]["m"]
+    assert restored[-1]["m"] is restored[0]["m"]
+    assert finished(execution) == uninterrupted(MAPS, Maze.load(MAZE))
+
+
+def test_branches_in_other_mazes():
+    maze = Maze.load(MAZE)
+    mazes = variants(maze, 3)
+    execution = paused(FOLLOWER, 20)
+    position = execution.robot.state()
+    results = execution.branches(mazes)
+    # execution itself stays where it stopped
+    assert execution.robot.state() == position and not execution.finished
+    for result, variant in zip(results, mazes):
+        branch = execution.branch(variant)
+        assert branch.robot.maze is variant
+        exit_found, (x, y, heading, steps, actions), _ = finished(branch)
+        assert (result.exit_found, result.position, result.steps, result.actions) == \
+               (exit_found, (x, y, heading), steps, actions)
+        assert result.actions == ACTIONS
+    # branch in the maze the run had goes on as the run does
+    same = execution.branches([maze])[0]
+    exit_found, (x, y, heading, steps, actions), _ = uninterrupted(FOLLOWER, Maze.load(MAZE))
+    assert (same.exit_found, same.position, same.steps, same.actions, same.variables) == \
+           (exit_found, (x, y, heading), steps, actions, None)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="os.fork is not available")
+def test_forked_branches_match_branches_in_process():
+    mazes = variants(Maze.load(MAZE), 3)
+    execution = paused(FOLLOWER, 50)
+    position = execution.robot.state()
+    forked = execution.branches(mazes, fork=True)
+    assert execution.robot.state() == position
+    expected = execution.branches(mazes)
+    assert [(result.index, result.exit_found, result.position, result.steps, result.actions, result.errors)
+            for result in forked] == \
+           [(result.index, result.exit_found, result.position, result.steps, result.actions, result.errors)
+            for result in expected]
+
+
+def test_budget_goes_on_from_snapshot():
+    execution = paused(FOLLOWER, 100)
+    snapshot = execution.snapshot()
+    assert snapshot.meter[2] == 100
+    finished(execution)
+    assert execution.robot.actions == ACTIONS and execution.interpreter.exhausted is not None
+    execution.restore(snapshot)
+    finished(execution)
+    assert execution.robot.actions == ACTIONS
+
+
+def test_refused_states():
+    program = compile_program(FOLLOWER)
+    execution = TAExecution(program, SimulatedRobot(Maze.load(MAZE)), budget=ExecutionBudget(fuel=None, actions=5))
+    finished(execution)
+    with pytest.raises(ValueError, match="Finished execution"):
+        execution.snapshot()
+    execution = paused(FOLLOWER, 2)
+    with pytest.raises(ValueError, match="can not continue run"):
+        execution.branch(Maze.random(9, 9, seed=1))
+    with pytest.raises(ValueError, match="syntax errors"):
+        TAExecution("proc main [x] (\nint a = \n)\n", SimulatedRobot(Maze.load(MAZE)))
+    with pytest.raises(ValueError, match="no main procedure"):
+        TAExecution("proc p [x] (\nstep\n)\n", SimulatedRobot(Maze.load(MAZE)))
@@ -0,0 +1,212 @@
+# ------------------------------------------------------------
+# test_trace.py
+#
+# robot traces of TATracer against the actions robot really got: the same trace from
+# every engine, seeking with and without index, and replay which ends where the run did
+# ------------------------------------------------------------
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+TESTING = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TESTING)
+sys.path[:0] = [ROOT, os.path.join(ROOT, "Interpreter")]
+
+from Robot.TAMaze import Maze
+from Robot.TARobot import SimulatedRobot
+from TABatch import TABatchRunner
+from TABudget import ExecutionBudget
+from TAInterpreter import TAInterpreter
+from TATrace import (HEADER, MAGIC, TATracer, TraceFormatError, TraceMismatch, TraceReader, replay,
+                     unzigzag, write_varint, zigzag)
+
+PROGRAM = open(os.path.join(TESTING, "test_interpreter_maze_loops")).read()
+MAZE = os.path.join(TESTING, "maze_small")
+ACTIONS = 300
+
+
+class LoggingRobot(SimulatedRobot):
+    # keeps every action with its result and where the robot was after it
+    def __init__(self, maze):
+        super().__init__(maze)
+        self.log = []
+
+    def act(self, action):
+        result = getattr(SimulatedRobot, action)(self)
+        if action == "look":
+            result = int(result)
+        self.log.append((action, result, self.x, self.y, self.heading))
+        return result
+
+    def step(self):
+        return self.act("step")
+
+    def look(self):
+        return self.act("look")
+
+    def right(self):
+        return self.act("right")
+
+    def left(self):
+        return self.act("left")
+
+    def back(self):
+        return self.act("back")
+
+
+def record(engine="tree", actions=ACTIONS, **options):
+    out = io.BytesIO()
+    robot = LoggingRobot(Maze.load(MAZE))
+    interpreter = TAInterpreter(engine=engine, tracer=TATracer(out, **options),
+                                budget=ExecutionBudget(fuel=None, actions=actions))
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        interpreter.start(PROGRAM, robot)
+    return out.getvalue(), robot
+
+
+@pytest.fixture(scope="module")
+def trace():
+    return record()
+
+
+def logged(events):
+    return [(event.action, event.result, event.x, event.y, event.heading) for event in events]
+
+
+def test_varints():
+    for value in (0, 1, -1, 63, -64, 64, 1 << 20, -(1 << 33)):
+        assert unzigzag(zigzag(value)) == value and zigzag(value) >= 0
+    out = bytearray()
+    write_varint(out, 300)
+    assert out == bytearray([0xAC, 0x02])
+
+
+@pytest.mark.parametrize("engine", TAInterpreter.engines)
+def test_trace_has_actions_robot_got(engine, trace):
+    data, robot = record(engine)
+    reader = TraceReader(data)
+    assert len(reader) == robot.actions == len(robot.log) == ACTIONS
+    assert logged(reader.events()) == robot.log
+    assert (reader.start.x, reader.start.y, reader.start.heading) == (*Maze.load(MAZE).start, Maze.load(MAZE).heading)
+    # every engine keeps the line of the sentence which made the action
+    assert data == trace[0]
+
+
+def test_records_are_compact(trace):
+    data, robot = trace
+    reader = TraceReader(data)
+    # one byte of tag, one more for a small line change and one for distance of look
+    events = list(reader.events())
+    lines = [0] + [event.line for event in events]
+    changes = sum(1 for previous, line in zip(lines, lines[1:]) if line != previous)
+    looks = sum(1 for event in events if event.action == "look")
+    assert reader.end - HEADER.size == len(reader) + changes + looks
+    assert sum(reader.lines().values()) == len(reader)
+    lines = PROGRAM.splitlines()
+    for event in reader.events():
+        assert event.action in lines[event.line - 1] or "while" in lines[event.line - 1]
+
+
+@pytest.mark.parametrize("interval", [1, 7, 64, 4096])
+def test_seek_matches_decoding_from_start(trace, interval):
+    data, robot = trace
+    reader = TraceReader(record(index_interval=interval)[0])
+    assert len(reader.index) == -(-ACTIONS // interval)
+    events = list(reader.events())
+    for index in (0, 1, 6, 7, 8, 63, 64, 65, 150, ACTIONS - 1):
+        state = reader.state(index)
+        assert state.index == index
+        assert logged(reader.events(index, index + 5)) == logged(events[index:index + 5])
+        x, y, heading = robot.log[index - 1][2:] if index else (reader.start.x, reader.start.y, reader.start.heading)
+        assert state.position() == (x, y, heading)
+        assert state.steps == sum(1 for action, result, *_ in robot.log[:index] if action == "step" and result)
+    assert reader.state(ACTIONS).position() == robot.position()
+    for index in (-1, ACTIONS + 1):
+        with pytest.raises(IndexError):
+            reader.state(index)
+
+
+def test_unfinished_trace_is_indexed_when_opened(trace):
+    data, robot = trace
+    reader = TraceReader(data)
+    unfinished = TraceReader(data[:reader.end], index_interval=32)
+    assert len(unfinished) == len(reader)
+    assert len(unfinished.index) == -(-ACTIONS // 32)
+    assert logged(unfinished.events(100, 200)) == robot.log[100:200]
+    # records cut in half are not read
+    assert len(TraceReader(data[:HEADER.size + 10])) <= 10
+
+
+def test_buffered_writes_give_the_same_trace(trace):
+    assert record(buffer_bytes=1)[0] == record(buffer_bytes=16)[0] == trace[0]
+
+
+def test_replay_ends_where_run_did(trace):
+    data, robot = trace
+    reader = TraceReader(data)
+    replayed = SimulatedRobot(Maze.load(MAZE))
+    assert replay(reader, replayed) == ACTIONS
+    assert replayed.position() == robot.position() and replayed.steps == robot.steps
+    half = SimulatedRobot(Maze.load(MAZE))
+    assert replay(reader, half, ACTIONS // 2) == ACTIONS - ACTIONS // 2
+    assert half.position() == robot.position()
+    seen = []
+    assert replay(reader, None, 10, 20, on_event=seen.append) == 10
+    assert logged(seen) == robot.log[10:20]
+
+
+def test_replay_into_other_maze_is_a_mismatch(trace):
+    reader = TraceReader(trace[0])
+    maze = Maze.load(MAZE)
+    other = Maze.from_text("\n".join(row.replace("#", ".") for row in maze.to_text().splitlines()))
+    with pytest.raises(TraceMismatch) as error:
+        replay(reader, SimulatedRobot(other))
+    event = error.value.event
+    assert event.action in ("step", "look") and error.value.result != event.result
+    replay(reader, SimulatedRobot(other), check=False)
+
+
+def test_trace_file_and_tracer_reuse(tmp_path):
+    path = tmp_path / "run.trace"
+    tracer = TATracer(str(path))
+    interpreter = TAInterpreter(tracer=tracer, budget=ExecutionBudget(fuel=None, actions=50))
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        interpreter.start(PROGRAM, SimulatedRobot(Maze.load(MAZE)))
+    assert tracer.finished and tracer.records == 50
+    assert not {"step", "look", "right", "left", "back", "handleSentence"} & set(interpreter.__dict__)
+    assert len(TraceReader(str(path))) == 50
+    with open(path, "rb") as f:
+        assert len(TraceReader(f)) == 50
+    with pytest.raises(ValueError, match="already recorded"):
+        with tracer.attach(interpreter):
+            pass
+
+
+def test_damaged_traces_are_refused(trace):
+    data = trace[0]
+    with pytest.raises(TraceFormatError, match="Not a robot trace"):
+        TraceReader(b"TAMZ" + data[4:])
+    with pytest.raises(TraceFormatError, match="Not a robot trace"):
+        TraceReader(MAGIC)
+    with pytest.raises(TraceFormatError, match="Unsupported trace version"):
+        TraceReader(data[:4] + b"\x09\x00" + data[6:])
+    damaged = bytearray(data[:TraceReader(data).end])
+    damaged[HEADER.size] = 0x07
+    with pytest.raises(TraceFormatError, match="Damaged trace record"):
+        TraceReader(bytes(damaged))
+
+
+def test_batch_writes_trace_of_every_run(tmp_path):
+    mazes = [Maze.random(16, 16, density=3, seed=seed) for seed in range(3)]
+    budget = ExecutionBudget(fuel=None, actions=ACTIONS)
+    results = TABatchRunner(PROGRAM, workers=0, budget=budget, trace_directory=str(tmp_path)).run_all(mazes)
+    for index, (result, maze) in enumerate(zip(results, mazes)):
+        assert result.trace == os.path.join(str(tmp_path), f"{index}.trace")
+        reader = TraceReader(result.trace)
+        assert len(reader) == result.actions
+        robot = SimulatedRobot(maze)
+        replay(reader, robot)
+        assert robot.position() == result.position and robot.steps == result.steps